@@ -0,0 +1,112 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Meritev časa uvoza (hladni zagon) modulov gredos2x in ukaza gredos2x-pretvorba.
+
+Vsak modul se uvozi v novem procesu (večkrat, upošteva se mediana). Meritev ne uspe (izhodna koda 1), če uvoz modula traja dlje od
+proračuna ali če uvoz naloži katero izmed težkih odvisnosti (geopandas, shapely, pyproj, fiona, sqlalchemy, ...), ki se morajo
+naložiti leno, šele ob uporabi (glej gredos2x/gredos_leni_uvoz.py).
+
+Primer:
+    python benchmarks/cas_uvoza.py --proracun 0.25 --izhod cas_uvoza.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+KOREN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULI = ['gredos2x', 'gredos2x.gredos_gpkg2dataframes', 'gredos2x.gredos2gpkg', 'gredos2x.gredos2pgsql', 'gredos2x.gredos2mssql',
+          'gredos2x.gredos2parquet', 'gredos2x.gredos2cim', 'gredos2x.gredos2pandapower', 'gredos2x.gredos_pretok_moci',
+          'gredos2x.gredos_paketna_pretvorba', 'gredos2x.gredos_ozadje', 'gredos2x.gredos_meritve', 'gredos2x.gredos_vir',
+          'gredos2x.gredos_predpomnilnik', 'gredos2x.gredos_kontrolne_vsote', 'gredos2x.gredos_preverjanje',
+          'gredos2x.gredos_kodiranje', 'gredos2x.gredos_zgodovina', 'gredos2x.gredos_razlike',
+          'gredos2x.gredos_povezljivost', 'gredos2x.gredos_geometrije']
+
+# moduli, ki se ob uvozu gredos2x ne smejo naložiti
+TEZKI_MODULI = ['numpy', 'pandas', 'geopandas', 'shapely', 'pyproj', 'fiona', 'pyogrio', 'sqlalchemy', 'pyodbc', 'pyarrow', 'pandapower']
+
+_KODA = """
+import json, sys, time
+t0 = time.perf_counter()
+import {modul}
+t1 = time.perf_counter()
+print(json.dumps({{'cas_s': t1 - t0, 'tezki': [m for m in {tezki!r} if m in sys.modules]}}))
+"""
+
+
+def izmeri_uvoz(modul, ponovitve=5):
+    """Izmeri čas uvoza modula v novih procesih.
+
+    Args:
+        modul (str): ime modula
+        ponovitve (int, optional): število meritev. Defaults to 5.
+
+    Returns:
+        dict: mediana in najmanjši čas uvoza v sekundah ter seznam naloženih težkih modulov.
+    """
+    okolje = dict(os.environ, PYTHONPATH=KOREN + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    meritve = []
+    for _ in range(ponovitve):
+        izhod = subprocess.run([sys.executable, '-W', 'ignore', '-c', _KODA.format(modul=modul, tezki=TEZKI_MODULI)],
+                               capture_output=True, text=True, check=True, env=okolje).stdout
+        meritve.append(json.loads(izhod.strip().splitlines()[-1]))
+    casi = [m['cas_s'] for m in meritve]
+    return {'modul': modul, 'mediana_s': round(statistics.median(casi), 4), 'najmanj_s': round(min(casi), 4),
+            'tezki_moduli': meritve[-1]['tezki']}
+
+
+def izmeri_ukaz(ponovitve=5):
+    """Izmeri celoten čas zagona ukaza gredos2x-pretvorba --help (vključno z zagonom interpreterja)."""
+    okolje = dict(os.environ, PYTHONPATH=KOREN + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    casi = []
+    for _ in range(ponovitve):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'gredos2x.gredos_paketna_pretvorba', '--help'], capture_output=True, check=True, env=okolje)
+        casi.append(time.perf_counter() - t0)
+    return {'modul': 'gredos2x-pretvorba --help', 'mediana_s': round(statistics.median(casi), 4), 'najmanj_s': round(min(casi), 4),
+            'tezki_moduli': []}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Meritev časa uvoza modulov gredos2x.')
+    parser.add_argument('--proracun', type=float, default=0.25, help='največji dovoljeni čas uvoza modula v sekundah (mediana)')
+    parser.add_argument('--proracun-ukaza', type=float, default=0.5, help='največji dovoljeni čas zagona ukaza gredos2x-pretvorba --help')
+    parser.add_argument('--ponovitve', type=int, default=5, help='število meritev na modul')
+    parser.add_argument('--izhod', default=None, help='JSON datoteka z rezultati')
+    args = parser.parse_args()
+
+    rezultati = [izmeri_uvoz(modul, args.ponovitve) for modul in MODULI] + [izmeri_ukaz(args.ponovitve)]
+    neuspesni = []
+    for r in rezultati:
+        proracun = args.proracun_ukaza if r['modul'].startswith('gredos2x-pretvorba') else args.proracun
+        r['proracun_s'] = proracun
+        r['uspeh'] = r['mediana_s'] <= proracun and not r['tezki_moduli']
+        if not r['uspeh']:
+            neuspesni.append(r['modul'])
+        print(f"{'OK' if r['uspeh'] else 'NAPAKA':<7} {r['modul']:<40} {r['mediana_s']:8.3f} s  (proračun {proracun} s)"
+              + (f"  naloženi: {', '.join(r['tezki_moduli'])}" if r['tezki_moduli'] else ''))
+
+    if args.izhod:
+        with open(args.izhod, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'rezultati': rezultati}, f, indent=2, ensure_ascii=False)
+    sys.exit(1 if neuspesni else 0)
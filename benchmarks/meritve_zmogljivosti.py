@@ -0,0 +1,179 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Meritve zmogljivosti izvoza Gredos2GPKG in branja GredosGPKG2df na sintetičnih modelih različnih velikosti.
+
+Za vsako velikost modela se zgradi sintetični model (glej sinteticni_model.py), nato se izmerijo posamezne faze pozeni_uvoz
+(geografske datoteke, mdb tabele, materiali, indeksi), branje vseh tabel in plasti nazaj in pretok moči, ki mora konvergirati na
+vseh izvodih. Za vsako fazo se zapišejo čas, število vrstic, prepustnost (vrstic/s) in največja poraba pomnilnika (RSS) med fazo.
+Rezultati se zapišejo v JSON datoteko, ki jo lahko primerjamo z rezultati prejšnje različice (--primerjaj).
+
+Meritve tečejo na linux (sintetični model uporablja skripte namesto mdb-tools).
+
+Primer:
+    python benchmarks/meritve_zmogljivosti.py --velikosti 10000 100000 --izhod rezultati.json
+    python benchmarks/meritve_zmogljivosti.py --velikosti 10000 --izhod novi.json --primerjaj rezultati.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import gredos2x
+from gredos2x.gredos2gpkg import Gredos2GPKG
+from gredos2x.gredos_gpkg2dataframes import GredosGPKG2df
+from gredos2x.gredos_pretok_moci import RadialniPretokMoci
+from sinteticni_model import zgradi_sinteticni_model, okolje_mdb_tools
+
+
+class MerilnikPomnilnika:
+    """Vzorči RSS procesa v ločeni niti in vrne največjo vrednost med fazo (linux /proc). Kjer /proc ni na voljo, se uporabi tracemalloc
+    (zajame samo Python alokacije)."""
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.proc = os.path.exists('/proc/self/statm')
+        self.stran = os.sysconf('SC_PAGE_SIZE') if self.proc else 1
+
+    def _rss(self):
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * self.stran
+
+    def _vzorci(self):
+        while not self._ustavi.is_set():
+            self.najvec = max(self.najvec, self._rss())
+            self._ustavi.wait(self.interval)
+
+    def __enter__(self):
+        if self.proc:
+            self.najvec = self._rss()
+            self._ustavi = threading.Event()
+            self._nit = threading.Thread(target=self._vzorci, daemon=True)
+            self._nit.start()
+        else:
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.proc:
+            self._ustavi.set()
+            self._nit.join()
+            self.najvec = max(self.najvec, self._rss())
+        else:
+            self.najvec = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return False
+
+
+def izmeri(rezultati, st_vozlisc, faza, vrstice, funkcija, *args, **kwargs):
+    """Izvede funkcijo in doda meritev faze v seznam rezultatov."""
+    with MerilnikPomnilnika() as pomnilnik:
+        zacetek = time.perf_counter()
+        funkcija(*args, **kwargs)
+        cas = time.perf_counter() - zacetek
+    rezultati.append({
+        'st_vozlisc': st_vozlisc, 'faza': faza, 'cas_s': round(cas, 4), 'vrstice': int(vrstice),
+        'vrstic_na_s': round(vrstice / cas, 1) if cas > 0 else None, 'najvecji_rss_mb': round(pomnilnik.najvec / 2**20, 1),
+    })
+    print(f"{st_vozlisc:>10} {faza:<40} {cas:9.3f} s {vrstice:>10} vrstic {pomnilnik.najvec / 2**20:8.1f} MB", flush=True)
+
+
+def izmeri_velikost(st_vozlisc, imenik, nastavitve_uvoza):
+    """Zgradi sintetični model in izmeri faze izvoza in branja."""
+    model = zgradi_sinteticni_model(os.path.join(imenik, f'model_{st_vozlisc}'), st_vozlisc)
+    okolje_mdb_tools(os.path.dirname(model['mdb']))
+    vrstice = model['vrstice']
+    gpkg = os.path.join(imenik, f'izvoz_{st_vozlisc}.gpkg')
+    rezultati = []
+
+    izvoz = Gredos2GPKG(model['mdb'], model['materiali'], gpkg)
+    izmeri(rezultati, st_vozlisc, 'uvozi_geografske_datoteke', sum(vrstice[p] for p in ['POINT_geo', 'LINE_geo', 'LNODE_geo']),
+           izvoz.uvozi_geografske_datoteke, **nastavitve_uvoza)
+    izmeri(rezultati, st_vozlisc, 'uvozi_podatke_mdb', sum(vrstice[t] for t in izvoz.spisek_tabel), izvoz.uvozi_podatke_mdb,
+           **nastavitve_uvoza)
+    izmeri(rezultati, st_vozlisc, 'uvozi_podatke_materialov_mdb', vrstice['MATERIAL'], izvoz.uvozi_podatke_materialov_mdb)
+    izmeri(rezultati, st_vozlisc, 'zgradi_indekse_tabelam', sum(vrstice[t] for t in izvoz.spisek_tabel), izvoz.zgradi_indekse_tabelam)
+
+    bralnik = GredosGPKG2df(gpkg)
+    for tabela in izvoz.spisek_tabel + ['MATERIAL']:
+        izmeri(rezultati, st_vozlisc, f'nalozi_negeografsko_tabelo:{tabela}', vrstice[tabela], bralnik.nalozi_negeografsko_tabelo, tabela)
+    for plast in ['POINT_geo', 'LINE_geo', 'LNODE_geo']:
+        izmeri(rezultati, st_vozlisc, f'preberi_geografsko_tabelo_iz_gpkg:{plast}', vrstice[plast],
+               bralnik.preberi_geografsko_tabelo_iz_gpkg, plast, epsg_set=None)
+
+    pretok = RadialniPretokMoci(gpkg)
+    izmeri(rezultati, st_vozlisc, 'izracunaj_pretok_moci', vrstice['Node'], pretok.izracunaj)
+    izvodi = pretok.rezultati['izvodi']
+    if not izvodi['Konvergiran'].all():
+        raise RuntimeError(f"Pretok moči sintetičnega modela ni konvergiral na {int((~izvodi['Konvergiran']).sum())} "
+                           f"od {len(izvodi)} izvodov.")
+    return rezultati
+
+
+def primerjaj(rezultati, pot_prejsnjih, prag=1.2):
+    """Izpiše faze, ki so glede na prejšnje rezultate počasnejše za več kot prag (razmerje časov)."""
+    with open(pot_prejsnjih, encoding='utf-8') as f:
+        prejsnji = {(r['st_vozlisc'], r['faza']): r for r in json.load(f)['rezultati']}
+    poslabsanja = []
+    for r in rezultati:
+        p = prejsnji.get((r['st_vozlisc'], r['faza']))
+        if p and p['cas_s'] > 0 and r['cas_s'] / p['cas_s'] > prag:
+            poslabsanja.append((r['st_vozlisc'], r['faza'], p['cas_s'], r['cas_s']))
+    for st_vozlisc, faza, prej, zdaj in poslabsanja:
+        print(f"POČASNEJE {st_vozlisc:>10} {faza:<40} {prej:9.3f} s -> {zdaj:9.3f} s ({zdaj / prej:.2f}x)")
+    return poslabsanja
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Meritve zmogljivosti gredos2x na sintetičnih modelih.')
+    parser.add_argument('--velikosti', type=int, nargs='+', default=[10_000, 100_000], help='število vozlišč modelov (10k do 10M)')
+    parser.add_argument('--izhod', default='rezultati_meritev.json', help='JSON datoteka z rezultati')
+    parser.add_argument('--imenik', default=None, help='delovni imenik za modele (privzeto začasni imenik)')
+    parser.add_argument('--omejitev-pomnilnika-mb', type=float, default=None, help='meritev prenosa po delih z omejitvijo pomnilnika')
+    parser.add_argument('--primerjaj', default=None, help='JSON datoteka prejšnjih meritev za primerjavo')
+    parser.add_argument('--prag', type=float, default=1.2, help='razmerje časov, nad katerim je faza označena kot počasnejša')
+    args = parser.parse_args()
+
+    nastavitve_uvoza = {}
+    if args.omejitev_pomnilnika_mb is not None:
+        nastavitve_uvoza['omejitev_pomnilnika_mb'] = args.omejitev_pomnilnika_mb
+
+    with tempfile.TemporaryDirectory() as zacasni:
+        imenik = args.imenik or zacasni
+        rezultati = []
+        for st_vozlisc in args.velikosti:
+            rezultati += izmeri_velikost(st_vozlisc, imenik, nastavitve_uvoza)
+
+    porocilo = {
+        'gredos2x': gredos2x.__version__, 'python': platform.python_version(), 'platforma': platform.platform(),
+        'cas': datetime.now().isoformat(timespec='seconds'), 'nastavitve_uvoza': nastavitve_uvoza, 'rezultati': rezultati,
+    }
+    with open(args.izhod, 'w', encoding='utf-8') as f:
+        json.dump(porocilo, f, indent=2, ensure_ascii=False)
+    print(f"Rezultati zapisani v {args.izhod}.")
+
+    if args.primerjaj:
+        sys.exit(1 if primerjaj(rezultati, args.primerjaj, args.prag) else 0)
@@ -0,0 +1,196 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Generator sintetičnega modela Gredos za meritve zmogljivosti.
+
+Model je sestavljen iz radialnih izvodov (drevo vozlišč), tabele so zapisane v obliki, ki jo vrne mdb-export (CSV z glavo), geografske
+plasti pa kot shp datoteke POINT, LINE in LNODE. Model se gradi po blokih izvodov, zato je poraba pomnilnika omejena tudi pri 10M vozliščih.
+
+Ker sintetični model nima prave mdb datoteke, se v imenik zapišejo še skripte mdb-export, mdb-tables in mdb-count, ki berejo CSV datoteke.
+Imenik bin/ modela je potrebno dodati na začetek PATH (glej okolje_mdb_tools), da Gredos2GPKG na linux bere sintetične tabele.
+
+Primer:
+    python benchmarks/sinteticni_model.py /tmp/model_100k --vozlisca 100000
+"""
+
+import argparse
+import os
+import stat
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+TABELE = ['LNode', 'Node', 'Section', 'Transformer', 'Switching_device', 'Branch']
+
+# skripte namesto mdb-tools: mdb datoteki nista pravi mdb, tabele so v <imenik>/<tabela>.csv
+MDB_EXPORT = '#!/bin/sh\ncat "$(dirname "$1")/$2.csv"\n'
+MDB_TABLES = '#!/bin/sh\necho ' + ' '.join(TABELE) + '\n'
+MDB_COUNT = '#!/bin/sh\necho $(($(wc -l < "$(dirname "$1")/$2.csv") - 1))\n'
+
+
+def _zapisi(df, pot, prvi):
+    df.to_csv(pot, mode='w' if prvi else 'a', header=prvi, index=False)
+
+
+def _materiali(st_materialov, rng):
+    """Katalog materialov (R, X v ohm/km, B v µS/km, Imax v A)."""
+    return pd.DataFrame({
+        'MaterialId': np.arange(1, st_materialov + 1),
+        'Naziv': [f'MAT_{i}' for i in range(1, st_materialov + 1)],
+        'R1': np.round(rng.uniform(0.05, 1.2, st_materialov), 4),
+        'X1': np.round(rng.uniform(0.08, 0.4, st_materialov), 4),
+        'B1': np.round(rng.uniform(2.0, 120.0, st_materialov), 3),
+        'Imax': rng.choice([140, 185, 240, 290, 360, 420], st_materialov),
+    })
+
+
+def _blok(prvi_izvod, st_izvodov, vozlisc_na_izvod, rng, st_materialov):
+    """Zgradi tabele za blok zaporednih izvodov. Šifre so globalno enolične, zato se bloki lahko zapisujejo zaporedno."""
+    n = st_izvodov * vozlisc_na_izvod
+    zamik = prvi_izvod * vozlisc_na_izvod
+    indeks = np.arange(n)
+    izvod = prvi_izvod + indeks // vozlisc_na_izvod
+    pozicija = indeks % vozlisc_na_izvod
+
+    node_id = (1_000_000 + zamik + indeks).astype(str)
+    # dve vozlišči na logično vozlišče (postajo)
+    lnode_st = (zamik + indeks) // 2
+    lnode_id = (5_000_000 + lnode_st).astype(str)
+
+    # starš vozlišča je eno izmed zadnjih 5 vozlišč istega izvoda -> drevo
+    nekoren = pozicija > 0
+    stars = indeks - np.minimum(rng.integers(1, 6, n), pozicija)
+    veje = np.flatnonzero(nekoren)
+    branch_id = (20_000_000 + zamik + veje).astype(str)
+    feeder_id = (20_000_000 + izvod * vozlisc_na_izvod + 1).astype(str)[veje]
+
+    # del vej so transformatorji SN/NN in stikala, ostale so vodi z odseki. Transformatorji so samo pred končnimi vozlišči (NN zbiralka
+    # postaje), ki nosijo odjem, zato so napetostni nivoji in moči skladni in pretok moči konvergira na vseh izvodih.
+    koncno = np.ones(n, dtype=bool)
+    koncno[stars[veje]] = False
+    vrsta = rng.random(len(veje))
+    je_tr = koncno[veje] & (vrsta < 0.1)
+    je_sw = (vrsta >= 0.1) & (vrsta < 0.13)
+    je_vod = ~(je_tr | je_sw)
+    nn = np.zeros(n, dtype=bool)
+    nn[veje[je_tr]] = True
+
+    # odjem v kW: postaje SN/NN do 150 kW (manj od najmanjšega transformatorja 250 kVA), SN vozlišča do 10 kW
+    p = np.where(nn, rng.uniform(20, 150, n), rng.uniform(0, 10, n)) * nekoren
+
+    x = 400_000 + (izvod % 100) * 1500 + pozicija * rng.uniform(5, 40, n)
+    y = 30_000 + (izvod // 100) * 1500 + rng.normal(0, 200, n)
+
+    node = pd.DataFrame({
+        'NodeId': node_id, 'LNodeId': lnode_id, 'Un': np.where(nn, 0.4, 20.0),
+        'P': np.round(p, 2), 'Q': np.round(p * rng.uniform(0.1, 0.3, n), 2), 'Generation': (~nekoren).astype(int),
+    })
+    branch = pd.DataFrame({
+        'BranchId': branch_id, 'Node1': node_id[stars[veje]], 'Node2': node_id[veje], 'FeederBrId': feeder_id,
+        'Type': np.select([je_tr, je_sw], [2, 3], 1),
+    })
+    st_odsekov = rng.integers(1, 4, je_vod.sum())
+    section = pd.DataFrame({
+        'BranchId': np.repeat(branch_id[je_vod], st_odsekov),
+        'MaterialId': rng.integers(1, st_materialov + 1, st_odsekov.sum()),
+        'Length': np.round(rng.uniform(5, 60, st_odsekov.sum()), 1),
+        'Parallel': 1,
+    })
+    transformer = pd.DataFrame({
+        'BranchId': branch_id[je_tr], 'Sn': rng.choice([0.25, 0.4, 0.63, 1.0], je_tr.sum()), 'Uk': 6.0,
+        'Pcu': rng.choice([3.25, 4.6, 6.5, 10.5], je_tr.sum()), 'U1': 20.0, 'U2': 0.4,
+    })
+    switching_device = pd.DataFrame({'BranchId': branch_id[je_sw], 'State': (rng.random(je_sw.sum()) > 0.1).astype(int)})
+    prvi_lnode = np.r_[True, lnode_st[1:] != lnode_st[:-1]]
+    lnode = pd.DataFrame({'LNodeId': lnode_id[prvi_lnode], 'Type': rng.integers(1, 4, prvi_lnode.sum())})
+
+    tocke = shapely.points(x, y)
+    geo = {
+        'POINT': gpd.GeoDataFrame({'NodeId': node_id}, geometry=tocke, crs='EPSG:3912'),
+        'LINE': gpd.GeoDataFrame({'BranchId': branch_id},
+                                 geometry=shapely.linestrings(np.stack([np.c_[x[stars[veje]], y[stars[veje]]], np.c_[x[veje], y[veje]]], axis=1)),
+                                 crs='EPSG:3912'),
+        'LNODE': gpd.GeoDataFrame({'LNodeId': lnode_id[prvi_lnode]}, geometry=shapely.buffer(tocke[prvi_lnode], 3.0, quad_segs=2), crs='EPSG:3912'),
+    }
+    tabele = {'LNode': lnode, 'Node': node, 'Section': section, 'Transformer': transformer,
+              'Switching_device': switching_device, 'Branch': branch}
+    return tabele, geo
+
+
+def zgradi_sinteticni_model(imenik, st_vozlisc, vozlisc_na_izvod=500, st_materialov=40, velikost_bloka=500_000, seme=0):
+    """Zapiše sintetični model Gredos v imenik.
+
+    Args:
+        imenik (str): izhodni imenik
+        st_vozlisc (int): približno število vozlišč (zaokroženo na cele izvode)
+        vozlisc_na_izvod (int, optional): število vozlišč v izvodu. Defaults to 500.
+        st_materialov (int, optional): število materialov v katalogu. Defaults to 40.
+        velikost_bloka (int, optional): število vozlišč, ki se zgradijo in zapišejo naenkrat. Defaults to 500000.
+        seme (int, optional): seme generatorja naključnih števil. Defaults to 0.
+
+    Returns:
+        dict: poti ('mdb', 'materiali', 'bin') in število vrstic po tabelah.
+    """
+    os.makedirs(os.path.join(imenik, 'bin'), exist_ok=True)
+    rng = np.random.default_rng(seme)
+    st_izvodov = max(1, int(round(st_vozlisc / vozlisc_na_izvod)))
+    izvodov_v_bloku = max(1, velikost_bloka // vozlisc_na_izvod)
+
+    vrstice = {ime: 0 for ime in TABELE + ['POINT_geo', 'LINE_geo', 'LNODE_geo', 'MATERIAL']}
+    for prvi in range(0, st_izvodov, izvodov_v_bloku):
+        tabele, geo = _blok(prvi, min(izvodov_v_bloku, st_izvodov - prvi), vozlisc_na_izvod, rng, st_materialov)
+        for ime, df in tabele.items():
+            _zapisi(df, os.path.join(imenik, f'{ime}.csv'), prvi == 0)
+            vrstice[ime] += len(df)
+        for ime, gdf in geo.items():
+            gdf.to_file(os.path.join(imenik, f'{ime}.shp'), encoding='cp1250', mode='w' if prvi == 0 else 'a')
+            vrstice[f'{ime}_geo'] += len(gdf)
+
+    material = _materiali(st_materialov, rng)
+    material.to_csv(os.path.join(imenik, 'MATERIAL.csv'), index=False)
+    vrstice['MATERIAL'] = len(material)
+
+    # predpomnilnik materialov prepozna katalog po vsebini mdb datoteke, zato material.mdb vsebuje kar CSV katalog
+    open(os.path.join(imenik, 'model.mdb'), 'w').close()
+    material.to_csv(os.path.join(imenik, 'material.mdb'), index=False)
+    for ime, vsebina in [('mdb-export', MDB_EXPORT), ('mdb-tables', MDB_TABLES), ('mdb-count', MDB_COUNT)]:
+        pot = os.path.join(imenik, 'bin', ime)
+        with open(pot, 'w') as f:
+            f.write(vsebina)
+        os.chmod(pot, os.stat(pot).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    return {'mdb': os.path.join(imenik, 'model.mdb'), 'materiali': os.path.join(imenik, 'material.mdb'),
+            'bin': os.path.join(imenik, 'bin'), 'vrstice': vrstice}
+
+
+def okolje_mdb_tools(imenik):
+    """Doda imenik bin/ sintetičnega modela na začetek PATH, da se namesto mdb-tools uporabijo skripte modela."""
+    bin_imenik = os.path.abspath(os.path.join(imenik, 'bin'))
+    if not os.environ.get('PATH', '').startswith(bin_imenik):
+        os.environ['PATH'] = bin_imenik + os.pathsep + os.environ.get('PATH', '')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generator sintetičnega Gredos modela.')
+    parser.add_argument('imenik', help='izhodni imenik modela')
+    parser.add_argument('--vozlisca', type=int, default=10_000, help='število vozlišč (10k do 10M)')
+    parser.add_argument('--seme', type=int, default=0, help='seme generatorja naključnih števil')
+    args = parser.parse_args()
+    rezultat = zgradi_sinteticni_model(args.imenik, args.vozlisca, seme=args.seme)
+    print(rezultat['vrstice'])
@@ -0,0 +1,361 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+
+import io
+import os
+import sqlite3
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape, quoteattr
+
+
+from gredos2x.gredos_gpkg2dataframes import GredosGPKG2df, gpkg_blob_v_wkb
+from gredos2x.gredos_shema import najdi_stolpec
+from gredos2x.gredos_meritve import merilnik_izvoza
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+np = leni_modul('numpy')
+pd = leni_modul('pandas')
+shapely = leni_modul('shapely')
+
+# imenski prostor za stabilne mRID, izpeljane iz Gredos šifer
+IMENSKI_PROSTOR_MRID = uuid.uuid5(uuid.NAMESPACE_URL, 'https://github.com/GSkrt/gredos2x')
+
+CIM = 'http://iec.ch/TC57/2013/CIM-schema-cim16#'
+PROFILI = {
+    'EQ': 'http://entsoe.eu/CIM/EquipmentCore/3/1',
+    'TP': 'http://entsoe.eu/CIM/Topology/4/1',
+    'GL': 'http://entsoe.eu/CIM/GeographicalLocation/2/1',
+}
+
+
+def mrid(tip, kljuc):
+    """Stabilen mRID (UUID v5) za Gredos element. Isti tip in šifra vedno dasta isti mRID.
+
+    Args:
+        tip (str): tip elementa, npr. 'Node' ali 'Branch'
+        kljuc (str): Gredos šifra elementa
+
+    Returns:
+        str: mRID v obliki UUID
+    """
+    # šifre iz shp datotek so lahko zapisane kot float (npr. 1234.0)
+    if isinstance(kljuc, float) and kljuc.is_integer():
+        kljuc = int(kljuc)
+    kljuc = str(kljuc).strip()
+    return str(uuid.uuid5(IMENSKI_PROSTOR_MRID, f'{tip}:{kljuc}'))
+
+
+class _PisecRDF:
+    """Sprotni zapis CIM RDF/XML v odprt tok, brez gradnje XML drevesa v pomnilniku."""
+    def __init__(self, tok, profil, model_id, odvisnosti=()):
+        self.tok = tok
+        self.st_elementov = 0
+        tok.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        tok.write(f'<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns:cim="{CIM}" '
+                  'xmlns:md="http://iec.ch/TC57/61970-552/ModelDescription/1#" xmlns:entsoe="http://entsoe.eu/CIM/SchemaExtension/3/1#">\n')
+        cas = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        tok.write(f'  <md:FullModel rdf:about="urn:uuid:{model_id}">\n'
+                  f'    <md:Model.created>{cas}</md:Model.created>\n'
+                  f'    <md:Model.scenarioTime>{cas}</md:Model.scenarioTime>\n'
+                  f'    <md:Model.profile>{PROFILI[profil]}</md:Model.profile>\n'
+                  '    <md:Model.modelingAuthoritySet>https://github.com/GSkrt/gredos2x</md:Model.modelingAuthoritySet>\n')
+        for odvisnost in odvisnosti:
+            tok.write(f'    <md:Model.DependentOn rdf:resource="urn:uuid:{odvisnost}"/>\n')
+        tok.write('  </md:FullModel>\n')
+
+    def element(self, razred, mrid_elementa, lastnosti=(), reference=(), opis=False):
+        """Zapiše en CIM objekt. Lastnosti z vrednostjo None ali NaN se izpustijo."""
+        if opis:
+            vrstice = [f'  <rdf:Description rdf:about="#_{mrid_elementa}">\n']
+        else:
+            vrstice = [f'  <cim:{razred} rdf:ID="_{mrid_elementa}">\n']
+        for ime, vrednost in lastnosti:
+            if vrednost is None or (isinstance(vrednost, float) and not np.isfinite(vrednost)):
+                continue
+            if isinstance(vrednost, bool):
+                vrednost = 'true' if vrednost else 'false'
+            vrstice.append(f'    <cim:{ime}>{escape(str(vrednost))}</cim:{ime}>\n')
+        for ime, cilj in reference:
+            if cilj is not None:
+                vrstice.append(f'    <cim:{ime} rdf:resource={quoteattr("#_" + cilj)}/>\n')
+        vrstice.append('  </rdf:Description>\n' if opis else f'  </cim:{razred}>\n')
+        self.tok.write(''.join(vrstice))
+        self.st_elementov += 1
+
+    def zakljuci(self):
+        self.tok.write('</rdf:RDF>\n')
+
+
+class Gredos2CIM:
+    """
+        Gredos2CIM zapiše izvožen Gredos model (GPKG datoteka iz Gredos2GPKG) v CIM/CGMES obliko: profile EQ (oprema), TP (topologija)
+        in GL (geografske lokacije), združene v zip datoteko.
+
+        Tabele se berejo po paketih (sqlite fetchmany) in XML se zapisuje sproti neposredno v zip datoteko, zato je poraba pomnilnika
+        neodvisna od velikosti modela. mRID elementov so stabilni UUID v5, izpeljani iz Gredos šifer (glej funkcijo mrid).
+
+        Preslikava: Node -> ConnectivityNode/TopologicalNode, LNode -> Substation, veje z odseki -> ACLineSegment, Transformer ->
+        PowerTransformer, Switching_device (veja brez odsekov) -> Switch, vozlišča z odjemom -> EnergyConsumer. Parametri vodov se vzamejo iz tabele
+        Branch_parametri (če je ni, se ob prvem klicu izračuna). Lokacije POINT_geo so vezane na ConnectivityNode (razširitev, ker
+        ConnectivityNode v CIM ni PowerSystemResource).
+
+        Args:
+            povezava_gpkg (str): pot do GPKG datoteke
+            pot_zip (str): pot do izhodne zip datoteke s CGMES profili
+            velikost_paketa (int, optional): število vrstic v enem paketu branja. Defaults to 10000.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+            crs (str, optional): koordinatni sistem geometrij v GPKG datoteki (urn za CoordinateSystem). Defaults to None (prebere se iz GPKG).
+            merilnik (gredos_meritve.Merilnik, optional): merilnik, ki dobi dogodke faz izvoza. Defaults to None (nov merilnik, glej self.merilnik).
+    """
+    def __init__(self, povezava_gpkg, pot_zip, velikost_paketa=10000, stolpci=None, crs=None, merilnik=None):
+        self.gpkg_povezava = povezava_gpkg
+        self.pot_zip = os.path.abspath(pot_zip)
+        self.velikost_paketa = velikost_paketa
+        self.stolpci = stolpci
+        self.crs = crs
+        self.merilnik = merilnik_izvoza(merilnik, 'Gredos2CIM')
+        self.ime_modela = os.path.splitext(os.path.basename(self.pot_zip))[0]
+        self.model_id = {profil: mrid('Model', f'{self.ime_modela}:{profil}') for profil in PROFILI}
+
+    def _stolpci_tabele(self, conn, tabela):
+        """Prazen DataFrame s stolpci tabele (za iskanje imen stolpcev z najdi_stolpec)."""
+        return pd.DataFrame(columns=[v[1] for v in conn.execute(f'pragma table_info("{tabela}")')])
+
+    def _obstaja(self, conn, tabela):
+        return conn.execute("select 1 from sqlite_master where type='table' and name=?", (tabela,)).fetchone() is not None
+
+    def _paketi(self, conn, sql):
+        """Generator paketov vrstic za podano poizvedbo."""
+        kazalec = conn.execute(sql)
+        while True:
+            vrstice = kazalec.fetchmany(self.velikost_paketa)
+            if not vrstice:
+                break
+            yield vrstice
+
+    def _zapisi_eq(self, conn, pisec):
+        """Profil EQ: regije, napetostni nivoji, postaje, vozlišča, odjemi in oprema vej."""
+        regija, podregija, vod = mrid('Region', self.ime_modela), mrid('SubRegion', self.ime_modela), mrid('Line', self.ime_modela)
+        pisec.element('GeographicalRegion', regija, [('IdentifiedObject.name', self.ime_modela)])
+        pisec.element('SubGeographicalRegion', podregija, [('IdentifiedObject.name', self.ime_modela)],
+                      [('SubGeographicalRegion.Region', regija)])
+        pisec.element('Line', vod, [('IdentifiedObject.name', self.ime_modela)], [('Line.Region', podregija)])
+
+        node = self._stolpci_tabele(conn, 'Node')
+        n_id = najdi_stolpec(node, 'Node', 'id', self.stolpci)
+        n_un = najdi_stolpec(node, 'Node', 'un', self.stolpci, obvezen=False)
+        n_p = najdi_stolpec(node, 'Node', 'p', self.stolpci, obvezen=False)
+        n_q = najdi_stolpec(node, 'Node', 'q', self.stolpci, obvezen=False)
+
+        if n_un is not None:
+            for (un,) in conn.execute(f'select distinct "{n_un}" from Node where "{n_un}" is not null'):
+                pisec.element('BaseVoltage', mrid('BaseVoltage', un), [('IdentifiedObject.name', f'{un} kV'), ('BaseVoltage.nominalVoltage', un)])
+
+        if self._obstaja(conn, 'LNode'):
+            l_id = najdi_stolpec(self._stolpci_tabele(conn, 'LNode'), 'LNode', 'id', self.stolpci)
+            for paket in self._paketi(conn, f'select "{l_id}" from LNode'):
+                for (lnode,) in paket:
+                    pisec.element('Substation', mrid('LNode', lnode), [('IdentifiedObject.name', lnode)],
+                                  [('Substation.Region', podregija)])
+
+        izbor = ', '.join(f'"{s}"' if s else 'null' for s in [n_id, n_p, n_q])
+        for paket in self._paketi(conn, f'select {izbor} from Node'):
+            for node_id, p, q in paket:
+                cn = mrid('Node', node_id)
+                pisec.element('ConnectivityNode', cn, [('IdentifiedObject.name', node_id)],
+                              [('ConnectivityNode.ConnectivityNodeContainer', vod)])
+                if (p or 0) != 0 or (q or 0) != 0:
+                    odjem = mrid('EnergyConsumer', node_id)
+                    pisec.element('EnergyConsumer', odjem, [('IdentifiedObject.name', node_id)],
+                                  [('Equipment.EquipmentContainer', vod)])
+                    pisec.element('Terminal', mrid('Terminal', f'{node_id}:odjem'),
+                                  [('IdentifiedObject.name', f'{node_id} T1'), ('ACDCTerminal.sequenceNumber', 1)],
+                                  [('Terminal.ConductingEquipment', odjem), ('Terminal.ConnectivityNode', cn)])
+
+        self._zapisi_veje(conn, pisec, vod, n_id, n_un)
+
+    def _zapisi_veje(self, conn, pisec, vod, n_id, n_un):
+        """Veje modela z enim prehodom (join Branch z Node, Branch_parametri, Transformer in Switching_device po indeksih)."""
+        branch = self._stolpci_tabele(conn, 'Branch')
+        b_id = najdi_stolpec(branch, 'Branch', 'id', self.stolpci)
+        b_n1 = najdi_stolpec(branch, 'Branch', 'vozlisce1', self.stolpci)
+        b_n2 = najdi_stolpec(branch, 'Branch', 'vozlisce2', self.stolpci)
+
+        izbor = [f'b."{b_id}"', f'b."{b_n1}"', f'b."{b_n2}"',
+                 f'n1."{n_un}"' if n_un else 'null', f'n2."{n_un}"' if n_un else 'null']
+        povezave = [f'left join Node n1 on n1."{n_id}" = b."{b_n1}"', f'left join Node n2 on n2."{n_id}" = b."{b_n2}"']
+
+        if self._obstaja(conn, 'Branch_parametri'):
+            parametri = self._stolpci_tabele(conn, 'Branch_parametri')
+            izbor += ['p.Dolzina_km', 'p.R_ohm', 'p.X_ohm', 'p.B_uS', 'p."{}" is not null'.format(parametri.columns[0])]
+            povezave.append(f'left join Branch_parametri p on p."{parametri.columns[0]}" = b."{b_id}"')
+        else:
+            izbor += ['null', 'null', 'null', 'null', '0']
+
+        if self._obstaja(conn, 'Transformer'):
+            transformer = self._stolpci_tabele(conn, 'Transformer')
+            t_veja = najdi_stolpec(transformer, 'Transformer', 'veja', self.stolpci)
+            for vloga in ['sn', 'uk', 'pcu', 'u1', 'u2']:
+                ime = najdi_stolpec(transformer, 'Transformer', vloga, self.stolpci, obvezen=False)
+                izbor.append(f't."{ime}"' if ime else 'null')
+            izbor.append(f't."{t_veja}" is not null')
+            povezave.append(f'left join Transformer t on t."{t_veja}" = b."{b_id}"')
+        else:
+            izbor += ['null'] * 5 + ['0']
+
+        if self._obstaja(conn, 'Switching_device'):
+            stikala = self._stolpci_tabele(conn, 'Switching_device')
+            s_veja = najdi_stolpec(stikala, 'Switching_device', 'veja', self.stolpci)
+            s_stanje = najdi_stolpec(stikala, 'Switching_device', 'stanje', self.stolpci, obvezen=False)
+            izbor += [f's."{s_stanje}"' if s_stanje else 'null', f's."{s_veja}" is not null']
+            povezave.append(f'left join Switching_device s on s."{s_veja}" = b."{b_id}"')
+        else:
+            izbor += ['null', '0']
+
+        sql = f'select {", ".join(izbor)} from Branch b {" ".join(povezave)}'
+        for paket in self._paketi(conn, sql):
+            for (veja, n1, n2, un1, un2, dolzina, r, x, b_us, ima_odseke,
+                 sn, uk, pcu, u1, u2, je_tr, stanje, je_sw) in paket:
+                oprema = mrid('Branch', veja)
+                osnovna = mrid('BaseVoltage', un1) if un1 is not None else None
+                if je_tr:
+                    self._zapisi_transformator(pisec, vod, veja, oprema, (n1, n2), (u1 or un1, u2 or un2), sn, uk, pcu)
+                    continue
+                if ima_odseke:
+                    pisec.element('ACLineSegment', oprema, [
+                        ('IdentifiedObject.name', veja), ('Conductor.length', dolzina), ('ACLineSegment.r', r),
+                        ('ACLineSegment.x', x), ('ACLineSegment.bch', b_us * 1e-6 if b_us is not None else None),
+                        ('ACLineSegment.gch', 0.0)],
+                        [('Equipment.EquipmentContainer', vod), ('ConductingEquipment.BaseVoltage', osnovna)])
+                else:
+                    odprto = je_sw and stanje is not None and float(stanje) == 0
+                    pisec.element('Switch', oprema, [('IdentifiedObject.name', veja), ('Switch.normalOpen', bool(odprto)),
+                                                     ('Switch.retained', False)],
+                                  [('Equipment.EquipmentContainer', vod), ('ConductingEquipment.BaseVoltage', osnovna)])
+                for zaporedna, vozlisce in enumerate((n1, n2), start=1):
+                    pisec.element('Terminal', mrid('Terminal', f'{veja}:{zaporedna}'),
+                                  [('IdentifiedObject.name', f'{veja} T{zaporedna}'), ('ACDCTerminal.sequenceNumber', zaporedna)],
+                                  [('Terminal.ConductingEquipment', oprema),
+                                   ('Terminal.ConnectivityNode', mrid('Node', vozlisce) if vozlisce is not None else None)])
+
+    def _zapisi_transformator(self, pisec, vod, veja, oprema, vozlisca, napetosti, sn, uk, pcu):
+        """PowerTransformer z dvema navitjema; impedanca je preračunana na prvo navitje (uk v %, Sn v MVA, Pcu v kW)."""
+        pisec.element('PowerTransformer', oprema, [('IdentifiedObject.name', veja)], [('Equipment.EquipmentContainer', vod)])
+        for zaporedna, (vozlisce, un) in enumerate(zip(vozlisca, napetosti), start=1):
+            terminal = mrid('Terminal', f'{veja}:{zaporedna}')
+            pisec.element('Terminal', terminal,
+                          [('IdentifiedObject.name', f'{veja} T{zaporedna}'), ('ACDCTerminal.sequenceNumber', zaporedna)],
+                          [('Terminal.ConductingEquipment', oprema),
+                           ('Terminal.ConnectivityNode', mrid('Node', vozlisce) if vozlisce is not None else None)])
+            r = x = 0.0
+            if zaporedna == 1 and sn and uk and un:
+                z_baza = float(un) ** 2 / float(sn)
+                r = (float(pcu) / 1000 / float(sn) if pcu else 0.0) * z_baza
+                x = float(np.sqrt(max((float(uk) / 100 * z_baza) ** 2 - r ** 2, 0.0)))
+            pisec.element('PowerTransformerEnd', mrid('PowerTransformerEnd', f'{veja}:{zaporedna}'), [
+                ('IdentifiedObject.name', f'{veja} N{zaporedna}'), ('TransformerEnd.endNumber', zaporedna),
+                ('PowerTransformerEnd.ratedS', sn), ('PowerTransformerEnd.ratedU', un), ('PowerTransformerEnd.r', r),
+                ('PowerTransformerEnd.x', x)],
+                [('PowerTransformerEnd.PowerTransformer', oprema), ('TransformerEnd.Terminal', terminal),
+                 ('TransformerEnd.BaseVoltage', mrid('BaseVoltage', un) if un is not None else None)])
+
+    def _zapisi_tp(self, conn, pisec):
+        """Profil TP: topološko vozlišče za vsako Gredos vozlišče in povezava ConnectivityNode -> TopologicalNode."""
+        node = self._stolpci_tabele(conn, 'Node')
+        n_id = najdi_stolpec(node, 'Node', 'id', self.stolpci)
+        n_un = najdi_stolpec(node, 'Node', 'un', self.stolpci, obvezen=False)
+        vod = mrid('Line', self.ime_modela)
+        un = f'"{n_un}"' if n_un else 'null'
+        for paket in self._paketi(conn, f'select "{n_id}", {un} from Node'):
+            for node_id, un in paket:
+                tn = mrid('TopologicalNode', node_id)
+                pisec.element('TopologicalNode', tn, [('IdentifiedObject.name', node_id)],
+                              [('TopologicalNode.BaseVoltage', mrid('BaseVoltage', un) if un is not None else None),
+                               ('TopologicalNode.ConnectivityNodeContainer', vod)])
+                pisec.element(None, mrid('Node', node_id), reference=[('ConnectivityNode.TopologicalNode', tn)], opis=True)
+
+    def _zapisi_gl(self, conn, pisec):
+        """Profil GL: koordinatni sistem, lokacije in točke lokacij iz geografskih plasti (geometrije se pretvarjajo po paketih)."""
+        crs = self.crs
+        if crs is None:
+            vrstica = conn.execute("select s.organization, s.organization_coordsys_id from gpkg_geometry_columns g "
+                                   "join gpkg_spatial_ref_sys s on s.srs_id = g.srs_id limit 1").fetchone()
+            crs = f'{vrstica[0]}:{vrstica[1]}' if vrstica else 'EPSG:3912'
+        koordinatni_sistem = mrid('CoordinateSystem', crs)
+        organizacija, koda = crs.split(':')
+        pisec.element('CoordinateSystem', koordinatni_sistem,
+                      [('IdentifiedObject.name', crs), ('CoordinateSystem.crsUrn', f'urn:ogc:def:crs:{organizacija}::{koda}')])
+
+        for plast, tip in [('POINT_geo', 'Node'), ('LINE_geo', 'Branch'), ('LNODE_geo', 'LNode')]:
+            if not self._obstaja(conn, plast):
+                continue
+            kljuc = najdi_stolpec(self._stolpci_tabele(conn, plast), plast, 'id', self.stolpci, obvezen=False)
+            geometrija = conn.execute("select column_name from gpkg_geometry_columns where table_name=?", (plast,)).fetchone()
+            if kljuc is None or geometrija is None:
+                continue
+            for paket in self._paketi(conn, f'select "{kljuc}", "{geometrija[0]}" from "{plast}"'):
+                kljuci = [vrstica[0] for vrstica in paket]
+                geometrije = shapely.from_wkb([gpkg_blob_v_wkb(vrstica[1]) for vrstica in paket])
+                koordinate, indeksi = shapely.get_coordinates(geometrije, return_index=True)
+                meje = np.searchsorted(indeksi, np.arange(len(paket) + 1))
+                for i, element in enumerate(kljuci):
+                    if element is None or meje[i] == meje[i + 1]:
+                        continue
+                    lokacija = mrid('Location', f'{tip}:{element}')
+                    pisec.element('Location', lokacija, [('IdentifiedObject.name', str(element))],
+                                  [('Location.PowerSystemResources', mrid(tip, element)), ('Location.CoordinateSystem', koordinatni_sistem)])
+                    for zaporedna, (x, y) in enumerate(koordinate[meje[i]:meje[i + 1]], start=1):
+                        pisec.element('PositionPoint', mrid('PositionPoint', f'{tip}:{element}:{zaporedna}'),
+                                      [('PositionPoint.sequenceNumber', zaporedna), ('PositionPoint.xPosition', float(x)),
+                                       ('PositionPoint.yPosition', float(y))], [('PositionPoint.Location', lokacija)])
+
+    def pozeni_izvoz(self, show_progress=False, imenik_profilov=None):
+        """Zapiše profile EQ, TP in GL v zip datoteko.
+
+        Args:
+            show_progress (bool, optional): V terminalu prikaže napredek izvoza. Defaults to False.
+            imenik_profilov (str, optional): profiliraj zapis profilov (cProfile, tracemalloc) in profile zapiši v ta imenik
+                (glej gredos_meritve.Profiliranje). Defaults to None (brez profiliranja).
+
+        Returns:
+            str: pot do zip datoteke.
+        """
+        with self.merilnik.profiliranje(imenik_profilov):
+            return self._pozeni_izvoz(show_progress)
+
+    def _pozeni_izvoz(self, show_progress):
+        rd = GredosGPKG2df(self.gpkg_povezava, merilnik=self.merilnik)
+        if not rd.tabela_obstaja('Branch_parametri') and rd.tabela_obstaja('Section') and rd.tabela_obstaja('MATERIAL'):
+            rd.nalozi_parametre_vej(stolpci=self.stolpci)
+
+        profili = [('EQ', self._zapisi_eq, ()), ('TP', self._zapisi_tp, ('EQ',)), ('GL', self._zapisi_gl, ('EQ',))]
+        with sqlite3.connect(self.gpkg_povezava) as conn, \
+                zipfile.ZipFile(self.pot_zip, 'w', compression=zipfile.ZIP_DEFLATED) as arhiv:
+            for profil, zapisi, odvisnosti in profili:
+                if show_progress:
+                    print(f"Zapisujem CGMES profil {profil}.")
+                ime_vnosa = f'{self.ime_modela}_{profil}.xml'
+                with self.merilnik.faza('zapis', tabela=profil) as meritev:
+                    with arhiv.open(ime_vnosa, 'w', force_zip64=True) as vnos, \
+                            io.TextIOWrapper(vnos, encoding='utf-8', write_through=False) as tok:
+                        pisec = _PisecRDF(tok, profil, self.model_id[profil], [self.model_id[o] for o in odvisnosti])
+                        zapisi(conn, pisec)
+                        pisec.zakljuci()
+                    meritev.dodaj(vrstice=pisec.st_elementov, bajti=arhiv.getinfo(ime_vnosa).compress_size)
+        return self.pot_zip
@@ -16,16 +16,31 @@
 
 
 import os
-import urllib
-from sqlalchemy import create_engine
-from sqlalchemy.sql import text
-import geopandas as gpd
-import pandas as pd
+import urllib.parse
+import uuid
 from datetime import datetime
 import time
 import sys, subprocess
 import io
+import sqlite3
 from shutil import which
+from contextlib import closing, contextmanager
+from gredos2x.gredos_shema import najdi_stolpec, kljuc_kot_niz
+from gredos2x.gredos_gpkg2dataframes import GredosGPKG2df
+from gredos2x.gredos_pretok_moci import RadialniPretokMoci
+from gredos2x import gredos_vir
+from gredos2x.gredos_meritve import merilnik_izvoza
+from gredos2x.gredos_ozadje import pozeni_v_ozadju
+from gredos2x.gredos_predpomnilnik import PredpomnilnikRezultatov, PredpomnilnikMaterialov
+from gredos2x.gredos_kontrolne_vsote import IME_TABELE as IME_KONTROLNIH_VSOT, KontrolneVsote
+from gredos2x.gredos_geometrije import PorociloGeometrij
+from gredos2x import gredos_preverjanje
+from gredos2x import gredos_povezljivost
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+gpd = leni_modul('geopandas')
+pd = leni_modul('pandas')
+sa = leni_modul('sqlalchemy')
 
 # Explicitly import the sqlalchemy_access.pyodbc module.
 # This can help SQLAlchemy discover the dialect if there are environment issues,
@@ -41,14 +56,18 @@ class Gredos2GPKG:
             povezava_mdb (str): povezava do mdb datoteke osnovnega modela
             pot_materiali (str): povezava do datoteke materialov (npr.material_2000_v10.mdb)
             povezava_gpkg (str): ime in lokacija datoteke GPKG npr. izvoz.gpkg
+            merilnik (gredos_meritve.Merilnik, optional): merilnik, ki dobi dogodke faz izvoza. Defaults to None (nov merilnik, glej self.merilnik).
     """
-    def __init__(self, povezava_mdb='', pot_materiali='', povezava_gpkg=''):
+    def __init__(self, povezava_mdb='', pot_materiali='', povezava_gpkg='', merilnik=None):
         self.mdb_povezava = os.path.normpath(povezava_mdb)
         self.pot_materiali = os.path.normpath(pot_materiali)
         self.gredos_file_name = os.path.basename(self.mdb_povezava).split('.')[0]
         self.spisek_tabel = ['LNode', 'Node', 'Section', 'Transformer', 'Switching_device','Branch']
         self.mdb_driver = "Microsoft Access Driver (*.mdb, *.accdb)"
-        
+        self.merilnik = merilnik_izvoza(merilnik, 'Gredos2GPKG')
+        self.kontrolne_vsote = KontrolneVsote()
+        self.porocilo_geometrij = PorociloGeometrij()
+        self.predpomnilnik_materialov = PredpomnilnikMaterialov()
         
         
         if povezava_gpkg == '' and povezava_mdb != '':
@@ -63,19 +82,15 @@ class Gredos2GPKG:
             # Use the provided GeoPackage path, making it absolute for robustness
             self.gpkg_path = os.path.abspath(povezava_gpkg)
 
-        # počistimo staro datoteko, če obstaja in ima isto ime. 
-        if os.path.exists(self.gpkg_path):
-            try: 
-                os.remove(self.gpkg_path)
-            except Exception as e:
-                pass
-
         # Ensure the directory for the GeoPackage file exists
         output_dir = os.path.dirname(self.gpkg_path)
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
         
-        if sys.platform.startswith('win'):
+        if gredos_vir.je_paket(povezava_mdb):
+            # paket tabel se bere brez ODBC gonilnika in mdb-tools, zato je podprt na vseh platformah
+            pass
+        elif sys.platform.startswith('win'):
             #TODO: make ODBC driver check and auto discovery mechanism using pyodbc package listing...
             connection_string = (
                 f"DRIVER={{{self.mdb_driver}}};"  # Braces for exact match
@@ -83,24 +98,52 @@ class Gredos2GPKG:
                 "Str_Ansi=no;"  # Key: Use Unicode (WCHAR) fetches, not ANSI/CP1250
             )
             connection_uri = f"access+pyodbc:///?odbc_connect={urllib.parse.quote_plus(connection_string)}"
-            self.connection = create_engine(connection_uri).connect()
+            self.connection = sa.create_engine(connection_uri).connect()
             
         else: 
             print(f"Platform {sys.platform} is not tested for GREDOS to GPKG conversion.")
 
-    def pd_dataframe_to_gpkg(self, pd_dataframe, geopackage_pth, table_name):
+    def pocisti_izhod(self):
+        """Pobriše staro GPKG datoteko, če obstaja in ima isto ime (pred začetkom izvoza, glej pozeni_uvoz)."""
+        if os.path.exists(self.gpkg_path):
+            try: 
+                os.remove(self.gpkg_path)
+            except Exception as e:
+                pass
+
+    @contextmanager
+    def _zacasni_izhod(self):
+        """Izvoz v ozadju piše v začasno datoteko ob izhodni, ki ob uspehu zamenja izhodno datoteko. Ob napaki ali preklicu se začasna
+        datoteka pobriše, izhodna pa ostane nespremenjena (glej gredos_ozadje)."""
+        izhod = self.gpkg_path
+        self.gpkg_path = f"{os.path.splitext(izhod)[0]}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp.gpkg"
+        try:
+            yield self.gpkg_path
+            os.replace(self.gpkg_path, izhod)
+        finally:
+            if os.path.exists(self.gpkg_path):
+                os.remove(self.gpkg_path)
+            self.gpkg_path = izhod
+
+    def pd_dataframe_to_gpkg(self, pd_dataframe, geopackage_pth, table_name, if_exists='replace'):
         """Transfer pandas dataframe to geopackage.
 
         Args: 
             pd_dataframe (pandas.DataFrame): dataframe to transfer
             geopackage_pth (str): location of geopackage file 
             table_name (str):  table name
+            if_exists (str, optional): 'replace' za prvi del tabele, 'append' za naslednje dele. Defaults to 'replace'.
         """
-        engine = create_engine(f'sqlite:///{geopackage_pth}', echo=False) #uses only absolute paths ?! or relative wtf 
-        #connection = engine.connect() # pandas using engine and not connection 2022
-        pd_dataframe.to_sql(table_name, engine, if_exists='replace', index=False)
+        with self.merilnik.faza('zapis', tabela=table_name) as meritev:
+            engine = sa.create_engine(f'sqlite:///{geopackage_pth}', echo=False) #uses only absolute paths ?! or relative wtf 
+            #connection = engine.connect() # pandas using engine and not connection 2022
+            pd_dataframe.to_sql(table_name, engine, if_exists=if_exists, index=False)
+            engine.dispose()
+            meritev.dodaj(pd_dataframe)
+        self.kontrolne_vsote.dodaj(table_name, pd_dataframe, zamenjaj=if_exists == 'replace')
 
-    def shp_to_geopackage(self,filepath_shp, geopackage_pth, layer_name, pretvori_crs = False, set_crs = 'EPSG:3912', input_encoding='cp1250'):
+    def shp_to_geopackage(self,filepath_shp, geopackage_pth, layer_name, pretvori_crs = False, set_crs = 'EPSG:3912', input_encoding='cp1250',
+                          velikost_dela=None, omejitev_pomnilnika_mb=None, popravi_geometrije=True, natancnost_koordinat=None):
         """Pretvorba iz SHP v geodataframe. Ta metoda razreda ni uporabljena direktno, lahko pa se jo uporabo ob morebitnih novih virih.
 
         Args:
@@ -110,57 +153,51 @@ class Gredos2GPKG:
             pretvori_crs (bool, optional): Pretvori v drug koordinatni sistem (True/False). Defaults to False.
             set_crs (str, optional): Izhodni koordinatni sistem. Defaults to 'EPSG:3912'. Pretvorba je zanimiva predvsem v 'EPSG:3794'
             input_encoding (str, optional): Encoding for the input SHP file. Defaults to 'cp1250'.
+            velikost_dela (int, optional): branje in zapis po delih s tem številom vrstic. Defaults to None (cela datoteka naenkrat).
+            omejitev_pomnilnika_mb (float, optional): velikost dela se določa sproti glede na omejitev pomnilnika. Defaults to None.
+            popravi_geometrije (bool, optional): pred zapisom popravi neveljavne in odstrani prazne geometrije (glej
+                gredos_geometrije.popravi_geometrije); števci se prištejejo v self.porocilo_geometrij. Defaults to True.
+            natancnost_koordinat (float, optional): pri popravilu koordinate zaokroži na mrežo s tem razmikom. Defaults to None.
         """
-        shp = gpd.GeoDataFrame.from_file(filepath_shp, crs='EPSG:3912', encoding=input_encoding)
-        shp.set_crs('EPSG:3912', inplace=True)
-        if pretvori_crs: 
-            shp.to_crs(crs=set_crs, inplace=True)
-            
-        shp.to_file(geopackage_pth, driver='GPKG', layer=layer_name, encoding='utf-8')
+        deli = gredos_vir.preberi_geografsko_datoteko_po_delih(filepath_shp, velikost_dela, omejitev_pomnilnika_mb, pretvori_crs=pretvori_crs,
+                                                               set_crs=set_crs, input_encoding=input_encoding, merilnik=self.merilnik,
+                                                               oznake={'tabela': layer_name}, popravi_geometrije=popravi_geometrije,
+                                                               natancnost_koordinat=natancnost_koordinat, porocilo=self.porocilo_geometrij)
+        for i, shp in enumerate(deli):
+            self._zapisi_del_plasti(shp, geopackage_pth, layer_name, i)
+
+    def _zapisi_del_plasti(self, shp, geopackage_pth, layer_name, st_dela):
+        """Zapiše del geografske plasti: prvi del ustvari plast, naslednji deli se dodajajo."""
+        with self.merilnik.faza('zapis', tabela=layer_name, **{'del': st_dela}) as meritev:
+            shp.to_file(geopackage_pth, driver='GPKG', layer=layer_name, encoding='utf-8', mode='w' if st_dela == 0 else 'a')
+            meritev.dodaj(shp)
+        self.kontrolne_vsote.dodaj(layer_name, shp, zamenjaj=st_dela == 0)
 
-    def uvozi_podatke_mdb(self, show_progress = False):
+    def uvozi_podatke_mdb(self, show_progress = False, velikost_dela=None, omejitev_pomnilnika_mb=None):
         """Osnovna funkcija za uvoz podatkov. Imena uvoznih tabel so predefinirana, prav tako format in tip podatkov uvoza. Pomembno, ker so nekateri modeli s šiframi v drugih formatih.
+        Tabele se prenašajo po delih (glej gredos_vir.preberi_tabelo_mdb_po_delih): prvi del ustvari tabelo, naslednji se dodajajo.
         
         Args:
             show_progress (bool): V terminalu prikaže proces nalaganja posamezne tabele ali seznam vseh tabel (samo linux).
-        
+            velikost_dela (int, optional): število vrstic v delu. Defaults to None (cela tabela naenkrat).
+            omejitev_pomnilnika_mb (float, optional): velikost dela se določa sproti glede na omejitev pomnilnika. Defaults to None.
         """
         if os.path.exists(self.mdb_povezava):
-            if sys.platform.startswith('win'): 
-                for ime_tabele in self.spisek_tabel:
-                    if show_progress: 
-                        print(f"Uvažam tabelo {ime_tabele} v Windows okolju.")
-                    sql = text(f"select * from {ime_tabele}")
-                    tabela = pd.read_sql_query(sql, self.connection)
-                    self.pd_dataframe_to_gpkg(tabela, self.gpkg_path, ime_tabele)
-                    
-            if sys.platform.startswith('linux'):
+            if sys.platform.startswith('linux') and not gredos_vir.je_paket(self.mdb_povezava):
                 available_tables = subprocess.Popen(["mdb-tables", self.mdb_povezava],
                                         stdout=subprocess.PIPE).communicate()[0].decode('utf-8')
                 if show_progress: 
                     print(available_tables)
-                if which('mdb-export') is not None: #shutil which za preverit ali je mdb-tables instaliran
-                    
-                    for ime_tabele in self.spisek_tabel:
-                        if show_progress: 
-                            print(f"Podatke uvažam z mdb-tools (Linux): tabela : {ime_tabele}")
-                        contents = subprocess.Popen(["mdb-export", self.mdb_povezava,ime_tabele],
-                                        stdout=subprocess.PIPE).communicate()[0].decode('utf-8')
-                        
-                        # weird import declarations (String IDs with numbers only - Only in Gredos ?!)
-                        types = None
-                        if ime_tabele.startswith('Node'): 
-                            
-                            types = {'NodeId':str, 'LNodeId': str, 'XDbId':str, 'OrgId':str}
-                        if ime_tabele.startswith('Branch'): 
-                            types = {'BranchId': str, 'FeederBrId':str, 'XDbId':str, 'Node1':str, 'Node2':str}
-                        if ime_tabele.startswith('LNode'): 
-                            types = {'LNodeId': str, 'OrgId':str}
-                        if ime_tabele.startswith('Section'): 
-                            types = {'BranchId': str}
-                            
-                        tabela = pd.read_csv(io.StringIO(str(contents)),sep=',', header=0, converters=types, encoding='cp1250', index_col=False, engine='python')
-                        self.pd_dataframe_to_gpkg(tabela, self.gpkg_path, ime_tabele)
+                if which('mdb-export') is None: #shutil which za preverit ali je mdb-tables instaliran
+                    return
+
+            for ime_tabele in self.spisek_tabel:
+                if show_progress: 
+                    print(f"Uvažam tabelo {ime_tabele}.")
+                deli = gredos_vir.preberi_tabelo_mdb_po_delih(self.mdb_povezava, ime_tabele, velikost_dela, omejitev_pomnilnika_mb,
+                                                              povezava=getattr(self, 'connection', None), merilnik=self.merilnik)
+                for i, tabela in enumerate(deli):
+                    self.pd_dataframe_to_gpkg(tabela, self.gpkg_path, ime_tabele, if_exists='replace' if i == 0 else 'append')
                   
             
     def zgradi_indekse_tabelam(self): 
@@ -168,7 +205,7 @@ class Gredos2GPKG:
             Zgradi indekse tabelam za hitrejše branje in poizvedbe po podatkovni bazi. 
         """
         
-        engine = create_engine(f'sqlite:///{self.gpkg_path}', echo=False) #POZOR ! - tale sprejema samo relativne poti
+        engine = sa.create_engine(f'sqlite:///{self.gpkg_path}', echo=False) #POZOR ! - tale sprejema samo relativne poti
         connection = engine.connect()
         
         sqls = ["create index if not exists branch_index on Branch(BranchId)", 
@@ -183,9 +220,10 @@ class Gredos2GPKG:
                 "create index if not exists transformer_index on Transformer(BranchId);",
                 "create index if not exists switching_device_index on Switching_device(BranchId);"]
 
-        for sql in sqls: 
-            s = text(sql)
-            connection.execute(s)
+        with self.merilnik.faza('indeksi'):
+            for sql in sqls: 
+                s = sa.text(sql)
+                connection.execute(s)
             
 
     def uvozi_podatke_materialov_mdb(self):
@@ -194,86 +232,218 @@ class Gredos2GPKG:
             uvoz podatkov na linux platformi pa temelji na osnovi mdb-tools.
             
             Datoteka materialov se običajno v distribuciji Gredos nahaja v imeniku C:\GredosMO\Defaults
+            Tabela se prebere enkrat na datoteko materialov in hrani v predpomnilniku materialov (glej
+            gredos_predpomnilnik.PredpomnilnikMaterialov), ki ga delijo vsi izvozi na računalniku.
             
         """
-        
-        if sys.platform.startswith('win'): 
-            connection_string = (
-                u"DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};"
-                f"DBQ={self.pot_materiali};"
-            )
-            connection_uri = f"access+pyodbc:///?odbc_connect={urllib.parse.quote_plus(connection_string)}"
-            con_material = create_engine(connection_uri).connect()
-
-            sql_material = text("select * from MATERIAL")
-
-            try:
-                #stlačim še materiale v geopackage
-                material = pd.read_sql_query(sql_material, con_material)
-                self.pd_dataframe_to_gpkg(material, self.gpkg_path, 'MATERIAL')
-
-                return True
-            except Exception as e:
-                return False
-        if sys.platform.startswith('lin'): 
-            
-            # poglej encodinge tle, pomoje neki ne štima tudi na Linux v dol primerih
-            contents = subprocess.Popen(["mdb-export", self.pot_materiali,'MATERIAL'],
-                                    stdout=subprocess.PIPE).communicate()[0].decode('utf-8')
-            
-            tabela = pd.read_csv(io.StringIO(str(contents)),sep=',', header=0, encoding='cp1250', index_col=False)
-            
-            
-            self.pd_dataframe_to_gpkg(tabela, self.gpkg_path, 'MATERIAL')
+        material = self.predpomnilnik_materialov.preberi(self.pot_materiali, merilnik=self.merilnik)
+        self.pd_dataframe_to_gpkg(material, self.gpkg_path, 'MATERIAL')
+        return True
             
             
 
-    def uvozi_geografske_datoteke(self, show_progress=False, pretvori_crs = False, set_crs='EPSG:3794'):
+    def uvozi_geografske_datoteke(self, show_progress=False, pretvori_crs = False, set_crs='EPSG:3794', velikost_dela=None, omejitev_pomnilnika_mb=None,
+                                  niti=None, popravi_geometrije=True, natancnost_koordinat=None):
         """
         
          Uvozi podatke SHP gredos  kot  geografsko plast  v  datoteko. Pot do datoteke je definirana s spremenljivko razreda self.gpkg_path.
          v Default EPSG koda je 3912 (GK48), med prenosom je možna pretvorba iz tega v drug koordinatni sistem, ki je kompatibilen z GIS ali
          drugimi prikazovalniki, ki imajo npr. podlago za prikaz v WGS84. S tem smo pokrili večino uporabniških primerov.
+         Plasti se berejo in pretvarjajo sočasno (glej gredos_vir.preberi_geografske_datoteke_vzporedno), zapis v GPKG pa je zaporeden.
         
         Args:
             show_progress (bool, optional): Prikaži napredek uvoza. Defaults to False.
             pretvori_crs (bool, optional): Pretvori v drug crs (default 3794). Defaults to True.
             set_crs (str, optional): Sets CRS of conversion data.
+            velikost_dela (int, optional): število vrstic v delu pri prenosu plasti. Defaults to None (cela plast naenkrat).
+            omejitev_pomnilnika_mb (float, optional): velikost dela se določa sproti glede na omejitev pomnilnika. Defaults to None.
+            niti (int, optional): število sočasno branih plasti. Defaults to None (vse plasti hkrati).
+            popravi_geometrije (bool, optional): pred zapisom popravi neveljavne in odstrani prazne geometrije (glej
+                gredos_geometrije.popravi_geometrije); števci se prištejejo v self.porocilo_geometrij. Defaults to True.
+            natancnost_koordinat (float, optional): pri popravilu koordinate zaokroži na mrežo s tem razmikom. Defaults to None.
         Returns:
             bool: True, če je število uvoženih SHP datotek pod 3 (POINT, LNODE, LINE). Če bi se v imeniku nahajalo več datotek SHP bi tako vrnil napako.
             Slednje se običajno zgodi, ko je v uvoznem imeniku, kjer se nahaja temeljna mdb datoteka več datotek. 
         """
 
-        imenik_projekta =os.path.dirname(self.mdb_povezava)
-        onlyfiles = [f for f in os.listdir(imenik_projekta) if os.path.isfile(os.path.join(imenik_projekta, f))]
-        i = 0
-        for file in onlyfiles:
-            splitfile = file.split('.')
-            if 'POINT' in splitfile[0]:
-                i = i + 1
-                if 'shp' in splitfile[1]:
-                    if show_progress: 
-                        print(f"Uvažam: {file}")
-                    self.shp_to_geopackage(os.path.join(imenik_projekta,file), self.gpkg_path, 'POINT_geo',input_encoding='cp1250',pretvori_crs=pretvori_crs, set_crs=set_crs)
-            if 'LINE' in splitfile[0]:
-                i = i + 1
-                if 'shp' in splitfile[1]:
-                    if show_progress: 
-                        print(f"Uvažam: {file}")
-                    self.shp_to_geopackage(os.path.join(imenik_projekta, file), self.gpkg_path, 'LINE_geo',input_encoding='cp1250', pretvori_crs=pretvori_crs,set_crs=set_crs)
-
-            if 'LNODE' in splitfile[0]:
-                i=i + 1
-                if 'shp' in splitfile[1]:
-                    if show_progress: 
-                        print(f"Uvažam: {file}")
-                    self.shp_to_geopackage(os.path.join(imenik_projekta, file), self.gpkg_path, 'LNODE_geo', input_encoding='cp1250', pretvori_crs=pretvori_crs, set_crs=set_crs)
+        imenik_projekta = gredos_vir.imenik_modela(self.mdb_povezava)
+        onlyfiles = gredos_vir.seznam_datotek(imenik_projekta)
+        i = sum(del_imena in file.split('.')[0] for file in onlyfiles for del_imena in ['POINT', 'LINE', 'LNODE'])
+
+        datoteke = gredos_vir.najdi_geografske_datoteke(imenik_projekta)
+        if show_progress:
+            for pot in datoteke.values():
+                print(f"Uvažam: {os.path.basename(pot)}")
+        deli = gredos_vir.preberi_geografske_datoteke_vzporedno(datoteke, niti, velikost_dela, omejitev_pomnilnika_mb, merilnik=self.merilnik,
+                                                                pretvori_crs=pretvori_crs, set_crs=set_crs, input_encoding='cp1250',
+                                                                popravi_geometrije=popravi_geometrije, natancnost_koordinat=natancnost_koordinat,
+                                                                porocilo=self.porocilo_geometrij)
+        with closing(deli):
+            for plast, st_dela, shp in deli:
+                if shp is not None:
+                    self._zapisi_del_plasti(shp, self.gpkg_path, plast, st_dela)
+        if show_progress:
+            self.porocilo_geometrij.izpisi()
         if i == 3:
             return False
         else:
             return True
 
-    def pozeni_uvoz(self, show_progress = False, pretvori_crs = False, set_crs = 'EPSG:3794'):
+    def _zapisi_zdruzeno_plast(self, atributi, geo_plast, kljuc, ime_plasti, stolpci=None, show_progress=False):
+        """Atributni tabeli pripne geometrijo iz geografske plasti in jo zapiše kot novo plast v GPKG datoteko.
+
+        Args:
+            atributi (pandas.DataFrame): združena atributna tabela
+            geo_plast (str): ime geografske plasti iz katere vzamemo geometrijo (npr. 'LINE_geo')
+            kljuc (str): stolpec v atributni tabeli, ki ga povežemo s ključem geografske plasti
+            ime_plasti (str): ime nove plasti v GPKG datoteki
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+            show_progress (bool, optional): Prikaži napredek. Defaults to False.
+
+        Returns:
+            bool: True, če je bila plast zapisana.
+        """
+        geo = gpd.read_file(self.gpkg_path, layer=geo_plast)
+        kljuc_geo = najdi_stolpec(geo, geo_plast, 'id', stolpci, obvezen=False)
+        if kljuc_geo is None:
+            print(f"Plast {geo_plast} nima stolpca s ključem, plasti {ime_plasti} ne gradim.")
+            return False
+
+        # ena geometrija na ključ, sicer bi se vrstice atributov podvajale
+        geo = geo[[kljuc_geo, 'geometry']].copy()
+        geo['_kljuc'] = kljuc_kot_niz(geo[kljuc_geo])
+        geo = geo.drop_duplicates('_kljuc')[['_kljuc', 'geometry']]
+
+        atributi = atributi.copy()
+        atributi['_kljuc'] = kljuc_kot_niz(atributi[kljuc])
+        zdruzeno = atributi.merge(geo, on='_kljuc', how='left').drop(columns='_kljuc')
+        zdruzeno = gpd.GeoDataFrame(zdruzeno, geometry='geometry', crs=geo.crs)
+
+        if show_progress:
+            print(f"Gradim plast {ime_plasti}: {len(zdruzeno)} vrstic, {int(zdruzeno.geometry.isna().sum())} brez geometrije.")
+        zdruzeno.to_file(self.gpkg_path, driver='GPKG', layer=ime_plasti, encoding='utf-8')
+        self.kontrolne_vsote.dodaj(ime_plasti, zdruzeno, zamenjaj=True)
+
+        with sqlite3.connect(self.gpkg_path) as conn:
+            conn.execute(f'create index if not exists "{ime_plasti.lower()}_index" on "{ime_plasti}"("{kljuc}")')
+        return True
+
+    @staticmethod
+    def _pripni_tabelo(osnova, kljuc, dodatek, kljuc_dodatka, pripona):
+        """Levo poveže osnovno tabelo z dodatno tabelo (hash join po tekstovnih ključih). Podvojeni ključi v dodatni tabeli se zavržejo,
+        imena stolpcev, ki že obstajajo v osnovni tabeli, dobijo pripono."""
+        dodatek = dodatek.copy()
+        dodatek['_kljuc'] = kljuc_kot_niz(dodatek.pop(kljuc_dodatka))
+        dodatek = dodatek.drop_duplicates('_kljuc')
+        osnova = osnova.copy()
+        osnova['_kljuc'] = kljuc_kot_niz(osnova[kljuc])
+        return osnova.merge(dodatek, on='_kljuc', how='left', suffixes=('', pripona)).drop(columns='_kljuc')
+
+    def zgradi_zdruzene_plasti(self, show_progress=False, stolpci=None):
+        """Zgradi denormalizirane plasti z že pripeto geometrijo, da bralcem ni potrebno vsakič ponavljati istih povezovanj tabel:
+
+            - Branch_zdruzeno_geo: Branch + povzetek Section (in Branch_parametri, če obstaja) + Transformer + Switching_device + geometrija iz LINE_geo
+            - Node_zdruzeno_geo: Node + LNode + geometrija iz POINT_geo
+            - LNode_zdruzeno_geo: LNode + geometrija iz LNODE_geo
+
+        Plasti so zapisane kot običajne GPKG plasti (s prostorskim indeksom) in indeksom na ključu.
+
+        Args:
+            show_progress (bool, optional): Prikaži napredek. Defaults to False.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+        Returns:
+            list: seznam zgrajenih plasti.
+        """
+        with sqlite3.connect(self.gpkg_path) as conn:
+            obstojece = set(pd.read_sql_query("select name from sqlite_master where type='table'", conn)['name'])
+            tabele = {ime: pd.read_sql_query(f'select * from "{ime}"', conn)
+                      for ime in self.spisek_tabel if ime in obstojece}
+
+        zgrajeno = []
+        if 'Branch' in tabele and 'LINE_geo' in obstojece:
+            branch = tabele['Branch']
+            kljuc = najdi_stolpec(branch, 'Branch', 'id', stolpci)
+            if 'Section' in tabele:
+                section = tabele['Section']
+                veja = najdi_stolpec(section, 'Section', 'veja', stolpci)
+                dolzina = najdi_stolpec(section, 'Section', 'dolzina', stolpci, obvezen=False)
+                skupine = section.groupby(kljuc_kot_niz(section[veja]).rename('_veja'))
+                povzetek = pd.DataFrame({'Section_stevilo': skupine.size()})
+                if dolzina is not None:
+                    povzetek['Section_dolzina'] = skupine[dolzina].sum()
+                branch = self._pripni_tabelo(branch, kljuc, povzetek.reset_index(), '_veja', '_Section')
+                branch['Section_stevilo'] = branch['Section_stevilo'].fillna(0).astype(int)
+            if 'Branch_parametri' in obstojece:
+                with sqlite3.connect(self.gpkg_path) as conn:
+                    parametri = pd.read_sql_query('select * from Branch_parametri', conn)
+                parametri = parametri.drop(columns=['Section_stevilo', 'Dolzina_km'], errors='ignore')
+                branch = self._pripni_tabelo(branch, kljuc, parametri, parametri.columns[0], '_parametri')
+            for ime in ['Transformer', 'Switching_device']:
+                if ime in tabele:
+                    veja = najdi_stolpec(tabele[ime], ime, 'veja', stolpci)
+                    branch = self._pripni_tabelo(branch, kljuc, tabele[ime], veja, f'_{ime}')
+            if self._zapisi_zdruzeno_plast(branch, 'LINE_geo', kljuc, 'Branch_zdruzeno_geo', stolpci, show_progress):
+                zgrajeno.append('Branch_zdruzeno_geo')
+
+        if 'Node' in tabele and 'POINT_geo' in obstojece:
+            node = tabele['Node']
+            kljuc = najdi_stolpec(node, 'Node', 'id', stolpci)
+            if 'LNode' in tabele:
+                node_lnode = najdi_stolpec(node, 'Node', 'lnode', stolpci)
+                lnode_kljuc = najdi_stolpec(tabele['LNode'], 'LNode', 'id', stolpci)
+                lnode = tabele['LNode'].rename(columns={lnode_kljuc: '_lnode'})
+                node = self._pripni_tabelo(node, node_lnode, lnode, '_lnode', '_LNode')
+            if self._zapisi_zdruzeno_plast(node, 'POINT_geo', kljuc, 'Node_zdruzeno_geo', stolpci, show_progress):
+                zgrajeno.append('Node_zdruzeno_geo')
+
+        if 'LNode' in tabele and 'LNODE_geo' in obstojece:
+            lnode = tabele['LNode']
+            kljuc = najdi_stolpec(lnode, 'LNode', 'id', stolpci)
+            if self._zapisi_zdruzeno_plast(lnode, 'LNODE_geo', kljuc, 'LNode_zdruzeno_geo', stolpci, show_progress):
+                zgrajeno.append('LNode_zdruzeno_geo')
+
+        return zgrajeno
+
+    def zgradi_parametre_vej(self, show_progress=False, stolpci=None):
+        """Izračuna električne parametre odsekov in vej (R, X, B, Imax) iz tabel Section in MATERIAL ter jih shrani v tabeli
+        'Section_parametri' in 'Branch_parametri' GPKG datoteke (glej GredosGPKG2df.nalozi_parametre_vej).
+
+        Args:
+            show_progress (bool, optional): Prikaži napredek. Defaults to False.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+        Returns:
+            pandas.DataFrame: parametri vej.
+        """
+        if show_progress:
+            print("Računam električne parametre vej iz Section in MATERIAL.")
+        veje = GredosGPKG2df(self.gpkg_path, merilnik=self.merilnik).nalozi_parametre_vej(osvezi=True, stolpci=stolpci)
+        if show_progress:
+            print(f"Izračunani parametri {len(veje)} vej.")
+        return veje
+
+    def izracunaj_pretok_moci(self, show_progress=False, **nastavitve):
+        """Na izvoženem modelu izračuna pretok moči (glej RadialniPretokMoci) in rezultate shrani v tabele LF_vozlisca, LF_veje in LF_izvodi.
+
+        Args:
+            show_progress (bool, optional): Prikaži napredek in povzetek po izvodih. Defaults to False.
+            **nastavitve: dodatni parametri za RadialniPretokMoci (npr. napajalna_vozlisca, faktor_moci).
+
+        Returns:
+            pandas.DataFrame: povzetek po izvodih (konvergenca, najnižja napetost, izgube).
+        """
+        pretok = RadialniPretokMoci(self.gpkg_path, **nastavitve)
+        pretok.izracunaj()
+        pretok.shrani_rezultate()
+        izvodi = pretok.rezultati['izvodi']
+        if show_progress:
+            print(f"Pretok moči: {int(izvodi['Konvergiran'].sum())}/{len(izvodi)} izvodov konvergira.")
+        return izvodi
+
+    def pozeni_uvoz(self, show_progress = False, pretvori_crs = False, set_crs = 'EPSG:3794', zdruzene_plasti = False, parametri_vej = False,
+                    pretok_moci = False, velikost_dela = None, omejitev_pomnilnika_mb = None, imenik_profilov = None,
+                    preveri_celovitost = False, preveri_povezljivost = False, popravi_geometrije = True, natancnost_koordinat = None):
         """ Izvozi vse podatke Gredos v lokalno GPKG datoteko na disku, glede na nastavljeno lokacijo. 
             Omogoča tudi pretvorbo koordinatnega sistema v druge oblike npr. WGS84 za spletne aplikacije ali EPSG:3794 (D96/TM Slovenski koordinatni sistem).
 
@@ -282,13 +452,119 @@ class Gredos2GPKG:
             show_progress (bool, optional): med izvozom prikazuj obvestila v terminalu.
             pretvori_crs (bool, optional): pretvori v drug koordinatni sistem npr. wgs84 (EPSG:4326) ali epsg: 3794 (Geodetic CRS: Slovenia 1996).
             set_crs (str): crs string npr. EPSG:3912 (izvorni crs).
+            zdruzene_plasti (bool, optional): zgradi še denormalizirane plasti z geometrijo (glej zgradi_zdruzene_plasti).
+            parametri_vej (bool, optional): izračunaj še električne parametre vej (glej zgradi_parametre_vej).
+            pretok_moci (bool, optional): za preverjanje izvoza izračunaj še pretok moči (glej izracunaj_pretok_moci).
+            velikost_dela (int, optional): prenos tabel in plasti po delih s tem številom vrstic. Defaults to None (cele tabele naenkrat).
+            omejitev_pomnilnika_mb (float, optional): omejitev pomnilnika za prenos; velikost delov se določa sproti, tako da največja poraba
+                pomnilnika ni odvisna od velikosti modela. Defaults to None.
+            imenik_profilov (str, optional): profiliraj faze izvoza (cProfile, tracemalloc) in profile zapiši v ta imenik
+                (glej gredos_meritve.Profiliranje). Defaults to None (brez profiliranja).
+            preveri_celovitost (bool, optional): ob koncu preveri referenčno celovitost izvoženega modela in poročilo zapiši v tabelo
+                g2x_celovitost (glej preveri_celovitost_modela). Defaults to False.
+            preveri_povezljivost (bool, optional): ob koncu primerjaj krajišča linij z vozlišči in atributno topologijo vej ter neskladja
+                zapiši v plast g2x_povezljivost (glej preveri_povezljivost_modela). Defaults to False.
+            popravi_geometrije (bool, optional): pred zapisom popravi neveljavne in odstrani prazne geometrije (glej
+                gredos_geometrije.popravi_geometrije); števci se prištejejo v self.porocilo_geometrij. Defaults to True.
+            natancnost_koordinat (float, optional): pri popravilu koordinate zaokroži na mrežo s tem razmikom. Defaults to None.
         Returns:
             bool: True, če je geografske datoteke ustrezno uvozilo.
         """
         
-        uvozeno = self.uvozi_geografske_datoteke(show_progress, pretvori_crs=pretvori_crs, set_crs = set_crs)
-        self.uvozi_podatke_mdb(show_progress)
-        self.uvozi_podatke_materialov_mdb()
-        self.zgradi_indekse_tabelam()
+        with self.merilnik.profiliranje(imenik_profilov), self.merilnik.faza('uvoz', model=self.gredos_file_name):
+            self.pocisti_izhod()
+            self.kontrolne_vsote.pocisti()
+            self.porocilo_geometrij.pocisti()
+            uvozeno = self.uvozi_geografske_datoteke(show_progress, pretvori_crs=pretvori_crs, set_crs = set_crs, velikost_dela=velikost_dela,
+                                                     omejitev_pomnilnika_mb=omejitev_pomnilnika_mb, popravi_geometrije=popravi_geometrije,
+                                                     natancnost_koordinat=natancnost_koordinat)
+            self.uvozi_podatke_mdb(show_progress, velikost_dela=velikost_dela, omejitev_pomnilnika_mb=omejitev_pomnilnika_mb)
+            self.uvozi_podatke_materialov_mdb()
+            self.zgradi_indekse_tabelam()
+            if parametri_vej:
+                with self.merilnik.faza('parametri_vej'):
+                    self.zgradi_parametre_vej(show_progress)
+            if zdruzene_plasti:
+                with self.merilnik.faza('zdruzene_plasti'):
+                    self.zgradi_zdruzene_plasti(show_progress)
+            if pretok_moci:
+                with self.merilnik.faza('pretok_moci'):
+                    self.izracunaj_pretok_moci(show_progress)
+            if preveri_celovitost:
+                with self.merilnik.faza('celovitost'):
+                    self.preveri_celovitost_modela(show_progress)
+            if preveri_povezljivost:
+                with self.merilnik.faza('povezljivost'):
+                    self.preveri_povezljivost_modela(show_progress)
+            self.zapisi_kontrolne_vsote()
+
+        return uvozeno
 
-        return uvozeno
\ No newline at end of file
+    def zapisi_kontrolne_vsote(self):
+        """Zapiše število vrstic in kontrolne vsote zapisanih tabel in plasti v tabelo g2x_manifest (glej gredos_kontrolne_vsote)."""
+        self.pd_dataframe_to_gpkg(self.kontrolne_vsote.v_tabelo(self.porocilo_geometrij.odstranjene()), self.gpkg_path, IME_KONTROLNIH_VSOT)
+
+    def preveri_celovitost_modela(self, show_progress=False, stolpci=None):
+        """Preveri tuje ključe, podvojene ključe in vrstice brez geometrije v izvoženem modelu (glej gredos_preverjanje) ter poročilo
+        zapiše v tabelo g2x_celovitost GPKG datoteke.
+
+        Args:
+            show_progress (bool, optional): Izpiši povzetek poročila. Defaults to False.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+        Returns:
+            pandas.DataFrame: poročilo (en zapis na problematičen ključ).
+        """
+        porocilo = gredos_preverjanje.preveri_celovitost_gpkg(self.gpkg_path, stolpci)
+        self.pd_dataframe_to_gpkg(porocilo, self.gpkg_path, gredos_preverjanje.IME_TABELE)
+        if show_progress:
+            gredos_preverjanje.izpisi_povzetek(porocilo)
+        return porocilo
+
+    def preveri_povezljivost_modela(self, show_progress=False, toleranca=gredos_povezljivost.TOLERANCA, stolpci=None):
+        """Krajišča linij (LINE_geo) pripne na vozlišča (POINT_geo), geometrijsko povezljivost primerja z Branch.Node1/Node2 (glej
+        gredos_povezljivost) in neskladja zapiše v plast g2x_povezljivost GPKG datoteke.
+
+        Args:
+            show_progress (bool, optional): Izpiši povzetek neskladij. Defaults to False.
+            toleranca (float, optional): največja razdalja med krajiščem linije in vozliščem. Defaults to 0.5.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+        Returns:
+            geopandas.GeoDataFrame: neskladja (eno krajišče linije na zapis).
+        """
+        neskladja = gredos_povezljivost.preveri_povezljivost_gpkg(self.gpkg_path, toleranca, stolpci)
+        if show_progress:
+            print(f"Povezljivost: {len(neskladja)} krajišč linij se ne ujema z vozlišči vej.")
+            if len(neskladja):
+                print(gredos_povezljivost.povzetek_povezljivosti(neskladja).to_string(index=False))
+        return neskladja
+
+    def pozeni_uvoz_v_ozadju(self, povratni_klic_napredka=None, izvajalec=None, **nastavitve):
+        """Zažene pozeni_uvoz v ozadju in takoj vrne opravilo z napredkom in preklicem (glej gredos_ozadje.IzvozVOzadju).
+        Izvoz piše v začasno datoteko, zato ob preklicu ali napaki izhodna GPKG datoteka ostane nespremenjena.
+
+        Args:
+            povratni_klic_napredka (callable, optional): funkcija (delez, tabela), klicana iz niti izvoza. Defaults to None.
+            izvajalec (concurrent.futures.Executor, optional): izvajalec za izvoz. Defaults to None (nova nit).
+            **nastavitve: parametri pozeni_uvoz (npr. pretvori_crs=True, velikost_dela=50000)
+
+        Returns:
+            gredos_ozadje.IzvozVOzadju: opravilo izvoza.
+        """
+        return pozeni_v_ozadju(self, povratni_klic_napredka, izvajalec, **nastavitve)
+
+    def pozeni_uvoz_s_predpomnilnikom(self, predpomnilnik=None, **nastavitve):
+        """Kot pozeni_uvoz, le da se rezultat postreže iz predpomnilnika rezultatov, če je bil model z enakimi nastavitvami že izvožen
+        (glej gredos_predpomnilnik.PredpomnilnikRezultatov), nov rezultat pa se v predpomnilnik shrani.
+
+        Args:
+            predpomnilnik (gredos_predpomnilnik.PredpomnilnikRezultatov, optional): predpomnilnik. Defaults to None (privzeti imenik).
+            **nastavitve: parametri pozeni_uvoz (npr. pretvori_crs=True, set_crs='EPSG:3794')
+
+        Returns:
+            rezultat pozeni_uvoz.
+        """
+        if predpomnilnik is None:
+            predpomnilnik = PredpomnilnikRezultatov()
+        return predpomnilnik.pozeni_uvoz(self, **nastavitve)
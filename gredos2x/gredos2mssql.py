@@ -16,18 +16,26 @@
 
 
 import os
-import urllib
-from sqlalchemy import create_engine, exc
-from sqlalchemy.engine import URL
-from sqlalchemy.sql import text
-from sqlalchemy.types import LargeBinary
-import geopandas as gpd
-import pandas as pd
+import urllib.parse
 from datetime import datetime
 import time
 import sys, subprocess
 import io
 from shutil import which
+from contextlib import closing
+from gredos2x import gredos_vir
+from gredos2x.gredos_meritve import merilnik_izvoza
+from gredos2x.gredos_predpomnilnik import PredpomnilnikMaterialov
+from gredos2x.gredos_kontrolne_vsote import IME_TABELE as IME_KONTROLNIH_VSOT, KontrolneVsote
+from gredos2x.gredos_geometrije import PorociloGeometrij
+from gredos2x import gredos_preverjanje
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+gpd = leni_modul('geopandas')
+pd = leni_modul('pandas')
+np = leni_modul('numpy')
+sa = leni_modul('sqlalchemy')
+shapely = leni_modul('shapely')
 
 class Gredos2MSSQL:
     """
@@ -49,6 +57,7 @@ class Gredos2MSSQL:
             pot_materiali (str): povezava do datoteke materialov (npr.material_2000_v10.mdb)
             parametri_povezave_mssql (dict): parametri povezave mssql (klasični zapis)
             ime_sheme (str): ime sheme v mssql bazi, kamor se bodo tabele izvozile (shema mora predhodno obstajati)
+            merilnik (gredos_meritve.Merilnik, optional): merilnik, ki dobi dogodke faz izvoza. Defaults to None (nov merilnik, glej self.merilnik).
 
             Primer `parametri_povezave_mssql`:
                 "drivername": "ODBC Driver 17 for SQL Server", # Ali drug ustrezen ODBC gonilnik
@@ -59,7 +68,7 @@ class Gredos2MSSQL:
                 "database": "podatkovna_baza"
             }
     """
-    def __init__(self, povezava_mdb='', pot_materiali='', parametri_povezave_mssql = {}, ime_sheme='ep'):
+    def __init__(self, povezava_mdb='', pot_materiali='', parametri_povezave_mssql = {}, ime_sheme='ep', merilnik=None):
         self.table_prefix = 'g2x_'
         self.mdb_povezava = os.path.normpath(povezava_mdb)
         self.pot_materiali = os.path.normpath(pot_materiali)
@@ -67,6 +76,10 @@ class Gredos2MSSQL:
         self.spisek_tabel = ['LNode', 'Node', 'Section', 'Transformer', 'Switching_device','Branch']
         self.mdb_driver = "Microsoft Access Driver (*.mdb, *.accdb)"
         self.ime_sheme = ime_sheme
+        self.merilnik = merilnik_izvoza(merilnik, 'Gredos2MSSQL')
+        self.kontrolne_vsote = KontrolneVsote()
+        self.porocilo_geometrij = PorociloGeometrij()
+        self.predpomnilnik_materialov = PredpomnilnikMaterialov()
         if parametri_povezave_mssql: 
             self.dict_povezava = parametri_povezave_mssql
         else:             
@@ -79,7 +92,10 @@ class Gredos2MSSQL:
                 "database": "podatkovna_baza"
             }
         
-        if sys.platform.startswith('win'):
+        if gredos_vir.je_paket(povezava_mdb):
+            # paket tabel se bere brez ODBC gonilnika in mdb-tools, zato je podprt na vseh platformah
+            pass
+        elif sys.platform.startswith('win'):
             #TODO: make ODBC driver check and auto discovery mechanism using pyodbc package listing...
             connection_string = (
                 f"DRIVER={self.mdb_driver};"
@@ -87,9 +103,9 @@ class Gredos2MSSQL:
 
             )
             connection_uri = f"access+pyodbc:///?odbc_connect={urllib.parse.quote_plus(connection_string)}"
-            self.connection_mdb = create_engine(connection_uri).connect()
+            self.connection_mdb = sa.create_engine(connection_uri).connect()
             
-        if sys.platform.startswith('lin'):
+        elif sys.platform.startswith('lin'):
             print('Linux power')
         else:  
             print(f"Platform {sys.platform} is not supported.")
@@ -106,18 +122,18 @@ class Gredos2MSSQL:
 
         connection_uri_mssql = f"mssql+pyodbc:///?odbc_connect={params}"
 
-        self.mssql_engine = create_engine(connection_uri_mssql)
+        self.mssql_engine = sa.create_engine(connection_uri_mssql)
         
         try:
     # Connect to the database and execute a simple query
             with self.mssql_engine.connect() as connection:
-                query = text("SELECT 1")
+                query = sa.text("SELECT 1")
                 result = connection.execute(query)
                 if result.scalar() == 1:
                     print("Database is responding.")
                 else:
                     print("Database responded but returned an unexpected result.")
-        except exc.SQLAlchemyError as e:
+        except sa.exc.SQLAlchemyError as e:
             print(f"An error occurred while connecting to the database: {e}")
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
@@ -143,11 +159,11 @@ class Gredos2MSSQL:
         """
         try:
             with engine.connect() as connection:
-                query = text("SELECT schema_name FROM information_schema.schemata WHERE schema_name = :schema_name")
+                query = sa.text("SELECT schema_name FROM information_schema.schemata WHERE schema_name = :schema_name")
                 query = query.bindparams(schema_name=schema_name)
                 result = connection.execute(query)
                 return result.fetchone() is not None
-        except exc.SQLAlchemyError as e:
+        except sa.exc.SQLAlchemyError as e:
             print(f"An error occurred: {e}")
             return False
 
@@ -162,24 +178,30 @@ class Gredos2MSSQL:
           @level1type = N'TABLE',  @level1name = N'{table_name}';
         """
         try:
-            connection.execute(text(sql))
+            connection.execute(sa.text(sql))
         except Exception as e:
             print(f"Warning: Could not add comment to table {table_name}: {e}")
 
 
-    def pd_dataframe_v_mssql(self, pd_dataframe, mssql_engine, table_name):
+    def pd_dataframe_v_mssql(self, pd_dataframe, mssql_engine, table_name, if_exists='replace'):
         """Shrani datoteke v podatkovno bazo. 
         
         Args: 
             pd_dataframe (pandas.DataFrame): dataframe to transfer
             mssql_engine (sqlachemy engine): sqlalchemy mssql engine 
             table_name (str):  table name
+            if_exists (str, optional): 'replace' za prvi del tabele, 'append' za naslednje dele. Defaults to 'replace'.
         """
         
         prefixed_table_name = f"{self.table_prefix}{table_name}"
-        pd_dataframe.to_sql(prefixed_table_name, mssql_engine, schema =self.ime_sheme, if_exists='replace', index=False)
+        with self.merilnik.faza('zapis', tabela=table_name) as meritev:
+            pd_dataframe.to_sql(prefixed_table_name, mssql_engine, schema =self.ime_sheme, if_exists=if_exists, index=False)
+            meritev.dodaj(pd_dataframe)
+        self.kontrolne_vsote.dodaj(table_name, pd_dataframe, zamenjaj=if_exists == 'replace')
+        if if_exists == 'append':
+            return
         
-        with mssql_engine.connect() as connection:
+        with self.merilnik.faza('komentar', tabela=table_name), mssql_engine.connect() as connection:
             self._add_table_comment(connection, prefixed_table_name, f"Source MDB: {self.mdb_povezava}")
             connection.commit()
 
@@ -188,52 +210,79 @@ class Gredos2MSSQL:
         Helper function to write a GeoDataFrame to SQL Server.
         It converts geometries to WKB and uses raw SQL INSERTs. It's a helper to write to MSSQL table with geometry. 
         """
+        self._zapisi_del_geodf_mssql(gdf, table_name)
+        meje = gdf.total_bounds if not gdf.empty and gdf['geometry'].notna().any() else None
+        self._zakljuci_geo_tabelo_mssql(table_name, srid, meje)
+
+    def _zapisi_del_geodf_mssql(self, gdf, table_name, if_exists='replace', zamik=0):
+        """Zapiše (del) GeoDataFrame v tabelo z geometrijo v začasnem WKB stolpcu geom_wkb. Stolpec id se pri naslednjih delih
+        nadaljuje z zamikom, da ostane enoličen."""
         prefixed_table_name = f"{self.table_prefix}{table_name}"
         # Create a copy to avoid modifying the original GeoDataFrame
         df = gdf.copy()
-        # Convert geometry to WKB and drop the original geometry column
-        df['geom_wkb'] = df['geometry'].apply(lambda g: g.wkb if g else None)
+        # Convert geometry to WKB (unless already done by the reader thread, see _pripravi_wkb) and drop the original geometry column
+        if 'geom_wkb' not in df.columns:
+            df['geom_wkb'] = shapely.to_wkb(df['geometry'].values)
         df = df.drop('geometry', axis=1)
 
         # Reset index to write it as a regular column 'id' without creating a DB index
-        df.index.name = 'id'
+        df.index = pd.RangeIndex(zamik, zamik + len(df), name='id')
         df = df.reset_index()
 
-        with self.mssql_engine.connect() as connection:
+        with self.merilnik.faza('zapis', tabela=table_name) as meritev, self.mssql_engine.connect() as connection:
+            meritev.dodaj(gdf)
             trans = connection.begin()
             try:
-                # 1. Upload data with WKB string using pandas.to_sql
                 df.to_sql(
                     prefixed_table_name,
                     connection,
                     schema=self.ime_sheme,
-                    if_exists='replace',
+                    if_exists=if_exists,
                     index=False,
-                    dtype={'geom_wkb': LargeBinary}
+                    dtype={'geom_wkb': sa.types.LargeBinary}
                 )
+                trans.commit()
+            except Exception as e:
+                print(f"Error writing spatial data: {e}")
+                trans.rollback()
+                raise
+        # pomožni stolpec geom_wkb (glej _pripravi_wkb) ni del kontrolne vsote, geometrija pa je
+        self.kontrolne_vsote.dodaj(table_name, gdf, zamenjaj=if_exists == 'replace', izpusti=('geom_wkb',))
+
+    def _zakljuci_geo_tabelo_mssql(self, table_name, srid, meje=None):
+        """Po zapisu vseh delov doda primarni ključ, stolpec Shape z geometrijo iz WKB in prostorski indeks.
 
+        Args:
+            table_name (str): ime tabele (brez predpone)
+            srid (int): koordinatni sistem geometrij
+            meje (array, optional): skupne meje geometrij (minx, miny, maxx, maxy) za prostorski indeks. Defaults to None (brez indeksa).
+        """
+        prefixed_table_name = f"{self.table_prefix}{table_name}"
+        with self.merilnik.faza('indeksi', tabela=table_name), self.mssql_engine.connect() as connection:
+            trans = connection.begin()
+            try:
                 # 1.1 Set Primary Key on id
                 alter_col_sql = f"ALTER TABLE {self.ime_sheme}.{prefixed_table_name} ALTER COLUMN id BIGINT NOT NULL;"
-                connection.execute(text(alter_col_sql))
+                connection.execute(sa.text(alter_col_sql))
 
                 add_pk_sql = f"ALTER TABLE {self.ime_sheme}.{prefixed_table_name} ADD CONSTRAINT PK_{prefixed_table_name} PRIMARY KEY (id);"
-                connection.execute(text(add_pk_sql))
+                connection.execute(sa.text(add_pk_sql))
 
                 # 2. Add a GEOMETRY column to the new table
                 add_geom_col_sql = f"ALTER TABLE {self.ime_sheme}.{prefixed_table_name} ADD Shape GEOMETRY;"
-                connection.execute(text(add_geom_col_sql))
+                connection.execute(sa.text(add_geom_col_sql))
            
                 # 3. Update the table, converting WKB to GEOMETRY
                 update_geom_sql = f"UPDATE {self.ime_sheme}.{prefixed_table_name} SET Shape = geometry::STGeomFromWKB(geom_wkb, {srid}) WHERE geom_wkb IS NOT NULL;"
-                connection.execute(text(update_geom_sql))
+                connection.execute(sa.text(update_geom_sql))
                
                 # 4. Drop the temporary WKB column
                 drop_wkb_col_sql = f"ALTER TABLE {self.ime_sheme}.{prefixed_table_name} DROP COLUMN geom_wkb;"
-                connection.execute(text(drop_wkb_col_sql))
+                connection.execute(sa.text(drop_wkb_col_sql))
 
                 # 5. Create Spatial Index
-                if not gdf.empty and gdf['geometry'].notna().any():
-                    minx, miny, maxx, maxy = gdf.total_bounds
+                if meje is not None:
+                    minx, miny, maxx, maxy = meje
                     # Expand bounds slightly to avoid boundary issues and ensure xmin < xmax
                     pad = 100
                     minx, miny, maxx, maxy = minx - pad, miny - pad, maxx + pad, maxy + pad
@@ -242,7 +291,7 @@ class Gredos2MSSQL:
                         CREATE SPATIAL INDEX [SI_{prefixed_table_name}] ON {self.ime_sheme}.{prefixed_table_name}(Shape)
                         WITH ( BOUNDING_BOX = ( {minx}, {miny}, {maxx}, {maxy} ) );
                     """
-                    connection.execute(text(spatial_index_sql))
+                    connection.execute(sa.text(spatial_index_sql))
 
                 self._add_table_comment(connection, prefixed_table_name, f"Source MDB: {self.mdb_povezava}")
 
@@ -252,7 +301,8 @@ class Gredos2MSSQL:
                 trans.rollback()
                 raise
 
-    def shp_to_mssql(self,filepath_shp, ime_tabele, pretvori_crs = False, set_crs = 'EPSG:3794'):
+    def shp_to_mssql(self,filepath_shp, ime_tabele, pretvori_crs = False, set_crs = 'EPSG:3794', velikost_dela=None, omejitev_pomnilnika_mb=None,
+                     popravi_geometrije=True, natancnost_koordinat=None):
         """Pretvorba iz SHP v geodataframe in uvoz v SQL Server.
             Uporablja spremenljivko razreda self.mssql_engine za povezavo z bazo. Potrebno pa je definirati shemo v bazi, ki mora predhodno obstajati.
 
@@ -261,60 +311,63 @@ class Gredos2MSSQL:
             ime_tabele (str): Ime tabele za izvoz
             pretvori_crs (bool, optional): _Pretvori crs pri izvozu ?_. Defaults to False.
             set_crs (str, optional): Izhodni koordinatni sistem. Defaults to 'EPSG:3912'. Pretvorba je zanimiva predvsem v 'EPSG:3794'
+            velikost_dela (int, optional): branje in zapis po delih s tem številom vrstic. Defaults to None (cela datoteka naenkrat).
+            omejitev_pomnilnika_mb (float, optional): velikost dela se določa sproti glede na omejitev pomnilnika. Defaults to None.
+            popravi_geometrije (bool, optional): pred zapisom popravi neveljavne in odstrani prazne geometrije (glej
+                gredos_geometrije.popravi_geometrije); števci se prištejejo v self.porocilo_geometrij. Defaults to True.
+            natancnost_koordinat (float, optional): pri popravilu koordinate zaokroži na mrežo s tem razmikom. Defaults to None.
         """
-        shp = gpd.GeoDataFrame.from_file(filepath_shp, crs='EPSG:3912', encoding='cp1250')
-        shp.set_crs('EPSG:3912', inplace=True)
-        srid = 3912
-        if pretvori_crs: 
-            shp.to_crs(crs=set_crs, inplace=True)
-            srid = int(set_crs.split(':')[-1])
-        else: 
-            set_crs = 'EPSG:3912' #pustimo crs v obliki, ki jo ima trenutno Gredos
-        
-        self._geodf_to_mssql(shp, ime_tabele, srid)
-
-    def mdb_2_mssql(self, show_progress = False):
+        srid = int(set_crs.split(':')[-1]) if pretvori_crs else 3912
+        deli = gredos_vir.preberi_geografsko_datoteko_po_delih(filepath_shp, velikost_dela, omejitev_pomnilnika_mb, pretvori_crs=pretvori_crs,
+                                                               set_crs=set_crs, merilnik=self.merilnik, oznake={'tabela': ime_tabele},
+                                                               popravi_geometrije=popravi_geometrije, natancnost_koordinat=natancnost_koordinat,
+                                                               porocilo=self.porocilo_geometrij)
+        zamik, meje = 0, None
+        for shp in deli:
+            # prvi del ustvari tabelo, naslednji deli se dodajajo; meje za prostorski indeks se zbirajo sproti
+            self._zapisi_del_geodf_mssql(shp, ime_tabele, if_exists='replace' if zamik == 0 else 'append', zamik=zamik)
+            zamik += len(shp)
+            meje = self._razsiri_meje(meje, shp)
+        self._zakljuci_geo_tabelo_mssql(ime_tabele, srid, meje)
+
+    @staticmethod
+    def _razsiri_meje(meje, shp):
+        """Vrne meje (minx, miny, maxx, maxy), razširjene z mejami dela plasti."""
+        if shp.empty or not shp['geometry'].notna().any():
+            return meje
+        return shp.total_bounds if meje is None else np.r_[np.fmin(meje[:2], shp.total_bounds[:2]), np.fmax(meje[2:], shp.total_bounds[2:])]
+
+    @staticmethod
+    def _pripravi_wkb(plast, shp):
+        """Pretvori geometrije dela v WKB (stolpec geom_wkb); izvede se v niti bralca, glej uvozi_geografske_datoteke."""
+        shp['geom_wkb'] = shapely.to_wkb(shp['geometry'].values)
+        return shp
+
+    def mdb_2_mssql(self, show_progress = False, velikost_dela=None, omejitev_pomnilnika_mb=None):
         """Osnovna funkcija za uvoz podatkov. Imena uvoznih tabel so predefinirana, prav tako format in tip podatkov uvoza. Pomembno, ker so nekateri modeli s šiframi v drugih formatih.
-           Osnovni spisek imen tabel v mdb je definiran spremenljivki razreda spisek_tabel.
+           Osnovni spisek imen tabel v mdb je definiran spremenljivki razreda spisek_tabel. Tabele se prenašajo po delih (glej gredos_vir.preberi_tabelo_mdb_po_delih).
 
         Args:
             show_progress (bool): V terminalu prikaže proces nalaganja posamezne tabele ali seznam vseh tabel (samo linux).
+            velikost_dela (int, optional): število vrstic v delu. Defaults to None (cela tabela naenkrat).
+            omejitev_pomnilnika_mb (float, optional): velikost dela se določa sproti glede na omejitev pomnilnika. Defaults to None.
         """
         if os.path.exists(self.mdb_povezava):
-            if sys.platform.startswith('win'): 
-                for ime_tabele_v_bazi in self.spisek_tabel:
-                    if show_progress: 
-                        print(f"Uvažam tabelo {ime_tabele_v_bazi} v Windows okolju.")
-                    sql = text(f"select * from {ime_tabele_v_bazi}")
-                    pd_tabela = pd.read_sql_query(sql, self.connection_mdb) 
-                    self.pd_dataframe_v_mssql(pd_tabela, self.mssql_engine, ime_tabele_v_bazi)
-            if sys.platform.startswith('linux'):
+            if sys.platform.startswith('linux') and not gredos_vir.je_paket(self.mdb_povezava):
                 available_tables = subprocess.Popen(["mdb-tables", self.mdb_povezava],
                                         stdout=subprocess.PIPE).communicate()[0].decode('utf-8')
                 if show_progress: 
                     print(available_tables)
-                if which('mdb-export') is not None: #shutil which za preverit ali je mdb-tables instaliran
-                    
-                    for ime_tabele_v_bazi in self.spisek_tabel:
-                        if show_progress: 
-                            print(f"Podatke uvažam z mdb-tools (Linux): tabela : {ime_tabele_v_bazi}")
-                        contents = subprocess.Popen(["mdb-export", self.mdb_povezava,ime_tabele_v_bazi],
-                                        stdout=subprocess.PIPE).communicate()[0].decode('utf-8')
-                        
-                        # weird import declarations (String IDs with numbers only - Only in Gredos ?!)
-                        types = None
-                        if ime_tabele_v_bazi.startswith('Node'): 
-                            
-                            types = {'NodeId':str, 'LNodeId': str, 'XDbId':str, 'OrgId':str}
-                        if ime_tabele_v_bazi.startswith('Branch'): 
-                            types = {'BranchId': str, 'FeederBrId':str, 'XDbId':str, 'Node1':str, 'Node2':str}
-                        if ime_tabele_v_bazi.startswith('LNode'): 
-                            types = {'LNodeId': str, 'OrgId':str}
-                        if ime_tabele_v_bazi.startswith('Section'): 
-                            types = {'BranchId': str}
-                            
-                        pd_tabela = pd.read_csv(io.StringIO(str(contents)),sep=',', header=0, converters=types, encoding='cp1250', index_col=False, engine='python')
-                        self.pd_dataframe_v_mssql(pd_tabela, self.mssql_engine, ime_tabele_v_bazi)
+                if which('mdb-export') is None: #shutil which za preverit ali je mdb-tables instaliran
+                    return
+
+            for ime_tabele_v_bazi in self.spisek_tabel:
+                if show_progress: 
+                    print(f"Uvažam tabelo {ime_tabele_v_bazi}.")
+                deli = gredos_vir.preberi_tabelo_mdb_po_delih(self.mdb_povezava, ime_tabele_v_bazi, velikost_dela, omejitev_pomnilnika_mb,
+                                                              povezava=getattr(self, 'connection_mdb', None), merilnik=self.merilnik)
+                for i, pd_tabela in enumerate(deli):
+                    self.pd_dataframe_v_mssql(pd_tabela, self.mssql_engine, ime_tabele_v_bazi, if_exists='replace' if i == 0 else 'append')
                   
             
 
@@ -324,92 +377,83 @@ class Gredos2MSSQL:
             uvoz podatkov na linux platformi pa temelji na osnovi mdb-tools.
             
             Datoteka materialov se običajno v distribuciji Gredos nahaja v imeniku C:\GredosMO\Defaults
+            Tabela se prebere enkrat na datoteko materialov in hrani v predpomnilniku materialov (glej
+            gredos_predpomnilnik.PredpomnilnikMaterialov), ki ga delijo vsi izvozi na računalniku.
             
             Returns:
                 True, če je uvoz uspešen, sicer False.
             
         """
-        
-        if sys.platform.startswith('win'): 
-            connection_string = (
-                u"DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};"
-                f"DBQ={self.pot_materiali};"
-            )
-            connection_uri = f"access+pyodbc:///?odbc_connect={urllib.parse.quote_plus(connection_string)}"
-            con_material = create_engine(connection_uri).connect()
-
-            sql_material = text("select * from MATERIAL")
-
-            try:
-                #stlačim še materiale v postgresql
-                material = pd.read_sql_query(sql_material, con_material, dtype=str)
-                self.pd_dataframe_v_mssql(material, self.mssql_engine, 'MATERIAL')
-
-                return True
-            except Exception as e:
-                return False
-            
-        if sys.platform.startswith('lin'): 
-            contents = subprocess.Popen(["mdb-export", self.pot_materiali,'MATERIAL'],
-                                    stdout=subprocess.PIPE).communicate()[0].decode('utf-8')
-            try: 
-                tabela = pd.read_csv(io.StringIO(str(contents)),sep=',', header=0, encoding='cp1250', index_col=False)
-                self.pd_dataframe_v_mssql(tabela, self.mssql_engine, 'MATERIAL')
-                return True
-            except Exception as e:
-                return False
+        try:
+            material = self.predpomnilnik_materialov.preberi(self.pot_materiali, merilnik=self.merilnik)
+            if sys.platform.startswith('win'):
+                # na Windows platformi se materiali v MS SQL Server zapišejo kot tekst
+                material = material.astype(str)
+            self.pd_dataframe_v_mssql(material, self.mssql_engine, 'MATERIAL')
+            return True
+        except Exception as e:
+            return False
             
             
 
-    def uvozi_geografske_datoteke(self, show_progress=False, pretvori_crs = False, set_crs='EPSG:3794'):
+    def uvozi_geografske_datoteke(self, show_progress=False, pretvori_crs = False, set_crs='EPSG:3794', velikost_dela=None, omejitev_pomnilnika_mb=None,
+                                  niti=None, popravi_geometrije=True, natancnost_koordinat=None):
         """
         
          Uvozi podatke SHP gredos  kot  geografsko plast  v  MS SQL Server.
          v Default EPSG koda je 3912 (GK48), med prenosom je možna pretvorba iz tega v drug koordinatni sistem, ki je kompatibilen z GIS ali
          drugimi prikazovalniki, ki imajo npr. podlago za prikaz v WGS84. S tem smo pokrili večino uporabniških primerov.
+         Plasti se berejo, pretvarjajo in kodirajo v WKB sočasno (glej gredos_vir.preberi_geografske_datoteke_vzporedno), zapis v bazo pa je zaporeden.
         
         Args:
             show_progress (bool, optional): Prikaži napredek uvoza. Defaults to False.
             pretvori_crs (bool, optional): Pretvori v drug crs (default 3794). Defaults to True.
             set_crs (str, optional): Sets CRS of conversion data.
+            velikost_dela (int, optional): število vrstic v delu pri prenosu plasti. Defaults to None (cela plast naenkrat).
+            omejitev_pomnilnika_mb (float, optional): velikost dela se določa sproti glede na omejitev pomnilnika. Defaults to None.
+            niti (int, optional): število sočasno branih plasti. Defaults to None (vse plasti hkrati).
+            popravi_geometrije (bool, optional): pred zapisom popravi neveljavne in odstrani prazne geometrije (glej
+                gredos_geometrije.popravi_geometrije); števci se prištejejo v self.porocilo_geometrij. Defaults to True.
+            natancnost_koordinat (float, optional): pri popravilu koordinate zaokroži na mrežo s tem razmikom. Defaults to None.
         Returns:
             bool: True, če je število uvoženih SHP datotek pod 3 (POINT, LNODE, LINE). Če bi se v imeniku nahajalo več datotek SHP bi tako vrnil napako.
             Slednje se običajno zgodi, ko je v uvoznem imeniku, kjer se nahaja temeljna mdb datoteka več datotek. 
         """
 
-        imenik_projekta =os.path.dirname(self.mdb_povezava)
-        onlyfiles = [f for f in os.listdir(imenik_projekta) if os.path.isfile(os.path.join(imenik_projekta, f))]
-        i = 0
-        
-        for file in onlyfiles:
-            splitfile = file.split('.')
-            if 'POINT' in splitfile[0]:
-                i = i + 1
-                if 'shp' in splitfile[1]:
-                    if show_progress: 
-                        print(f"Uvažam: {file}")
-                    self.shp_to_mssql(os.path.join(imenik_projekta,file), ime_tabele='POINT_geo' ,pretvori_crs=pretvori_crs, set_crs=set_crs)
-                    
-            if 'LINE' in splitfile[0]:
-                i = i + 1
-                if 'shp' in splitfile[1]:
-                    if show_progress: 
-                        print(f"Uvažam: {file}")
-                    self.shp_to_mssql(os.path.join(imenik_projekta,file), ime_tabele='LINE_geo' ,pretvori_crs=pretvori_crs, set_crs=set_crs)
-                    
-            if 'LNODE' in splitfile[0]:
-                i=i + 1
-                if 'shp' in splitfile[1]:
-                    if show_progress: 
-                        print(f"Uvažam: {file}")
-                    self.shp_to_mssql(os.path.join(imenik_projekta,file), ime_tabele='LNODE_geo', pretvori_crs=pretvori_crs, set_crs=set_crs)
+        imenik_projekta = gredos_vir.imenik_modela(self.mdb_povezava)
+        onlyfiles = gredos_vir.seznam_datotek(imenik_projekta)
+        i = sum(del_imena in file.split('.')[0] for file in onlyfiles for del_imena in ['POINT', 'LINE', 'LNODE'])
+
+        datoteke = gredos_vir.najdi_geografske_datoteke(imenik_projekta)
+        if show_progress:
+            for pot in datoteke.values():
+                print(f"Uvažam: {os.path.basename(pot)}")
+        srid = int(set_crs.split(':')[-1]) if pretvori_crs else 3912
+        deli = gredos_vir.preberi_geografske_datoteke_vzporedno(datoteke, niti, velikost_dela, omejitev_pomnilnika_mb, priprava=self._pripravi_wkb,
+                                                                merilnik=self.merilnik, pretvori_crs=pretvori_crs, set_crs=set_crs,
+                                                                popravi_geometrije=popravi_geometrije, natancnost_koordinat=natancnost_koordinat,
+                                                                porocilo=self.porocilo_geometrij)
+        zamiki, meje = {}, {}
+        with closing(deli):
+            for plast, st_dela, shp in deli:
+                if shp is None:
+                    self._zakljuci_geo_tabelo_mssql(plast, srid, meje.get(plast))
+                    continue
+                zamik = zamiki.get(plast, 0)
+                self._zapisi_del_geodf_mssql(shp, plast, if_exists='replace' if st_dela == 0 else 'append', zamik=zamik)
+                zamiki[plast] = zamik + len(shp)
+                meje[plast] = self._razsiri_meje(meje.get(plast), shp)
+        if show_progress:
+            self.porocilo_geometrij.izpisi()
                    
         if i == 3:
             return False
         else:
             return True
 
-    def pozeni_uvoz(self, show_progress = False, pretvori_crs = False, set_crs = 'EPSG:3794'):
+    def pozeni_uvoz(self, show_progress = False, pretvori_crs = False, set_crs = 'EPSG:3794', velikost_dela = None, omejitev_pomnilnika_mb = None,
+                    imenik_profilov = None,
+                    preveri_celovitost = False, popravi_geometrije = True, natancnost_koordinat = None):
         """ Izvozi vse podatke Gredos v MSSQL  podatkovno bazo, pred tem je potrebno definirati shemo v katero bomo izvažali podatke. 
             Omogoča tudi pretvorbo koordinatnega sistema v druge oblike npr. WGS84 za spletne aplikacije ali EPSG:3794 (D96/TM Slovenski koordinatni sistem).
 
@@ -418,13 +462,53 @@ class Gredos2MSSQL:
             show_progress (bool, optional): med izvozom prikazuj obvestila v terminalu.
             pretvori_crs (bool, optional): pretvori v drug koordinatni sistem npr. wgs84 (EPSG:4326) ali epsg: 3794 (Geodetic CRS: Slovenia 1996).
             set_crs (str): crs string npr. EPSG:3912 (izvorni crs).
+            velikost_dela (int, optional): prenos tabel in plasti po delih s tem številom vrstic. Defaults to None (cele tabele naenkrat).
+            omejitev_pomnilnika_mb (float, optional): omejitev pomnilnika za prenos; velikost delov se določa sproti, tako da največja poraba
+                pomnilnika ni odvisna od velikosti modela. Defaults to None.
+            imenik_profilov (str, optional): profiliraj faze izvoza (cProfile, tracemalloc) in profile zapiši v ta imenik
+                (glej gredos_meritve.Profiliranje). Defaults to None (brez profiliranja).
+            preveri_celovitost (bool, optional): ob koncu preveri referenčno celovitost izvoženega modela in poročilo zapiši v tabelo
+                g2x_celovitost (glej preveri_celovitost_modela). Defaults to False.
+            popravi_geometrije (bool, optional): pred zapisom popravi neveljavne in odstrani prazne geometrije (glej
+                gredos_geometrije.popravi_geometrije); števci se prištejejo v self.porocilo_geometrij. Defaults to True.
+            natancnost_koordinat (float, optional): pri popravilu koordinate zaokroži na mrežo s tem razmikom. Defaults to None.
         Returns:
             bool: True, če je geografske datoteke ustrezno uvozilo.
         """
         
-        uvozeno = self.uvozi_geografske_datoteke(show_progress=True, pretvori_crs=pretvori_crs, set_crs=set_crs)
-        self.mdb_2_mssql(show_progress=True)
-        self.uvozi_podatke_materialov_mdb()
+        with self.merilnik.profiliranje(imenik_profilov), self.merilnik.faza('uvoz', model=self.gredos_file_name):
+            self.kontrolne_vsote.pocisti()
+            self.porocilo_geometrij.pocisti()
+            uvozeno = self.uvozi_geografske_datoteke(show_progress=True, pretvori_crs=pretvori_crs, set_crs=set_crs, velikost_dela=velikost_dela,
+                                                     omejitev_pomnilnika_mb=omejitev_pomnilnika_mb, popravi_geometrije=popravi_geometrije,
+                                                     natancnost_koordinat=natancnost_koordinat)
+            self.mdb_2_mssql(show_progress=True, velikost_dela=velikost_dela, omejitev_pomnilnika_mb=omejitev_pomnilnika_mb)
+            self.uvozi_podatke_materialov_mdb()
+            if preveri_celovitost:
+                with self.merilnik.faza('celovitost'):
+                    self.preveri_celovitost_modela(show_progress)
+            self.zapisi_kontrolne_vsote()
         
 
         return uvozeno
+
+    def zapisi_kontrolne_vsote(self):
+        """Zapiše število vrstic in kontrolne vsote zapisanih tabel in plasti v tabelo g2x_manifest v shemi (glej gredos_kontrolne_vsote)."""
+        self.pd_dataframe_v_mssql(self.kontrolne_vsote.v_tabelo(self.porocilo_geometrij.odstranjene()), self.mssql_engine, IME_KONTROLNIH_VSOT)
+
+    def preveri_celovitost_modela(self, show_progress=False, stolpci=None):
+        """Preveri tuje ključe, podvojene ključe in vrstice brez geometrije v izvoženem modelu (glej gredos_preverjanje) ter poročilo
+        zapiše v tabelo g2x_celovitost v shemi.
+
+        Args:
+            show_progress (bool, optional): Izpiši povzetek poročila. Defaults to False.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+        Returns:
+            pandas.DataFrame: poročilo (en zapis na problematičen ključ).
+        """
+        porocilo = gredos_preverjanje.preveri_celovitost_izvoza(self, stolpci)
+        self.pd_dataframe_v_mssql(porocilo, self.mssql_engine, gredos_preverjanje.IME_TABELE)
+        if show_progress:
+            gredos_preverjanje.izpisi_povzetek(porocilo)
+        return porocilo
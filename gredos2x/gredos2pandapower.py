@@ -0,0 +1,283 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+
+import os
+
+from gredos2x.gredos_gpkg2dataframes import GredosGPKG2df
+from gredos2x.gredos_shema import najdi_stolpec, kljuc_kot_niz
+from gredos2x.gredos_meritve import merilnik_izvoza
+from gredos2x.gredos_parametri import (izracunaj_parametre_odsekov, agregiraj_parametre_vej,
+                                       odjemi_vozlisc, napajalna_vozlisca)
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+np = leni_modul('numpy')
+pd = leni_modul('pandas')
+shapely = leni_modul('shapely')
+
+
+class Gredos2Pandapower:
+    """
+        Gredos2Pandapower pretvori izvožen Gredos model (GPKG datoteka ali že naložene tabele) v pandapower mrežo.
+        Tabele elementov (bus, line, trafo, switch, load, ext_grid) se zgradijo naenkrat kot celi stolpci, brez klicev create_* za
+        posamezne elemente, zato je pretvorba hitra tudi za celoten model. Paket pandapower je potrebno namestiti posebej
+        (pip install pandapower).
+
+        Veje z odseki (Section) postanejo vodi, veje iz tabele Transformer transformatorji, veje brez odsekov pa stikala med zbiralkama
+        (stanje iz Switching_device). Vozlišča z Generation različnim od 0 (ali podana napajalna vozlišča) dobijo ext_grid.
+
+        Enote: moči odjemov v kW (faktor_moci), Sn transformatorjev v MVA, uk v %, Pcu v kW.
+
+        Args:
+            povezava_gpkg (str, optional): pot do GPKG datoteke (Gredos2GPKG). Defaults to None.
+            tabele (dict, optional): že naložene tabele {'Node': df, 'Branch': df, ..., 'POINT_geo': gdf}, namesto GPKG datoteke. Defaults to None.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+            napajalna_vozlisca (list, optional): seznam NodeId napajalnih vozlišč. Defaults to None.
+            faktor_moci (float, optional): pretvorba moči odjemov v MW. Defaults to 0.001 (kW).
+            un_privzeto (float, optional): nazivna napetost v kV za vozlišča brez podatka. Defaults to 20.0.
+            f_hz (float, optional): frekvenca omrežja. Defaults to 50.0.
+            merilnik (gredos_meritve.Merilnik, optional): merilnik, ki dobi dogodke faz izvoza. Defaults to None (nov merilnik, glej self.merilnik).
+    """
+    def __init__(self, povezava_gpkg=None, tabele=None, stolpci=None, napajalna_vozlisca=None, faktor_moci=0.001,
+                 un_privzeto=20.0, f_hz=50.0, merilnik=None):
+        self.gpkg_povezava = povezava_gpkg
+        self.tabele = dict(tabele) if tabele else {}
+        self.stolpci = stolpci
+        self.napajalna_vozlisca = napajalna_vozlisca
+        self.faktor_moci = faktor_moci
+        self.un_privzeto = un_privzeto
+        self.f_hz = f_hz
+        self.merilnik = merilnik_izvoza(merilnik, 'Gredos2Pandapower')
+        self.net = None
+
+    def _tabela(self, ime):
+        """Vrne tabelo iz podanih tabel ali iz GPKG datoteke (None, če je ni)."""
+        if ime not in self.tabele and self.gpkg_povezava:
+            rd = GredosGPKG2df(self.gpkg_povezava)
+            with self.merilnik.faza('branje', tabela=ime) as meritev:
+                if ime == 'Branch_parametri':
+                    # parametri se ob prvem klicu izračunajo in shranijo v GPKG
+                    if rd.tabela_obstaja('Section') and rd.tabela_obstaja('MATERIAL'):
+                        self.tabele[ime] = rd.nalozi_parametre_vej(stolpci=self.stolpci)
+                elif rd.tabela_obstaja(ime):
+                    if ime.endswith('_geo'):
+                        self.tabele[ime] = rd.preberi_geografsko_tabelo_iz_gpkg(ime, epsg_set=None)
+                    else:
+                        self.tabele[ime] = rd.nalozi_negeografsko_tabelo(ime)
+                if ime in self.tabele:
+                    meritev.dodaj(self.tabele[ime])
+        return self.tabele.get(ime)
+
+    def _parametri_vej(self):
+        """Parametri vej iz GPKG (Branch_parametri) ali izračunani iz podanih tabel Section in MATERIAL."""
+        if 'Branch_parametri' not in self.tabele and self.gpkg_povezava is None:
+            section, material = self._tabela('Section'), self._tabela('MATERIAL')
+            if section is None or material is None:
+                return None
+            odseki = izracunaj_parametre_odsekov(section, material, stolpci=self.stolpci)
+            self.tabele['Branch_parametri'] = agregiraj_parametre_vej(odseki, kljuc=odseki.columns[0])
+        return self._tabela('Branch_parametri')
+
+    @staticmethod
+    def _geojson(plast, kljuc_plasti, kljuci, stolpci=None):
+        """GeoJSON zapis geometrij geografske plasti v vrstnem redu podanih ključev (None, kjer geometrije ni)."""
+        if plast is None:
+            return None
+        kljuc_geo = najdi_stolpec(plast, kljuc_plasti, 'id', stolpci, obvezen=False)
+        if kljuc_geo is None:
+            return None
+        geo = pd.Series(plast.geometry.to_numpy(), index=kljuc_kot_niz(plast[kljuc_geo]))
+        geo = geo[~geo.index.duplicated()].reindex(kljuci)
+        return shapely.to_geojson(geo.to_numpy())
+
+    @staticmethod
+    def _zapisi_tabelo(net, ime, podatki):
+        """Zapiše celotno tabelo elementov v mrežo; manjkajoči stolpci dobijo privzete vrednosti, tipi sledijo praznemu pandapower omrežju."""
+        prazna = net[ime]
+        tabela = pd.DataFrame(podatki)
+        for stolpec in prazna.columns:
+            if stolpec not in tabela.columns:
+                tip = prazna[stolpec].dtype
+                if tip == bool:
+                    tabela[stolpec] = stolpec == 'in_service'
+                elif pd.api.types.is_numeric_dtype(tip):
+                    tabela[stolpec] = 1 if stolpec in ('parallel', 'df', 'scaling') else np.nan
+                else:
+                    tabela[stolpec] = None
+        tabela = tabela[list(prazna.columns) + [s for s in tabela.columns if s not in prazna.columns]]
+        for stolpec in prazna.columns:
+            try:
+                tabela[stolpec] = tabela[stolpec].astype(prazna[stolpec].dtype)
+            except (TypeError, ValueError):
+                pass
+        net[ime] = tabela
+
+    def zgradi_mrezo(self):
+        """Zgradi pandapower mrežo iz Gredos tabel.
+
+        Returns:
+            pandapowerNet: pandapower mreža.
+        """
+        try:
+            import pandapower as pp
+        except ImportError as e:
+            raise ImportError("Za izvoz v pandapower je potrebno namestiti paket pandapower (pip install pandapower).") from e
+
+        node = self._tabela('Node')
+        branch = self._tabela('Branch')
+        net = pp.create_empty_network(name=str(self.gpkg_povezava or 'gredos'), f_hz=self.f_hz)
+
+        # zbiralke
+        vozlisca = pd.Index(kljuc_kot_niz(node[najdi_stolpec(node, 'Node', 'id', self.stolpci)]))
+        un = najdi_stolpec(node, 'Node', 'un', self.stolpci, obvezen=False)
+        un = pd.to_numeric(node[un], errors='coerce').to_numpy(dtype=float) if un else np.full(len(node), np.nan)
+        un = np.where(np.isfinite(un) & (un > 0), un, self.un_privzeto)
+        zbiralke = {'name': vozlisca.to_numpy(dtype=object), 'vn_kv': un, 'type': 'b', 'in_service': True}
+        geo = self._geojson(self._tabela('POINT_geo'), 'POINT_geo', vozlisca, self.stolpci)
+        if geo is not None:
+            zbiralke['geo'] = geo
+        self._zapisi_tabelo(net, 'bus', zbiralke)
+
+        # razvrstitev vej na transformatorje, vode in stikala
+        veje = kljuc_kot_niz(branch[najdi_stolpec(branch, 'Branch', 'id', self.stolpci)])
+        od = vozlisca.get_indexer(kljuc_kot_niz(branch[najdi_stolpec(branch, 'Branch', 'vozlisce1', self.stolpci)]))
+        do = vozlisca.get_indexer(kljuc_kot_niz(branch[najdi_stolpec(branch, 'Branch', 'vozlisce2', self.stolpci)]))
+        veljavna = (od >= 0) & (do >= 0)
+
+        transformer = self._tabela('Transformer')
+        je_transformator = np.zeros(len(branch), dtype=bool)
+        if transformer is not None:
+            tr_kljuc = kljuc_kot_niz(transformer[najdi_stolpec(transformer, 'Transformer', 'veja', self.stolpci)])
+            je_transformator = veje.isin(tr_kljuc).to_numpy()
+
+        stanje_stikal = pd.Series(dtype=float)
+        stikala = self._tabela('Switching_device')
+        if stikala is not None:
+            stanje = najdi_stolpec(stikala, 'Switching_device', 'stanje', self.stolpci, obvezen=False)
+            sw_kljuc = kljuc_kot_niz(stikala[najdi_stolpec(stikala, 'Switching_device', 'veja', self.stolpci)])
+            vrednosti = pd.to_numeric(stikala[stanje], errors='coerce').to_numpy() if stanje else np.ones(len(stikala))
+            stanje_stikal = pd.Series(vrednosti, index=sw_kljuc)
+            stanje_stikal = stanje_stikal[~stanje_stikal.index.duplicated()]
+        stanje_vej = stanje_stikal.reindex(veje).to_numpy(dtype=float)
+        je_stikalo = np.isfinite(stanje_vej)
+
+        parametri = self._parametri_vej()
+        if parametri is not None:
+            parametri = parametri.set_index(kljuc_kot_niz(parametri[parametri.columns[0]]))
+            parametri = parametri[~parametri.index.duplicated()].reindex(veje)
+            ima_odseke = parametri['R_ohm'].notna().to_numpy()
+        else:
+            parametri = pd.DataFrame(index=veje, columns=['Dolzina_km', 'R_ohm', 'X_ohm', 'B_uS', 'Imax_A'], dtype=float)
+            ima_odseke = np.zeros(len(branch), dtype=bool)
+
+        # vodi
+        je_vod = veljavna & ~je_transformator & ima_odseke
+        dolzina = parametri['Dolzina_km'].to_numpy(dtype=float)[je_vod]
+        dolzina = np.where(np.isfinite(dolzina) & (dolzina > 0), dolzina, 0.001)
+        vodi = {
+            'name': veje[je_vod].to_numpy(dtype=object),
+            'from_bus': od[je_vod], 'to_bus': do[je_vod], 'length_km': dolzina,
+            'r_ohm_per_km': parametri['R_ohm'].to_numpy(dtype=float)[je_vod] / dolzina,
+            'x_ohm_per_km': parametri['X_ohm'].fillna(0).to_numpy(dtype=float)[je_vod] / dolzina,
+            'c_nf_per_km': parametri['B_uS'].fillna(0).to_numpy(dtype=float)[je_vod] / dolzina / (2 * np.pi * self.f_hz) * 1e3,
+            'g_us_per_km': 0.0,
+            'max_i_ka': parametri['Imax_A'].fillna(1000).to_numpy(dtype=float)[je_vod] / 1000,
+            'type': 'cs', 'in_service': True,
+        }
+        geo = self._geojson(self._tabela('LINE_geo'), 'LINE_geo', veje[je_vod], self.stolpci)
+        if geo is not None:
+            vodi['geo'] = geo
+        self._zapisi_tabelo(net, 'line', vodi)
+
+        # transformatorji, visokonapetostna stran je stran z višjo nazivno napetostjo
+        je_tr = veljavna & je_transformator
+        self._zapisi_tabelo(net, 'trafo', self._transformatorji(transformer, veje[je_tr], od[je_tr], do[je_tr], un))
+
+        # stikala: stikala na vodih (et='l') in veje brez impedance kot stikala med zbiralkama (et='b')
+        sw_vod = je_vod & je_stikalo
+        sw_zbiralke = veljavna & ~je_transformator & ~ima_odseke
+        indeks_vodov = np.cumsum(je_vod) - 1
+        zaprto_zbiralke = np.where(je_stikalo, stanje_vej != 0, True)
+        self._zapisi_tabelo(net, 'switch', {
+            'bus': np.concatenate([od[sw_vod], od[sw_zbiralke]]),
+            'element': np.concatenate([indeks_vodov[sw_vod], do[sw_zbiralke]]),
+            'et': np.concatenate([np.full(sw_vod.sum(), 'l'), np.full(sw_zbiralke.sum(), 'b')]),
+            'type': 'LBS',
+            'closed': np.concatenate([stanje_vej[sw_vod] != 0, zaprto_zbiralke[sw_zbiralke]]),
+            'name': np.concatenate([veje[sw_vod].to_numpy(dtype=object), veje[sw_zbiralke].to_numpy(dtype=object)]),
+            'z_ohm': 0.0, 'in_ka': np.nan,
+        })
+
+        # odjemi in napajanje
+        s = odjemi_vozlisc(node, self._tabela('LNode'), self.stolpci, self.faktor_moci)
+        z_odjemom = np.flatnonzero(s != 0)
+        self._zapisi_tabelo(net, 'load', {
+            'name': vozlisca[z_odjemom].to_numpy(dtype=object), 'bus': z_odjemom,
+            'p_mw': s.real[z_odjemom], 'q_mvar': s.imag[z_odjemom],
+            'const_z_p_percent': 0.0, 'const_i_p_percent': 0.0, 'const_z_q_percent': 0.0, 'const_i_q_percent': 0.0,
+            'scaling': 1.0, 'in_service': True, 'type': 'wye',
+        })
+        napajanje = napajalna_vozlisca(node, self.stolpci, self.napajalna_vozlisca)
+        self._zapisi_tabelo(net, 'ext_grid', {
+            'name': vozlisca[napajanje].to_numpy(dtype=object), 'bus': napajanje,
+            'vm_pu': 1.0, 'va_degree': 0.0, 'slack_weight': 1.0, 'in_service': True, 'controllable': False,
+        })
+
+        self.net = net
+        return net
+
+    def _transformatorji(self, transformer, veje, od, do, un):
+        """Tabela transformatorjev v obliki pandapower."""
+        if transformer is None:
+            return {'name': [], 'hv_bus': [], 'lv_bus': []}
+        podatki = transformer.copy()
+        podatki.index = kljuc_kot_niz(podatki[najdi_stolpec(podatki, 'Transformer', 'veja', self.stolpci)])
+        podatki = podatki[~podatki.index.duplicated()].reindex(veje)
+
+        def vrednost(vloga, privzeto):
+            ime = najdi_stolpec(podatki, 'Transformer', vloga, self.stolpci, obvezen=False)
+            if ime is None:
+                return np.full(len(podatki), privzeto, dtype=float)
+            return pd.to_numeric(podatki[ime], errors='coerce').fillna(privzeto).to_numpy(dtype=float)
+
+        obrnjeno = un[do] > un[od]
+        hv = np.where(obrnjeno, do, od)
+        lv = np.where(obrnjeno, od, do)
+        sn = vrednost('sn', 1.0)
+        u1 = vrednost('u1', np.nan)
+        u2 = vrednost('u2', np.nan)
+        return {
+            'name': veje.to_numpy(dtype=object), 'hv_bus': hv, 'lv_bus': lv, 'sn_mva': sn,
+            'vn_hv_kv': np.where(np.isfinite(u1), np.fmax(u1, u2), un[hv]),
+            'vn_lv_kv': np.where(np.isfinite(u2), np.fmin(u1, u2), un[lv]),
+            'vk_percent': vrednost('uk', 6.0),
+            'vkr_percent': vrednost('pcu', 0.0) / (sn * 1000) * 100,
+            'pfe_kw': 0.0, 'i0_percent': 0.0, 'shift_degree': 0.0,
+            'parallel': 1, 'df': 1.0, 'in_service': True,
+        }
+
+    def shrani_json(self, pot):
+        """Shrani pandapower mrežo v JSON datoteko (pandapower.to_json). Če mreža še ni zgrajena, se zgradi.
+
+        Args:
+            pot (str): pot do JSON datoteke
+        """
+        import pandapower as pp
+        if self.net is None:
+            self.zgradi_mrezo()
+        with self.merilnik.faza('zapis', tabela='pandapower') as meritev:
+            pp.to_json(self.net, pot)
+            meritev.dodaj(vrstice=len(self.net.bus) + len(self.net.line) + len(self.net.trafo), bajti=os.path.getsize(pot))
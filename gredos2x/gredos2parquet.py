@@ -0,0 +1,612 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+
+import json
+import os
+import shutil
+import sys
+import urllib.parse
+import uuid
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from datetime import datetime
+
+
+from gredos2x.gredos_shema import SPISEK_TABEL, najdi_stolpec, kljuc_kot_niz
+from gredos2x import gredos_vir
+from gredos2x.gredos_meritve import merilnik_izvoza
+from gredos2x.gredos_ozadje import pozeni_v_ozadju
+from gredos2x.gredos_predpomnilnik import PredpomnilnikRezultatov, PredpomnilnikMaterialov
+from gredos2x.gredos_kontrolne_vsote import IME_TABELE as IME_KONTROLNIH_VSOT, KontrolneVsote
+from gredos2x import gredos_preverjanje
+from gredos2x.gredos_kodiranje import IME_TABELE as IME_SLOVARJA_KLJUCEV, SlovarKljucev
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+gpd = leni_modul('geopandas')
+pa = leni_modul('pyarrow')
+pd = leni_modul('pandas')
+pq = leni_modul('pyarrow.parquet')
+
+# ime imenika za manjkajočo vrednost particije (hive konvencija, ki jo razumejo pyarrow, DuckDB in Spark)
+PRAZNA_PARTICIJA = '__HIVE_DEFAULT_PARTITION__'
+
+# ime stolpca particije glede na izbrano vrsto particioniranja
+STOLPCI_PARTICIJ = {'izvod': 'Izvod', 'datum': 'DatumModela'}
+
+# največ hkrati odprtih parquet datotek ene tabele pri zapisu po delih; najdlje neuporabljena se zapre, naslednji del njene
+# particije pa se zapiše v novo datoteko (part-1.parquet, ...)
+NAJVEC_ODPRTIH_DATOTEK = 256
+
+
+def _poenoti_shemi(shema, nova):
+    """Poenoti tipe stolpcev dveh delov tabele. Tipi se razširijo (npr. null ali int64 in double -> double), nezdružljivi tipi
+    (npr. double prvega dela s samimi NaN in niz) pa se zapišejo kot niz."""
+    polja = []
+    for polje, novo_polje in zip(shema, nova):
+        if polje.type.equals(novo_polje.type):
+            polja.append(polje)
+            continue
+        try:
+            polja.append(pa.unify_schemas([pa.schema([polje]), pa.schema([novo_polje])], promote_options='permissive').field(0))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            polja.append(pa.field(polje.name, pa.string()))
+    return pa.schema(polja)
+
+
+def _zdruzi_geo(geo, novi):
+    """Združi GeoParquet metapodatke dveh delov (bbox in geometry_types vseh delov datoteke)."""
+    if geo is None:
+        return novi
+    geo, novi = json.loads(geo), json.loads(novi)
+    for ime, stolpec in geo['columns'].items():
+        nov_stolpec = novi['columns'].get(ime, {})
+        if 'bbox' in stolpec and 'bbox' in nov_stolpec:
+            stolpec['bbox'] = [min(stolpec['bbox'][0], nov_stolpec['bbox'][0]), min(stolpec['bbox'][1], nov_stolpec['bbox'][1]),
+                               max(stolpec['bbox'][2], nov_stolpec['bbox'][2]), max(stolpec['bbox'][3], nov_stolpec['bbox'][3])]
+        stolpec['geometry_types'] = sorted(set(stolpec.get('geometry_types', [])) | set(nov_stolpec.get('geometry_types', [])))
+    return json.dumps(geo).encode()
+
+
+class _DatotekaParquet:
+    """Ena parquet datoteka particije, v katero se zapisujejo zaporedni deli (pyarrow.parquet.ParquetWriter). Metapodatki (pandas, geo)
+    se zapišejo ob zaprtju, da GeoParquet bbox in tipi geometrij zajamejo vse dele."""
+    def __init__(self, pot, shema, nastavitve):
+        self.pot = pot
+        self.metapodatki = {}
+        self.pisalec = pq.ParquetWriter(pot, shema.remove_metadata(), store_schema=False, **nastavitve)
+
+    def zapisi(self, tabela, velikost_skupine_vrstic):
+        metapodatki = tabela.schema.metadata or {}
+        for kljuc, vrednost in metapodatki.items():
+            self.metapodatki[kljuc] = _zdruzi_geo(self.metapodatki.get(kljuc), vrednost) if kljuc == b'geo' else vrednost
+        self.pisalec.write_table(tabela.replace_schema_metadata(None), row_group_size=velikost_skupine_vrstic)
+
+    def zapri(self):
+        if self.metapodatki:
+            self.pisalec.add_key_value_metadata(self.metapodatki)
+        self.pisalec.close()
+
+
+class _ZapisTabele:
+    """
+        Zapis tabele po delih: vsaka particija ima svojo parquet datoteko, v katero se dodajajo deli, tako da je v pomnilniku le en del.
+        Tipi stolpcev se lahko med deli razlikujejo (pandas tip določi iz vsebine dela), zato se ob spremembi shema poenoti
+        (glej _poenoti_shemi), že zapisane datoteke pa se prepišejo po skupinah vrstic.
+    """
+    def __init__(self, imenik_tabele, kompresija, velikost_skupine_vrstic):
+        self.imenik_tabele = imenik_tabele
+        self.nastavitve = {'compression': kompresija, 'write_statistics': True}
+        self.velikost_skupine_vrstic = velikost_skupine_vrstic
+        self.shema = None
+        self.vrstice = 0
+        self.odprte = OrderedDict()
+        self.st_datotek = {}
+        self.zapisano = []
+        # razdeljen prazen del, ki se zapiše samo, če tabela nima nobene vrstice (bralniki tako najdejo tabelo in njene stolpce)
+        self.prazen = None
+
+    def zapisi(self, imenik, tabela):
+        """Doda del particije v imeniku."""
+        if self.shema is None:
+            self.shema = tabela.schema.remove_metadata()
+        elif not tabela.schema.equals(self.shema):
+            shema = _poenoti_shemi(self.shema, tabela.schema)
+            if not shema.equals(self.shema):
+                self._prepisi(shema)
+            tabela = tabela.cast(shema.with_metadata(tabela.schema.metadata))
+
+        datoteka = self.odprte.pop(imenik, None)
+        if datoteka is None:
+            if len(self.odprte) >= NAJVEC_ODPRTIH_DATOTEK:
+                self.odprte.popitem(last=False)[1].zapri()
+            os.makedirs(imenik, exist_ok=True)
+            st = self.st_datotek.get(imenik, 0)
+            self.st_datotek[imenik] = st + 1
+            datoteka = _DatotekaParquet(os.path.join(imenik, f'part-{st}.parquet'), self.shema, self.nastavitve)
+            self.zapisano.append(datoteka.pot)
+        self.odprte[imenik] = datoteka
+        datoteka.zapisi(tabela, self.velikost_skupine_vrstic)
+
+    def _prepisi(self, shema):
+        """Zapre odprte datoteke in že zapisane datoteke prepiše s poenoteno shemo."""
+        self._zapri_odprte()
+        for pot in self.zapisano:
+            prejsnja = pot + '.prej'
+            os.replace(pot, prejsnja)
+            vir = pq.ParquetFile(prejsnja)
+            metapodatki = vir.schema_arrow.metadata
+            with pq.ParquetWriter(pot, shema.with_metadata(metapodatki), **self.nastavitve) as pisalec:
+                for skupina in vir.iter_batches(batch_size=self.velikost_skupine_vrstic):
+                    pisalec.write_table(pa.Table.from_batches([skupina]).cast(shema.with_metadata(metapodatki)))
+            vir.close()
+            os.remove(prejsnja)
+        self.shema = shema
+
+    def _zapri_odprte(self):
+        while self.odprte:
+            self.odprte.popitem(last=False)[1].zapri()
+
+    def prekini(self):
+        """Ob napaki zapre odprte datoteke (izvoz je neuspešen, zato vsebina ni pomembna)."""
+        for datoteka in self.odprte.values():
+            try:
+                datoteka.pisalec.close()
+            except Exception:
+                pass
+        self.odprte.clear()
+
+    def zapri(self):
+        """Zapre odprte datoteke (prazna tabela se zapiše kot prazne datoteke) in vrne seznam zapisanih datotek."""
+        if not self.zapisano and self.prazen:
+            for imenik, tabela in self.prazen:
+                self.zapisi(imenik, tabela)
+        self._zapri_odprte()
+        return self.zapisano
+
+
+def _v_arrow(df):
+    """Pretvori (del) tabele v pyarrow.Table; geografske plasti kot GeoParquet s stolpcem bbox (kot GeoDataFrame.to_parquet)."""
+    if isinstance(df, gpd.GeoDataFrame):
+        from geopandas.io.arrow import _geopandas_to_arrow
+        return _geopandas_to_arrow(df, index=False, write_covering_bbox=True)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+class Gredos2Parquet:
+    """
+        Gredos2Parquet izvozi model Gredos v stisnjene stolpčne (Geo)Parquet datoteke, primerne za analitiko (pyarrow, DuckDB, Spark).
+        Vsaka tabela in geografska plast se zapiše v svoj imenik (npr. izvoz/Branch/), po želji razdeljen na particije po izvodu
+        (Izvod=...) in/ali datumu modela (DatumModela=...) v hive obliki.
+
+        Vrstice so urejene po ključu tabele (pri prenosu po delih znotraj vsakega dela), zato statistike skupin vrstic (min/max) omogočajo
+        preskok skupin pri filtriranju po ključu. Pri prenosu po delih (velikost_dela, omejitev_pomnilnika_mb) se vsak del doda v parquet
+        datoteke svojih particij, zato je v pomnilniku hkrati le en del.
+        Geografske plasti so zapisane kot GeoParquet s stolpcem bbox za hitro prostorsko filtriranje.
+
+        Args:
+            povezava_mdb (str): povezava do mdb datoteke osnovnega modela
+            pot_materiali (str): povezava do datoteke materialov (npr.material_2000_v10.mdb)
+            imenik_parquet (str): imenik za izvoz. Defaults to 'intmodel/<ime modela>_parquet'.
+            particije (str or list, optional): 'izvod', 'datum' ali seznam obeh. Defaults to None (brez particij).
+            datum_modela (str, optional): datum modela za particijo 'datum' (YYYY-MM-DD). Defaults to None (datum spremembe mdb datoteke).
+            kompresija (str, optional): kompresija parquet datotek. Defaults to 'zstd'.
+            velikost_skupine_vrstic (int, optional): število vrstic v skupini vrstic (row group). Defaults to 100000.
+            kodiraj_kljuce (bool, optional): stolpce s ključi zapiši kot int32 kode in slovar ključev kot tabelo g2x_slovar_kljucev
+                (glej gredos_kodiranje). Defaults to False.
+            merilnik (gredos_meritve.Merilnik, optional): merilnik, ki dobi dogodke faz izvoza. Defaults to None (nov merilnik, glej self.merilnik).
+    """
+    def __init__(self, povezava_mdb='', pot_materiali='', imenik_parquet='', particije=None, datum_modela=None, kompresija='zstd',
+                 velikost_skupine_vrstic=100000, kodiraj_kljuce=False, merilnik=None):
+        self.mdb_povezava = os.path.normpath(povezava_mdb)
+        self.pot_materiali = os.path.normpath(pot_materiali)
+        self.gredos_file_name = os.path.basename(self.mdb_povezava).split('.')[0]
+        self.spisek_tabel = list(SPISEK_TABEL)
+        self.kompresija = kompresija
+        self.velikost_skupine_vrstic = velikost_skupine_vrstic
+        self.merilnik = merilnik_izvoza(merilnik, 'Gredos2Parquet')
+        self.kontrolne_vsote = KontrolneVsote()
+        self.predpomnilnik_materialov = PredpomnilnikMaterialov()
+        self.kodiraj_kljuce = kodiraj_kljuce
+        self.slovar_kljucev = SlovarKljucev() if kodiraj_kljuce else None
+
+        if isinstance(particije, str):
+            particije = [particije]
+        self.particije = list(particije or [])
+        for particija in self.particije:
+            if particija not in STOLPCI_PARTICIJ:
+                raise ValueError(f"Neznana particija '{particija}', možne so: {list(STOLPCI_PARTICIJ)}.")
+
+        if datum_modela is None and os.path.exists(self.mdb_povezava):
+            datum_modela = datetime.fromtimestamp(os.path.getmtime(self.mdb_povezava)).strftime('%Y-%m-%d')
+        self.datum_modela = datum_modela
+
+        if imenik_parquet == '':
+            imenik_parquet = os.path.join('intmodel', self.gredos_file_name + '_parquet')
+        self.imenik_parquet = os.path.abspath(imenik_parquet)
+        os.makedirs(self.imenik_parquet, exist_ok=True)
+
+        self.connection = None
+        if sys.platform.startswith('win') and not gredos_vir.je_paket(povezava_mdb):
+            self.connection = gredos_vir.povezava_mdb(povezava_mdb)
+
+        # preslikave ključev v izvod, zgrajene iz tabele Branch (in Node za LNode), za particioniranje ostalih tabel
+        self._izvodi = {}
+        self._deli_izvodov = {}
+
+    def _dodaj_izvode(self, df, ime_tabele, stolpci=None):
+        """Iz (dela) tabele Branch doda preslikave BranchId in NodeId -> izvod (FeederBrId), iz (dela) tabele Node pa LNodeId -> izvod.
+        Vozlišče pripada izvodu prve veje, na katero je priključeno, zato morajo biti vsi deli tabele Branch dodani pred deli Node."""
+        if ime_tabele == 'Branch':
+            kljuc = kljuc_kot_niz(df[najdi_stolpec(df, 'Branch', 'id', stolpci)])
+            izvod = kljuc_kot_niz(df[najdi_stolpec(df, 'Branch', 'izvod', stolpci)])
+            self._dodaj_preslikavo('Branch', pd.Series(izvod.to_numpy(), index=kljuc.to_numpy()))
+            vozlisca = pd.concat([kljuc_kot_niz(df[najdi_stolpec(df, 'Branch', vloga, stolpci)]) for vloga in ['vozlisce1', 'vozlisce2']])
+            self._dodaj_preslikavo('Node', pd.Series(pd.concat([izvod, izvod]).to_numpy(), index=vozlisca.to_numpy()).dropna())
+        elif ime_tabele == 'Node' and self._preslikava('Node') is not None:
+            node_kljuc = kljuc_kot_niz(df[najdi_stolpec(df, 'Node', 'id', stolpci)])
+            node_lnode = kljuc_kot_niz(df[najdi_stolpec(df, 'Node', 'lnode', stolpci)])
+            izvodi_lnode = pd.Series(self._preslikava('Node').reindex(node_kljuc.to_numpy()).to_numpy(), index=node_lnode.to_numpy()).dropna()
+            self._dodaj_preslikavo('LNode', izvodi_lnode)
+
+    def _dodaj_preslikavo(self, ime, preslikava):
+        self._deli_izvodov.setdefault(ime, []).append(preslikava)
+        self._izvodi.pop(ime, None)
+
+    def _preslikava(self, ime):
+        """Vrne preslikavo ključev tabele v izvod (velja prva pojavitev ključa) ali None, če je ni."""
+        if ime not in self._izvodi and self._deli_izvodov.get(ime):
+            preslikava = pd.concat(self._deli_izvodov[ime])
+            preslikava = preslikava[~preslikava.index.duplicated()]
+            self._deli_izvodov[ime] = [preslikava]
+            self._izvodi[ime] = preslikava
+        return self._izvodi.get(ime)
+
+    def _izvod_tabele(self, df, ime, stolpci=None):
+        """Vrne izvod za vsako vrstico tabele ali None, če tabele ni mogoče povezati z izvodom."""
+        if ime == 'Branch':
+            return kljuc_kot_niz(df[najdi_stolpec(df, 'Branch', 'izvod', stolpci)]).to_numpy()
+        povezave = {
+            'Section': ('Branch', 'Section', 'veja'), 'Transformer': ('Branch', 'Transformer', 'veja'),
+            'Switching_device': ('Branch', 'Switching_device', 'veja'), 'LINE_geo': ('Branch', 'LINE_geo', 'id'),
+            'Node': ('Node', 'Node', 'id'), 'POINT_geo': ('Node', 'POINT_geo', 'id'),
+            'LNode': ('LNode', 'LNode', 'id'), 'LNODE_geo': ('LNode', 'LNODE_geo', 'id'),
+        }
+        if ime not in povezave or self._preslikava(povezave[ime][0]) is None:
+            return None
+        preslikava, tabela, vloga = povezave[ime]
+        kljuc = najdi_stolpec(df, tabela, vloga, stolpci, obvezen=False)
+        if kljuc is None:
+            return None
+        return self._preslikava(preslikava).reindex(kljuc_kot_niz(df[kljuc]).to_numpy()).to_numpy()
+
+    @contextmanager
+    def _zacasni_izhod(self):
+        """Izvoz v ozadju piše v začasni imenik ob izhodnem. Šele ob uspehu se zapisane tabele (pri particiji 'datum' le particije
+        tega datuma) prestavijo v izhodni imenik, ob napaki ali preklicu pa izhodni imenik ostane nespremenjen (glej gredos_ozadje)."""
+        izhod = self.imenik_parquet
+        self.imenik_parquet = f"{izhod}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            os.makedirs(self.imenik_parquet, exist_ok=True)
+            yield self.imenik_parquet
+            self.prenesi_v_izhod(self.imenik_parquet, izhod)
+        finally:
+            shutil.rmtree(self.imenik_parquet, ignore_errors=True)
+            self.imenik_parquet = izhod
+
+    def prenesi_v_izhod(self, imenik, izhod, prenos=os.replace):
+        """Prenese tabele iz imenika (npr. začasnega ali predpomnilnika) v izhodni imenik. Tabela v izhodu se zamenja v celoti,
+        pri particiji 'datum' pa le particije datumov, ki so v imeniku.
+
+        Args:
+            imenik (str): imenik s tabelami izvoza
+            izhod (str): izhodni imenik
+            prenos (callable, optional): funkcija (vir, cilj) za prenos imenika. Defaults to os.replace (premik).
+        """
+        for ime in sorted(os.listdir(imenik)):
+            vir, cilj = os.path.join(imenik, ime), os.path.join(izhod, ime)
+            if 'datum' in self.particije:
+                zamenjave = [(os.path.join(vir, p), os.path.join(cilj, p)) for p in sorted(os.listdir(vir))]
+                os.makedirs(cilj, exist_ok=True)
+            else:
+                zamenjave = [(vir, cilj)]
+            for vir_dela, cilj_dela in zamenjave:
+                if os.path.isdir(cilj_dela):
+                    shutil.rmtree(cilj_dela)
+                prenos(vir_dela, cilj_dela)
+
+    def zapisi_tabelo(self, df, ime, stolpci=None, show_progress=False):
+        """Zapiše tabelo ali geografsko plast v imenik <imenik_parquet>/<ime>, razdeljeno na particije.
+
+        Args:
+            df (pandas.DataFrame or geopandas.GeoDataFrame): tabela za zapis
+            ime (str): ime tabele oz. plasti (npr. 'Branch', 'LINE_geo')
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+            show_progress (bool, optional): Prikaži napredek. Defaults to False.
+
+        Returns:
+            list: seznam zapisanih parquet datotek.
+        """
+        return self.zapisi_dele([df], ime, stolpci, show_progress)
+
+    def zapisi_dele(self, deli, ime, stolpci=None, show_progress=False):
+        """Zapiše zaporedne dele tabele ali geografske plasti (npr. iz gredos_vir.preberi_tabelo_mdb_po_delih) v imenik
+        <imenik_parquet>/<ime>. V pomnilniku je hkrati le en del: vsak del se uredi po ključu in doda v parquet datoteke svojih particij.
+
+        Args:
+            deli (iterable): zaporedni deli tabele (pandas.DataFrame or geopandas.GeoDataFrame)
+            ime (str): ime tabele oz. plasti (npr. 'Branch', 'LINE_geo')
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+            show_progress (bool, optional): Prikaži napredek. Defaults to False.
+
+        Returns:
+            list: seznam zapisanih parquet datotek.
+        """
+        zapis = self._zacni_zapis(ime)
+        try:
+            for st_dela, df in enumerate(deli):
+                self._zapisi_del(zapis, df, ime, stolpci, st_dela)
+        except BaseException:
+            zapis.prekini()
+            raise
+        zapisano = zapis.zapri()
+
+        if show_progress:
+            print(f"Zapisano {ime}: {zapis.vrstice} vrstic v {len(zapisano)} datotek.")
+        return zapisano
+
+    def _zacni_zapis(self, ime):
+        """Pobriše prejšnji izvoz tabele (pri particiji 'datum' le particijo datuma modela) in vrne zapis tabele po delih."""
+        imenik_tabele = os.path.join(self.imenik_parquet, ime)
+        # ob ponovnem izvozu istega datuma se zamenja samo particija tega datuma
+        if 'datum' in self.particije:
+            brisi = os.path.join(imenik_tabele, f"{STOLPCI_PARTICIJ['datum']}={self.datum_modela}")
+        else:
+            brisi = imenik_tabele
+        if os.path.isdir(brisi):
+            shutil.rmtree(brisi)
+        return _ZapisTabele(imenik_tabele, self.kompresija, self.velikost_skupine_vrstic)
+
+    def _zapisi_del(self, zapis, df, ime, stolpci, st_dela):
+        """Razdeli del tabele na particije in ga doda v zapis tabele."""
+        with self.merilnik.faza('zapis', tabela=ime, **{'del': st_dela}) as meritev:
+            deli_particij = self._razdeli_na_particije(df, ime, stolpci)
+            if len(df):
+                for imenik, tabela in deli_particij:
+                    zapis.zapisi(imenik, tabela)
+            else:
+                zapis.prazen = deli_particij
+            meritev.dodaj(df)
+        zapis.vrstice += len(df)
+        self.kontrolne_vsote.dodaj(ime, df, zamenjaj=st_dela == 0)
+
+    def _razdeli_na_particije(self, df, ime, stolpci=None):
+        """Uredi (del) tabele po ključu in ga razdeli na particije.
+
+        Returns:
+            list: (imenik particije, pyarrow.Table) za vsako particijo.
+        """
+        df = df.copy()
+        kljuc = najdi_stolpec(df, ime, 'veja' if ime in ['Section', 'Transformer', 'Switching_device'] else 'id', stolpci, obvezen=False)
+        if kljuc is not None:
+            df = df.sort_values(kljuc, kind='stable', ignore_index=True)
+
+        imena_particij = []
+        for particija in self.particije:
+            stolpec = STOLPCI_PARTICIJ[particija]
+            if particija == 'datum':
+                df[stolpec] = self.datum_modela
+            else:
+                izvod = self._izvod_tabele(df, ime, stolpci)
+                if izvod is None:
+                    continue
+                df[stolpec] = izvod
+            imena_particij.append(stolpec)
+
+        if self.slovar_kljucev is not None:
+            df = self.slovar_kljucev.kodiraj_tabelo(df, ime, stolpci)
+
+        if imena_particij and df.empty:
+            # prazna tabela (npr. poročilo brez napak) se zapiše kot ena prazna datoteka, da jo bralniki najdejo
+            skupine = [(tuple(self.datum_modela if s == STOLPCI_PARTICIJ['datum'] else PRAZNA_PARTICIJA for s in imena_particij), df)]
+        elif imena_particij:
+            skupine = df.groupby([df[s].fillna(PRAZNA_PARTICIJA).astype(str) for s in imena_particij], sort=True, dropna=False)
+        else:
+            skupine = [((), df)]
+
+        imenik_tabele = os.path.join(self.imenik_parquet, ime)
+        deli = []
+        for vrednosti, del_tabele in skupine:
+            if not isinstance(vrednosti, tuple):
+                vrednosti = (vrednosti,)
+            imenik = os.path.join(imenik_tabele, *[f'{s}={urllib.parse.quote(str(v), safe="")}' for s, v in zip(imena_particij, vrednosti)])
+            deli.append((imenik, _v_arrow(del_tabele.drop(columns=imena_particij))))
+        return deli
+
+    def uvozi_podatke_mdb(self, show_progress=False, stolpci=None, velikost_dela=None, omejitev_pomnilnika_mb=None):
+        """Prebere tabele Gredos iz mdb datoteke in jih zapiše v parquet. Tabela Branch se zapiše prva, ker določa izvode za particije.
+        Tabele se prenašajo po delih (glej gredos_vir.preberi_tabelo_mdb_po_delih), v pomnilniku pa ostanejo le preslikave ključev v
+        izvode za particijo 'izvod'.
+
+        Args:
+            show_progress (bool, optional): V terminalu prikaže proces nalaganja posamezne tabele.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+            velikost_dela (int, optional): število vrstic v delu. Defaults to None (cela tabela naenkrat).
+            omejitev_pomnilnika_mb (float, optional): velikost dela se določa sproti glede na omejitev pomnilnika. Defaults to None.
+        """
+        vrstni_red = ['Branch', 'Node'] + [t for t in self.spisek_tabel if t not in ['Branch', 'Node']]
+        self._izvodi, self._deli_izvodov = {}, {}
+
+        def beri(ime_tabele):
+            deli = gredos_vir.preberi_tabelo_mdb_po_delih(self.mdb_povezava, ime_tabele, velikost_dela, omejitev_pomnilnika_mb,
+                                                          povezava=self.connection, merilnik=self.merilnik)
+            return self._z_izvodi(deli, ime_tabele, stolpci) if 'izvod' in self.particije else deli
+
+        if self.slovar_kljucev is not None and velikost_dela is None and omejitev_pomnilnika_mb is None:
+            # cele tabele: ključi osnovnih tabel dobijo kode najprej, da so kode urejene enako kot vrstice
+            tabele = {ime_tabele: list(beri(ime_tabele)) for ime_tabele in vrstni_red}
+            self.slovar_kljucev.zgradi({ime_tabele: deli[0] for ime_tabele, deli in tabele.items()}, stolpci)
+            viri = tabele.items()
+        else:
+            # po delih se ključi dodajajo v slovar v vrstnem redu branja
+            viri = ((ime_tabele, beri(ime_tabele)) for ime_tabele in vrstni_red)
+        for ime_tabele, deli in viri:
+            if show_progress:
+                print(f"Uvažam tabelo {ime_tabele}.")
+            self.zapisi_dele(deli, ime_tabele, stolpci, show_progress)
+
+    def _z_izvodi(self, deli, ime_tabele, stolpci=None):
+        """Iz delov tabel Branch in Node sproti dopolnjuje preslikave ključev v izvode (glej _dodaj_izvode)."""
+        for df in deli:
+            if ime_tabele in ['Branch', 'Node']:
+                self._dodaj_izvode(df, ime_tabele, stolpci)
+            yield df
+
+    def uvozi_podatke_materialov_mdb(self, show_progress=False):
+        """Prebere tabelo MATERIAL iz datoteke materialov (prek predpomnilnika materialov) in jo zapiše v parquet (brez particij po izvodu)."""
+        material = self.predpomnilnik_materialov.preberi(self.pot_materiali, merilnik=self.merilnik)
+        self.zapisi_tabelo(material, 'MATERIAL', show_progress=show_progress)
+
+    def uvozi_geografske_datoteke(self, show_progress=False, pretvori_crs=False, set_crs='EPSG:3794', stolpci=None, niti=None,
+                                  velikost_dela=None, omejitev_pomnilnika_mb=None):
+        """Zapiše Gredos shp datoteke kot GeoParquet plasti POINT_geo, LINE_geo in LNODE_geo. Plasti se berejo in pretvarjajo sočasno
+        (glej gredos_vir.preberi_geografske_datoteke_vzporedno), zapis pa je zaporeden.
+
+        Args:
+            show_progress (bool, optional): Prikaži napredek uvoza. Defaults to False.
+            pretvori_crs (bool, optional): Pretvori v drug crs. Defaults to False.
+            set_crs (str, optional): Izhodni koordinatni sistem. Defaults to 'EPSG:3794'.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+            niti (int, optional): število sočasno branih plasti. Defaults to None (vse plasti hkrati).
+            velikost_dela (int, optional): število vrstic v delu pri prenosu plasti. Defaults to None (cela plast naenkrat).
+            omejitev_pomnilnika_mb (float, optional): velikost dela se določa sproti glede na omejitev pomnilnika. Defaults to None.
+
+        Returns:
+            bool: True, če niso bile najdene vse tri geografske datoteke.
+        """
+        datoteke = gredos_vir.najdi_geografske_datoteke(gredos_vir.imenik_modela(self.mdb_povezava))
+        if show_progress:
+            for pot in datoteke.values():
+                print(f"Uvažam: {os.path.basename(pot)}")
+        deli = gredos_vir.preberi_geografske_datoteke_vzporedno(datoteke, niti, velikost_dela, omejitev_pomnilnika_mb, merilnik=self.merilnik,
+                                                                pretvori_crs=pretvori_crs, set_crs=set_crs)
+        # deli plasti prihajajo prepleteno, zato ima vsaka plast svoj zapis, ki se zaključi ob koncu plasti
+        zapisi = {}
+        try:
+            with closing(deli):
+                for plast, st_dela, shp in deli:
+                    if shp is not None:
+                        if plast not in zapisi:
+                            zapisi[plast] = self._zacni_zapis(plast)
+                        self._zapisi_del(zapisi[plast], shp, plast, stolpci, st_dela)
+                    elif plast in zapisi:
+                        zapis = zapisi.pop(plast)
+                        zapisano = zapis.zapri()
+                        if show_progress:
+                            print(f"Zapisano {plast}: {zapis.vrstice} vrstic v {len(zapisano)} datotek.")
+        except BaseException:
+            for zapis in zapisi.values():
+                zapis.prekini()
+            raise
+        return len(datoteke) != 3
+
+    def pozeni_uvoz(self, show_progress=False, pretvori_crs=False, set_crs='EPSG:3794', stolpci=None, imenik_profilov=None,
+                    preveri_celovitost=False, velikost_dela=None, omejitev_pomnilnika_mb=None):
+        """Izvozi vse podatke Gredos v parquet imenik.
+
+        Args:
+            show_progress (bool, optional): med izvozom prikazuj obvestila v terminalu.
+            pretvori_crs (bool, optional): pretvori v drug koordinatni sistem npr. wgs84 (EPSG:4326) ali epsg: 3794.
+            set_crs (str): crs string npr. EPSG:3794.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+            imenik_profilov (str, optional): profiliraj faze izvoza (cProfile, tracemalloc) in profile zapiši v ta imenik
+                (glej gredos_meritve.Profiliranje). Defaults to None (brez profiliranja).
+            preveri_celovitost (bool, optional): ob koncu preveri referenčno celovitost izvoženega modela in poročilo zapiši kot tabelo
+                g2x_celovitost (glej preveri_celovitost_modela). Defaults to False.
+            velikost_dela (int, optional): tabele in plasti prenašaj po delih s tem številom vrstic (vsak del se doda v parquet
+                datoteke svojih particij). Defaults to None (cela tabela naenkrat).
+            omejitev_pomnilnika_mb (float, optional): velikost delov določaj sproti tako, da del porabi le manjši delež te omejitve
+                pomnilnika. Defaults to None.
+
+        Returns:
+            bool: True, če niso bile najdene vse tri geografske datoteke.
+        """
+        with self.merilnik.profiliranje(imenik_profilov), self.merilnik.faza('uvoz', model=self.gredos_file_name):
+            self.kontrolne_vsote.pocisti()
+            if self.kodiraj_kljuce:
+                self.slovar_kljucev = SlovarKljucev()
+            # tabele najprej, da so izvodi za particioniranje geografskih plasti že znani
+            self.uvozi_podatke_mdb(show_progress, stolpci, velikost_dela, omejitev_pomnilnika_mb)
+            self.uvozi_podatke_materialov_mdb(show_progress)
+            uvozeno = self.uvozi_geografske_datoteke(show_progress, pretvori_crs=pretvori_crs, set_crs=set_crs, stolpci=stolpci,
+                                                     velikost_dela=velikost_dela, omejitev_pomnilnika_mb=omejitev_pomnilnika_mb)
+            if self.slovar_kljucev is not None:
+                self.zapisi_tabelo(self.slovar_kljucev.v_tabelo(), IME_SLOVARJA_KLJUCEV)
+            if preveri_celovitost:
+                with self.merilnik.faza('celovitost'):
+                    self.preveri_celovitost_modela(show_progress, stolpci)
+            self.zapisi_kontrolne_vsote()
+            return uvozeno
+
+    def zapisi_kontrolne_vsote(self):
+        """Zapiše število vrstic in kontrolne vsote zapisanih tabel in plasti kot tabelo g2x_manifest (glej gredos_kontrolne_vsote)."""
+        self.zapisi_tabelo(self.kontrolne_vsote.v_tabelo(), IME_KONTROLNIH_VSOT)
+
+    def preveri_celovitost_modela(self, show_progress=False, stolpci=None):
+        """Preveri tuje ključe, podvojene ključe in vrstice brez geometrije v izvoženem modelu (glej gredos_preverjanje) ter poročilo
+        zapiše kot tabelo g2x_celovitost.
+
+        Args:
+            show_progress (bool, optional): Izpiši povzetek poročila. Defaults to False.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+        Returns:
+            pandas.DataFrame: poročilo (en zapis na problematičen ključ).
+        """
+        porocilo = gredos_preverjanje.preveri_celovitost_izvoza(self, stolpci)
+        self.zapisi_tabelo(porocilo, gredos_preverjanje.IME_TABELE)
+        if show_progress:
+            gredos_preverjanje.izpisi_povzetek(porocilo)
+        return porocilo
+
+    def pozeni_uvoz_v_ozadju(self, povratni_klic_napredka=None, izvajalec=None, **nastavitve):
+        """Zažene pozeni_uvoz v ozadju in takoj vrne opravilo z napredkom in preklicem (glej gredos_ozadje.IzvozVOzadju).
+        Izvoz piše v začasni imenik, zato ob preklicu ali napaki izhodni imenik ostane nespremenjen.
+
+        Args:
+            povratni_klic_napredka (callable, optional): funkcija (delez, tabela), klicana iz niti izvoza. Defaults to None.
+            izvajalec (concurrent.futures.Executor, optional): izvajalec za izvoz. Defaults to None (nova nit).
+            **nastavitve: parametri pozeni_uvoz (npr. pretvori_crs=True, set_crs='EPSG:4326')
+
+        Returns:
+            gredos_ozadje.IzvozVOzadju: opravilo izvoza.
+        """
+        return pozeni_v_ozadju(self, povratni_klic_napredka, izvajalec, **nastavitve)
+
+    def pozeni_uvoz_s_predpomnilnikom(self, predpomnilnik=None, **nastavitve):
+        """Kot pozeni_uvoz, le da se rezultat postreže iz predpomnilnika rezultatov, če je bil model z enakimi nastavitvami že izvožen
+        (glej gredos_predpomnilnik.PredpomnilnikRezultatov), nov rezultat pa se v predpomnilnik shrani.
+
+        Args:
+            predpomnilnik (gredos_predpomnilnik.PredpomnilnikRezultatov, optional): predpomnilnik. Defaults to None (privzeti imenik).
+            **nastavitve: parametri pozeni_uvoz (npr. pretvori_crs=True, set_crs='EPSG:3794')
+
+        Returns:
+            rezultat pozeni_uvoz.
+        """
+        if predpomnilnik is None:
+            predpomnilnik = PredpomnilnikRezultatov()
+        return predpomnilnik.pozeni_uvoz(self, **nastavitve)
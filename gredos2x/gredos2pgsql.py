@@ -16,17 +16,24 @@
 
 
 import os
-import urllib
-from sqlalchemy import create_engine, exc
-from sqlalchemy.engine import URL
-from sqlalchemy.sql import text
-import geopandas as gpd
-import pandas as pd
+import urllib.parse
 from datetime import datetime
 import time
 import sys, subprocess
 import io
 from shutil import which
+from contextlib import closing
+from gredos2x import gredos_vir
+from gredos2x.gredos_meritve import merilnik_izvoza
+from gredos2x.gredos_predpomnilnik import PredpomnilnikMaterialov
+from gredos2x.gredos_kontrolne_vsote import IME_TABELE as IME_KONTROLNIH_VSOT, KontrolneVsote
+from gredos2x.gredos_geometrije import PorociloGeometrij
+from gredos2x import gredos_preverjanje
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+gpd = leni_modul('geopandas')
+pd = leni_modul('pandas')
+sa = leni_modul('sqlalchemy')
 
 class Gredos2PGSQL:
     """
@@ -48,6 +55,7 @@ class Gredos2PGSQL:
             pot_materiali (str): povezava do datoteke materialov (npr.material_2000_v10.mdb)
             parametri_povezave_pgsql (dict): parametri povezave postgresql (klasični zapis, port kot textualni vnos)
             ime_sheme (str): ime sheme v postgresql bazi, kamor se bodo tabele izvozile
+            merilnik (gredos_meritve.Merilnik, optional): merilnik, ki dobi dogodke faz izvoza. Defaults to None (nov merilnik, glej self.merilnik).
 
             Primer `parametri_povezave_pgsql`:
                 "drivername": "postgresql+psycopg2",
@@ -58,13 +66,17 @@ class Gredos2PGSQL:
                 "database": "podatkovna_baza"
             }
     """
-    def __init__(self, povezava_mdb='', pot_materiali='', parametri_povezave_pgsql = {}, ime_sheme='public'):
+    def __init__(self, povezava_mdb='', pot_materiali='', parametri_povezave_pgsql = {}, ime_sheme='public', merilnik=None):
         self.mdb_povezava = os.path.normpath(povezava_mdb)
         self.pot_materiali = os.path.normpath(pot_materiali)
         self.gredos_file_name = os.path.basename(self.mdb_povezava).split('.')[0]
         self.spisek_tabel = ['LNode', 'Node', 'Section', 'Transformer', 'Switching_device','Branch']
         self.mdb_driver = "Microsoft Access Driver (*.mdb, *.accdb)"
         self.ime_sheme = ime_sheme
+        self.merilnik = merilnik_izvoza(merilnik, 'Gredos2PGSQL')
+        self.kontrolne_vsote = KontrolneVsote()
+        self.porocilo_geometrij = PorociloGeometrij()
+        self.predpomnilnik_materialov = PredpomnilnikMaterialov()
         if parametri_povezave_pgsql: 
             self.dict_povezava = parametri_povezave_pgsql
         else:             
@@ -77,7 +89,10 @@ class Gredos2PGSQL:
                 "database": "podatkovna_baza_na_strežniku"
             }
         
-        if sys.platform.startswith('win'):
+        if gredos_vir.je_paket(povezava_mdb):
+            # paket tabel se bere brez ODBC gonilnika in mdb-tools, zato je podprt na vseh platformah
+            pass
+        elif sys.platform.startswith('win'):
             #TODO: make ODBC driver check and auto discovery mechanism using pyodbc package listing...
             connection_string = (
                 f"DRIVER={self.mdb_driver};"
@@ -85,28 +100,28 @@ class Gredos2PGSQL:
 
             )
             connection_uri = f"access+pyodbc:///?odbc_connect={urllib.parse.quote_plus(connection_string)}"
-            self.connection_mdb = create_engine(connection_uri).connect()
+            self.connection_mdb = sa.create_engine(connection_uri).connect()
             
-        if sys.platform.startswith('lin'):
+        elif sys.platform.startswith('lin'):
             print('Linux power')
         else:  
             print(f"Platform {sys.platform} is not supported.")
             
         # vzpostavimo povezavo še s postgresql 
         ime_povezave_vidno_bazi = {"application_name": "gredos_etl"}
-        url_povezave = URL.create(**self.dict_povezava)
-        self.pgsql_engine = create_engine(url_povezave, connect_args=ime_povezave_vidno_bazi) 
+        url_povezave = sa.engine.URL.create(**self.dict_povezava)
+        self.pgsql_engine = sa.create_engine(url_povezave, connect_args=ime_povezave_vidno_bazi) 
         
         try:
     # Connect to the database and execute a simple query
             with self.pgsql_engine.connect() as connection:
-                query = text("SELECT 1")
+                query = sa.text("SELECT 1")
                 result = connection.execute(query)
                 if result.scalar() == 1:
                     print("Database is responding.")
                 else:
                     print("Database responded but returned an unexpected result.")
-        except exc.SQLAlchemyError as e:
+        except sa.exc.SQLAlchemyError as e:
             print(f"An error occurred while connecting to the database: {e}")
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
@@ -132,35 +147,42 @@ class Gredos2PGSQL:
         """
         try:
             with engine.connect() as connection:
-                query = text("SELECT schema_name FROM information_schema.schemata WHERE schema_name = :schema_name")
+                query = sa.text("SELECT schema_name FROM information_schema.schemata WHERE schema_name = :schema_name")
                 query = query.bindparams(schema_name=schema_name)
                 result = connection.execute(query)
                 return result.fetchone() is not None
-        except exc.SQLAlchemyError as e:
+        except sa.exc.SQLAlchemyError as e:
             print(f"An error occurred: {e}")
             return False
 
 
-    def pd_dataframe_v_pgsql(self, pd_dataframe, pgsql_engine, table_name):
+    def pd_dataframe_v_pgsql(self, pd_dataframe, pgsql_engine, table_name, if_exists='replace'):
         """Shrani datoteke v podatkovno bazo. 
 
         Args: 
             pd_dataframe (pandas.DataFrame): dataframe to transfer
             pgsql_engine (sqlachemy engine): sqlalchemy postgresql engine 
             table_name (str):  table name
+            if_exists (str, optional): 'replace' za prvi del tabele, 'append' za naslednje dele. Defaults to 'replace'.
         """
         
-        pd_dataframe.to_sql(table_name, pgsql_engine, schema =self.ime_sheme, if_exists='replace', index=False)
+        with self.merilnik.faza('zapis', tabela=table_name) as meritev:
+            pd_dataframe.to_sql(table_name, pgsql_engine, schema =self.ime_sheme, if_exists=if_exists, index=False)
+            meritev.dodaj(pd_dataframe)
+        self.kontrolne_vsote.dodaj(table_name, pd_dataframe, zamenjaj=if_exists == 'replace')
+        if if_exists == 'append':
+            return
         
-        with pgsql_engine.connect() as connection:
+        with self.merilnik.faza('komentar', tabela=table_name), pgsql_engine.connect() as connection:
             comment = f"Source MDB: {self.mdb_povezava}".replace("'", "''")
-            sql = text(f'COMMENT ON TABLE "{self.ime_sheme}"."{table_name}" IS \'{comment}\';')
+            sql = sa.text(f'COMMENT ON TABLE "{self.ime_sheme}"."{table_name}" IS \'{comment}\';')
             connection.execute(sql)
             connection.commit()
 
     
 
-    def shp_to_pgsql(self,filepath_shp, ime_tabele, pretvori_crs = False, set_crs = 'EPSG:3794'):
+    def shp_to_pgsql(self,filepath_shp, ime_tabele, pretvori_crs = False, set_crs = 'EPSG:3794', velikost_dela=None, omejitev_pomnilnika_mb=None,
+                     popravi_geometrije=True, natancnost_koordinat=None):
         """Pretvorba iz SHP v geodataframe. Ta metoda razreda ni uporabljena direktno, lahko pa se jo uporabo ob morebitnih novih virih. 
             Uporablja spremenljivko razreda self.pgsql_engine za povezavo s postgresql bazo. Potrebno pa je definirati shemo v bazi, ki mora predhodno obstajati.
 
@@ -169,66 +191,61 @@ class Gredos2PGSQL:
             ime_tabele (str): Ime tabele za izvoz
             pretvori_crs (bool, optional): _Pretvori crs pri izvozu ?_. Defaults to False.
             set_crs (str, optional): Izhodni koordinatni sistem. Defaults to 'EPSG:3912'. Pretvorba je zanimiva predvsem v 'EPSG:3794'
+            velikost_dela (int, optional): branje in zapis po delih s tem številom vrstic. Defaults to None (cela datoteka naenkrat).
+            omejitev_pomnilnika_mb (float, optional): velikost dela se določa sproti glede na omejitev pomnilnika. Defaults to None.
+            popravi_geometrije (bool, optional): pred zapisom popravi neveljavne in odstrani prazne geometrije (glej
+                gredos_geometrije.popravi_geometrije); števci se prištejejo v self.porocilo_geometrij. Defaults to True.
+            natancnost_koordinat (float, optional): pri popravilu koordinate zaokroži na mrežo s tem razmikom. Defaults to None.
         """
-        shp = gpd.GeoDataFrame.from_file(filepath_shp, crs='EPSG:3912', encoding='cp1250')
-        shp.set_crs('EPSG:3912', inplace=True)
-        if pretvori_crs: 
-            shp.to_crs(crs=set_crs, inplace=True)
-        else: 
-            set_crs = 'EPSG:3912' #pustimo crs v obliki, ki jo ima trenutno Gredos
-        
-        
-        shp.to_postgis(ime_tabele, self.pgsql_engine, if_exists= 'replace', schema = self.ime_sheme, index = False, chunksize = 10000)
-        
-        with self.pgsql_engine.connect() as connection:
+        deli = gredos_vir.preberi_geografsko_datoteko_po_delih(filepath_shp, velikost_dela, omejitev_pomnilnika_mb, pretvori_crs=pretvori_crs,
+                                                               set_crs=set_crs, merilnik=self.merilnik, oznake={'tabela': ime_tabele},
+                                                               popravi_geometrije=popravi_geometrije, natancnost_koordinat=natancnost_koordinat,
+                                                               porocilo=self.porocilo_geometrij)
+        for i, shp in enumerate(deli):
+            self._zapisi_del_plasti(shp, ime_tabele, i)
+        self._komentiraj_plast(ime_tabele)
+
+    def _zapisi_del_plasti(self, shp, ime_tabele, st_dela):
+        """Zapiše del geografske plasti: prvi del ustvari tabelo, naslednji deli se dodajajo."""
+        with self.merilnik.faza('zapis', tabela=ime_tabele, **{'del': st_dela}) as meritev:
+            shp.to_postgis(ime_tabele, self.pgsql_engine, if_exists= 'replace' if st_dela == 0 else 'append', schema = self.ime_sheme, index = False,
+                           chunksize = 10000)
+            meritev.dodaj(shp)
+        self.kontrolne_vsote.dodaj(ime_tabele, shp, zamenjaj=st_dela == 0)
+
+    def _komentiraj_plast(self, ime_tabele):
+        """Tabeli geografske plasti doda komentar z virom podatkov."""
+        with self.merilnik.faza('komentar', tabela=ime_tabele), self.pgsql_engine.connect() as connection:
             comment = f"Source MDB: {self.mdb_povezava}".replace("'", "''")
-            sql = text(f'COMMENT ON TABLE "{self.ime_sheme}"."{ime_tabele}" IS \'{comment}\';')
+            sql = sa.text(f'COMMENT ON TABLE "{self.ime_sheme}"."{ime_tabele}" IS \'{comment}\';')
             connection.execute(sql)
             connection.commit()
 
-    def mdb_2_pgsql(self, show_progress = False):
+    def mdb_2_pgsql(self, show_progress = False, velikost_dela=None, omejitev_pomnilnika_mb=None):
         """Osnovna funkcija za uvoz podatkov. Imena uvoznih tabel so predefinirana, prav tako format in tip podatkov uvoza. Pomembno, ker so nekateri modeli s šiframi v drugih formatih.
-           Osnovni spisek imen tabel v mdb je definiran spremenljivki razreda spisek_tabel.
+           Osnovni spisek imen tabel v mdb je definiran spremenljivki razreda spisek_tabel. Tabele se prenašajo po delih (glej gredos_vir.preberi_tabelo_mdb_po_delih).
 
         Args:
             show_progress (bool): V terminalu prikaže proces nalaganja posamezne tabele ali seznam vseh tabel (samo linux).
-        
+            velikost_dela (int, optional): število vrstic v delu. Defaults to None (cela tabela naenkrat).
+            omejitev_pomnilnika_mb (float, optional): velikost dela se določa sproti glede na omejitev pomnilnika. Defaults to None.
         """
         if os.path.exists(self.mdb_povezava):
-            if sys.platform.startswith('win'): 
-                for ime_tabele_v_bazi in self.spisek_tabel:
-                    if show_progress: 
-                        print(f"Uvažam tabelo {ime_tabele_v_bazi} v Windows okolju.")
-                    sql = text(f"select * from {ime_tabele_v_bazi}")
-                    pd_tabela = pd.read_sql_query(sql, self.connection_mdb)
-                    self.pd_dataframe_v_pgsql(pd_tabela, self.pgsql_engine, ime_tabele_v_bazi)
-            if sys.platform.startswith('linux'):
+            if sys.platform.startswith('linux') and not gredos_vir.je_paket(self.mdb_povezava):
                 available_tables = subprocess.Popen(["mdb-tables", self.mdb_povezava],
                                         stdout=subprocess.PIPE).communicate()[0].decode('utf-8')
                 if show_progress: 
                     print(available_tables)
-                if which('mdb-export') is not None: #shutil which za preverit ali je mdb-tables instaliran
-                    
-                    for ime_tabele_v_bazi in self.spisek_tabel:
-                        if show_progress: 
-                            print(f"Podatke uvažam z mdb-tools (Linux): tabela : {ime_tabele_v_bazi}")
-                        contents = subprocess.Popen(["mdb-export", self.mdb_povezava,ime_tabele_v_bazi],
-                                        stdout=subprocess.PIPE).communicate()[0].decode('utf-8')
-                        
-                        # weird import declarations (String IDs with numbers only - Only in Gredos ?!)
-                        types = None
-                        if ime_tabele_v_bazi.startswith('Node'): 
-                            
-                            types = {'NodeId':str, 'LNodeId': str, 'XDbId':str, 'OrgId':str}
-                        if ime_tabele_v_bazi.startswith('Branch'): 
-                            types = {'BranchId': str, 'FeederBrId':str, 'XDbId':str, 'Node1':str, 'Node2':str}
-                        if ime_tabele_v_bazi.startswith('LNode'): 
-                            types = {'LNodeId': str, 'OrgId':str}
-                        if ime_tabele_v_bazi.startswith('Section'): 
-                            types = {'BranchId': str}
-                            
-                        pd_tabela = pd.read_csv(io.StringIO(str(contents)),sep=',', header=0, converters=types, encoding='cp1250', index_col=False, engine='python')
-                        self.pd_dataframe_v_pgsql(pd_tabela, self.pgsql_engine, ime_tabele_v_bazi)
+                if which('mdb-export') is None: #shutil which za preverit ali je mdb-tables instaliran
+                    return
+
+            for ime_tabele_v_bazi in self.spisek_tabel:
+                if show_progress: 
+                    print(f"Uvažam tabelo {ime_tabele_v_bazi}.")
+                deli = gredos_vir.preberi_tabelo_mdb_po_delih(self.mdb_povezava, ime_tabele_v_bazi, velikost_dela, omejitev_pomnilnika_mb,
+                                                              povezava=getattr(self, 'connection_mdb', None), merilnik=self.merilnik)
+                for i, pd_tabela in enumerate(deli):
+                    self.pd_dataframe_v_pgsql(pd_tabela, self.pgsql_engine, ime_tabele_v_bazi, if_exists='replace' if i == 0 else 'append')
                   
             
 
@@ -238,85 +255,69 @@ class Gredos2PGSQL:
             uvoz podatkov na linux platformi pa temelji na osnovi mdb-tools.
             
             Datoteka materialov se običajno v distribuciji Gredos nahaja v imeniku C:\GredosMO\Defaults
+            Tabela se prebere enkrat na datoteko materialov in hrani v predpomnilniku materialov (glej
+            gredos_predpomnilnik.PredpomnilnikMaterialov), ki ga delijo vsi izvozi na računalniku.
             
         """
-        
-        if sys.platform.startswith('win'): 
-            connection_string = (
-                u"DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};"
-                f"DBQ={self.pot_materiali};"
-            )
-            connection_uri = f"access+pyodbc:///?odbc_connect={urllib.parse.quote_plus(connection_string)}"
-            con_material = create_engine(connection_uri).connect()
-
-            sql_material = text("select * from MATERIAL")
-
-            try:
-                #stlačim še materiale v postgresql
-                material = pd.read_sql_query(sql_material, con_material)
-                self.pd_dataframe_v_pgsql(material, self.pgsql_engine, 'MATERIAL')
-
-                return True
-            except Exception as e:
-                return False
-        if sys.platform.startswith('lin'): 
-            contents = subprocess.Popen(["mdb-export", self.pot_materiali,'MATERIAL'],
-                                    stdout=subprocess.PIPE).communicate()[0].decode('utf-8')
-            
-            tabela = pd.read_csv(io.StringIO(str(contents)),sep=',', header=0, encoding='cp1250', index_col=False)
-            self.pd_dataframe_v_pgsql(tabela, self.pgsql_engine, 'MATERIAL')
+        material = self.predpomnilnik_materialov.preberi(self.pot_materiali, merilnik=self.merilnik)
+        self.pd_dataframe_v_pgsql(material, self.pgsql_engine, 'MATERIAL')
+        return True
             
             
 
-    def uvozi_geografske_datoteke(self, show_progress=False, pretvori_crs = False, set_crs='EPSG:3794'):
+    def uvozi_geografske_datoteke(self, show_progress=False, pretvori_crs = False, set_crs='EPSG:3794', velikost_dela=None, omejitev_pomnilnika_mb=None,
+                                  niti=None, popravi_geometrije=True, natancnost_koordinat=None):
         """
         
          Uvozi podatke SHP gredos  kot  geografsko plast  v  postgresql.
          v Default EPSG koda je 3912 (GK48), med prenosom je možna pretvorba iz tega v drug koordinatni sistem, ki je kompatibilen z GIS ali
          drugimi prikazovalniki, ki imajo npr. podlago za prikaz v WGS84. S tem smo pokrili večino uporabniških primerov.
+         Plasti se berejo in pretvarjajo sočasno (glej gredos_vir.preberi_geografske_datoteke_vzporedno), zapis v bazo pa je zaporeden.
         
         Args:
             show_progress (bool, optional): Prikaži napredek uvoza. Defaults to False.
             pretvori_crs (bool, optional): Pretvori v drug crs (default 3794). Defaults to True.
             set_crs (str, optional): Sets CRS of conversion data.
+            velikost_dela (int, optional): število vrstic v delu pri prenosu plasti. Defaults to None (cela plast naenkrat).
+            omejitev_pomnilnika_mb (float, optional): velikost dela se določa sproti glede na omejitev pomnilnika. Defaults to None.
+            niti (int, optional): število sočasno branih plasti. Defaults to None (vse plasti hkrati).
+            popravi_geometrije (bool, optional): pred zapisom popravi neveljavne in odstrani prazne geometrije (glej
+                gredos_geometrije.popravi_geometrije); števci se prištejejo v self.porocilo_geometrij. Defaults to True.
+            natancnost_koordinat (float, optional): pri popravilu koordinate zaokroži na mrežo s tem razmikom. Defaults to None.
         Returns:
             bool: True, če je število uvoženih SHP datotek pod 3 (POINT, LNODE, LINE). Če bi se v imeniku nahajalo več datotek SHP bi tako vrnil napako.
             Slednje se običajno zgodi, ko je v uvoznem imeniku, kjer se nahaja temeljna mdb datoteka več datotek. 
         """
 
-        imenik_projekta =os.path.dirname(self.mdb_povezava)
-        onlyfiles = [f for f in os.listdir(imenik_projekta) if os.path.isfile(os.path.join(imenik_projekta, f))]
-        i = 0
-        
-        for file in onlyfiles:
-            splitfile = file.split('.')
-            if 'POINT' in splitfile[0]:
-                i = i + 1
-                if 'shp' in splitfile[1]:
-                    if show_progress: 
-                        print(f"Uvažam: {file}")
-                    self.shp_to_pgsql(os.path.join(imenik_projekta,file), ime_tabele='POINT_geo' ,pretvori_crs=pretvori_crs, set_crs=set_crs)
-                    
-            if 'LINE' in splitfile[0]:
-                i = i + 1
-                if 'shp' in splitfile[1]:
-                    if show_progress: 
-                        print(f"Uvažam: {file}")
-                    self.shp_to_pgsql(os.path.join(imenik_projekta,file), ime_tabele='LINE_geo' ,pretvori_crs=pretvori_crs, set_crs=set_crs)
-                    
-            if 'LNODE' in splitfile[0]:
-                i=i + 1
-                if 'shp' in splitfile[1]:
-                    if show_progress: 
-                        print(f"Uvažam: {file}")
-                    self.shp_to_pgsql(os.path.join(imenik_projekta,file), ime_tabele='LNODE_geo', pretvori_crs=pretvori_crs, set_crs=set_crs)
+        imenik_projekta = gredos_vir.imenik_modela(self.mdb_povezava)
+        onlyfiles = gredos_vir.seznam_datotek(imenik_projekta)
+        i = sum(del_imena in file.split('.')[0] for file in onlyfiles for del_imena in ['POINT', 'LINE', 'LNODE'])
+
+        datoteke = gredos_vir.najdi_geografske_datoteke(imenik_projekta)
+        if show_progress:
+            for pot in datoteke.values():
+                print(f"Uvažam: {os.path.basename(pot)}")
+        deli = gredos_vir.preberi_geografske_datoteke_vzporedno(datoteke, niti, velikost_dela, omejitev_pomnilnika_mb, merilnik=self.merilnik,
+                                                                pretvori_crs=pretvori_crs, set_crs=set_crs,
+                                                                popravi_geometrije=popravi_geometrije, natancnost_koordinat=natancnost_koordinat,
+                                                                porocilo=self.porocilo_geometrij)
+        with closing(deli):
+            for plast, st_dela, shp in deli:
+                if shp is None:
+                    self._komentiraj_plast(plast)
+                else:
+                    self._zapisi_del_plasti(shp, plast, st_dela)
+        if show_progress:
+            self.porocilo_geometrij.izpisi()
                    
         if i == 3:
             return False
         else:
             return True
 
-    def pozeni_uvoz(self, show_progress = False, pretvori_crs = False, set_crs = 'EPSG:3794'):
+    def pozeni_uvoz(self, show_progress = False, pretvori_crs = False, set_crs = 'EPSG:3794', velikost_dela = None, omejitev_pomnilnika_mb = None,
+                    imenik_profilov = None,
+                    preveri_celovitost = False, popravi_geometrije = True, natancnost_koordinat = None):
         """ Izvozi vse podatke Gredos v lokalno posgis podatkovno bazo, pret tem je potrebno definirati shemo v katero bomo izvažali podatke. 
             Omogoča tudi pretvorbo koordinatnega sistema v druge oblike npr. WGS84 za spletne aplikacije ali EPSG:3794 (D96/TM Slovenski koordinatni sistem).
 
@@ -325,13 +326,53 @@ class Gredos2PGSQL:
             show_progress (bool, optional): med izvozom prikazuj obvestila v terminalu.
             pretvori_crs (bool, optional): pretvori v drug koordinatni sistem npr. wgs84 (EPSG:4326) ali epsg: 3794 (Geodetic CRS: Slovenia 1996).
             set_crs (str): crs string npr. EPSG:3912 (izvorni crs).
+            velikost_dela (int, optional): prenos tabel in plasti po delih s tem številom vrstic. Defaults to None (cele tabele naenkrat).
+            omejitev_pomnilnika_mb (float, optional): omejitev pomnilnika za prenos; velikost delov se določa sproti, tako da največja poraba
+                pomnilnika ni odvisna od velikosti modela. Defaults to None.
+            imenik_profilov (str, optional): profiliraj faze izvoza (cProfile, tracemalloc) in profile zapiši v ta imenik
+                (glej gredos_meritve.Profiliranje). Defaults to None (brez profiliranja).
+            preveri_celovitost (bool, optional): ob koncu preveri referenčno celovitost izvoženega modela in poročilo zapiši v tabelo
+                g2x_celovitost (glej preveri_celovitost_modela). Defaults to False.
+            popravi_geometrije (bool, optional): pred zapisom popravi neveljavne in odstrani prazne geometrije (glej
+                gredos_geometrije.popravi_geometrije); števci se prištejejo v self.porocilo_geometrij. Defaults to True.
+            natancnost_koordinat (float, optional): pri popravilu koordinate zaokroži na mrežo s tem razmikom. Defaults to None.
         Returns:
             bool: True, če je geografske datoteke ustrezno uvozilo.
         """
         
-        uvozeno = self.uvozi_geografske_datoteke(show_progress=True, pretvori_crs=pretvori_crs, set_crs=set_crs)
-        self.mdb_2_pgsql(show_progress=True)
-        self.uvozi_podatke_materialov_mdb()
+        with self.merilnik.profiliranje(imenik_profilov), self.merilnik.faza('uvoz', model=self.gredos_file_name):
+            self.kontrolne_vsote.pocisti()
+            self.porocilo_geometrij.pocisti()
+            uvozeno = self.uvozi_geografske_datoteke(show_progress=True, pretvori_crs=pretvori_crs, set_crs=set_crs, velikost_dela=velikost_dela,
+                                                     omejitev_pomnilnika_mb=omejitev_pomnilnika_mb, popravi_geometrije=popravi_geometrije,
+                                                     natancnost_koordinat=natancnost_koordinat)
+            self.mdb_2_pgsql(show_progress=True, velikost_dela=velikost_dela, omejitev_pomnilnika_mb=omejitev_pomnilnika_mb)
+            self.uvozi_podatke_materialov_mdb()
+            if preveri_celovitost:
+                with self.merilnik.faza('celovitost'):
+                    self.preveri_celovitost_modela(show_progress)
+            self.zapisi_kontrolne_vsote()
         
 
         return uvozeno
+
+    def zapisi_kontrolne_vsote(self):
+        """Zapiše število vrstic in kontrolne vsote zapisanih tabel in plasti v tabelo g2x_manifest v shemi (glej gredos_kontrolne_vsote)."""
+        self.pd_dataframe_v_pgsql(self.kontrolne_vsote.v_tabelo(self.porocilo_geometrij.odstranjene()), self.pgsql_engine, IME_KONTROLNIH_VSOT)
+
+    def preveri_celovitost_modela(self, show_progress=False, stolpci=None):
+        """Preveri tuje ključe, podvojene ključe in vrstice brez geometrije v izvoženem modelu (glej gredos_preverjanje) ter poročilo
+        zapiše v tabelo g2x_celovitost v shemi.
+
+        Args:
+            show_progress (bool, optional): Izpiši povzetek poročila. Defaults to False.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+        Returns:
+            pandas.DataFrame: poročilo (en zapis na problematičen ključ).
+        """
+        porocilo = gredos_preverjanje.preveri_celovitost_izvoza(self, stolpci)
+        self.pd_dataframe_v_pgsql(porocilo, self.pgsql_engine, gredos_preverjanje.IME_TABELE)
+        if show_progress:
+            gredos_preverjanje.izpisi_povzetek(porocilo)
+        return porocilo
@@ -0,0 +1,177 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Preverjanje in popravilo geometrij Gredos shp datotek pred zapisom v izhod.
+
+Neveljavne ali prazne geometrije se sicer pokažejo šele kot napaka v to_postgis oziroma v STGeomFromWKB pri SQL Server, ko je
+večina plasti že zapisana. Vsak prebrani del plasti se zato pred zapisom pregleda z operacijami nad celim poljem geometrij (shapely 2):
+
+    - prazne: manjkajoče (NULL) ali prazne geometrije se odstranijo,
+    - z_koordinate: 3D geometrije se pretvorijo v 2D,
+    - nefinitne: geometrije s koordinatami NaN ali inf se odstranijo,
+    - neveljavne: popravijo se z make_valid; iz zbirk se ohranijo deli z dimenzijo plasti, geometrije, ki se popravijo v nižjo
+      dimenzijo (npr. linija z eno samo točko), pa se odstranijo,
+    - po želji se koordinate zaokrožijo na mrežo natancnost (shapely.set_precision).
+
+Število popravljenih in odstranjenih geometrij se za vsako plast prišteje v PorociloGeometrij:
+
+    porocilo = PorociloGeometrij()
+    shp, stevci = popravi_geometrije(shp, natancnost=0.001)
+    porocilo.dodaj('LINE_geo', stevci)
+"""
+
+import threading
+
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+gpd = leni_modul('geopandas')
+np = leni_modul('numpy')
+pd = leni_modul('pandas')
+shapely = leni_modul('shapely')
+
+STEVCI = ['vrstice', 'prazne', 'z_koordinate', 'nefinitne', 'neveljavne', 'popravljene', 'odstranjene']
+
+# shapely.GeometryType.GEOMETRYCOLLECTION
+_ZBIRKA = 7
+
+
+def _deli_z_dimenzijo(zbirke, dimenzija):
+    """Iz zbirk geometrij ohrani dele z dano dimenzijo (en del ostane enostaven, več delov se združi v Multi geometrijo)."""
+    deli, indeksi = shapely.get_parts(zbirke, return_index=True)
+    izbrani = shapely.get_dimensions(deli) == dimenzija
+    deli, indeksi = deli[izbrani], indeksi[izbrani]
+    rezultat = np.full(len(zbirke), None, dtype=object)
+    st_delov = np.bincount(indeksi, minlength=len(zbirke))
+    en_del = st_delov[indeksi] == 1
+    rezultat[indeksi[en_del]] = deli[en_del]
+    vec = ~en_del
+    if vec.any():
+        zdruzi = {0: shapely.multipoints, 1: shapely.multilinestrings, 2: shapely.multipolygons}[dimenzija]
+        zbirke_vec, zaporedne = np.unique(indeksi[vec], return_inverse=True)
+        rezultat[zbirke_vec] = zdruzi(deli[vec], indices=zaporedne)
+    return rezultat
+
+
+def popravi_geometrije(gdf, natancnost=None, v_2d=True):
+    """Preveri in popravi geometrije dela plasti (glej opis modula). Če ni kaj popraviti, se vrne nespremenjen gdf.
+
+    Args:
+        gdf (geopandas.GeoDataFrame): del geografske plasti
+        natancnost (float, optional): koordinate zaokroži na mrežo s tem razmikom (v enotah koordinatnega sistema). Defaults to None.
+        v_2d (bool, optional): 3D geometrije pretvori v 2D. Defaults to True.
+
+    Returns:
+        tuple: (geopandas.GeoDataFrame s popravljenimi geometrijami in brez odstranjenih vrstic, dict števcev (glej STEVCI)).
+    """
+    geometrije = gdf.geometry.to_numpy()
+    stevci = dict.fromkeys(STEVCI, 0)
+    stevci['vrstice'] = len(gdf)
+    if not len(gdf):
+        return gdf, stevci
+
+    prazne = shapely.is_missing(geometrije) | shapely.is_empty(geometrije)
+    stevci['prazne'] = int(prazne.sum())
+    nove = geometrije
+    spremenjene = False
+
+    if v_2d:
+        z_koordinate = shapely.has_z(nove)
+        stevci['z_koordinate'] = int(z_koordinate.sum())
+        if stevci['z_koordinate']:
+            nove = shapely.force_2d(nove)
+            spremenjene = True
+
+    koordinate, indeksi = shapely.get_coordinates(nove, return_index=True)
+    nefinitne = np.zeros(len(nove), dtype=bool)
+    nefinitne[indeksi[~np.isfinite(koordinate).all(axis=1)]] = True
+    stevci['nefinitne'] = int(nefinitne.sum())
+    ostale = ~prazne & ~nefinitne
+
+    # dimenzija plasti (shp plast ima en sam tip geometrije, npr. LineString/MultiLineString)
+    dimenzija = shapely.get_dimensions(nove[ostale]).max() if ostale.any() else -1
+
+    if natancnost:
+        nove = nove.copy() if nove is geometrije else nove
+        nove[ostale] = shapely.set_precision(nove[ostale], natancnost)
+        spremenjene = True
+
+    neveljavne = ostale & ~shapely.is_valid(nove)
+    stevci['neveljavne'] = int(neveljavne.sum())
+    if stevci['neveljavne']:
+        nove = nove.copy() if nove is geometrije else nove
+        popravljene = shapely.make_valid(nove[neveljavne])
+        zbirke = shapely.get_type_id(popravljene) == _ZBIRKA
+        if zbirke.any():
+            popravljene[zbirke] = _deli_z_dimenzijo(popravljene[zbirke], dimenzija)
+        popravljene[shapely.get_dimensions(popravljene) != dimenzija] = None
+        nove[neveljavne] = popravljene
+        spremenjene = True
+
+    # po zaokroževanju in popravilu so lahko geometrije prazne (npr. linija, krajša od natančnosti)
+    odstrani = ~ostale | shapely.is_missing(nove) | shapely.is_empty(nove)
+    stevci['odstranjene'] = int(odstrani.sum())
+    stevci['popravljene'] = int((neveljavne & ~odstrani).sum())
+    if not spremenjene and not stevci['odstranjene']:
+        return gdf, stevci
+
+    gdf = gdf.copy()
+    gdf[gdf.geometry.name] = gpd.GeoSeries(nove, index=gdf.index, crs=gdf.crs)
+    if stevci['odstranjene']:
+        gdf = gdf[~odstrani].reset_index(drop=True)
+    return gdf, stevci
+
+
+class PorociloGeometrij:
+    """
+        Sproti zbira števce popravljenih in odstranjenih geometrij po plasteh (glej popravi_geometrije). Deli plasti se lahko
+        pregledujejo v več nitih hkrati (glej gredos_vir.preberi_geografske_datoteke_vzporedno).
+    """
+    def __init__(self):
+        self.plasti = {}
+        self._zaklep = threading.Lock()
+
+    def pocisti(self):
+        """Pobriše zbrane števce (npr. ob začetku novega izvoza)."""
+        with self._zaklep:
+            self.plasti = {}
+
+    def dodaj(self, plast, stevci):
+        """Prišteje števce dela plasti."""
+        with self._zaklep:
+            skupaj = self.plasti.setdefault(plast, dict.fromkeys(STEVCI, 0))
+            for ime in STEVCI:
+                skupaj[ime] += stevci.get(ime, 0)
+
+    def v_tabelo(self):
+        """Vrne števce kot tabelo (stolpca tabela in STEVCI, ena vrstica na plast)."""
+        with self._zaklep:
+            vrstice = [{'tabela': plast, **stevci} for plast, stevci in sorted(self.plasti.items())]
+        return pd.DataFrame(vrstice, columns=['tabela'] + STEVCI)
+
+    def odstranjene(self):
+        """Vrne število odstranjenih geometrij po plasteh (plast -> število), npr. za g2x_manifest."""
+        with self._zaklep:
+            return {plast: stevci['odstranjene'] for plast, stevci in self.plasti.items()}
+
+    def izpisi(self):
+        """Izpiše plasti s popravljenimi ali odstranjenimi geometrijami."""
+        with self._zaklep:
+            plasti = sorted(self.plasti.items())
+        for plast, s in plasti:
+            if any(s[ime] for ime in STEVCI[1:]):
+                print(f"Geometrije {plast}: {s['vrstice']} vrstic, {s['popravljene']} popravljenih, {s['odstranjene']} odstranjenih "
+                      f"(prazne {s['prazne']}, 3D {s['z_koordinate']}, nefinitne {s['nefinitne']}, neveljavne {s['neveljavne']}).")
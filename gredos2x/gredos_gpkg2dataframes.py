@@ -1,18 +1,84 @@
-import pandas as pd
-import sqlalchemy as sa 
-import geopandas as gpd
-import fiona
+import os
 import sqlite3
 
+from gredos2x.gredos_shema import najdi_stolpec, kljuc_kot_niz
+from gredos2x.gredos_preverjanje import GEOMETRIJE
+from gredos2x.gredos_parametri import izracunaj_parametre_odsekov, agregiraj_parametre_vej
+from gredos2x.gredos_kodiranje import IME_TABELE as IME_SLOVARJA_KLJUCEV, SlovarKljucev
+from gredos2x.gredos_meritve import merilnik_izvoza
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+np = leni_modul('numpy')
+pd = leni_modul('pandas')
+gpd = leni_modul('geopandas')
+shapely = leni_modul('shapely')
+fiona = leni_modul('fiona')
+sa = leni_modul('sqlalchemy')
+
+# velikost ovojnice (envelope) v glavi GPKG geometrije glede na kodo v zastavicah
+_GPKG_OVOJNICA = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+
+# atributna tabela geografske plasti (za pridružitev atributov rezultatom prostorskih poizvedb)
+ATRIBUTI_PLASTI = {plast: tabela for tabela, plast in GEOMETRIJE.items()}
+
+
+def geometrije_poizvedbe(poizvedbe, crs=None):
+    """Pretvori poizvedbe prostorskih metod GredosGPKG2df v polje shapely geometrij.
+
+    Args:
+        poizvedbe: shapely geometrija, koordinata (x, y), polje koordinat oblike (n, 2), seznam geometrij ali GeoSeries/GeoDataFrame
+        crs (optional): koordinatni sistem plasti; GeoSeries v drugem koordinatnem sistemu se pretvori vanj. Defaults to None.
+
+    Returns:
+        numpy.ndarray: shapely geometrije (object).
+    """
+    if isinstance(poizvedbe, (gpd.GeoSeries, gpd.GeoDataFrame)):
+        geometrije = poizvedbe.geometry if isinstance(poizvedbe, gpd.GeoDataFrame) else poizvedbe
+        if crs is not None and geometrije.crs is not None and geometrije.crs != crs:
+            geometrije = geometrije.to_crs(crs)
+        return geometrije.to_numpy()
+    if isinstance(poizvedbe, shapely.Geometry):
+        return np.array([poizvedbe], dtype=object)
+    polje = np.asarray(poizvedbe, dtype=object)
+    if polje.ndim == 1 and len(polje) in (2, 3) and all(isinstance(v, (int, float, np.number)) for v in polje):
+        polje = polje.reshape(1, -1)
+    if polje.ndim == 2:
+        return shapely.points(polje.astype(float))
+    return polje
+
+
+def gpkg_blob_v_wkb(blob):
+    """Pretvori GPKG geometrijo (glava GP + WKB) v čisti WKB, ki ga razume shapely.from_wkb.
+
+    Args:
+        blob (bytes): geometrija, kot je shranjena v GPKG tabeli
+
+    Returns:
+        bytes or None: WKB zapis geometrije ali None za prazno vrednost.
+    """
+    if blob is None:
+        return None
+    ovojnica = (blob[3] >> 1) & 0x07
+    return bytes(blob[8 + _GPKG_OVOJNICA[ovojnica]:])
+
+
 class GredosGPKG2df(): 
-    def __init__(self, povezava_gpkg='base.gpkg', pregled_vsebine=False):
+    def __init__(self, povezava_gpkg='base.gpkg', pregled_vsebine=False, merilnik=None, imenik_profilov=None):
         """
         Args:
             povezava_gpkg (str, optional): Pot do GPKG datoteke. Defaults to 'base.gpkg'.
             pregled_vsebine (bool, optional): Če je True, se izpišejo glave tabel za razhroščevanje. Defaults to False.
+            merilnik (gredos_meritve.Merilnik, optional): merilnik, ki dobi dogodke branja tabel. Defaults to None.
+            imenik_profilov (str, optional): profiliraj branje tabel (cProfile, tracemalloc) in profile zapiši v ta imenik. Profiliranje
+                ostane vklopljeno do klica self.merilnik.izklopi_profiliranje(). Defaults to None (brez profiliranja).
         """
         self.gpkg_povezava = povezava_gpkg
         self.debug = pregled_vsebine
+        self.merilnik = merilnik_izvoza(merilnik, 'GredosGPKG2df')
+        # plast -> (stanje datoteke, GeoDataFrame, STRtree, položaji atributnih vrstic), glej prostorski_indeks
+        self._prostorski_indeksi = {}
+        if imenik_profilov is not None:
+            self.merilnik.vklopi_profiliranje(imenik_profilov)
         
     def list_gpkg_tables(self):
         """ Preglej vse tabele, ki so shranjene v GPKG datoteki. 
@@ -38,11 +104,13 @@ class GredosGPKG2df():
             # Read the table into a DataFrame
             table_name = "your_table"
             query = f"SELECT * FROM {ime_tabele}"
-            df = pd.read_sql_query(query, conn)
+            with self.merilnik.faza('branje', tabela=ime_tabele) as meritev:
+                df = pd.read_sql_query(query, conn)
+                meritev.dodaj(df)
             
             if self.debug: 
-                print('\n\n{ime_tabele}')
-                print(df.head)
+                print(f'\n\n{ime_tabele}')
+                print(df.head())
 
             # Close the database connection
             conn.close()
@@ -68,14 +136,18 @@ class GredosGPKG2df():
         Args:
             layer_name (str): ime plasti za uvoz
             epsg_set (str, optional): EPSG koda koordinatnega sistema, ki je vsebovana v GPKG datoteki. Defaults to 'EPSG:3912'.
+                Če je None, se uporabi koordinatni sistem zapisan v GPKG datoteki.
         Returns:
             geopandas.GeoDataFrame: Geodataframe s predpisanim koordinatnim sistemom.
         """
                   
         try:
             # Read each layer into a GeoDataFrame
-            layer_gdf = gpd.read_file(self.gpkg_povezava , layer=layer_name)
-            layer_gdf.set_crs(epsg_set, inplace=True)
+            with self.merilnik.faza('branje', tabela=layer_name) as meritev:
+                layer_gdf = gpd.read_file(self.gpkg_povezava , layer=layer_name)
+                meritev.dodaj(layer_gdf)
+            if epsg_set is not None:
+                layer_gdf.set_crs(epsg_set, inplace=True)
             if self.debug: 
                 print(f"Layer Name: {layer_name}")
                 print(layer_gdf.head())
@@ -87,3 +159,201 @@ class GredosGPKG2df():
         
         return layer_gdf
         
+
+    def tabela_obstaja(self, ime_tabele:str):
+        """Preveri ali je tabela (geografska ali negeografska) shranjena v GPKG datoteki.
+
+        Args:
+            ime_tabele (str): ime tabele
+
+        Returns:
+            bool: True, če tabela obstaja.
+        """
+        with sqlite3.connect(self.gpkg_povezava) as conn:
+            vrstica = conn.execute("select 1 from sqlite_master where type='table' and name=?", (ime_tabele,)).fetchone()
+        return vrstica is not None
+
+    def prostorski_indeks(self, plast, epsg_set='EPSG:3912', osvezi=False):
+        """Vrne geografsko plast in njen prostorski indeks (shapely.STRtree). Indeks se zgradi ob prvem klicu in se hrani, dokler se
+        GPKG datoteka ne spremeni, zato so nadaljnje poizvedbe le poizvedbe po drevesu.
+
+        Args:
+            plast (str): ime geografske plasti, npr. 'POINT_geo'
+            epsg_set (str, optional): koordinatni sistem plasti (glej preberi_geografsko_tabelo_iz_gpkg). Defaults to 'EPSG:3912'.
+            osvezi (bool, optional): ponovno preberi plast in zgradi indeks. Defaults to False.
+
+        Returns:
+            tuple: (geopandas.GeoDataFrame, shapely.STRtree)
+        """
+        stanje = os.stat(self.gpkg_povezava)
+        stanje = (stanje.st_mtime_ns, stanje.st_size, epsg_set)
+        shranjen = self._prostorski_indeksi.get(plast)
+        if osvezi or shranjen is None or shranjen[0] != stanje:
+            gdf = self.preberi_geografsko_tabelo_iz_gpkg(plast, epsg_set=epsg_set)
+            with self.merilnik.faza('prostorski_indeks', tabela=plast) as meritev:
+                drevo = shapely.STRtree(gdf.geometry.to_numpy())
+                meritev.dodaj(gdf)
+            shranjen = (stanje, gdf, drevo, None)
+            self._prostorski_indeksi[plast] = shranjen
+        return shranjen[1], shranjen[2]
+
+    def _stolpci_poizvedb(self, plast, atributi=True, stolpci=None):
+        """Stolpci plasti in (po želji) atributne tabele plasti (glej ATRIBUTI_PLASTI), poravnani z vrsticami plasti, kot numpy polja.
+        Pripravijo se ob prvem klicu, tako da poizvedba le izbere vrstice iz polj."""
+        shranjen = self._prostorski_indeksi[plast]
+        polja = shranjen[3] or {}
+        if atributi not in polja:
+            gdf = shranjen[1]
+            stolpci_plasti = {ime: gdf[ime].to_numpy() for ime in gdf.columns}
+            stolpci_atributov = {}
+            tabela = ATRIBUTI_PLASTI.get(plast)
+            if atributi and tabela is not None and self.tabela_obstaja(tabela):
+                podatki = self.nalozi_negeografsko_tabelo(tabela)
+                kljuci = kljuc_kot_niz(podatki[najdi_stolpec(podatki, tabela, 'id', stolpci)])
+                kljuci_plasti = kljuc_kot_niz(gdf[najdi_stolpec(gdf, plast, 'id', stolpci)])
+                # ob podvojenih ključih se pridruži prva vrstica, vrstica plasti brez atributov dobi prazno vrstico
+                prvi = ~kljuci.duplicated().to_numpy()
+                indeks = pd.Index(kljuci[prvi]).get_indexer(kljuci_plasti)
+                polozaji = np.where(indeks >= 0, np.flatnonzero(prvi)[indeks], len(podatki))
+                podatki = podatki.reset_index(drop=True).reindex(range(len(podatki) + 1))
+                stolpci_atributov = {ime: podatki[ime].to_numpy()[polozaji] for ime in podatki.columns if ime not in gdf.columns}
+            polja[atributi] = (stolpci_plasti, stolpci_atributov)
+            self._prostorski_indeksi[plast] = shranjen[:3] + (polja,)
+        return polja[atributi]
+
+    def _rezultat_poizvedbe(self, plast, gdf, poizvedba, vrstice, razdalje=None, atributi=True, stolpci=None):
+        """Vrstice plasti, ki jih je vrnila poizvedba, s številko poizvedbe, razdaljo in (po želji) pridruženimi atributi."""
+        stolpci_plasti, stolpci_atributov = self._stolpci_poizvedb(plast, atributi, stolpci)
+        podatki = {'poizvedba': poizvedba}
+        podatki.update((ime, polje[vrstice]) for ime, polje in stolpci_plasti.items())
+        if razdalje is not None:
+            podatki['razdalja'] = razdalje
+        podatki.update((ime, polje[vrstice]) for ime, polje in stolpci_atributov.items())
+        return gpd.GeoDataFrame(podatki, geometry=gdf.geometry.name, crs=gdf.crs)
+
+    def najblizji(self, plast, poizvedbe, max_razdalja=None, atributi=True, epsg_set='EPSG:3912', stolpci=None):
+        """Najbližji element plasti za vsako poizvedbo (npr. najbližje vozlišče koordinati). Poizvedbe se izvedejo hkrati.
+
+        Args:
+            plast (str): ime geografske plasti, npr. 'POINT_geo'
+            poizvedbe: koordinata (x, y), polje koordinat (n, 2), shapely geometrija, seznam geometrij ali GeoSeries
+            max_razdalja (float, optional): išči le do te razdalje. Defaults to None (brez omejitve).
+            atributi (bool, optional): pridruži atribute iz atributne tabele plasti (Node, Branch, LNode). Defaults to True.
+            epsg_set (str, optional): koordinatni sistem plasti. Defaults to 'EPSG:3912'.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+        Returns:
+            geopandas.GeoDataFrame: poizvedba (zaporedna številka poizvedbe), stolpci plasti, razdalja in atributi. Ob enako
+                oddaljenih elementih ima poizvedba več vrstic, poizvedbe brez elementa do max_razdalja pa nobene.
+        """
+        gdf, drevo = self.prostorski_indeks(plast, epsg_set)
+        geometrije = geometrije_poizvedbe(poizvedbe, gdf.crs)
+        (poizvedba, vrstice), razdalje = drevo.query_nearest(geometrije, max_distance=max_razdalja, return_distance=True)
+        return self._rezultat_poizvedbe(plast, gdf, poizvedba, vrstice, razdalje, atributi, stolpci)
+
+    def v_obmocju(self, plast, obmocja, predikat='intersects', atributi=True, epsg_set='EPSG:3912', stolpci=None):
+        """Elementi plasti, ki so v prostorski relaciji z območji (npr. vse linije, ki sekajo poligon).
+
+        Args:
+            plast (str): ime geografske plasti, npr. 'LINE_geo'
+            obmocja: shapely geometrija, seznam geometrij ali GeoSeries
+            predikat (str, optional): relacija med območjem in elementom (glej shapely.STRtree.query), npr. 'intersects',
+                'contains', 'crosses'. Defaults to 'intersects'.
+            atributi (bool, optional): pridruži atribute iz atributne tabele plasti. Defaults to True.
+            epsg_set (str, optional): koordinatni sistem plasti. Defaults to 'EPSG:3912'.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+        Returns:
+            geopandas.GeoDataFrame: poizvedba (zaporedna številka območja), stolpci plasti in atributi.
+        """
+        gdf, drevo = self.prostorski_indeks(plast, epsg_set)
+        poizvedba, vrstice = drevo.query(geometrije_poizvedbe(obmocja, gdf.crs), predicate=predikat)
+        return self._rezultat_poizvedbe(plast, gdf, poizvedba, vrstice, atributi=atributi, stolpci=stolpci)
+
+    def v_radiju(self, plast, poizvedbe, radij, atributi=True, epsg_set='EPSG:3912', stolpci=None):
+        """Elementi plasti, ki so od poizvedb oddaljeni največ radij (npr. vse točke LNODE_geo v radiju 500 m).
+
+        Args:
+            plast (str): ime geografske plasti, npr. 'LNODE_geo'
+            poizvedbe: koordinata (x, y), polje koordinat (n, 2), shapely geometrija, seznam geometrij ali GeoSeries
+            radij (float): največja razdalja v enotah koordinatnega sistema
+            atributi (bool, optional): pridruži atribute iz atributne tabele plasti. Defaults to True.
+            epsg_set (str, optional): koordinatni sistem plasti. Defaults to 'EPSG:3912'.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+        Returns:
+            geopandas.GeoDataFrame: poizvedba (zaporedna številka poizvedbe), stolpci plasti, razdalja in atributi.
+        """
+        gdf, drevo = self.prostorski_indeks(plast, epsg_set)
+        geometrije = geometrije_poizvedbe(poizvedbe, gdf.crs)
+        poizvedba, vrstice = drevo.query(geometrije, predicate='dwithin', distance=radij)
+        razdalje = shapely.distance(geometrije[poizvedba], drevo.geometries[vrstice])
+        return self._rezultat_poizvedbe(plast, gdf, poizvedba, vrstice, razdalje, atributi, stolpci)
+
+    def nalozi_parametre_vej(self, osvezi=False, stolpci=None, faktor_dolzine=0.001):
+        """Vrne električne parametre vej (R, X, B, Imax), izračunane iz tabel Section in MATERIAL. Rezultat se ob prvem klicu zapiše
+        v GPKG datoteko kot tabeli 'Section_parametri' in 'Branch_parametri' (z indeksi), naslednji klici pa ju le preberejo.
+
+        Args:
+            osvezi (bool, optional): Ponovno izračunaj in prepiši shranjene parametre. Defaults to False.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+            faktor_dolzine (float, optional): pretvorba dolžine odseka v km. Defaults to 0.001 (dolžina v m).
+
+        Returns:
+            pandas.DataFrame: parametri vej (en zapis na vejo).
+        """
+        if not osvezi and self.tabela_obstaja('Branch_parametri'):
+            return self.nalozi_negeografsko_tabelo('Branch_parametri')
+
+        section = self.nalozi_negeografsko_tabelo('Section')
+        material = self.nalozi_negeografsko_tabelo('MATERIAL')
+        with self.merilnik.faza('parametri_vej') as meritev:
+            odseki = izracunaj_parametre_odsekov(section, material, stolpci=stolpci, faktor_dolzine=faktor_dolzine)
+            kljuc = odseki.columns[0]
+            veje = agregiraj_parametre_vej(odseki, kljuc=kljuc)
+            meritev.dodaj(veje)
+
+        if self.debug:
+            print(f"Izračunani parametri {len(odseki)} odsekov in {len(veje)} vej, "
+                  f"{int(odseki['R_ohm'].isna().sum())} odsekov brez ustreznega materiala.")
+
+        with sqlite3.connect(self.gpkg_povezava) as conn:
+            odseki.to_sql('Section_parametri', conn, if_exists='replace', index=False)
+            veje.to_sql('Branch_parametri', conn, if_exists='replace', index=False)
+            conn.execute(f'create index if not exists section_parametri_index on Section_parametri("{kljuc}")')
+            conn.execute(f'create index if not exists branch_parametri_index on Branch_parametri("{kljuc}")')
+
+        return veje
+
+    def nalozi_kodiran_model(self, tabele=None, stolpci=None, osvezi=False):
+        """Naloži negeografske tabele modela s stolpci ključev, zapisanimi kot int32 kode (glej gredos_kodiranje.SlovarKljucev).
+        Slovar ključev se ob prvem klicu zapiše v GPKG datoteko kot tabela 'g2x_slovar_kljucev', naslednji klici ga preberejo (in
+        dopolnijo z novimi ključi), zato so kode ob vsakem nalaganju enake.
+
+        Args:
+            tabele (list, optional): imena tabel. Defaults to None (LNode, Node, Branch, Section, Transformer, Switching_device, MATERIAL).
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+            osvezi (bool, optional): Zgradi nov slovar in prepiši shranjenega. Defaults to False.
+
+        Returns:
+            tuple: (dict ime tabele -> pandas.DataFrame s kodami, SlovarKljucev)
+        """
+        if tabele is None:
+            tabele = ['LNode', 'Node', 'Branch', 'Section', 'Transformer', 'Switching_device', 'MATERIAL']
+        podatki = {ime: self.nalozi_negeografsko_tabelo(ime) for ime in tabele if self.tabela_obstaja(ime)}
+
+        if not osvezi and self.tabela_obstaja(IME_SLOVARJA_KLJUCEV):
+            slovar = SlovarKljucev.iz_tabele(self.nalozi_negeografsko_tabelo(IME_SLOVARJA_KLJUCEV))
+        else:
+            slovar = SlovarKljucev()
+        velikost = None if osvezi or not len(slovar) else len(slovar)
+        kodirane = slovar.kodiraj_tabele(podatki, stolpci)
+
+        if len(slovar) != velikost:
+            with sqlite3.connect(self.gpkg_povezava) as conn:
+                slovar.v_tabelo().to_sql(IME_SLOVARJA_KLJUCEV, conn, if_exists='replace', index=False)
+                conn.execute(f'create index if not exists slovar_kljucev_index on {IME_SLOVARJA_KLJUCEV}(domena, koda)')
+
+        if self.debug:
+            print(f"Kodiran model: {', '.join(f'{d} {len(k)}' for d, k in slovar.kljuci.items())} ključev.")
+        return kodirane, slovar
@@ -0,0 +1,222 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Kompakten zapis ključev modela Gredos s slovarjem (dictionary encoding).
+
+Gredos šifre so številke, zapisane kot tekst, in se ponavljajo v več tabelah (NodeId v Node, Branch.Node1/Node2 in POINT_geo,
+BranchId v Branch, Section, Transformer, ...). Slovar ključev vsaki domeni ključev (glej DOMENE) dodeli skupen seznam ključev,
+stolpci s ključi pa se zapišejo kot int32 kode v ta seznam. Stiki in topologija nato delajo s celimi števili, stolpci s ključi pa
+zasedejo 4 bajte na vrstico namesto Python niza.
+
+Slovar se shrani ob podatkih kot tabela g2x_slovar_kljucev (domena, koda, kljuc), tako da so kode ob ponovnem nalaganju enake:
+
+    tabele, slovar = GredosGPKG2df('izvoz.gpkg').nalozi_kodiran_model()
+    Gredos2Parquet(..., kodiraj_kljuce=True).pozeni_uvoz()
+"""
+
+from gredos2x.gredos_shema import najdi_stolpec, kljuc_kot_niz
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+np = leni_modul('numpy')
+pd = leni_modul('pandas')
+
+IME_TABELE = 'g2x_slovar_kljucev'
+
+# domene ključev: seznam (tabela, vloga stolpca); prva tabela je osnovna tabela domene (glej gredos_shema.STOLPCI)
+DOMENE = {
+    'lnode': [('LNode', 'id'), ('Node', 'lnode'), ('LNODE_geo', 'id')],
+    'vozlisce': [('Node', 'id'), ('Branch', 'vozlisce1'), ('Branch', 'vozlisce2'), ('POINT_geo', 'id')],
+    'veja': [('Branch', 'id'), ('Branch', 'izvod'), ('Section', 'veja'), ('Transformer', 'veja'), ('Switching_device', 'veja'),
+             ('LINE_geo', 'id')],
+    'material': [('MATERIAL', 'id'), ('Section', 'material')],
+}
+
+# koda za manjkajoč ključ v numpy poljih (v tabelah je manjkajoč ključ NA)
+BREZ_KLJUCA = -1
+
+
+def stolpci_kljucev(df, tabela, stolpci=None):
+    """Poišče stolpce s ključi v tabeli.
+
+    Args:
+        df (pandas.DataFrame): tabela
+        tabela (str): ime Gredos tabele, npr. 'Branch'
+        stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+    Returns:
+        dict: ime stolpca -> domena ključev.
+    """
+    najdeni = {}
+    for domena, clani in DOMENE.items():
+        for ime_tabele, vloga in clani:
+            ime = najdi_stolpec(df, tabela, vloga, stolpci, obvezen=False) if ime_tabele == tabela else None
+            if ime is not None:
+                najdeni[ime] = domena
+    return najdeni
+
+
+class SlovarKljucev:
+    """
+        Slovar ključev po domenah (glej DOMENE). Koda ključa je njegov položaj v seznamu ključev domene; obstoječe kode se ob dodajanju
+        novih ključev ne spreminjajo.
+
+        Args:
+            kljuci (dict, optional): domena -> seznam ključev (npr. prebran iz tabele g2x_slovar_kljucev). Defaults to None.
+    """
+    def __init__(self, kljuci=None):
+        self.kljuci = {domena: pd.Index(seznam, dtype=object) for domena, seznam in (kljuci or {}).items()}
+
+    def __len__(self):
+        return sum(len(kljuci) for kljuci in self.kljuci.values())
+
+    def dodaj(self, domena, kljuci):
+        """Doda nove ključe domeni (urejene, za obstoječimi ključi).
+
+        Args:
+            domena (str): domena ključev, npr. 'vozlisce'
+            kljuci (pandas.Series or list): ključi (kot tekst, glej gredos_shema.kljuc_kot_niz)
+
+        Returns:
+            int: število dodanih ključev.
+        """
+        obstojeci = self.kljuci.get(domena, pd.Index([], dtype=object))
+        novi = pd.Index(pd.Series(kljuci, dtype='string').dropna().unique().astype(object))
+        if len(obstojeci):
+            novi = novi[~novi.isin(obstojeci)]
+        novi = novi.sort_values()
+        if len(novi) or domena not in self.kljuci:
+            self.kljuci[domena] = obstojeci.append(novi)
+        return len(novi)
+
+    def zgradi(self, tabele, stolpci=None):
+        """Doda ključe vseh stolpcev s ključi iz tabel, najprej ključe osnovnih tabel domen (njihove kode so tako urejene po ključu).
+
+        Args:
+            tabele (dict): ime tabele -> pandas.DataFrame
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+        Returns:
+            SlovarKljucev: self
+        """
+        for domena, clani in DOMENE.items():
+            for tabela, _ in clani:
+                if tabela not in tabele:
+                    continue
+                for ime, domena_stolpca in stolpci_kljucev(tabele[tabela], tabela, stolpci).items():
+                    if domena_stolpca == domena:
+                        self.dodaj(domena, kljuc_kot_niz(tabele[tabela][ime]))
+        return self
+
+    def kodiraj(self, domena, stolpec, dodaj=True):
+        """Pretvori ključe v kode.
+
+        Args:
+            domena (str): domena ključev
+            stolpec (pandas.Series): ključi
+            dodaj (bool, optional): neznane ključe doda v slovar; sicer dobijo kodo BREZ_KLJUCA. Defaults to True.
+
+        Returns:
+            numpy.ndarray: kode (int32), BREZ_KLJUCA za manjkajoče ključe.
+        """
+        kljuci = kljuc_kot_niz(pd.Series(stolpec))
+        vrednosti = kljuci.astype(object).to_numpy()
+        manjkajoci = kljuci.isna().to_numpy()
+        kode = self.kljuci.get(domena, pd.Index([], dtype=object)).get_indexer(vrednosti)
+        neznani = (kode < 0) & ~manjkajoci
+        if dodaj and neznani.any():
+            self.dodaj(domena, kljuci[neznani])
+            kode[neznani] = self.kljuci[domena].get_indexer(vrednosti[neznani])
+        kode[manjkajoci] = BREZ_KLJUCA
+        return kode.astype(np.int32)
+
+    def odkodiraj(self, domena, kode):
+        """Pretvori kode nazaj v ključe.
+
+        Args:
+            domena (str): domena ključev
+            kode (array-like): kode (BREZ_KLJUCA ali NA za manjkajoče ključe)
+
+        Returns:
+            pandas.Series: ključi (pandas 'string' tip).
+        """
+        kode = pd.Series(kode).astype('Int64').fillna(BREZ_KLJUCA).to_numpy(dtype=np.int64)
+        kljuci = self.kljuci[domena].to_numpy()
+        veljavne = kode >= 0
+        izhod = np.full(len(kode), None, dtype=object)
+        izhod[veljavne] = kljuci[kode[veljavne]]
+        return pd.Series(izhod, dtype='string')
+
+    def kodiraj_tabelo(self, df, tabela, stolpci=None):
+        """Vrne kopijo tabele, v kateri so stolpci s ključi zamenjani s kodami (pandas 'Int32', NA za manjkajoče ključe).
+
+        Args:
+            df (pandas.DataFrame or geopandas.GeoDataFrame): tabela
+            tabela (str): ime Gredos tabele
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+        Returns:
+            pandas.DataFrame: tabela s kodami.
+        """
+        df = df.copy()
+        for ime, domena in stolpci_kljucev(df, tabela, stolpci).items():
+            kode = self.kodiraj(domena, df[ime])
+            df[ime] = pd.arrays.IntegerArray(kode, kode == BREZ_KLJUCA)
+        return df
+
+    def kodiraj_tabele(self, tabele, stolpci=None):
+        """Kodira več tabel hkrati (glej kodiraj_tabelo). Osnovne tabele domen se kodirajo najprej, zato so kode njihovih ključev
+        urejene po ključu in pri novem slovarju enake položaju vrstice v tabeli, urejeni po ključu.
+
+        Args:
+            tabele (dict): ime tabele -> pandas.DataFrame
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+        Returns:
+            dict: ime tabele -> pandas.DataFrame s kodami (v vrstnem redu vhoda).
+        """
+        osnovne = [clani[0][0] for clani in DOMENE.values()]
+        vrstni_red = [ime for ime in osnovne if ime in tabele] + [ime for ime in tabele if ime not in osnovne]
+        kodirane = {ime: self.kodiraj_tabelo(tabele[ime], ime, stolpci) for ime in vrstni_red}
+        return {ime: kodirane[ime] for ime in tabele}
+
+    def odkodiraj_tabelo(self, df, tabela, stolpci=None):
+        """Vrne kopijo tabele s kodami, v kateri so kode zamenjane nazaj s ključi (obratno kot kodiraj_tabelo)."""
+        df = df.copy()
+        for ime, domena in stolpci_kljucev(df, tabela, stolpci).items():
+            df[ime] = self.odkodiraj(domena, df[ime]).array
+        return df
+
+    def v_tabelo(self):
+        """Vrne slovar kot tabelo g2x_slovar_kljucev (domena, koda, kljuc)."""
+        deli = [pd.DataFrame({'domena': domena, 'koda': np.arange(len(kljuci), dtype=np.int32), 'kljuc': kljuci.to_numpy()})
+                for domena, kljuci in self.kljuci.items()]
+        if not deli:
+            return pd.DataFrame({'domena': pd.Series(dtype=object), 'koda': pd.Series(dtype=np.int32), 'kljuc': pd.Series(dtype=object)})
+        return pd.concat(deli, ignore_index=True)
+
+    @classmethod
+    def iz_tabele(cls, tabela):
+        """Sestavi slovar iz tabele g2x_slovar_kljucev.
+
+        Args:
+            tabela (pandas.DataFrame): tabela s stolpci domena, koda, kljuc
+
+        Returns:
+            SlovarKljucev: slovar.
+        """
+        tabela = tabela.sort_values(['domena', 'koda'], kind='stable')
+        return cls({domena: kljuc_kot_niz(skupina['kljuc']).astype(object).tolist() for domena, skupina in tabela.groupby('domena', sort=False)})
@@ -0,0 +1,205 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Število vrstic in kontrolne vsote tabel in geografskih plasti, izračunane sproti med zapisom (brez ponovnega branja izhoda).
+
+Izvozi (Gredos2GPKG, Gredos2PGSQL, Gredos2MSSQL, Gredos2Parquet) vsak zapisan del tabele prištejejo v KontrolneVsote, ob koncu
+pozeni_uvoz pa v izhod (GPKG, shemo baze oziroma parquet imenik) zapišejo tabelo g2x_manifest s stolpci tabela, vrstice,
+odstranjene (vrstice vira, ki jih je namenoma odstranilo popravilo geometrij), kontrolna_vsota in stolpci. Kontrolna vsota je vsota
+(mod 2^64) zgoščenih vrednosti vrstic, zato ni odvisna od vrstnega reda vrstic, delov ali stolpcev. Pred zgoščevanjem se vrednosti
+normalizirajo (števila v float64, vse manjkajoče vrednosti v eno vrednost, geometrije v WKB), zato tip stolpca posameznega dela
+(npr. int64 ali float64, če del vsebuje NULL) ne vpliva na vsoto. Enak model, izvožen v različne formate, ima enake kontrolne vsote.
+
+Preverjanje izvoza je tako le primerjava metapodatkov:
+    izvoz.pozeni_uvoz()
+    print(preveri_kontrolne_vsote(izvoz))   # vrstice v viru (mdb, shp) proti vrsticam v g2x_manifest
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import gredos2x
+from gredos2x.gredos_ozadje import prestej_vrstice_izvoza
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+np = leni_modul('numpy')
+pd = leni_modul('pandas')
+
+IME_TABELE = 'g2x_manifest'
+
+_FNV_PRAFAKTOR = 1099511628211
+_FNV_ZACETEK = 14695981039346656037
+
+
+def _zgosti_ime(ime):
+    return int.from_bytes(hashlib.sha256(str(ime).encode('utf-8')).digest()[:8], 'little')
+
+
+# zgoščena vrednost manjkajoče vrednosti (NULL, NaN, None, pd.NA) ne glede na tip stolpca
+_ZGOSCEN_NA = 0x9E3779B97F4A7C15
+
+# vrste vrednosti (pandas.api.types.infer_dtype), ki se zgostijo kot float64
+_STEVILSKE_VRSTE = {'integer', 'floating', 'mixed-integer-float', 'boolean', 'decimal'}
+
+
+def normaliziraj_stolpec(stolpec):
+    """Stolpec v obliki za zgoščevanje, neodvisni od tipa, ki ga je stolpec dobil pri branju posameznega dela ali formata: števila
+    (int, float, bool, tudi v object stolpcih) kot float64, besedila kot object, geometrije kot WKB.
+
+    Stolpec s praznimi vrednostmi je v delu, kjer se pojavijo, float (ali object), v ostalih delih pa int; z normalizacijo je
+    kontrolna vsota enaka pri branju po delih in naenkrat ter v vseh formatih izvoza.
+
+    Args:
+        stolpec (pandas.Series or geopandas.GeoSeries): stolpec tabele
+
+    Returns:
+        tuple: (pandas.Series za zgoščevanje, numpy.ndarray maska manjkajočih vrednosti).
+    """
+    if stolpec.dtype.name == 'geometry':
+        manjkajoce = stolpec.isna().to_numpy() | stolpec.is_empty.to_numpy()
+        return stolpec.to_wkb(), manjkajoce
+    manjkajoce = stolpec.isna().to_numpy()
+    if pd.api.types.is_numeric_dtype(stolpec.dtype) or pd.api.types.infer_dtype(stolpec, skipna=True) in _STEVILSKE_VRSTE:
+        vrednosti = pd.to_numeric(stolpec, errors='coerce').astype('float64').to_numpy(na_value=np.nan)
+        # -0.0 in 0.0 se zgostita enako
+        return pd.Series(vrednosti + 0.0, copy=False), manjkajoce
+    return stolpec.astype(object).where(~manjkajoce, None), manjkajoce
+
+
+def zgosti_vrstice(df, izpusti=()):
+    """Zgoščena vrednost (uint64) vsake vrstice. Stolpci se upoštevajo po abecednem vrstnem redu imen, vrednosti v normalizirani
+    obliki (glej normaliziraj_stolpec), manjkajoče vrednosti pa z enako zgoščeno vrednostjo ne glede na tip stolpca.
+
+    Args:
+        df (pandas.DataFrame or geopandas.GeoDataFrame): tabela
+        izpusti (tuple, optional): imena stolpcev, ki se ne upoštevajo (npr. pomožni stolpec geom_wkb). Defaults to ().
+
+    Returns:
+        numpy.ndarray: zgoščene vrednosti vrstic (uint64).
+    """
+    zgoscene = np.full(len(df), _FNV_ZACETEK, dtype=np.uint64)
+    prafaktor = np.uint64(_FNV_PRAFAKTOR)
+    for ime in sorted((ime for ime in df.columns if ime not in izpusti), key=str):
+        stolpec, manjkajoce = normaliziraj_stolpec(df[ime])
+        prispevek = pd.util.hash_pandas_object(stolpec, index=False).to_numpy(np.uint64)
+        prispevek[manjkajoce] = np.uint64(_ZGOSCEN_NA)
+        zgoscene ^= np.uint64(_zgosti_ime(ime))
+        zgoscene ^= prispevek
+        zgoscene *= prafaktor
+    return zgoscene
+
+
+class KontrolneVsote:
+    """
+        Sproti zbira število vrstic in kontrolne vsote zapisanih tabel (glej zgosti_vrstice).
+    """
+    def __init__(self):
+        self.tabele = {}
+        self._zaklep = threading.Lock()
+
+    def pocisti(self):
+        """Pobriše zbrane vsote (npr. ob začetku novega izvoza)."""
+        with self._zaklep:
+            self.tabele = {}
+
+    def dodaj(self, ime, df, zamenjaj=False, izpusti=()):
+        """Prišteje zapisan del tabele.
+
+        Args:
+            ime (str): ime tabele oz. plasti
+            df (pandas.DataFrame or geopandas.GeoDataFrame): zapisan del
+            zamenjaj (bool, optional): del zamenja tabelo (prvi del oziroma if_exists='replace'). Defaults to False.
+            izpusti (tuple, optional): stolpci, ki se ne upoštevajo. Defaults to ().
+        """
+        if ime == IME_TABELE:
+            return
+        vsota = int(zgosti_vrstice(df, izpusti).sum(dtype=np.uint64))
+        stolpci = sorted((str(s) for s in df.columns if s not in izpusti))
+        with self._zaklep:
+            tabela = self.tabele.get(ime)
+            if zamenjaj or tabela is None:
+                tabela = self.tabele[ime] = {'vrstice': 0, 'vsota': 0, 'stolpci': stolpci}
+            tabela['vrstice'] += len(df)
+            tabela['vsota'] = (tabela['vsota'] + vsota) % 2**64
+
+    def v_tabelo(self, odstranjene=None):
+        """Vrne tabelo g2x_manifest (tabela, vrstice, odstranjene, kontrolna_vsota kot 16 hex znakov, stolpci, ustvarjeno, gredos2x).
+
+        Args:
+            odstranjene (dict, optional): število vrstic vira, ki jih je popravilo geometrij namenoma odstranilo, po tabelah
+                (glej PorociloGeometrij.odstranjene). Defaults to None.
+        """
+        odstranjene = odstranjene or {}
+        ustvarjeno = datetime.now().isoformat(timespec='seconds')
+        with self._zaklep:
+            vrstice = [{'tabela': ime, 'vrstice': t['vrstice'], 'odstranjene': int(odstranjene.get(ime, 0)),
+                        'kontrolna_vsota': f"{t['vsota']:016x}", 'stolpci': ','.join(t['stolpci']),
+                        'ustvarjeno': ustvarjeno, 'gredos2x': gredos2x.__version__} for ime, t in sorted(self.tabele.items())]
+        return pd.DataFrame(vrstice, columns=['tabela', 'vrstice', 'odstranjene', 'kontrolna_vsota', 'stolpci', 'ustvarjeno', 'gredos2x'])
+
+
+def preberi_kontrolne_vsote(izvoz):
+    """Prebere tabelo g2x_manifest iz izhoda izvoza (brez branja ostalih tabel).
+
+    Args:
+        izvoz: razred izvoza (Gredos2GPKG, Gredos2PGSQL, Gredos2MSSQL ali Gredos2Parquet)
+
+    Returns:
+        pandas.DataFrame: tabela g2x_manifest.
+    """
+    if hasattr(izvoz, 'imenik_parquet'):
+        from gredos2x.gredos2parquet import STOLPCI_PARTICIJ
+        # pri particiji 'datum' le manifest datuma modela izvoza
+        filtri = [(STOLPCI_PARTICIJ['datum'], '=', izvoz.datum_modela)] if 'datum' in izvoz.particije else None
+        return pd.read_parquet(os.path.join(izvoz.imenik_parquet, IME_TABELE), filters=filtri)
+    if hasattr(izvoz, 'gpkg_path'):
+        with sqlite3.connect(izvoz.gpkg_path) as povezava:
+            return pd.read_sql_query(f'SELECT * FROM "{IME_TABELE}"', povezava)
+    if hasattr(izvoz, 'mssql_engine'):
+        return pd.read_sql_table(f'{izvoz.table_prefix}{IME_TABELE}', izvoz.mssql_engine, schema=izvoz.ime_sheme)
+    return pd.read_sql_table(IME_TABELE, izvoz.pgsql_engine, schema=izvoz.ime_sheme)
+
+
+def preveri_kontrolne_vsote(izvoz, manifest=None):
+    """Primerja število vrstic v viru (mdb tabele in shp plasti, preštete brez branja podatkov) s števili v g2x_manifest izhoda.
+    Vrstice, ki jih je popravilo geometrij namenoma odstranilo (stolpec odstranjene), se od števila vrstic vira odštejejo.
+
+    Args:
+        izvoz: razred izvoza
+        manifest (pandas.DataFrame, optional): tabela g2x_manifest. Defaults to None (prebere se iz izhoda).
+
+    Returns:
+        pandas.DataFrame: tabela, vrstice_vira, odstranjene, vrstice, kontrolna_vsota, ujemanje (None, če števila vrstic v viru ni
+        mogoče ugotoviti).
+    """
+    if manifest is None:
+        manifest = preberi_kontrolne_vsote(izvoz)
+    vir = prestej_vrstice_izvoza(izvoz)
+    izhod = manifest.drop_duplicates('tabela', keep='last').set_index('tabela')
+    vrstice = []
+    for tabela, vrstice_vira in vir.items():
+        v_izhodu = tabela in izhod.index
+        st_vrstic = int(izhod.at[tabela, 'vrstice']) if v_izhodu else None
+        # manifesti starejših različic nimajo stolpca odstranjene
+        odstranjene = int(izhod.at[tabela, 'odstranjene']) if v_izhodu and 'odstranjene' in izhod.columns else 0
+        vrstice.append({'tabela': tabela, 'vrstice_vira': vrstice_vira, 'odstranjene': odstranjene, 'vrstice': st_vrstic,
+                        'kontrolna_vsota': izhod.at[tabela, 'kontrolna_vsota'] if v_izhodu else None,
+                        'ujemanje': None if vrstice_vira is None else vrstice_vira - odstranjene == st_vrstic})
+    return pd.DataFrame(vrstice)
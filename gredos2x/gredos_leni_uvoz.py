@@ -0,0 +1,72 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Leni uvoz težkih odvisnosti (pandas, geopandas, shapely, fiona, pyproj, sqlalchemy, numpy).
+
+Moduli paketa namesto import pandas as pd uporabijo pd = leni_modul('pandas'), tako da se odvisnost uvozi šele ob prvi uporabi
+(npr. pd.read_sql_query). Uvoz modulov gredos2x in zagon ukazov (gredos2x-pretvorba --help) je tako hiter, kratka opravila
+(npr. seznam plasti ali branje ene atributne tabele) pa naložijo le odvisnosti, ki jih dejansko potrebujejo.
+
+Čas uvoza preverja benchmarks/cas_uvoza.py.
+"""
+
+import importlib
+import sys
+import types
+
+# odvisnosti, ki jih uporabljajo izvozi (glej uvozi_odvisnosti)
+TEZKE_ODVISNOSTI = ['numpy', 'pandas', 'shapely', 'pyproj', 'fiona', 'geopandas', 'sqlalchemy']
+
+
+class _LeniModul(types.ModuleType):
+    """Namestnik modula, ki pravi modul uvozi ob prvem dostopu do atributa in nato prevzame njegove atribute."""
+    def __getattr__(self, atribut):
+        # kliče se le za atribute, ki jih namestnik še nima (pred uvozom vsi, po uvozu npr. kasneje uvoženi podmoduli)
+        modul = importlib.import_module(self.__name__)
+        self.__dict__.update(modul.__dict__)
+        return getattr(modul, atribut)
+
+    def __repr__(self):
+        return f"<leni modul '{self.__name__}'>"
+
+
+def leni_modul(ime):
+    """Vrne modul, ki se uvozi ob prvem dostopu do njegovih atributov. Če je modul že uvožen, se vrne kar ta modul.
+
+    Args:
+        ime (str): ime modula, npr. 'geopandas'
+
+    Returns:
+        module: modul ali njegov leni namestnik.
+    """
+    if ime in sys.modules:
+        return sys.modules[ime]
+    return _LeniModul(ime)
+
+
+def uvozi_odvisnosti(imena=None):
+    """Takoj uvozi odvisnosti, npr. pred profiliranjem ali pred zagonom niti, kjer zamik ob prvi uporabi ni zaželen.
+    Manjkajoče odvisnosti se preskočijo.
+
+    Args:
+        imena (list, optional): imena modulov. Defaults to None (TEZKE_ODVISNOSTI).
+    """
+    for ime in imena or TEZKE_ODVISNOSTI:
+        try:
+            importlib.import_module(ime)
+        except ImportError:
+            pass
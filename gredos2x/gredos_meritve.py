@@ -0,0 +1,534 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Merjenje faz izvoza (branje, pretvorba koordinat, zapis, indeksi, komentarji).
+
+Vsaka faza ob koncu objavi dogodek (dict) s trajanjem, številom vrstic, velikostjo podatkov in največjo porabo pomnilnika (RSS) med fazo.
+Dogodki se pošljejo povratnim klicem, v dnevnik (logging, 'gredos2x.meritve') in po želji v datoteko metrik (JSON vrstice), tako da
+grafičnim vmesnikom ni več potrebno prestrezati izpisov v terminal.
+
+Primer:
+    merilnik = Merilnik(povratni_klici=[print], pot_metrik='metrike.jsonl')
+    Gredos2GPKG('model.mdb', 'material.mdb', 'izvoz.gpkg', merilnik=merilnik).pozeni_uvoz()
+    print(merilnik.povzetek())
+
+Poraba pomnilnika se meri iz /proc/self/statm (linux); na drugih platformah je najvecji_rss_mb None. Vzorčenje pomnilnika in ocena
+velikosti tabel (bajti) tečeta le v podrobnem merilniku (privzeto, če merilnik ustvari uporabnik, in med profiliranjem). Merilnik, ki ga
+izvoz ustvari sam (glej merilnik_izvoza), meri le trajanje in vrstice.
+
+Za iskanje ozkih grl je na voljo profiliranje faz (cProfile in tracemalloc), ki se vklopi samo na zahtevo:
+    with merilnik.profiliranje('profili'):
+        izvoz.pozeni_uvoz()
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from gredos2x.gredos_leni_uvoz import leni_modul, uvozi_odvisnosti
+
+pd = leni_modul('pandas')
+shapely = leni_modul('shapely')
+
+
+# faze, ki jih objavljajo izvozi
+FAZE = ['uvoz', 'branje', 'pretvorba_crs', 'zapis', 'indeksi', 'komentar', 'parametri_vej', 'zdruzene_plasti', 'pretok_moci', 'predpomnilnik', 'celovitost', 'prostorski_indeks', 'povezljivost', 'geometrije']
+
+_PROC_STATM = '/proc/self/statm'
+
+# število zadnjih dogodkov, ki jih merilnik hrani v seznamu dogodki; povzetek se vodi sproti za vse dogodke
+NAJVEC_DOGODKOV = 1000
+
+# oznake, ki se pri sprotnem povzetku ne upoštevajo (vrednosti meritev in oznake posameznega dogodka)
+_VREDNOSTI_DOGODKA = {'zacetek', 'trajanje_s', 'vrstice', 'bajti', 'najvecji_rss_mb', 'del', 'napaka', 'profil'}
+
+
+class IzvozPreklican(Exception):
+    """Izvoz je bil preklican (glej gredos_ozadje.IzvozVOzadju.preklici). Sproži se ob začetku naslednje faze."""
+
+
+def _rss():
+    """Trenutni RSS procesa v bajtih ali None, kjer /proc ni na voljo."""
+    try:
+        with open(_PROC_STATM) as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def velikost_v_bajtih(df):
+    """Ocena velikosti tabele v pomnilniku (brez indeksa). Geometrijam se prišteje 16 bajtov na koordinato (GEOS pomnilnik).
+
+    Args:
+        df (pandas.DataFrame or geopandas.GeoDataFrame): tabela
+
+    Returns:
+        int: velikost v bajtih.
+    """
+    bajti = int(df.memory_usage(index=False).sum())
+    if hasattr(df, 'geometry') and hasattr(df, 'crs'):
+        bajti += int(shapely.get_num_coordinates(df.geometry.values).sum()) * 16
+    return bajti
+
+
+class Meritev:
+    """Podatki faze, ki jih med izvajanjem dopolnjuje koda izvoza (glej Merilnik.faza)."""
+    __slots__ = ('faza', 'oznake', 'vrstice', 'bajti', 'najvec_rss', 'zavrzeno', 'podrobno')
+
+    def __init__(self, faza, oznake, podrobno=True):
+        self.faza = faza
+        self.oznake = oznake
+        self.vrstice = 0
+        self.bajti = 0
+        self.najvec_rss = None
+        self.zavrzeno = False
+        self.podrobno = podrobno
+
+    def dodaj(self, df=None, vrstice=0, bajti=0):
+        """Prišteje vrstice in bajte tabele (ali podane vrednosti) k meritvi. Velikost tabele se oceni le v podrobni meritvi."""
+        if df is not None:
+            vrstice += len(df)
+            if self.podrobno:
+                bajti += velikost_v_bajtih(df)
+        self.vrstice += int(vrstice)
+        self.bajti += int(bajti)
+
+    def zavrzi(self):
+        """Ob koncu faze se dogodek ne objavi (npr. prazen zaključni klic iteratorja)."""
+        self.zavrzeno = True
+
+    def _vzorec(self, rss):
+        if rss is not None and (self.najvec_rss is None or rss > self.najvec_rss):
+            self.najvec_rss = rss
+
+
+# alokacije samega profiliranja se ne izpisujejo
+_IZLOCENE_ALOKACIJE = [tracemalloc.Filter(False, modul.__file__) for modul in (tracemalloc, cProfile, pstats)] + [
+    tracemalloc.Filter(False, __file__)]
+
+
+class Profiliranje:
+    """
+        Profiliranje faz: vsaka faza se izvaja pod cProfile in med začetnim in končnim posnetkom tracemalloc. Za vsako fazo se v imenik
+        zapišeta <st>_<faza>_<tabela>.prof (pstats, npr. za snakeviz) in <st>_<faza>_<tabela>.txt (najdražje funkcije in mesta alokacij).
+
+        Gnezdene faze prekinejo profil nadrejene faze, zato profil faze vsebuje samo njen lastni čas. cProfile teče samo v niti, ki je
+        vklopila profiliranje; faze v drugih nitih dobijo samo posnetke pomnilnika.
+
+        Args:
+            imenik (str): imenik za profile (ustvari se, če ne obstaja)
+            st_mest (int, optional): število izpisanih funkcij in mest alokacij. Defaults to 25.
+    """
+    def __init__(self, imenik, st_mest=25):
+        self.imenik = os.path.abspath(imenik)
+        self.st_mest = st_mest
+        os.makedirs(self.imenik, exist_ok=True)
+        self._nit = threading.get_ident()
+        self._sklad = []
+        self._stevec = 0
+        self._zaklep = threading.Lock()
+        self._ustavi_tracemalloc = False
+
+    def vklopi(self):
+        # leno uvožene odvisnosti se naložijo pred začetkom sledenja, da uvozi niso del profilov in posnetkov pomnilnika
+        uvozi_odvisnosti()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._ustavi_tracemalloc = True
+
+    def izklopi(self):
+        if self._ustavi_tracemalloc:
+            tracemalloc.stop()
+            self._ustavi_tracemalloc = False
+
+    def zacni(self, ime, oznake):
+        """Začne profil faze in vrne stanje za koncaj."""
+        profil = None
+        v_niti = threading.get_ident() == self._nit
+        if v_niti and self._sklad:
+            self._sklad[-1].disable()
+        posnetek = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        if v_niti:
+            profil = cProfile.Profile()
+            try:
+                profil.enable()
+                self._sklad.append(profil)
+            except ValueError:
+                # drugo orodje za profiliranje je že aktivno
+                profil = None
+                if self._sklad:
+                    self._sklad[-1].enable()
+        return profil, posnetek
+
+    def koncaj(self, ime, oznake, stanje, zapisi=True):
+        """Konča profil faze, zapiše datoteke in vrne pot do .prof datoteke (ali .txt, če cProfile ni tekel)."""
+        profil, posnetek = stanje
+        if profil is not None:
+            profil.disable()
+            self._sklad.remove(profil)
+        try:
+            return self._zapisi(ime, oznake, profil, posnetek) if zapisi else None
+        finally:
+            # nadrejena faza nadaljuje s profiliranjem šele po zapisu, da zapis ni del njenega profila
+            if profil is not None and self._sklad:
+                self._sklad[-1].enable()
+
+    def _zapisi(self, ime, oznake, profil, posnetek):
+        with self._zaklep:
+            self._stevec += 1
+            st = self._stevec
+        deli_imena = [ime] + [str(oznake[k]) for k in ('tabela', 'del') if oznake.get(k) is not None]
+        osnova = os.path.join(self.imenik, f'{st:04d}_' + re.sub(r'[^\w.-]+', '_', '_'.join(deli_imena)))
+
+        izpis = io.StringIO()
+        izpis.write(f"Faza: {ime} {oznake}\n\n")
+        if profil is not None:
+            profil.dump_stats(osnova + '.prof')
+            izpis.write('Najdražje funkcije (kumulativni čas):\n')
+            pstats.Stats(profil, stream=izpis).sort_stats('cumulative').print_stats(self.st_mest)
+        if posnetek is not None and tracemalloc.is_tracing():
+            razlike = tracemalloc.take_snapshot().filter_traces(_IZLOCENE_ALOKACIJE).compare_to(
+                posnetek.filter_traces(_IZLOCENE_ALOKACIJE), 'lineno')
+            izpis.write('\nMesta alokacij (razlika med začetkom in koncem faze):\n')
+            for razlika in razlike[:self.st_mest]:
+                izpis.write(f'{razlika}\n')
+        with open(osnova + '.txt', 'w', encoding='utf-8') as f:
+            f.write(izpis.getvalue())
+        return osnova + ('.prof' if profil is not None else '.txt')
+
+class Merilnik:
+    """
+        Zbira meritve faz izvoza in jih objavlja povratnim klicem, dnevniku in datoteki metrik.
+
+        Args:
+            povratni_klici (list, optional): funkcije, ki ob koncu vsake faze dobijo dogodek (dict). Defaults to None.
+            dnevnik (logging.Logger, optional): dnevnik za dogodke (nivo INFO). Defaults to None (logging.getLogger('gredos2x.meritve')).
+            pot_metrik (str, optional): datoteka, v katero se dogodki dodajajo kot JSON vrstice. Defaults to None.
+            oznake (dict, optional): oznake, dodane vsem dogodkom (npr. {'model': 'Ljubljana'}). Defaults to None.
+            hrani_dogodke (bool or int, optional): v seznamu dogodki hrani zadnjih NAJVEC_DOGODKOV (oziroma podano število)
+                dogodkov; False jih ne hrani. Povzetek se ne glede na to vodi sproti za vse dogodke. Defaults to True.
+            interval_pomnilnika (float, optional): interval vzorčenja RSS med fazo v sekundah. Defaults to 0.05.
+            podrobno (bool, optional): med fazo vzorči RSS (v ločeni niti) in oceni velikost tabel; sicer se merita le trajanje in
+                vrstice. Med profiliranjem se faze merijo podrobno ne glede na to. Defaults to True.
+    """
+    def __init__(self, povratni_klici=None, dnevnik=None, pot_metrik=None, oznake=None, hrani_dogodke=True, interval_pomnilnika=0.05,
+                 podrobno=True):
+        self.povratni_klici = list(povratni_klici or [])
+        self.dnevnik = dnevnik if dnevnik is not None else logging.getLogger('gredos2x.meritve')
+        self.pot_metrik = pot_metrik
+        self.oznake = dict(oznake or {})
+        self.hrani_dogodke = hrani_dogodke
+        self.interval_pomnilnika = interval_pomnilnika
+        self.podrobno = podrobno
+        najvec = NAJVEC_DOGODKOV if hrani_dogodke is True else int(hrani_dogodke or 0)
+        self.dogodki = deque(maxlen=najvec)
+        self._skupine = {}
+        self._zaklep = threading.Lock()
+        self._aktivne = []
+        self._vzorcevalnik = None
+        self._profiliranje = None
+        self._preklic = None
+
+    def dodaj_povratni_klic(self, povratni_klic):
+        """Doda funkcijo, ki dobi vsak naslednji dogodek."""
+        self.povratni_klici.append(povratni_klic)
+
+    def z_oznakami(self, **oznake):
+        """Vrne merilnik, ki vsem dogodkom doda oznake in jih objavi prek tega merilnika (npr. izvoz='Gredos2GPKG')."""
+        return _OznaceniMerilnik(self, oznake)
+
+    def vklopi_profiliranje(self, imenik, st_mest=25):
+        """Vklopi profiliranje vseh naslednjih faz (glej Profiliranje)."""
+        self.izklopi_profiliranje()
+        self._profiliranje = Profiliranje(imenik, st_mest)
+        self._profiliranje.vklopi()
+
+    def izklopi_profiliranje(self):
+        """Izklopi profiliranje faz."""
+        if self._profiliranje is not None:
+            self._profiliranje.izklopi()
+            self._profiliranje = None
+
+    def profiliranje(self, imenik=None, st_mest=25):
+        """Kontekst, v katerem so faze profilirane. Brez imenika (None) je kontekst prazen in profiliranje ostane izklopljeno.
+
+        Args:
+            imenik (str, optional): imenik za profile. Defaults to None.
+            st_mest (int, optional): število izpisanih funkcij in mest alokacij. Defaults to 25.
+        """
+        if imenik is None:
+            return nullcontext()
+        return self._profiliranje_v(imenik, st_mest)
+
+    @contextmanager
+    def _profiliranje_v(self, imenik, st_mest):
+        self.vklopi_profiliranje(imenik, st_mest)
+        try:
+            yield self._profiliranje
+        finally:
+            self.izklopi_profiliranje()
+
+    def _vzorci(self):
+        while True:
+            with self._zaklep:
+                if not self._aktivne:
+                    self._vzorcevalnik = None
+                    return
+                aktivne = list(self._aktivne)
+            rss = _rss()
+            for meritev in aktivne:
+                meritev._vzorec(rss)
+            time.sleep(self.interval_pomnilnika)
+
+    def _zacni(self, meritev):
+        meritev._vzorec(_rss())
+        if meritev.najvec_rss is None:
+            return
+        with self._zaklep:
+            self._aktivne.append(meritev)
+            if self._vzorcevalnik is None:
+                self._vzorcevalnik = threading.Thread(target=self._vzorci, name='gredos2x-meritve', daemon=True)
+                self._vzorcevalnik.start()
+
+    def _koncaj(self, meritev):
+        with self._zaklep:
+            if meritev in self._aktivne:
+                self._aktivne.remove(meritev)
+        meritev._vzorec(_rss())
+
+    @contextmanager
+    def faza(self, ime, **oznake):
+        """Izmeri fazo. Koda v bloku dopolni vrnjeno meritev (meritev.dodaj(df)), ob izhodu iz bloka se objavi dogodek.
+        Če se faza konča z izjemo, ima dogodek ključ 'napaka', izjema pa se posreduje naprej.
+
+        Če je nastavljen preklic (glej gredos_ozadje), se ob začetku faze sproži IzvozPreklican, tako da se izvoz ustavi med tabelami
+        oziroma med deli tabele.
+
+        Args:
+            ime (str): ime faze (glej FAZE)
+            **oznake: dodatne oznake dogodka (npr. tabela='Node', del=0)
+
+        Yields:
+            Meritev: meritev faze.
+        """
+        preklic = self._preklic
+        if preklic is not None and preklic.is_set():
+            raise IzvozPreklican(f"Izvoz preklican pred fazo '{ime}'.")
+        profiliranje = self._profiliranje
+        meritev = Meritev(ime, oznake, podrobno=self.podrobno or profiliranje is not None)
+        zacetek = datetime.now()
+        if meritev.podrobno:
+            self._zacni(meritev)
+        stanje_profila = profiliranje.zacni(ime, oznake) if profiliranje is not None else None
+        t0 = time.perf_counter()
+        napaka = None
+        try:
+            yield meritev
+        except BaseException as e:
+            napaka = e
+            raise
+        finally:
+            trajanje = time.perf_counter() - t0
+            pot_profila = None
+            if profiliranje is not None:
+                pot_profila = profiliranje.koncaj(ime, oznake, stanje_profila, zapisi=not meritev.zavrzeno or napaka is not None)
+            if meritev.podrobno:
+                self._koncaj(meritev)
+            if not meritev.zavrzeno or napaka is not None:
+                dogodek = {
+                    'faza': ime, 'zacetek': zacetek.isoformat(timespec='milliseconds'), 'trajanje_s': round(trajanje, 6),
+                    'vrstice': meritev.vrstice, 'bajti': meritev.bajti,
+                    'najvecji_rss_mb': None if meritev.najvec_rss is None else round(meritev.najvec_rss / 2**20, 1),
+                }
+                dogodek.update(oznake)
+                if napaka is not None:
+                    dogodek['napaka'] = repr(napaka)
+                if pot_profila is not None:
+                    dogodek['profil'] = pot_profila
+                self.objavi(dogodek)
+
+    def merjeni_deli(self, deli, ime='branje', **oznake):
+        """Ovije iterator delov tabele (npr. gredos_vir.preberi_tabelo_mdb_po_delih) tako, da je pridobitev vsakega dela svoja faza.
+
+        Args:
+            deli (iterable): iterator DataFrame delov
+            ime (str, optional): ime faze. Defaults to 'branje'.
+            **oznake: dodatne oznake dogodka
+
+        Yields:
+            pandas.DataFrame: deli tabele.
+        """
+        deli = iter(deli)
+        st_dela = 0
+        while True:
+            with self.faza(ime, **oznake, **{'del': st_dela}) as meritev:
+                df = next(deli, None)
+                if df is None:
+                    meritev.zavrzi()
+                else:
+                    meritev.dodaj(df)
+            if df is None:
+                return
+            yield df
+            st_dela += 1
+
+    def objavi(self, dogodek):
+        """Doda oznake merilnika in dogodek pošlje vsem ponorom. Napake povratnih klicev se zapišejo v dnevnik in ne prekinejo izvoza."""
+        if self.oznake:
+            dogodek = {**self.oznake, **dogodek}
+        self._pristej(dogodek)
+        if self.hrani_dogodke:
+            self.dogodki.append(dogodek)
+        if self.dnevnik.isEnabledFor(logging.INFO):
+            self.dnevnik.info('%s', json.dumps(dogodek, ensure_ascii=False, default=str))
+        if self.pot_metrik:
+            with self._zaklep, open(self.pot_metrik, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(dogodek, ensure_ascii=False, default=str) + '\n')
+        for povratni_klic in self.povratni_klici:
+            try:
+                povratni_klic(dogodek)
+            except Exception:
+                self.dnevnik.exception('Napaka v povratnem klicu meritev.')
+
+    def _pristej(self, dogodek):
+        """Prišteje dogodek sprotnemu povzetku (skupina so vse oznake dogodka razen vrednosti meritev in številke dela)."""
+        kljuc = tuple(sorted((k, v) for k, v in dogodek.items()
+                             if k not in _VREDNOSTI_DOGODKA and isinstance(v, (str, int, float, bool, type(None)))))
+        rss = dogodek.get('najvecji_rss_mb')
+        with self._zaklep:
+            skupina = self._skupine.get(kljuc)
+            if skupina is None:
+                skupina = self._skupine[kljuc] = {'dogodki': 0, 'trajanje_s': 0.0, 'vrstice': 0, 'bajti': 0, 'najvecji_rss_mb': None}
+            skupina['dogodki'] += 1
+            skupina['trajanje_s'] += dogodek.get('trajanje_s') or 0.0
+            skupina['vrstice'] += dogodek.get('vrstice') or 0
+            skupina['bajti'] += dogodek.get('bajti') or 0
+            if rss is not None and (skupina['najvecji_rss_mb'] is None or rss > skupina['najvecji_rss_mb']):
+                skupina['najvecji_rss_mb'] = rss
+
+    def povzetek(self, po=('faza',)):
+        """Povzetek vseh objavljenih dogodkov (tudi tistih, ki niso več hranjeni): število dogodkov, skupno trajanje, vrstice, bajti
+        in največji RSS po skupinah.
+
+        Args:
+            po (tuple, optional): oznake za združevanje (npr. ('faza', 'tabela')); po številki dela ('del') se ne združuje.
+                Defaults to ('faza',).
+
+        Returns:
+            pandas.DataFrame: povzetek, urejen po skupnem trajanju.
+        """
+        with self._zaklep:
+            dogodki = pd.DataFrame([{**dict(kljuc), **skupina} for kljuc, skupina in self._skupine.items()])
+        po = [stolpec for stolpec in po if stolpec in dogodki.columns]
+        if dogodki.empty or not po:
+            return pd.DataFrame(columns=['dogodki', 'trajanje_s', 'vrstice', 'bajti', 'najvecji_rss_mb'])
+        povzetek = dogodki.groupby(po, dropna=False).agg(dogodki=('dogodki', 'sum'), trajanje_s=('trajanje_s', 'sum'),
+                                                          vrstice=('vrstice', 'sum'), bajti=('bajti', 'sum'),
+                                                          najvecji_rss_mb=('najvecji_rss_mb', 'max'))
+        return povzetek.sort_values('trajanje_s', ascending=False)
+
+
+class _OznaceniMerilnik(Merilnik):
+    """Merilnik z dodatnimi oznakami, ki dogodke objavlja prek nadrejenega merilnika."""
+    def __init__(self, nadrejeni, oznake):
+        self.nadrejeni = nadrejeni
+        self.oznake = dict(oznake)
+        self.interval_pomnilnika = nadrejeni.interval_pomnilnika
+        self._zaklep = threading.Lock()
+        self._aktivne = []
+        self._vzorcevalnik = None
+
+    @property
+    def dogodki(self):
+        return self.nadrejeni.dogodki
+
+    @property
+    def podrobno(self):
+        return self.nadrejeni.podrobno
+
+    def povzetek(self, po=('faza',)):
+        return self.nadrejeni.povzetek(po)
+
+    @property
+    def _profiliranje(self):
+        return self.nadrejeni._profiliranje
+
+    @property
+    def _preklic(self):
+        return self.nadrejeni._preklic
+
+    def vklopi_profiliranje(self, imenik, st_mest=25):
+        self.nadrejeni.vklopi_profiliranje(imenik, st_mest)
+
+    def izklopi_profiliranje(self):
+        self.nadrejeni.izklopi_profiliranje()
+
+    def dodaj_povratni_klic(self, povratni_klic):
+        self.nadrejeni.dodaj_povratni_klic(povratni_klic)
+
+    def objavi(self, dogodek):
+        self.nadrejeni.objavi({**self.oznake, **dogodek})
+
+
+class _PraznaMeritev(Meritev):
+    """Meritev, ki ne računa velikosti tabel."""
+    __slots__ = ()
+
+    def dodaj(self, df=None, vrstice=0, bajti=0):
+        pass
+
+
+class _BrezMeritev:
+    """Merilnik, ki ne meri ničesar (privzet v funkcijah gredos_vir, kadar merilnik ni podan)."""
+    @contextmanager
+    def faza(self, ime, **oznake):
+        yield _PraznaMeritev(ime, oznake)
+
+    def merjeni_deli(self, deli, ime='branje', **oznake):
+        return iter(deli)
+
+    def profiliranje(self, imenik=None, st_mest=25):
+        return nullcontext()
+
+
+BREZ_MERITEV = _BrezMeritev()
+
+
+def merilnik_izvoza(merilnik, izvoz):
+    """Merilnik za razred izvoza: podan merilnik z oznako izvoza ali nov merilnik, če ga uporabnik ni podal. Nov merilnik meri le
+    trajanje in vrstice faz (brez vzorčenja pomnilnika in ocene velikosti tabel), razen med profiliranjem.
+
+    Args:
+        merilnik (Merilnik or None): uporabniški merilnik
+        izvoz (str): ime izvoza (razreda), npr. 'Gredos2GPKG'
+
+    Returns:
+        Merilnik: merilnik z oznako izvoz.
+    """
+    if merilnik is None:
+        merilnik = Merilnik(podrobno=False)
+    return merilnik.z_oznakami(izvoz=izvoz)
@@ -0,0 +1,192 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Izvoz v ozadju z napredkom in preklicem, da grafičnim vmesnikom ni potrebno zaganjati niti in prestrezati sys.stdout.
+
+Izvoz teče v niti (concurrent.futures), napredek se računa iz števila zapisanih vrstic glede na število vrstic tabel in geografskih plasti,
+preštetih pred začetkom izvoza. Preklic je kooperativen: izvoz se ustavi ob začetku naslednje faze (med tabelami oziroma med deli tabele,
+glej velikost_dela). Izvozi v datoteke (Gredos2GPKG, Gredos2Parquet) pišejo v začasno datoteko oziroma imenik, ki ob uspehu zamenja izhod,
+zato ob preklicu ali napaki izhod ostane nespremenjen.
+
+Primer:
+    izvoz = Gredos2GPKG('model.mdb', 'material_2000_v10.mdb', 'izvoz.gpkg')
+    opravilo = izvoz.pozeni_uvoz_v_ozadju(lambda delez, tabela: print(f'{delez:.0%} {tabela}'), pretvori_crs=True)
+    ...
+    opravilo.preklici()           # npr. gumb Prekliči
+    opravilo.rezultat()           # vrne rezultat pozeni_uvoz ali sproži IzvozPreklican
+
+V asyncio programih lahko na opravilo počakamo z await opravilo.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from gredos2x import gredos_vir
+from gredos2x.gredos_meritve import IzvozPreklican, _OznaceniMerilnik
+
+_dnevnik = logging.getLogger('gredos2x.ozadje')
+
+# največji delež napredka pred koncem izvoza; preostanek so indeksi in dodatni izračuni po zapisu tabel
+NAJVECJI_DELEZ_ZAPISA = 0.99
+
+
+def prestej_vrstice_izvoza(izvoz):
+    """Prešteje vrstice tabel, materialov in geografskih plasti, ki jih bo izvoz zapisal.
+
+    Args:
+        izvoz: razred izvoza z atributi mdb_povezava, pot_materiali in spisek_tabel (npr. Gredos2GPKG)
+
+    Returns:
+        dict: ime tabele (kot v oznaki 'tabela' dogodkov zapisa) -> število vrstic ali None, če ga ni mogoče ugotoviti.
+    """
+    povezava = getattr(izvoz, 'connection', None)
+    vrstice = {ime: gredos_vir.prestej_vrstice_mdb(izvoz.mdb_povezava, ime, povezava) for ime in izvoz.spisek_tabel}
+    vrstice['MATERIAL'] = gredos_vir.prestej_vrstice_mdb(izvoz.pot_materiali, 'MATERIAL')
+    for plast, pot in gredos_vir.najdi_geografske_datoteke(gredos_vir.imenik_modela(izvoz.mdb_povezava)).items():
+        vrstice[plast] = gredos_vir.prestej_vrstice_geografske_datoteke(pot)
+    return vrstice
+
+
+class _MerilnikOzadja(_OznaceniMerilnik):
+    """Merilnik izvoza v ozadju: dogodke posreduje nadrejenemu merilniku izvoza, dogodke zapisa šteje za napredek in nosi zastavico preklica."""
+    def __init__(self, nadrejeni, opravilo):
+        super().__init__(nadrejeni, {})
+        self.opravilo = opravilo
+
+    @property
+    def _preklic(self):
+        return self.opravilo._preklic
+
+    def objavi(self, dogodek):
+        super().objavi(dogodek)
+        if dogodek['faza'] == 'zapis' and 'napaka' not in dogodek:
+            self.opravilo._zapisano(dogodek.get('tabela'), dogodek['vrstice'])
+
+
+class IzvozVOzadju:
+    """
+        Izvoz, ki teče v ozadju (vrne ga pozeni_v_ozadju oziroma pozeni_uvoz_v_ozadju razredov izvoza).
+
+        Povratni klic napredka se kliče iz niti izvoza z deležem (0 do 1) in imenom zadnje zapisane tabele. Grafični vmesniki naj
+        osvežitev prikaza prenesejo v svojo glavno nit (npr. tkinter: root.after).
+
+        Args:
+            izvoz: razred izvoza (npr. Gredos2GPKG)
+            povratni_klic_napredka (callable, optional): funkcija (delez, tabela). Defaults to None.
+    """
+    def __init__(self, izvoz, povratni_klic_napredka=None):
+        self.izvoz = izvoz
+        self.povratni_klic_napredka = povratni_klic_napredka
+        self.prihodnost = None
+        self.skupaj_vrstic = {}
+        self.zapisane_vrstice = {}
+        self.napredek = 0.0
+        self._preklic = threading.Event()
+        self._zaklep = threading.Lock()
+
+    def preklici(self):
+        """Zahteva preklic izvoza. Izvoz se ustavi ob začetku naslednje faze, rezultat() pa nato sproži IzvozPreklican.
+
+        Returns:
+            bool: True, če izvoz še ni bil končan.
+        """
+        self._preklic.set()
+        return not self.koncano()
+
+    def preklican(self):
+        """True, če je bil zahtevan preklic."""
+        return self._preklic.is_set()
+
+    def koncano(self):
+        """True, ko je izvoz končan (uspešno, z napako ali s preklicem)."""
+        return self.prihodnost is not None and self.prihodnost.done()
+
+    def rezultat(self, timeout=None):
+        """Počaka na konec izvoza in vrne rezultat metode izvoza (npr. pozeni_uvoz). Napake izvoza in IzvozPreklican se posredujejo naprej.
+
+        Args:
+            timeout (float, optional): največji čas čakanja v sekundah. Defaults to None (brez omejitve).
+        """
+        return self.prihodnost.result(timeout)
+
+    def __await__(self):
+        import asyncio
+        return asyncio.wrap_future(self.prihodnost).__await__()
+
+    def _javi(self, delez, tabela):
+        self.napredek = delez
+        if self.povratni_klic_napredka is not None:
+            try:
+                self.povratni_klic_napredka(delez, tabela)
+            except Exception:
+                _dnevnik.exception('Napaka v povratnem klicu napredka.')
+
+    def _zapisano(self, tabela, vrstice):
+        with self._zaklep:
+            self.zapisane_vrstice[tabela] = self.zapisane_vrstice.get(tabela, 0) + vrstice
+            znane = {ime: n for ime, n in self.skupaj_vrstic.items() if n}
+            if not znane:
+                return
+            zapisano = sum(min(self.zapisane_vrstice.get(ime, 0), n) for ime, n in znane.items())
+            delez = min(zapisano / sum(znane.values()), 1.0) * NAJVECJI_DELEZ_ZAPISA
+        self._javi(max(delez, self.napredek), tabela)
+
+    def _pozeni(self, metoda, nastavitve):
+        if self._preklic.is_set():
+            raise IzvozPreklican('Izvoz preklican pred začetkom.')
+        self.skupaj_vrstic = prestej_vrstice_izvoza(self.izvoz)
+        merilnik = self.izvoz.merilnik
+        self.izvoz.merilnik = _MerilnikOzadja(merilnik, self)
+        zacasni_izhod = getattr(self.izvoz, '_zacasni_izhod', None)
+        try:
+            self._javi(0.0, None)
+            if zacasni_izhod is None:
+                rezultat = getattr(self.izvoz, metoda)(**nastavitve)
+            else:
+                with zacasni_izhod():
+                    rezultat = getattr(self.izvoz, metoda)(**nastavitve)
+        finally:
+            self.izvoz.merilnik = merilnik
+        self._javi(1.0, None)
+        return rezultat
+
+
+def pozeni_v_ozadju(izvoz, povratni_klic_napredka=None, izvajalec=None, metoda='pozeni_uvoz', **nastavitve):
+    """Zažene izvoz v ozadju in takoj vrne IzvozVOzadju.
+
+    Izvozi, ki nimajo metode _zacasni_izhod (npr. Gredos2PGSQL, Gredos2MSSQL), se ob preklicu ustavijo, že zapisane tabele pa ostanejo v bazi.
+
+    Args:
+        izvoz: razred izvoza (npr. Gredos2GPKG, Gredos2Parquet)
+        povratni_klic_napredka (callable, optional): funkcija (delez, tabela), klicana iz niti izvoza. Defaults to None.
+        izvajalec (concurrent.futures.Executor, optional): izvajalec za izvoz. Defaults to None (nova nit).
+        metoda (str, optional): metoda izvoza, ki se izvede. Defaults to 'pozeni_uvoz'.
+        **nastavitve: parametri metode izvoza (npr. pretvori_crs=True, velikost_dela=50000)
+
+    Returns:
+        IzvozVOzadju: opravilo z napredkom, preklicem in rezultatom.
+    """
+    opravilo = IzvozVOzadju(izvoz, povratni_klic_napredka)
+    if izvajalec is None:
+        izvajalec = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gredos2x-izvoz')
+        opravilo.prihodnost = izvajalec.submit(opravilo._pozeni, metoda, nastavitve)
+        izvajalec.shutdown(wait=False)
+    else:
+        opravilo.prihodnost = izvajalec.submit(opravilo._pozeni, metoda, nastavitve)
+    return opravilo
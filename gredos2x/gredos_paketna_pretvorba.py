@@ -0,0 +1,282 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Paketna pretvorba več Gredos modelov v GPKG datoteke (ukaz gredos2x-pretvorba).
+
+Opravila so podana v manifestu (JSON ali CSV). Vsako opravilo teče v svojem procesu, izpisi in dnevnik opravila se zapišejo v
+<imenik_dnevnikov>/<ime>.log, meritve faz pa v <ime>.metrike.jsonl. Izhod se zapiše v začasno datoteko in šele ob uspehu zamenja
+ciljno datoteko, ob njej pa se zapiše še <izhod>.g2x.json s prstnim odtisom vhodnih datotek in nastavitev. Opravila, katerih izhod
+ima enak prstni odtis, se preskočijo. Z --predpomnilnik se rezultati delijo med opravili in zagoni prek predpomnilnika rezultatov
+(glej gredos_predpomnilnik), tako da se enak model z enakimi nastavitvami pretvori le enkrat.
+
+Primer manifesta (JSON):
+    {
+        "privzeto": {"materiali": "C:/GredosMO/Defaults/material_2000_v10.mdb", "pretvori_crs": true, "set_crs": "EPSG:3794"},
+        "opravila": [
+            {"ime": "ep_2026_01", "mdb": "modeli/ep/26_1_2026.mdb", "izhod": "izvoz/ep_2026_01.gpkg"},
+            {"ime": "ee_2026_01", "mdb": "modeli/ee/26_1_2026.mdb", "izhod": "izvoz/ee_2026_01.gpkg", "nastavitve": {"parametri_vej": true}}
+        ]
+    }
+
+CSV manifest ima stolpce ime, mdb, materiali, izhod, pretvori_crs, set_crs (ime, pretvori_crs in set_crs niso obvezni).
+
+Primer:
+    gredos2x-pretvorba manifest.json --procesi 8 --imenik-dnevnikov dnevniki --povzetek povzetek.json
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import logging
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import gredos2x
+from gredos2x import gredos_vir
+
+# nastavitve opravila, ki se prenesejo v Gredos2GPKG.pozeni_uvoz
+NASTAVITVE_UVOZA = ['pretvori_crs', 'set_crs', 'zdruzene_plasti', 'parametri_vej', 'pretok_moci', 'velikost_dela', 'omejitev_pomnilnika_mb',
+                    'preveri_celovitost', 'preveri_povezljivost', 'popravi_geometrije', 'natancnost_koordinat']
+
+PRIPONA_ODTISA = '.g2x.json'
+
+
+def preberi_manifest(pot_manifesta):
+    """Prebere manifest opravil (JSON ali CSV). Relativne poti so glede na imenik manifesta.
+
+    Args:
+        pot_manifesta (str): pot do manifesta (.json ali .csv)
+
+    Returns:
+        list: seznam opravil (dict s ključi ime, mdb, materiali, izhod, nastavitve).
+    """
+    imenik = os.path.dirname(os.path.abspath(pot_manifesta))
+    if pot_manifesta.lower().endswith('.csv'):
+        with open(pot_manifesta, newline='', encoding='utf-8-sig') as f:
+            vrstice = [{k: v for k, v in vrstica.items() if v not in (None, '')} for vrstica in csv.DictReader(f)]
+        for vrstica in vrstice:
+            if 'pretvori_crs' in vrstica:
+                vrstica['pretvori_crs'] = vrstica['pretvori_crs'].strip().lower() in ('1', 'true', 'da', 'yes')
+        privzeto, opravila = {}, vrstice
+    else:
+        with open(pot_manifesta, encoding='utf-8') as f:
+            vsebina = json.load(f)
+        if isinstance(vsebina, list):
+            privzeto, opravila = {}, vsebina
+        else:
+            privzeto, opravila = vsebina.get('privzeto', {}), vsebina['opravila']
+
+    rezultat = []
+    for i, opravilo in enumerate(opravila):
+        opravilo = {**privzeto, **opravilo}
+        nastavitve = {**privzeto.get('nastavitve', {}), **opravilo.pop('nastavitve', {})}
+        for kljuc in NASTAVITVE_UVOZA:
+            if kljuc in opravilo:
+                nastavitve[kljuc] = opravilo.pop(kljuc)
+        for kljuc in ['mdb', 'materiali', 'izhod']:
+            if kljuc not in opravilo:
+                raise ValueError(f"Opravilo {i} v manifestu nima ključa '{kljuc}'.")
+            opravilo[kljuc] = os.path.normpath(os.path.join(imenik, opravilo[kljuc]))
+        opravilo.setdefault('ime', os.path.splitext(os.path.basename(opravilo['izhod']))[0])
+        opravilo['nastavitve'] = nastavitve
+        rezultat.append(opravilo)
+
+    for kljuc in ['ime', 'izhod']:
+        vrednosti = [o[kljuc] for o in rezultat]
+        podvojene = sorted({v for v in vrednosti if vrednosti.count(v) > 1})
+        if podvojene:
+            raise ValueError(f"Podvojene vrednosti '{kljuc}' v manifestu: {podvojene}.")
+    return rezultat
+
+
+def prstni_odtis(opravilo):
+    """Prstni odtis vhodnih datotek (velikost in čas spremembe mdb, materialov in shp datotek) ter nastavitev opravila.
+
+    Args:
+        opravilo (dict): opravilo iz manifesta
+
+    Returns:
+        dict: prstni odtis, ki se zapiše ob izhodno datoteko.
+    """
+    vhodi = {}
+    for pot in gredos_vir.vhodne_datoteke_modela(opravilo['mdb'], opravilo['materiali']):
+        if os.path.exists(pot):
+            stat = os.stat(pot)
+            vhodi[pot] = [stat.st_size, stat.st_mtime_ns]
+        else:
+            vhodi[pot] = None
+    return {'gredos2x': gredos2x.__version__, 'vhodi': vhodi, 'nastavitve': opravilo['nastavitve']}
+
+
+def je_posodobljeno(opravilo):
+    """True, če izhod obstaja in je bil zapisan iz istih vhodnih datotek z enakimi nastavitvami."""
+    pot_odtisa = opravilo['izhod'] + PRIPONA_ODTISA
+    if not (os.path.exists(opravilo['izhod']) and os.path.exists(pot_odtisa)):
+        return False
+    try:
+        with open(pot_odtisa, encoding='utf-8') as f:
+            shranjen = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return shranjen == json.loads(json.dumps(prstni_odtis(opravilo)))
+
+
+def pozeni_opravilo(opravilo, imenik_dnevnikov, prisili=False, predpomnilnik=None):
+    """Izvede eno opravilo (v delovnem procesu). Izpisi in dnevnik gredos2x se preusmerijo v dnevnik opravila.
+
+    Args:
+        opravilo (dict): opravilo iz manifesta
+        imenik_dnevnikov (str): imenik za dnevnike in meritve opravil
+        prisili (bool, optional): izvedi opravilo, tudi če je izhod posodobljen. Defaults to False.
+        predpomnilnik (gredos_predpomnilnik.PredpomnilnikRezultatov, optional): predpomnilnik rezultatov. Defaults to None.
+
+    Returns:
+        dict: rezultat opravila (ime, stanje 'uspeh', 'preskoceno' ali 'napaka', trajanje_s, izhod, dnevnik, napaka in
+        pri uporabi predpomnilnika še predpomnilnik 'zadetek' ali 'zgresitev').
+    """
+    from gredos2x.gredos2gpkg import Gredos2GPKG
+    from gredos2x.gredos_kontrolne_vsote import preveri_kontrolne_vsote
+    from gredos2x.gredos_meritve import Merilnik
+
+    ime = opravilo['ime']
+    pot_dnevnika = os.path.join(imenik_dnevnikov, f'{ime}.log')
+    rezultat = {'ime': ime, 'izhod': opravilo['izhod'], 'dnevnik': pot_dnevnika, 'pid': os.getpid(),
+                'zacetek': datetime.now().isoformat(timespec='seconds')}
+    zacetek = time.perf_counter()
+    if not prisili and je_posodobljeno(opravilo):
+        return {**rezultat, 'stanje': 'preskoceno', 'trajanje_s': 0.0}
+
+    odtis = prstni_odtis(opravilo)
+    zacasni_izhod = f"{opravilo['izhod']}.{os.getpid()}.tmp.gpkg"
+    with open(pot_dnevnika, 'w', encoding='utf-8') as dnevnik, \
+            contextlib.redirect_stdout(dnevnik), contextlib.redirect_stderr(dnevnik):
+        rokovalec = logging.StreamHandler(dnevnik)
+        rokovalec.setFormatter(logging.Formatter('%(asctime)s %(name)s %(levelname)s %(message)s'))
+        dnevnik_gredos = logging.getLogger('gredos2x')
+        dnevnik_gredos.addHandler(rokovalec)
+        dnevnik_gredos.setLevel(logging.INFO)
+        try:
+            print(f"Opravilo {ime}: {opravilo['mdb']} -> {opravilo['izhod']}, nastavitve {opravilo['nastavitve']}", flush=True)
+            for kljuc in ['mdb', 'materiali']:
+                if not os.path.exists(opravilo[kljuc]):
+                    raise FileNotFoundError(f"Datoteka {opravilo[kljuc]} ne obstaja.")
+            os.makedirs(os.path.dirname(os.path.abspath(opravilo['izhod'])), exist_ok=True)
+            merilnik = Merilnik(pot_metrik=os.path.join(imenik_dnevnikov, f'{ime}.metrike.jsonl'), oznake={'opravilo': ime})
+            izvoz = Gredos2GPKG(opravilo['mdb'], opravilo['materiali'], zacasni_izhod, merilnik=merilnik)
+            if predpomnilnik is None:
+                izvoz.pozeni_uvoz(show_progress=True, **opravilo['nastavitve'])
+            else:
+                izvoz.pozeni_uvoz_s_predpomnilnikom(predpomnilnik, show_progress=True, **opravilo['nastavitve'])
+                rezultat['predpomnilnik'] = 'zadetek' if predpomnilnik.zadetki else 'zgresitev'
+            # število vrstic v viru proti g2x_manifest izhoda (brez ponovnega branja tabel)
+            preverjanje = preveri_kontrolne_vsote(izvoz)
+            neujemanja = preverjanje[preverjanje['ujemanje'] == False]
+            if len(neujemanja):
+                raise ValueError(f"Število vrstic izhoda se ne ujema z virom: {neujemanja.to_dict('records')}")
+            os.replace(zacasni_izhod, opravilo['izhod'])
+            with open(opravilo['izhod'] + PRIPONA_ODTISA, 'w', encoding='utf-8') as f:
+                json.dump(odtis, f, indent=2, ensure_ascii=False)
+            rezultat['stanje'] = 'uspeh'
+        except Exception as e:
+            traceback.print_exc()
+            rezultat['stanje'] = 'napaka'
+            rezultat['napaka'] = repr(e)
+            if os.path.exists(zacasni_izhod):
+                os.remove(zacasni_izhod)
+        finally:
+            dnevnik_gredos.removeHandler(rokovalec)
+            rezultat['trajanje_s'] = round(time.perf_counter() - zacetek, 3)
+            print(f"Opravilo {ime}: {rezultat['stanje']} v {rezultat['trajanje_s']} s.", flush=True)
+    return rezultat
+
+
+def pozeni_paketno(opravila, imenik_dnevnikov='dnevniki', procesi=None, prisili=False, show_progress=False, predpomnilnik=None):
+    """Izvede opravila v skupini procesov.
+
+    Args:
+        opravila (list): opravila (glej preberi_manifest)
+        imenik_dnevnikov (str, optional): imenik za dnevnike opravil. Defaults to 'dnevniki'.
+        procesi (int, optional): število sočasnih procesov. Defaults to None (število jeder).
+        prisili (bool, optional): izvedi tudi posodobljena opravila. Defaults to False.
+        show_progress (bool, optional): izpiši rezultat vsakega opravila, ko se konča. Defaults to False.
+        predpomnilnik (gredos_predpomnilnik.PredpomnilnikRezultatov, optional): predpomnilnik rezultatov, skupen vsem opravilom.
+            Defaults to None (brez predpomnilnika).
+
+    Returns:
+        list: rezultati opravil v vrstnem redu manifesta.
+    """
+    os.makedirs(imenik_dnevnikov, exist_ok=True)
+    procesi = min(procesi or os.cpu_count() or 1, max(len(opravila), 1))
+    rezultati = {}
+    # vsak proces izvede eno opravilo, tako da se pomnilnik velikih modelov sprosti po vsakem opravilu (python >= 3.11)
+    nastavitve_izvajalca = {'max_tasks_per_child': 1} if sys.version_info >= (3, 11) else {}
+    with ProcessPoolExecutor(max_workers=procesi, **nastavitve_izvajalca) as izvajalec:
+        prihodnosti = {izvajalec.submit(pozeni_opravilo, opravilo, imenik_dnevnikov, prisili, predpomnilnik): opravilo['ime'] for opravilo in opravila}
+        for prihodnost in as_completed(prihodnosti):
+            ime = prihodnosti[prihodnost]
+            try:
+                rezultat = prihodnost.result()
+            except Exception as e:
+                # proces se je nepričakovano končal (npr. zmanjkalo pomnilnika)
+                rezultat = {'ime': ime, 'stanje': 'napaka', 'napaka': repr(e), 'trajanje_s': None}
+            rezultati[ime] = rezultat
+            if show_progress:
+                print(f"{rezultat['stanje']:<11} {ime:<30} {rezultat.get('trajanje_s') or 0:9.1f} s  {rezultat.get('predpomnilnik', '')} "
+                      f"{rezultat.get('napaka', '')}", flush=True)
+    return [rezultati[opravilo['ime']] for opravilo in opravila]
+
+
+def main(argv=None):
+    """Vstopna točka ukaza gredos2x-pretvorba. Vrne izhodno kodo 0, če so vsa opravila uspešna ali preskočena, sicer 1."""
+    parser = argparse.ArgumentParser(prog='gredos2x-pretvorba', description='Paketna pretvorba Gredos modelov v GPKG datoteke.')
+    parser.add_argument('manifest', help='JSON ali CSV datoteka z opravili')
+    parser.add_argument('--procesi', type=int, default=None, help='število sočasnih procesov (privzeto število jeder)')
+    parser.add_argument('--imenik-dnevnikov', default='dnevniki', help='imenik za dnevnike in meritve opravil')
+    parser.add_argument('--prisili', action='store_true', help='izvedi tudi opravila s posodobljenim izhodom')
+    parser.add_argument('--povzetek', default=None, help='JSON datoteka s povzetkom rezultatov')
+    parser.add_argument('--predpomnilnik', nargs='?', const='', default=None, metavar='IMENIK',
+                        help='uporabi predpomnilnik rezultatov (privzeti imenik ~/.cache/gredos2x/rezultati)')
+    parser.add_argument('--predpomnilnik-mb', type=float, default=None, help='največja velikost predpomnilnika v MB')
+    parser.add_argument('--trde-povezave', action='store_true', help='rezultate iz predpomnilnika postrezi s trdimi povezavami')
+    args = parser.parse_args(argv)
+
+    predpomnilnik = None
+    if args.predpomnilnik is not None:
+        from gredos2x.gredos_predpomnilnik import PRIVZETA_VELIKOST_MB, PredpomnilnikRezultatov
+        predpomnilnik = PredpomnilnikRezultatov(args.predpomnilnik or None, args.predpomnilnik_mb or PRIVZETA_VELIKOST_MB, args.trde_povezave)
+
+    opravila = preberi_manifest(args.manifest)
+    zacetek = time.perf_counter()
+    rezultati = pozeni_paketno(opravila, args.imenik_dnevnikov, args.procesi, args.prisili, show_progress=True, predpomnilnik=predpomnilnik)
+    trajanje = time.perf_counter() - zacetek
+
+    stanja = {stanje: sum(r['stanje'] == stanje for r in rezultati) for stanje in ['uspeh', 'preskoceno', 'napaka']}
+    print(f"Končano v {trajanje:.1f} s: {stanja['uspeh']} uspešnih, {stanja['preskoceno']} preskočenih, {stanja['napaka']} z napako.")
+    if args.povzetek:
+        with open(args.povzetek, 'w', encoding='utf-8') as f:
+            json.dump({'gredos2x': gredos2x.__version__, 'trajanje_s': round(trajanje, 3), 'stanja': stanja, 'rezultati': rezultati},
+                      f, indent=2, ensure_ascii=False)
+    return 1 if stanja['napaka'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,192 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Izračun električnih parametrov odsekov in vej iz tabel Section in MATERIAL.
+
+Odseki (Section) so zaporedni deli veje (Branch), zato se upornosti, reaktance in susceptance odsekov seštevajo, trajni tok veje pa
+je določen z najšibkejšim odsekom. Vsi izračuni so vektorski (numpy), povezava odsekov z materiali pa poteka preko hash indeksa.
+
+Privzete enote materialov: R in X v ohm/km, B v µS/km, Imax v A. Dolžina odseka je privzeto v metrih (faktor_dolzine=0.001).
+"""
+
+
+from gredos2x.gredos_shema import najdi_stolpec, kljuc_kot_niz
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+np = leni_modul('numpy')
+pd = leni_modul('pandas')
+
+
+def izracunaj_parametre_odsekov(section, material, stolpci=None, faktor_dolzine=0.001):
+    """Poveže odseke z materiali in izračuna parametre posameznega odseka.
+
+    Args:
+        section (pandas.DataFrame): tabela Section
+        material (pandas.DataFrame): tabela MATERIAL
+        stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+        faktor_dolzine (float, optional): pretvorba dolžine odseka v km. Defaults to 0.001 (dolžina v m).
+
+    Returns:
+        pandas.DataFrame: tabela z ID veje, materialom, dolžino [km], R [ohm], X [ohm], B [µS] in Imax [A] za vsak odsek.
+    """
+    veja = najdi_stolpec(section, 'Section', 'veja', stolpci)
+    mat_section = najdi_stolpec(section, 'Section', 'material', stolpci)
+    dolzina = najdi_stolpec(section, 'Section', 'dolzina', stolpci)
+    vzporedno = najdi_stolpec(section, 'Section', 'vzporedno', stolpci, obvezen=False)
+
+    mat_id = najdi_stolpec(material, 'MATERIAL', 'id', stolpci)
+    vrednosti = {}
+    for vloga in ['r', 'x', 'b', 'imax']:
+        ime = najdi_stolpec(material, 'MATERIAL', vloga, stolpci, obvezen=False)
+        if ime is None:
+            vrednosti[vloga] = np.full(len(material), np.nan)
+        else:
+            vrednosti[vloga] = pd.to_numeric(material[ime], errors='coerce').to_numpy(dtype=float)
+
+    # hash join odsekov na materiale: indeks materialov -> pozicija v tabeli, -1 pomeni manjkajoč material
+    kljuci_materialov, kljuci_odsekov = material[mat_id], section[mat_section]
+    if not (pd.api.types.is_integer_dtype(kljuci_materialov) and pd.api.types.is_integer_dtype(kljuci_odsekov)):
+        # pretvorba v tekst je potrebna le, če tipa ključev nista oba celoštevilska
+        kljuci_materialov, kljuci_odsekov = kljuc_kot_niz(kljuci_materialov), kljuc_kot_niz(kljuci_odsekov)
+    indeks_materialov = pd.Index(kljuci_materialov)
+    if not indeks_materialov.is_unique:
+        ohrani = ~indeks_materialov.duplicated()
+        indeks_materialov = indeks_materialov[ohrani]
+        vrednosti = {k: v[ohrani] for k, v in vrednosti.items()}
+    pozicije = indeks_materialov.get_indexer(kljuci_odsekov)
+    najden = pozicije >= 0
+    pozicije = np.where(najden, pozicije, 0)
+
+    def po_odsekih(vloga):
+        v = vrednosti[vloga][pozicije] if len(indeks_materialov) else np.full(len(pozicije), np.nan)
+        return np.where(najden, v, np.nan)
+
+    dolzina_km = pd.to_numeric(section[dolzina], errors='coerce').to_numpy(dtype=float) * faktor_dolzine
+    if vzporedno is not None:
+        n_vzporedno = pd.to_numeric(section[vzporedno], errors='coerce').to_numpy(dtype=float)
+        n_vzporedno = np.where(np.isfinite(n_vzporedno) & (n_vzporedno > 0), n_vzporedno, 1.0)
+    else:
+        n_vzporedno = np.ones(len(section))
+
+    return pd.DataFrame({
+        veja: kljuc_kot_niz(section[veja]).to_numpy(),
+        'MaterialId': section[mat_section].to_numpy(),
+        'Dolzina_km': dolzina_km,
+        'R_ohm': po_odsekih('r') * dolzina_km / n_vzporedno,
+        'X_ohm': po_odsekih('x') * dolzina_km / n_vzporedno,
+        'B_uS': po_odsekih('b') * dolzina_km * n_vzporedno,
+        'Imax_A': po_odsekih('imax') * n_vzporedno,
+    })
+
+
+def agregiraj_parametre_vej(odseki, kljuc='BranchId'):
+    """Sešteje parametre zaporednih odsekov po vejah.
+
+    Args:
+        odseki (pandas.DataFrame): rezultat izracunaj_parametre_odsekov
+        kljuc (str, optional): stolpec z ID veje. Defaults to 'BranchId'.
+
+    Returns:
+        pandas.DataFrame: en zapis na vejo s skupno dolžino, R, X, B, najmanjšim Imax in številom odsekov.
+    """
+    kode, veje = pd.factorize(odseki[kljuc], sort=False)
+    if (kode < 0).any():
+        odseki = odseki[kode >= 0]
+        kode = kode[kode >= 0]
+    n = len(veje)
+
+    def vsota(stolpec):
+        vrednosti = odseki[stolpec].to_numpy(dtype=float)
+        vsote = np.bincount(kode, weights=np.nan_to_num(vrednosti), minlength=n)
+        # veja brez enega samega znanega podatka naj ostane brez vrednosti
+        znani = np.bincount(kode, weights=np.isfinite(vrednosti), minlength=n)
+        return np.where(znani > 0, vsote, np.nan)
+
+    imax = np.full(n, np.nan)
+    if n:
+        vrstni_red = np.argsort(kode, kind='stable')
+        zacetki = np.flatnonzero(np.r_[True, np.diff(kode[vrstni_red]) != 0])
+        imax = np.fmin.reduceat(odseki['Imax_A'].to_numpy(dtype=float)[vrstni_red], zacetki)
+
+    return pd.DataFrame({
+        kljuc: np.asarray(veje),
+        'Section_stevilo': np.bincount(kode, minlength=n),
+        'Dolzina_km': vsota('Dolzina_km'),
+        'R_ohm': vsota('R_ohm'),
+        'X_ohm': vsota('X_ohm'),
+        'B_uS': vsota('B_uS'),
+        'Imax_A': imax,
+    })
+
+
+def odjemi_vozlisc(node, lnode=None, stolpci=None, faktor_moci=0.001):
+    """Vrne kompleksne odjeme vozlišč v MW/MVAr. Če tabela Node nima podatkov o odjemu, se odjem LNode enakomerno razdeli
+    na njegova vozlišča.
+
+    Args:
+        node (pandas.DataFrame): tabela Node
+        lnode (pandas.DataFrame, optional): tabela LNode. Defaults to None.
+        stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+        faktor_moci (float, optional): pretvorba moči v MW. Defaults to 0.001 (kW).
+
+    Returns:
+        numpy.ndarray: kompleksni odjem (P + jQ) za vsako vrstico tabele Node.
+    """
+    p = najdi_stolpec(node, 'Node', 'p', stolpci, obvezen=False)
+    q = najdi_stolpec(node, 'Node', 'q', stolpci, obvezen=False)
+    if p is not None:
+        p_vr = pd.to_numeric(node[p], errors='coerce').fillna(0).to_numpy(dtype=float)
+        q_vr = pd.to_numeric(node[q], errors='coerce').fillna(0).to_numpy(dtype=float) if q else np.zeros(len(node))
+        return (p_vr + 1j * q_vr) * faktor_moci
+
+    s = np.zeros(len(node), dtype=complex)
+    if lnode is None:
+        return s
+    lp = najdi_stolpec(lnode, 'Node', 'p', stolpci, obvezen=False)
+    lq = najdi_stolpec(lnode, 'Node', 'q', stolpci, obvezen=False)
+    if lp is None:
+        return s
+    lnode_kljuc = najdi_stolpec(lnode, 'LNode', 'id', stolpci)
+    odjem_lnode = pd.Series(pd.to_numeric(lnode[lp], errors='coerce').fillna(0).to_numpy()
+                            + 1j * (pd.to_numeric(lnode[lq], errors='coerce').fillna(0).to_numpy() if lq else 0),
+                            index=kljuc_kot_niz(lnode[lnode_kljuc]))
+    odjem_lnode = odjem_lnode[~odjem_lnode.index.duplicated()]
+    lnode_vozlisc = kljuc_kot_niz(node[najdi_stolpec(node, 'Node', 'lnode', stolpci)])
+    st_vozlisc = lnode_vozlisc.map(lnode_vozlisc.value_counts()).to_numpy(dtype=float)
+    s = odjem_lnode.reindex(lnode_vozlisc).fillna(0).to_numpy() / st_vozlisc
+    return s * faktor_moci
+
+
+def napajalna_vozlisca(node, stolpci=None, izbrana=None):
+    """Vrne pozicije napajalnih vozlišč v tabeli Node: podana vozlišča ali vozlišča z vrednostjo Generation različno od 0.
+
+    Args:
+        node (pandas.DataFrame): tabela Node
+        stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+        izbrana (list, optional): seznam NodeId napajalnih vozlišč. Defaults to None.
+
+    Returns:
+        numpy.ndarray: pozicije napajalnih vozlišč.
+    """
+    if izbrana is not None:
+        vozlisca = pd.Index(kljuc_kot_niz(node[najdi_stolpec(node, 'Node', 'id', stolpci)]))
+        pozicije = vozlisca.get_indexer(kljuc_kot_niz(pd.Series(list(izbrana))))
+        return pozicije[pozicije >= 0]
+    generacija = najdi_stolpec(node, 'Node', 'generacija', stolpci, obvezen=False)
+    if generacija is None:
+        return np.array([], dtype=int)
+    return np.flatnonzero(pd.to_numeric(node[generacija], errors='coerce').fillna(0).to_numpy() != 0)
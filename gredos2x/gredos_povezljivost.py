@@ -0,0 +1,174 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Geometrijska povezljivost modela Gredos: primerjava krajišč linij (LINE_geo) z vozlišči (POINT_geo) in atributno topologijo
+(Branch.Node1/Node2).
+
+Geometrija modela izvira iz risb (DWG), zato se lahko zgodi, da linija na karti ne konča v vozlišču, v katerem se po atributih
+veja konča. Krajišča vseh linij se izluščijo kot polje koordinat in se pripnejo na najbližje vozlišče v toleranci (ena poizvedba po
+prostorskem indeksu shapely.STRtree za vsa krajišča hkrati). Pripeti vozlišči veje se nato primerjata z Node1 in Node2 (smer
+linije ni pomembna):
+
+    - konec_brez_vozlisca: v toleranci krajišča ni nobenega vozlišča,
+    - napacno_vozlisce: krajišče je pripeto na drugo vozlišče, kot ga določajo atributi veje.
+
+Linije brez atributne vrstice v Branch se preskočijo (glej gredos_preverjanje, geometrija_brez_atributov). Neskladja se zapišejo
+kot točkovna plast g2x_povezljivost (krajišča linij) s prostorskim indeksom in indeksom po veji:
+
+    neskladja = preveri_povezljivost_gpkg('izvoz.gpkg', toleranca=0.5)
+    Gredos2GPKG(...).pozeni_uvoz(preveri_povezljivost=True)
+"""
+
+import sqlite3
+
+from gredos2x.gredos_shema import najdi_stolpec, kljuc_kot_niz
+from gredos2x.gredos_gpkg2dataframes import GredosGPKG2df
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+np = leni_modul('numpy')
+pd = leni_modul('pandas')
+gpd = leni_modul('geopandas')
+shapely = leni_modul('shapely')
+
+IME_PLASTI = 'g2x_povezljivost'
+
+# privzeta toleranca pripenjanja krajišč (v enotah koordinatnega sistema, za D96/TM metri)
+TOLERANCA = 0.5
+
+STOLPCI_NESKLADIJ = ['veja', 'konec', 'vozlisce', 'pricakovano_vozlisce', 'razdalja', 'neskladje']
+
+
+def konci_linij(geometrije):
+    """Krajišča linij kot polje koordinat. Pri večdelnih linijah je začetek prva točka prvega dela, konec pa zadnja točka
+    zadnjega dela; prazne geometrije nimajo krajišč.
+
+    Args:
+        geometrije (array-like): shapely geometrije linij
+
+    Returns:
+        tuple: (indeksi linij (n,), konec (n,): 1 za začetek in 2 za konec linije, koordinate (n, 2)).
+    """
+    koordinate, indeksi = shapely.get_coordinates(np.asarray(geometrije, dtype=object), return_index=True)
+    if not len(indeksi):
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int8), np.empty((0, 2))
+    # indeksi so urejeni po linijah: prva in zadnja točka vsake linije
+    meje = np.flatnonzero(np.diff(indeksi)) + 1
+    prve = np.concatenate([[0], meje])
+    zadnje = np.concatenate([meje - 1, [len(indeksi) - 1]])
+    linije = indeksi[prve]
+    return (np.repeat(linije, 2), np.tile(np.array([1, 2], dtype=np.int8), len(linije)),
+            koordinate[np.column_stack([prve, zadnje]).ravel()])
+
+
+def preveri_povezljivost(line_geo, point_geo, branch, toleranca=TOLERANCA, stolpci=None, drevo=None):
+    """Primerja geometrijsko povezljivost (krajišča linij, pripeta na vozlišča) z atributno topologijo vej.
+
+    Args:
+        line_geo (geopandas.GeoDataFrame): plast LINE_geo
+        point_geo (geopandas.GeoDataFrame): plast POINT_geo
+        branch (pandas.DataFrame): tabela Branch
+        toleranca (float, optional): največja razdalja med krajiščem in vozliščem. Defaults to TOLERANCA.
+        stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+        drevo (shapely.STRtree, optional): že zgrajen prostorski indeks geometrij point_geo (glej GredosGPKG2df.prostorski_indeks).
+            Defaults to None.
+
+    Returns:
+        geopandas.GeoDataFrame: neskladja (glej STOLPCI_NESKLADIJ) z geometrijo krajišča linije.
+    """
+    kljuci_linij = kljuc_kot_niz(line_geo[najdi_stolpec(line_geo, 'LINE_geo', 'id', stolpci)]).to_numpy(dtype=object, na_value=None)
+    kljuci_vozlisc = kljuc_kot_niz(point_geo[najdi_stolpec(point_geo, 'POINT_geo', 'id', stolpci)]).to_numpy(dtype=object, na_value=None)
+    kljuci_vej = kljuc_kot_niz(branch[najdi_stolpec(branch, 'Branch', 'id', stolpci)])
+    vozlisce1 = kljuc_kot_niz(branch[najdi_stolpec(branch, 'Branch', 'vozlisce1', stolpci)]).to_numpy(dtype=object, na_value=None)
+    vozlisce2 = kljuc_kot_niz(branch[najdi_stolpec(branch, 'Branch', 'vozlisce2', stolpci)]).to_numpy(dtype=object, na_value=None)
+
+    # krajišča linij, ki imajo atributno vrstico (ob podvojenih ključih velja prva)
+    linije, konec, koordinate = konci_linij(line_geo.geometry.to_numpy())
+    prve = ~kljuci_vej.duplicated().to_numpy()
+    veja = pd.Index(kljuci_vej[prve]).get_indexer(kljuci_linij[linije])
+    izbrana = veja >= 0
+    linije, konec, koordinate = linije[izbrana], konec[izbrana], koordinate[izbrana]
+    veja = np.flatnonzero(prve)[veja[izbrana]]
+
+    # pripenjanje vseh krajišč hkrati
+    if drevo is None:
+        drevo = shapely.STRtree(point_geo.geometry.to_numpy())
+    tocke = shapely.points(koordinate)
+    # vsa vozlišča v toleranci (hitreje kot query_nearest), nato najbližje za vsako krajišče
+    krajisca, najdena = drevo.query(tocke, predicate='dwithin', distance=toleranca)
+    razdalje = shapely.distance(tocke[krajisca], drevo.geometries[najdena])
+    vrstni_red = np.lexsort((razdalje, krajisca))
+    prvi = vrstni_red[np.concatenate([[True], np.diff(krajisca[vrstni_red]) != 0])] if len(vrstni_red) else vrstni_red
+    krajisca, najdena, razdalje = krajisca[prvi], najdena[prvi], razdalje[prvi]
+    vozlisce = np.full(len(tocke), None, dtype=object)
+    vozlisce[krajisca] = kljuci_vozlisc[najdena]
+    razdalja = np.full(len(tocke), np.nan)
+    razdalja[krajisca] = razdalje
+
+    # smer linije: obrnjena, če se začetek ujema z Node2 ali konec z Node1 (in ne obratno)
+    n1, n2 = vozlisce1[veja], vozlisce2[veja]
+    brez = pd.isna(vozlisce)
+    ujema1 = ~brez & np.asarray(vozlisce == n1, dtype=bool)
+    ujema2 = ~brez & np.asarray(vozlisce == n2, dtype=bool)
+    zacetek = konec == 1
+    naprej = np.zeros(len(line_geo), dtype=bool)
+    nazaj = np.zeros(len(line_geo), dtype=bool)
+    np.logical_or.at(naprej, linije, np.where(zacetek, ujema1, ujema2))
+    np.logical_or.at(nazaj, linije, np.where(zacetek, ujema2, ujema1))
+    obrnjena = nazaj[linije] & ~naprej[linije]
+    pricakovano = np.where(zacetek != obrnjena, n1, n2)
+
+    napacno = ~brez & np.asarray(vozlisce != pricakovano, dtype=bool)
+    neskladje = np.where(brez, 'konec_brez_vozlisca', np.where(napacno, 'napacno_vozlisce', ''))
+    izbrani = neskladje != ''
+    neskladja = gpd.GeoDataFrame({'veja': kljuci_linij[linije[izbrani]], 'konec': konec[izbrani],
+                                  'vozlisce': vozlisce[izbrani], 'pricakovano_vozlisce': pricakovano[izbrani],
+                                  'razdalja': razdalja[izbrani], 'neskladje': neskladje[izbrani]},
+                                 geometry=tocke[izbrani], crs=line_geo.crs)
+    return neskladja
+
+
+def povzetek_povezljivosti(neskladja):
+    """Število neskladij po vrsti neskladja."""
+    return neskladja.groupby('neskladje').agg(krajisca=('veja', 'size'), veje=('veja', 'nunique')).reset_index()
+
+
+def zapisi_neskladja(neskladja, pot_gpkg):
+    """Zapiše neskladja kot plast g2x_povezljivost v GPKG datoteko (s prostorskim indeksom) in doda indeks po veji."""
+    neskladja.to_file(pot_gpkg, layer=IME_PLASTI, driver='GPKG', encoding='utf-8')
+    with sqlite3.connect(pot_gpkg) as conn:
+        conn.execute(f'create index if not exists g2x_povezljivost_index on {IME_PLASTI}(veja)')
+
+
+def preveri_povezljivost_gpkg(pot_gpkg, toleranca=TOLERANCA, stolpci=None, zapisi=True):
+    """Preveri geometrijsko povezljivost modela v GPKG datoteki (glej preveri_povezljivost).
+
+    Args:
+        pot_gpkg (str): pot do GPKG datoteke
+        toleranca (float, optional): največja razdalja med krajiščem in vozliščem. Defaults to TOLERANCA.
+        stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+        zapisi (bool, optional): neskladja zapiši kot plast g2x_povezljivost. Defaults to True.
+
+    Returns:
+        geopandas.GeoDataFrame: neskladja.
+    """
+    gpkg = GredosGPKG2df(pot_gpkg)
+    point_geo, drevo = gpkg.prostorski_indeks('POINT_geo', epsg_set=None)
+    line_geo = gpkg.preberi_geografsko_tabelo_iz_gpkg('LINE_geo', epsg_set=None)
+    neskladja = preveri_povezljivost(line_geo, point_geo, gpkg.nalozi_negeografsko_tabelo('Branch'), toleranca, stolpci, drevo)
+    if zapisi:
+        zapisi_neskladja(neskladja, pot_gpkg)
+    return neskladja
@@ -0,0 +1,464 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Predpomnilnik rezultatov izvoza (GPKG datoteke in parquet imeniki), naslovljen z vsebino vhodnih datotek.
+
+Ključ rezultata je SHA-256 vsebine vhodnih datotek (mdb, materiali, shp datoteke), vrste izvoza, nastavitev, ki vplivajo na izhod
+(pretvori_crs, set_crs, zdruzene_plasti, ..., pri parquet še particije in kompresija) in različice gredos2x. Ponovljen izvoz istih
+datotek z enakimi nastavitvami (tudi iz drugega imenika ali drugega opravila) se namesto z izvozom postreže s kopijo ali trdo povezavo
+shranjenega rezultata. Velikost predpomnilnika je omejena, ob preseganju se brišejo najdlje neuporabljeni rezultati (LRU).
+
+Zgoščene vrednosti datotek se hranijo v zgoscene.json glede na pot, velikost in čas spremembe, tako da se nespremenjene datoteke
+ne berejo ponovno. Ob vsakem zadetku se preveri, da shranjen rezultat ni bil spremenjen (npr. prek trde povezave), sicer se zavrže.
+
+Primer:
+    predpomnilnik = PredpomnilnikRezultatov(najvecja_velikost_mb=20000)
+    izvoz = Gredos2GPKG('model.mdb', 'material_2000_v10.mdb', 'izvoz.gpkg')
+    izvoz.pozeni_uvoz_s_predpomnilnikom(predpomnilnik, show_progress=True, pretvori_crs=True)
+
+Predpomnilnik materialov (PredpomnilnikMaterialov) hrani prebrano tabelo MATERIAL iz datoteke materialov (material_2000_v10.mdb), ki
+je enaka za vse modele na računalniku. Tabela se shrani kot pickle, naslovljen z zgoščeno vrednostjo datoteke materialov, in se deli
+med izvozi v istem procesu (v pomnilniku) in med procesi (na disku), tako da se mdb-export za materiale požene le ob prvem izvozu.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import gredos2x
+from gredos2x import gredos_vir
+from gredos2x.gredos_meritve import BREZ_MERITEV
+
+_dnevnik = logging.getLogger('gredos2x.predpomnilnik')
+
+IMENIK_GREDOS2X = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'gredos2x')
+PRIVZETI_IMENIK = os.path.join(IMENIK_GREDOS2X, 'rezultati')
+PRIVZETI_IMENIK_MATERIALOV = os.path.join(IMENIK_GREDOS2X, 'materiali')
+PRIVZETA_VELIKOST_MB = 10 * 1024
+
+# parametri pozeni_uvoz, ki ne vplivajo na vsebino izhoda
+NEVPLIVNE_NASTAVITVE = ['show_progress', 'velikost_dela', 'omejitev_pomnilnika_mb', 'imenik_profilov', 'niti']
+
+# atributi izvoza, ki vplivajo na vsebino izhoda
+NASTAVITVE_IZVOZA = {'Gredos2Parquet': ['particije', 'datum_modela', 'kompresija', 'velikost_skupine_vrstic', 'kodiraj_kljuce']}
+
+_VELIKOST_BLOKA = 1 << 20
+# nedokončani izvozi (npr. prekinjen proces) se pobrišejo po enem dnevu
+_STAROST_ZACASNIH_S = 24 * 3600
+
+
+def zgosti_datoteko(pot):
+    """Vrne SHA-256 vsebine datoteke (hex)."""
+    zgoscena = hashlib.sha256()
+    with open(pot, 'rb') as f:
+        for blok in iter(lambda: f.read(_VELIKOST_BLOKA), b''):
+            zgoscena.update(blok)
+    return zgoscena.hexdigest()
+
+
+def _stanje(pot):
+    """Velikost in čas spremembe datoteke ali vseh datotek v imeniku (relativna pot -> [velikost, mtime_ns])."""
+    if os.path.isfile(pot):
+        stat = os.stat(pot)
+        return {'.': [stat.st_size, stat.st_mtime_ns]}
+    stanje = {}
+    for koren, _, datoteke in os.walk(pot):
+        for datoteka in datoteke:
+            stat = os.stat(os.path.join(koren, datoteka))
+            stanje[os.path.relpath(os.path.join(koren, datoteka), pot)] = [stat.st_size, stat.st_mtime_ns]
+    return stanje
+
+
+def _kljuc_opisa(opis):
+    return hashlib.sha256(json.dumps(opis, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class PredpomnilnikRezultatov:
+    """
+        Predpomnilnik rezultatov izvoza v lokalnem imeniku. Vsak rezultat je v svojem imeniku <ključ[:2]>/<ključ> z izhodom
+        (izhod.gpkg ali imenik izhod) in opisom meta.json; čas spremembe meta.json je čas zadnje uporabe.
+
+        Args:
+            imenik (str, optional): imenik predpomnilnika. Defaults to None (~/.cache/gredos2x/rezultati oz. $XDG_CACHE_HOME/gredos2x/rezultati).
+            najvecja_velikost_mb (float, optional): največja skupna velikost rezultatov v MB. Defaults to 10240.
+            trde_povezave (bool, optional): rezultat postreži s trdo povezavo namesto s kopijo (kjer je mogoče). Izhod je tedaj
+                treba obravnavati kot datoteko samo za branje; spremenjen rezultat se ob naslednjem zadetku zavrže. Defaults to False.
+    """
+    def __init__(self, imenik=None, najvecja_velikost_mb=PRIVZETA_VELIKOST_MB, trde_povezave=False):
+        self.imenik = os.path.abspath(imenik or PRIVZETI_IMENIK)
+        self.najvecja_velikost_mb = najvecja_velikost_mb
+        self.trde_povezave = trde_povezave
+        self.zadetki = 0
+        self.zgresitve = 0
+        self._zgoscene = None
+
+    # --- ključ ---
+
+    def _zgoscena(self, pot):
+        """Zgoščena vrednost datoteke; ponovno se izračuna le, če sta se velikost ali čas spremembe spremenila."""
+        if self._zgoscene is None:
+            try:
+                with open(os.path.join(self.imenik, 'zgoscene.json'), encoding='utf-8') as f:
+                    self._zgoscene = json.load(f)
+            except (OSError, ValueError):
+                self._zgoscene = {}
+        pot = os.path.abspath(pot)
+        stat = os.stat(pot)
+        shranjena = self._zgoscene.get(pot)
+        if shranjena is not None and shranjena[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return shranjena[2]
+        zgoscena = zgosti_datoteko(pot)
+        self._zgoscene[pot] = [stat.st_size, stat.st_mtime_ns, zgoscena]
+        return zgoscena
+
+    def _shrani_zgoscene(self):
+        os.makedirs(self.imenik, exist_ok=True)
+        pot = os.path.join(self.imenik, 'zgoscene.json')
+        zacasna = f'{pot}.{os.getpid()}.tmp'
+        with open(zacasna, 'w', encoding='utf-8') as f:
+            json.dump(self._zgoscene, f)
+        os.replace(zacasna, pot)
+
+    def opis(self, izvoz, nastavitve):
+        """Opis izvoza, iz katerega se izračuna ključ: vsebina vhodnih datotek, vrsta izvoza in nastavitve, ki vplivajo na izhod.
+
+        Args:
+            izvoz: razred izvoza (Gredos2GPKG ali Gredos2Parquet)
+            nastavitve (dict): parametri pozeni_uvoz
+
+        Returns:
+            dict: opis izvoza.
+        """
+        for pot in [izvoz.mdb_povezava, izvoz.pot_materiali]:
+            if not os.path.exists(pot):
+                raise FileNotFoundError(f"Datoteka {pot} ne obstaja.")
+        datoteke = gredos_vir.vhodne_datoteke_modela(izvoz.mdb_povezava, izvoz.pot_materiali)
+        # ime mdb datoteke in imenika ne vplivata na izhod, imena shp datotek (in datotek paketa) pa določajo plasti in tabele
+        vloge = {izvoz.mdb_povezava: 'mdb', izvoz.pot_materiali: 'materiali'}
+        vhodi = {vloge.get(pot, os.path.basename(pot)): self._zgoscena(pot) for pot in datoteke}
+        self._shrani_zgoscene()
+
+        privzete = {ime: parameter.default for ime, parameter in inspect.signature(izvoz.pozeni_uvoz).parameters.items()
+                    if parameter.default is not inspect.Parameter.empty}
+        vrsta = type(izvoz).__name__
+        return {
+            'gredos2x': gredos2x.__version__,
+            'izvoz': vrsta,
+            'vhodi': vhodi,
+            'nastavitve': {k: v for k, v in {**privzete, **nastavitve}.items() if k not in NEVPLIVNE_NASTAVITVE},
+            'nastavitve_izvoza': {atribut: getattr(izvoz, atribut) for atribut in NASTAVITVE_IZVOZA.get(vrsta, [])},
+        }
+
+    def kljuc(self, izvoz, nastavitve):
+        """Ključ rezultata (SHA-256 opisa izvoza, glej opis)."""
+        return _kljuc_opisa(self.opis(izvoz, nastavitve))
+
+    # --- vnosi ---
+
+    def _imenik_vnosa(self, kljuc):
+        return os.path.join(self.imenik, kljuc[:2], kljuc)
+
+    def _vnosi(self):
+        """Vrne seznam (čas zadnje uporabe, velikost, imenik vnosa) vseh shranjenih rezultatov."""
+        vnosi = []
+        if not os.path.isdir(self.imenik):
+            return vnosi
+        for predpona in os.listdir(self.imenik):
+            imenik_predpone = os.path.join(self.imenik, predpona)
+            if len(predpona) != 2 or not os.path.isdir(imenik_predpone):
+                continue
+            for kljuc in os.listdir(imenik_predpone):
+                pot_opisa = os.path.join(imenik_predpone, kljuc, 'meta.json')
+                try:
+                    with open(pot_opisa, encoding='utf-8') as f:
+                        velikost = json.load(f)['velikost']
+                    vnosi.append((os.stat(pot_opisa).st_mtime, velikost, os.path.dirname(pot_opisa)))
+                except (OSError, ValueError, KeyError):
+                    continue
+        return vnosi
+
+    def velikost(self):
+        """Skupna velikost shranjenih rezultatov v bajtih."""
+        return sum(velikost for _, velikost, _ in self._vnosi())
+
+    def poisci(self, kljuc):
+        """Vrne opis shranjenega rezultata ali None. Rezultat, ki je bil po shranjevanju spremenjen, se zavrže.
+
+        Args:
+            kljuc (str): ključ rezultata (glej kljuc)
+
+        Returns:
+            dict: meta.json rezultata ali None.
+        """
+        imenik_vnosa = self._imenik_vnosa(kljuc)
+        try:
+            with open(os.path.join(imenik_vnosa, 'meta.json'), encoding='utf-8') as f:
+                vnos = json.load(f)
+            nespremenjen = _stanje(os.path.join(imenik_vnosa, vnos['izhod'])) == vnos['stanje']
+        except (OSError, ValueError, KeyError):
+            return None
+        if not nespremenjen:
+            _dnevnik.warning('Rezultat %s v predpomnilniku je bil spremenjen in bo zavržen.', kljuc)
+            shutil.rmtree(imenik_vnosa, ignore_errors=True)
+            return None
+        return vnos
+
+    def shrani(self, kljuc, imenik_izvoza, ime_izhoda, rezultat, opis=None):
+        """Shrani izhod izvoza (premakne začasni imenik izvoza v predpomnilnik). Najdlje neuporabljenih rezultatov ne briše (glej pocisti).
+
+        Args:
+            kljuc (str): ključ rezultata
+            imenik_izvoza (str): začasni imenik z izhodom izvoza (v imeniku predpomnilnika)
+            ime_izhoda (str): ime izhoda v imeniku (izhod.gpkg ali izhod)
+            rezultat: rezultat pozeni_uvoz (JSON)
+            opis (dict, optional): opis izvoza (glej opis). Defaults to None.
+
+        Returns:
+            dict: meta.json rezultata.
+        """
+        stanje = _stanje(os.path.join(imenik_izvoza, ime_izhoda))
+        vnos = {'kljuc': kljuc, 'izhod': ime_izhoda, 'rezultat': rezultat, 'velikost': sum(v[0] for v in stanje.values()),
+                'stanje': stanje, 'ustvarjeno': datetime.now().isoformat(timespec='seconds'), 'opis': opis}
+        with open(os.path.join(imenik_izvoza, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(vnos, f, indent=2, ensure_ascii=False, default=str)
+        imenik_vnosa = self._imenik_vnosa(kljuc)
+        os.makedirs(os.path.dirname(imenik_vnosa), exist_ok=True)
+        try:
+            os.rename(imenik_izvoza, imenik_vnosa)
+        except OSError:
+            # enak rezultat je medtem shranil drug proces
+            shutil.rmtree(imenik_izvoza, ignore_errors=True)
+        return vnos
+
+    def pocisti(self, najvecja_velikost_mb=None):
+        """Pobriše najdlje neuporabljene rezultate, dokler skupna velikost ne pade pod omejitev, in stare nedokončane izvoze.
+
+        Args:
+            najvecja_velikost_mb (float, optional): omejitev velikosti v MB. Defaults to None (self.najvecja_velikost_mb).
+
+        Returns:
+            int: število pobrisanih rezultatov.
+        """
+        meja = (self.najvecja_velikost_mb if najvecja_velikost_mb is None else najvecja_velikost_mb) * 2**20
+        vnosi = sorted(self._vnosi())
+        skupaj = sum(velikost for _, velikost, _ in vnosi)
+        pobrisani = 0
+        for _, velikost, imenik_vnosa in vnosi:
+            if skupaj <= meja:
+                break
+            shutil.rmtree(imenik_vnosa, ignore_errors=True)
+            skupaj -= velikost
+            pobrisani += 1
+
+        imenik_zacasnih = os.path.join(self.imenik, 'zacasno')
+        if os.path.isdir(imenik_zacasnih):
+            for ime in os.listdir(imenik_zacasnih):
+                pot = os.path.join(imenik_zacasnih, ime)
+                if time.time() - os.path.getmtime(pot) > _STAROST_ZACASNIH_S:
+                    shutil.rmtree(pot, ignore_errors=True)
+        return pobrisani
+
+    # --- izvoz ---
+
+    def _povezi_ali_kopiraj(self, vir, cilj):
+        if self.trde_povezave:
+            try:
+                os.link(vir, cilj)
+                return cilj
+            except OSError:
+                # npr. drug datotečni sistem
+                pass
+        return shutil.copy2(vir, cilj)
+
+    def obnovi(self, kljuc, vnos, izvoz):
+        """Postreže shranjen rezultat v izhod izvoza (GPKG datoteko oz. parquet imenik) in osveži čas zadnje uporabe.
+
+        Args:
+            kljuc (str): ključ rezultata
+            vnos (dict): opis rezultata (glej poisci)
+            izvoz: razred izvoza (Gredos2GPKG ali Gredos2Parquet)
+        """
+        imenik_vnosa = self._imenik_vnosa(kljuc)
+        vir = os.path.join(imenik_vnosa, vnos['izhod'])
+        if hasattr(izvoz, 'imenik_parquet'):
+            os.makedirs(izvoz.imenik_parquet, exist_ok=True)
+            izvoz.prenesi_v_izhod(vir, izvoz.imenik_parquet,
+                                  prenos=lambda v, c: shutil.copytree(v, c, copy_function=self._povezi_ali_kopiraj))
+        else:
+            os.makedirs(os.path.dirname(izvoz.gpkg_path), exist_ok=True)
+            zacasna = f'{izvoz.gpkg_path}.{os.getpid()}.tmp'
+            self._povezi_ali_kopiraj(vir, zacasna)
+            os.replace(zacasna, izvoz.gpkg_path)
+        os.utime(os.path.join(imenik_vnosa, 'meta.json'))
+
+    @contextmanager
+    def _izhod_v(self, izvoz, imenik_izvoza):
+        """Začasno preusmeri izhod izvoza v imenik predpomnilnika in vrne ime izhoda v njem."""
+        if hasattr(izvoz, 'imenik_parquet'):
+            atribut, ime_izhoda = 'imenik_parquet', 'izhod'
+            os.makedirs(os.path.join(imenik_izvoza, ime_izhoda))
+        else:
+            atribut, ime_izhoda = 'gpkg_path', 'izhod.gpkg'
+        izhod = getattr(izvoz, atribut)
+        setattr(izvoz, atribut, os.path.join(imenik_izvoza, ime_izhoda))
+        try:
+            yield ime_izhoda
+        finally:
+            setattr(izvoz, atribut, izhod)
+
+    def pozeni_uvoz(self, izvoz, **nastavitve):
+        """Postreže rezultat iz predpomnilnika ali izvede izvoz (izvoz.pozeni_uvoz) in rezultat shrani.
+
+        Args:
+            izvoz: razred izvoza (Gredos2GPKG ali Gredos2Parquet)
+            **nastavitve: parametri pozeni_uvoz (npr. pretvori_crs=True, set_crs='EPSG:3794')
+
+        Returns:
+            rezultat pozeni_uvoz (shranjen ali nov).
+        """
+        with izvoz.merilnik.faza('predpomnilnik') as meritev:
+            opis = self.opis(izvoz, nastavitve)
+            kljuc = _kljuc_opisa(opis)
+            vnos = self.poisci(kljuc)
+            if vnos is not None:
+                try:
+                    self.obnovi(kljuc, vnos, izvoz)
+                    meritev.dodaj(bajti=vnos['velikost'])
+                except FileNotFoundError:
+                    # rezultat je medtem pobrisal drug proces
+                    vnos = None
+            meritev.oznake.update(kljuc=kljuc[:12], zadetek=vnos is not None)
+
+        if vnos is not None:
+            self.zadetki += 1
+            if nastavitve.get('show_progress'):
+                print(f"Rezultat izvoza je v predpomnilniku ({kljuc[:12]}), izvoz ni potreben.")
+            return vnos['rezultat']
+
+        self.zgresitve += 1
+        imenik_izvoza = os.path.join(self.imenik, 'zacasno', f'{kljuc}.{os.getpid()}.{uuid.uuid4().hex[:8]}')
+        os.makedirs(imenik_izvoza)
+        try:
+            with self._izhod_v(izvoz, imenik_izvoza) as ime_izhoda:
+                rezultat = izvoz.pozeni_uvoz(**nastavitve)
+        except BaseException:
+            shutil.rmtree(imenik_izvoza, ignore_errors=True)
+            raise
+        vnos = self.shrani(kljuc, imenik_izvoza, ime_izhoda, rezultat, opis)
+        self.obnovi(kljuc, vnos, izvoz)
+        self.pocisti()
+        return rezultat
+
+
+class PredpomnilnikMaterialov:
+    """
+        Predpomnilnik prebrane tabele MATERIAL. Ključ je SHA-256 datoteke materialov in različica gredos2x; tabela se hrani kot
+        <imenik>/<ključ>.pkl (deljeno med procesi) in v pomnilniku procesa (deljeno med vsemi predpomnilniki materialov v procesu).
+        Spremenjena datoteka materialov dobi nov ključ, zato se prebere ponovno.
+
+        Args:
+            imenik (str, optional): imenik predpomnilnika. Defaults to None (~/.cache/gredos2x/materiali oz. $XDG_CACHE_HOME/gredos2x/materiali).
+    """
+    # ključ -> tabela, skupno vsem predpomnilnikom materialov v procesu
+    _tabele = {}
+    # (pot, velikost, mtime_ns) -> SHA-256
+    _zgoscene = {}
+    _kljucavnica = threading.Lock()
+
+    def __init__(self, imenik=None):
+        self.imenik = os.path.abspath(imenik or PRIVZETI_IMENIK_MATERIALOV)
+        self.zadetki = 0
+        self.zgresitve = 0
+
+    def kljuc(self, pot_materiali):
+        """Ključ tabele materialov (SHA-256 vsebine datoteke in različica gredos2x)."""
+        pot = os.path.abspath(pot_materiali)
+        if os.path.isdir(pot):
+            # paket izvoženih tabel: ključ je odvisen samo od datoteke tabele MATERIAL
+            pot = os.path.join(pot, gredos_vir.poisci_tabelo_paketa(pot, 'MATERIAL'))
+        stat = os.stat(pot)
+        stanje = (pot, stat.st_size, stat.st_mtime_ns)
+        zgoscena = self._zgoscene.get(stanje)
+        if zgoscena is None:
+            zgoscena = self._zgoscene[stanje] = zgosti_datoteko(pot)
+        return hashlib.sha256(f'{zgoscena}:{gredos2x.__version__}'.encode('utf-8')).hexdigest()
+
+    def _pot(self, kljuc):
+        return os.path.join(self.imenik, f'{kljuc}.pkl')
+
+    def _preberi_z_diska(self, kljuc):
+        try:
+            with open(self._pot(kljuc), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            _dnevnik.warning('Tabele materialov %s v predpomnilniku ni mogoče prebrati (%s), prebrala se bo ponovno.', kljuc[:12], e)
+            return None
+
+    def _shrani_na_disk(self, kljuc, tabela):
+        try:
+            os.makedirs(self.imenik, exist_ok=True)
+            zacasna = f'{self._pot(kljuc)}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp'
+            with open(zacasna, 'wb') as f:
+                pickle.dump(tabela, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(zacasna, self._pot(kljuc))
+        except OSError as e:
+            # npr. imenik samo za branje; tabela ostane v pomnilniku procesa
+            _dnevnik.warning('Tabele materialov ni mogoče shraniti v predpomnilnik %s (%s).', self.imenik, e)
+
+    def preberi(self, pot_materiali, merilnik=None):
+        """Vrne tabelo MATERIAL iz predpomnilnika ali jo prebere iz datoteke materialov (glej gredos_vir.preberi_tabelo_mdb) in shrani.
+
+        Args:
+            pot_materiali (str): pot do datoteke materialov
+            merilnik (gredos_meritve.Merilnik, optional): branje se objavi kot faza 'branje' (z oznako predpomnilnik). Defaults to None.
+
+        Returns:
+            pandas.DataFrame: kopija tabele MATERIAL.
+        """
+        merilnik = merilnik if merilnik is not None else BREZ_MERITEV
+        if not os.path.exists(pot_materiali):
+            raise FileNotFoundError(f"Datoteka {pot_materiali} ne obstaja.")
+        kljuc = self.kljuc(pot_materiali)
+        with self._kljucavnica:
+            tabela = self._tabele.get(kljuc)
+            with merilnik.faza('branje', tabela='MATERIAL', predpomnilnik='pomnilnik' if tabela is not None else 'disk') as meritev:
+                if tabela is None:
+                    tabela = self._preberi_z_diska(kljuc)
+                if tabela is None:
+                    # zgrešitev: branje iz datoteke materialov objavi svojo fazo
+                    meritev.zavrzi()
+                else:
+                    meritev.dodaj(tabela)
+            if tabela is None:
+                self.zgresitve += 1
+                tabela = gredos_vir.preberi_tabelo_mdb(pot_materiali, 'MATERIAL', merilnik=merilnik)
+                self._shrani_na_disk(kljuc, tabela)
+            else:
+                self.zadetki += 1
+            self._tabele[kljuc] = tabela
+        return tabela.copy()
@@ -0,0 +1,384 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Preprost izračun pretoka moči za radialna omrežja (backward/forward sweep) nad GPKG datoteko, ki jo ustvari Gredos2GPKG.
+
+Namenjen je hitremu preverjanju izvoza (konvergenca, napetosti, obremenitve vej), ne nadomešča pa celovitih simulatorjev.
+Vsi izvodi se računajo hkrati po nivojih drevesa z numpy operacijami, po želji pa tudi vzporedno v več procesih.
+"""
+
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+from gredos2x.gredos_gpkg2dataframes import GredosGPKG2df
+from gredos2x.gredos_shema import najdi_stolpec, kljuc_kot_niz
+from gredos2x.gredos_parametri import odjemi_vozlisc, napajalna_vozlisca
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+np = leni_modul('numpy')
+pd = leni_modul('pandas')
+
+
+def uredi_drevo(st_vozlisc, od, do, koreni):
+    """Uredi radialno omrežje v drevesa z iskanjem v širino, ki hkrati teče iz vseh napajalnih vozlišč.
+
+    Args:
+        st_vozlisc (int): število vozlišč
+        od (numpy.ndarray): indeksi začetnih vozlišč vej
+        do (numpy.ndarray): indeksi končnih vozlišč vej
+        koreni (numpy.ndarray): indeksi napajalnih vozlišč
+
+    Returns:
+        tuple: (stars, veja_starsa, nivo, koren) - za vsako vozlišče indeks nadrejenega vozlišča, indeks veje do njega,
+        globina v drevesu in indeks napajalnega vozlišča. Nenapajana vozlišča imajo vrednost -1.
+    """
+    st_vej = len(od)
+    a = np.concatenate([od, do])
+    b = np.concatenate([do, od])
+    e = np.concatenate([np.arange(st_vej), np.arange(st_vej)])
+    red = np.argsort(a, kind='stable')
+    b, e = b[red], e[red]
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(a, minlength=st_vozlisc))])
+
+    stars = np.full(st_vozlisc, -1)
+    veja_starsa = np.full(st_vozlisc, -1)
+    nivo = np.full(st_vozlisc, -1)
+    koren = np.full(st_vozlisc, -1)
+    koreni = np.unique(koreni)
+    nivo[koreni] = 0
+    koren[koreni] = koreni
+
+    meja = koreni
+    globina = 0
+    while meja.size:
+        globina += 1
+        zacetki = indptr[meja]
+        dolzine = indptr[meja + 1] - zacetki
+        pozicije = np.repeat(zacetki - np.cumsum(dolzine) + dolzine, dolzine) + np.arange(dolzine.sum())
+        sosedi, veje, starsi = b[pozicije], e[pozicije], np.repeat(meja, dolzine)
+
+        nova = nivo[sosedi] < 0
+        sosedi, veje, starsi = sosedi[nova], veje[nova], starsi[nova]
+        # vozlišče, dosegljivo iz več vozlišč istega nivoja, je zanka - obdržimo prvo povezavo
+        sosedi, prvi = np.unique(sosedi, return_index=True)
+        stars[sosedi] = starsi[prvi]
+        veja_starsa[sosedi] = veje[prvi]
+        nivo[sosedi] = globina
+        koren[sosedi] = koren[starsi[prvi]]
+        meja = sosedi
+
+    return stars, veja_starsa, nivo, koren
+
+
+def backward_forward_sweep(stars, nivo, z, s, y, u0, max_iteracij=50, toleranca=1e-6):
+    """Izračun napetosti in tokov v radialnem omrežju (vse v relativnih vrednostih).
+
+    Args:
+        stars (numpy.ndarray): indeks nadrejenega vozlišča (-1 za napajalna vozlišča)
+        nivo (numpy.ndarray): globina vozlišča v drevesu (0 za napajalna vozlišča)
+        z (numpy.ndarray): impedanca veje od nadrejenega vozlišča do vozlišča
+        s (numpy.ndarray): odjem moči v vozlišču (konstantna moč)
+        y (numpy.ndarray): prečna admitanca v vozlišču
+        u0 (complex): napetost napajalnih vozlišč (in začetna napetost ostalih vozlišč)
+        max_iteracij (int, optional): Največje število iteracij. Defaults to 50.
+        toleranca (float, optional): Največja sprememba napetosti za konvergenco. Defaults to 1e-6.
+
+    Returns:
+        tuple: (napetosti, tokovi vej do vozlišč, število iteracij, zadnja sprememba napetosti po vozliščih)
+    """
+    n = len(stars)
+    red = np.argsort(nivo, kind='stable')
+    meje = np.searchsorted(nivo[red], np.arange(nivo.max() + 2 if n else 1))
+    nivoji = [red[meje[i]:meje[i + 1]] for i in range(len(meje) - 1)]
+
+    u = np.full(n, u0, dtype=complex)
+    tok = np.zeros(n, dtype=complex)
+    sprememba = np.zeros(n)
+    iteracija = 0
+    for iteracija in range(1, max_iteracij + 1):
+        # backward: tokovi vej se seštevajo od listov proti napajanju
+        tok = np.conj(s / u) + y * u
+        for k in reversed(nivoji[1:]):
+            np.add.at(tok, stars[k], tok[k])
+        # forward: padci napetosti od napajanja proti listom
+        nova = u.copy()
+        for k in nivoji[1:]:
+            nova[k] = nova[stars[k]] - z[k] * tok[k]
+        sprememba = np.abs(nova - u)
+        u = nova
+        if n == 0 or sprememba.max() < toleranca:
+            break
+    return u, tok, iteracija, sprememba
+
+
+def _resi_skupino(podatki):
+    """Izračun ene skupine izvodov v ločenem procesu."""
+    return backward_forward_sweep(*podatki)
+
+
+class RadialniPretokMoci:
+    """
+        RadialniPretokMoci izračuna pretok moči na radialnem SN omrežju iz GPKG datoteke (Gredos2GPKG) z metodo backward/forward sweep.
+        Impedance vej se vzamejo iz tabele Branch_parametri (glej GredosGPKG2df.nalozi_parametre_vej) in tabele Transformer, odjemi pa
+        iz tabel Node oziroma LNode. Odprta stikala (Switching_device) se izločijo iz omrežja.
+
+        Izvodi se napajajo iz vozlišč z vrednostjo Generation različno od 0 ali iz podanega seznama napajalnih vozlišč.
+
+        Enote: napetosti v kV, moči odjemov v kW (faktor_moci), Sn transformatorjev v MVA, uk v %, Pcu v kW.
+
+        Args:
+            povezava_gpkg (str): pot do GPKG datoteke
+            napajalna_vozlisca (list, optional): seznam NodeId napajalnih vozlišč. Defaults to None.
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+            s_base (float, optional): bazna moč v MVA. Defaults to 1.0.
+            un_privzeto (float, optional): nazivna napetost v kV za vozlišča brez podatka. Defaults to 20.0.
+            faktor_moci (float, optional): pretvorba moči odjemov v MW. Defaults to 0.001 (kW).
+            u_napajanja (float, optional): relativna napetost napajalnih vozlišč. Defaults to 1.0.
+            pregled_vsebine (bool, optional): izpis poteka izračuna. Defaults to False.
+    """
+    def __init__(self, povezava_gpkg, napajalna_vozlisca=None, stolpci=None, s_base=1.0, un_privzeto=20.0,
+                 faktor_moci=0.001, u_napajanja=1.0, pregled_vsebine=False):
+        self.gpkg_povezava = povezava_gpkg
+        self.napajalna_vozlisca = napajalna_vozlisca
+        self.stolpci = stolpci
+        self.s_base = s_base
+        self.un_privzeto = un_privzeto
+        self.faktor_moci = faktor_moci
+        self.u_napajanja = u_napajanja
+        self.debug = pregled_vsebine
+        self.model = None
+        self.rezultati = None
+
+    def pripravi_model(self):
+        """Prebere tabele iz GPKG datoteke in pripravi numpy polja za izračun (vozlišča, veje, impedance, odjemi, drevo).
+
+        Returns:
+            dict: model omrežja v obliki numpy polj.
+        """
+        rd = GredosGPKG2df(self.gpkg_povezava)
+        node = rd.nalozi_negeografsko_tabelo('Node')
+        branch = rd.nalozi_negeografsko_tabelo('Branch')
+        lnode = rd.nalozi_negeografsko_tabelo('LNode') if rd.tabela_obstaja('LNode') else None
+        parametri = rd.nalozi_parametre_vej(stolpci=self.stolpci) if rd.tabela_obstaja('Section') else None
+
+        # vozlišča
+        vozlisca = pd.Index(kljuc_kot_niz(node[najdi_stolpec(node, 'Node', 'id', self.stolpci)]))
+        un = najdi_stolpec(node, 'Node', 'un', self.stolpci, obvezen=False)
+        un = pd.to_numeric(node[un], errors='coerce').to_numpy(dtype=float) if un else np.full(len(node), np.nan)
+        un = np.where(np.isfinite(un) & (un > 0), un, self.un_privzeto)
+        s = odjemi_vozlisc(node, lnode, self.stolpci, self.faktor_moci) / self.s_base
+
+        # veje brez odprtih stikal
+        veje = kljuc_kot_niz(branch[najdi_stolpec(branch, 'Branch', 'id', self.stolpci)])
+        od_vse = vozlisca.get_indexer(kljuc_kot_niz(branch[najdi_stolpec(branch, 'Branch', 'vozlisce1', self.stolpci)]))
+        do_vse = vozlisca.get_indexer(kljuc_kot_niz(branch[najdi_stolpec(branch, 'Branch', 'vozlisce2', self.stolpci)]))
+        vklopljena = (od_vse >= 0) & (do_vse >= 0)
+        if rd.tabela_obstaja('Switching_device'):
+            stikala = rd.nalozi_negeografsko_tabelo('Switching_device')
+            stanje = najdi_stolpec(stikala, 'Switching_device', 'stanje', self.stolpci, obvezen=False)
+            if stanje is not None:
+                odprta = kljuc_kot_niz(stikala.loc[pd.to_numeric(stikala[stanje], errors='coerce') == 0,
+                                                   najdi_stolpec(stikala, 'Switching_device', 'veja', self.stolpci)])
+                vklopljena &= ~veje.isin(odprta).to_numpy()
+
+        # impedance vej v relativnih vrednostih; veje brez podatkov (npr. zbiralke) imajo impedanco 0
+        z_baza = un[np.clip(od_vse, 0, None)] ** 2 / self.s_base
+        r = np.zeros(len(branch))
+        x = np.zeros(len(branch))
+        b = np.zeros(len(branch))
+        imax = np.full(len(branch), np.nan)
+        if parametri is not None:
+            parametri = parametri.set_index(kljuc_kot_niz(parametri[parametri.columns[0]]))
+            parametri = parametri[~parametri.index.duplicated()].reindex(veje)
+            r = parametri['R_ohm'].fillna(0).to_numpy(dtype=float) / z_baza
+            x = parametri['X_ohm'].fillna(0).to_numpy(dtype=float) / z_baza
+            b = parametri['B_uS'].fillna(0).to_numpy(dtype=float) * 1e-6 * z_baza
+            imax = parametri['Imax_A'].to_numpy(dtype=float)
+        if rd.tabela_obstaja('Transformer'):
+            r, x = self._impedance_transformatorjev(rd.nalozi_negeografsko_tabelo('Transformer'), veje, r, x)
+
+        od, do = od_vse[vklopljena], do_vse[vklopljena]
+        koreni = napajalna_vozlisca(node, self.stolpci, self.napajalna_vozlisca)
+        stars, veja_starsa, nivo, koren = uredi_drevo(len(vozlisca), od, do, koreni)
+        indeksi_vej = np.flatnonzero(vklopljena)
+        veja_starsa = np.where(veja_starsa >= 0, indeksi_vej[np.clip(veja_starsa, 0, None)], -1)
+
+        napajano = nivo >= 0
+        st_zank = int((napajano[od] & napajano[do]).sum() - (napajano.sum() - len(np.unique(koreni))))
+        if self.debug:
+            print(f"Model: {len(vozlisca)} vozlišč, {len(veje)} vej, {len(np.unique(koreni))} napajalnih vozlišč, "
+                  f"{int((~napajano).sum())} nenapajanih vozlišč, {max(st_zank, 0)} zank (odprte veje).")
+
+        self.model = {
+            'vozlisca': vozlisca, 'veje': veje, 'un': un, 's': s,
+            'od': np.where(vklopljena, od_vse, -1), 'do': np.where(vklopljena, do_vse, -1),
+            'z': r + 1j * x, 'b': b, 'imax': imax,
+            'stars': stars, 'veja_starsa': veja_starsa, 'nivo': nivo, 'koren': koren,
+        }
+        return self.model
+
+    def _impedance_transformatorjev(self, transformer, veje, r, x):
+        """Vejam, ki so transformatorji, nastavi impedance iz uk, Sn in Pcu (relativno na s_base)."""
+        kljuc = kljuc_kot_niz(transformer[najdi_stolpec(transformer, 'Transformer', 'veja', self.stolpci)])
+        pozicije = pd.Index(veje).get_indexer(kljuc)
+        najden = pozicije >= 0
+
+        def vrednost(vloga):
+            ime = najdi_stolpec(transformer, 'Transformer', vloga, self.stolpci, obvezen=False)
+            if ime is None:
+                return np.full(len(transformer), np.nan)
+            return pd.to_numeric(transformer[ime], errors='coerce').to_numpy(dtype=float)
+
+        sn, uk, pcu = vrednost('sn'), vrednost('uk'), vrednost('pcu')
+        veljaven = najden & np.isfinite(sn) & (sn > 0) & np.isfinite(uk)
+        z_tr = uk / 100 * self.s_base / sn
+        r_tr = np.where(np.isfinite(pcu), pcu / 1000 / sn, 0) * self.s_base / sn
+        x_tr = np.sqrt(np.clip(z_tr ** 2 - r_tr ** 2, 0, None))
+
+        r, x = r.copy(), x.copy()
+        r[pozicije[veljaven]] = r_tr[veljaven]
+        x[pozicije[veljaven]] = x_tr[veljaven]
+        return r, x
+
+    def izracunaj(self, max_iteracij=50, toleranca=1e-6, vzporedno=False, st_procesov=None):
+        """Izračuna pretok moči za vse izvode.
+
+        Args:
+            max_iteracij (int, optional): Največje število iteracij. Defaults to 50.
+            toleranca (float, optional): Kriterij konvergence (sprememba napetosti v p.u.). Defaults to 1e-6.
+            vzporedno (bool, optional): Izvode razdeli med več procesov. Defaults to False.
+            st_procesov (int, optional): Število procesov pri vzporednem izračunu. Defaults to None (število jeder).
+
+        Returns:
+            dict: tabele 'vozlisca', 'veje' in 'izvodi' (pandas.DataFrame).
+        """
+        if self.model is None:
+            self.pripravi_model()
+        m = self.model
+        zacetek = time.perf_counter()
+
+        # impedanca in prečna admitanca veje do nadrejenega vozlišča, polovica admitance veje na vsakem koncu
+        napajano = np.flatnonzero(m['nivo'] >= 0)
+        veja = m['veja_starsa']
+        z = np.where(veja >= 0, m['z'][np.clip(veja, 0, None)], 0)
+        y_veje = np.where(veja >= 0, 1j * m['b'][np.clip(veja, 0, None)], 0)
+        y = y_veje / 2
+        np.add.at(y, m['stars'][veja >= 0], y_veje[veja >= 0] / 2)
+
+        koreni = np.unique(m['koren'][napajano])
+        if vzporedno and len(koreni) > 1:
+            skupine = np.array_split(koreni, min(len(koreni), st_procesov or os.cpu_count() or 1))
+        else:
+            skupine = [koreni]
+
+        naloge = []
+        for skupina in skupine:
+            lokalna = napajano[np.isin(m['koren'][napajano], skupina)]
+            preslikava = np.full(len(m['stars']), -1)
+            preslikava[lokalna] = np.arange(len(lokalna))
+            stars = np.where(m['stars'][lokalna] >= 0, preslikava[np.clip(m['stars'][lokalna], 0, None)], -1)
+            naloge.append((lokalna, (stars, m['nivo'][lokalna], z[lokalna], m['s'][lokalna], y[lokalna],
+                                     complex(self.u_napajanja), max_iteracij, toleranca)))
+
+        if vzporedno and len(naloge) > 1:
+            with ProcessPoolExecutor(max_workers=st_procesov) as izvajalec:
+                izidi = list(izvajalec.map(_resi_skupino, [podatki for _, podatki in naloge]))
+        else:
+            izidi = [_resi_skupino(podatki) for _, podatki in naloge]
+
+        n = len(m['stars'])
+        u = np.full(n, np.nan, dtype=complex)
+        tok = np.full(n, np.nan, dtype=complex)
+        sprememba = np.full(n, np.nan)
+        iteracije = np.zeros(n, dtype=int)
+        for (lokalna, _), (u_l, tok_l, it_l, spr_l) in zip(naloge, izidi):
+            u[lokalna], tok[lokalna], sprememba[lokalna], iteracije[lokalna] = u_l, tok_l, spr_l, it_l
+
+        self.rezultati = self._sestavi_rezultate(u, tok, sprememba, iteracije, toleranca)
+        if self.debug:
+            print(f"Pretok moči izračunan v {time.perf_counter() - zacetek:.3f} s za {len(koreni)} izvodov.")
+        return self.rezultati
+
+    def _sestavi_rezultate(self, u, tok, sprememba, iteracije, toleranca):
+        """Pretvori relativne vrednosti v tabele rezultatov po vozliščih, vejah in izvodih."""
+        m = self.model
+        vozlisca = m['vozlisca']
+        koren = m['koren']
+        izvod = np.where(koren >= 0, np.asarray(vozlisca)[np.clip(koren, 0, None)], None)
+
+        rez_vozlisca = pd.DataFrame({
+            'NodeId': np.asarray(vozlisca),
+            'Izvod': izvod,
+            'Nivo': m['nivo'],
+            'U_pu': np.abs(u),
+            'U_kV': np.abs(u) * m['un'],
+            'Kot_deg': np.degrees(np.angle(u)),
+            'P_MW': m['s'].real * self.s_base,
+            'Q_MVAr': m['s'].imag * self.s_base,
+        })
+
+        # tok veje v A na strani nadrejenega vozlišča
+        otroci = np.flatnonzero(m['veja_starsa'] >= 0)
+        veje_otrok = m['veja_starsa'][otroci]
+        starsi = m['stars'][otroci]
+        tok_a = np.abs(tok[otroci]) * self.s_base / (np.sqrt(3) * m['un'][starsi]) * 1000
+        moc = u[starsi] * np.conj(tok[otroci]) * self.s_base
+        izgube = np.abs(tok[otroci]) ** 2 * m['z'][veje_otrok].real * self.s_base
+
+        rez_veje = pd.DataFrame({'BranchId': np.asarray(m['veje'])})
+        rez_veje['Izvod'] = None
+        rez_veje['I_A'] = np.nan
+        rez_veje['P_MW'] = np.nan
+        rez_veje['Q_MVAr'] = np.nan
+        rez_veje['Izgube_kW'] = np.nan
+        rez_veje.loc[veje_otrok, 'Izvod'] = izvod[otroci]
+        rez_veje.loc[veje_otrok, 'I_A'] = tok_a
+        rez_veje.loc[veje_otrok, 'P_MW'] = moc.real
+        rez_veje.loc[veje_otrok, 'Q_MVAr'] = moc.imag
+        rez_veje.loc[veje_otrok, 'Izgube_kW'] = izgube * 1000
+        rez_veje['Imax_A'] = m['imax']
+        rez_veje['Obremenitev_pct'] = rez_veje['I_A'] / rez_veje['Imax_A'] * 100
+
+        napajano = rez_vozlisca['Izvod'].notna()
+        po_izvodih = pd.DataFrame({
+            'Izvod': izvod[napajano],
+            'U_pu': np.abs(u[napajano]),
+            'Sprememba': sprememba[napajano],
+            'Iteracije': iteracije[napajano],
+        }).groupby('Izvod')
+        rez_izvodi = po_izvodih.agg(Vozlisca=('U_pu', 'size'), U_min_pu=('U_pu', 'min'),
+                                    Iteracije=('Iteracije', 'max'), Sprememba=('Sprememba', 'max')).reset_index()
+        rez_izvodi['Konvergiran'] = rez_izvodi['Sprememba'] < toleranca
+        izgube_izvodov = rez_veje.groupby('Izvod')['Izgube_kW'].sum()
+        rez_izvodi['Izgube_kW'] = rez_izvodi['Izvod'].map(izgube_izvodov).fillna(0).to_numpy()
+        obremenitve = rez_veje.groupby('Izvod')['Obremenitev_pct'].max()
+        rez_izvodi['Obremenitev_max_pct'] = rez_izvodi['Izvod'].map(obremenitve).to_numpy()
+
+        return {'vozlisca': rez_vozlisca, 'veje': rez_veje, 'izvodi': rez_izvodi}
+
+    def shrani_rezultate(self):
+        """Zapiše rezultate zadnjega izračuna v GPKG datoteko kot tabele 'LF_vozlisca', 'LF_veje' in 'LF_izvodi' (z indeksi)."""
+        if self.rezultati is None:
+            self.izracunaj()
+        with sqlite3.connect(self.gpkg_povezava) as conn:
+            for ime, kljuc in [('vozlisca', 'NodeId'), ('veje', 'BranchId'), ('izvodi', 'Izvod')]:
+                tabela = f'LF_{ime}'
+                self.rezultati[ime].to_sql(tabela, conn, if_exists='replace', index=False)
+                conn.execute(f'create index if not exists {tabela.lower()}_index on {tabela}("{kljuc}")')
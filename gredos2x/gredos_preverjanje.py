@@ -0,0 +1,345 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Preverjanje referenčne celovitosti izvoženega modela Gredos.
+
+Pokvarjene reference (npr. Node.LNodeId brez LNode ali Branch.Node1/Node2, ki ne kaže na nobeno vozlišče) povzročijo, da se
+pretvorjen model v simulatorjih ne naloži. Preverjanje prebere le stolpce s ključi (brez ostalih atributov in geometrij) in vse
+relacije preveri z množicami ključev (pandas Index, zgoščene tabele), zato traja le nekaj sekund tudi za državni model:
+
+    - tuji_kljuc: vrednost tujega ključa (glej TUJI_KLJUCI), ki je ni v ciljni tabeli,
+    - podvojen_kljuc: ključ, ki se v tabeli ponovi (glej ENOLICNI_KLJUCI),
+    - brez_geometrije: atributna vrstica (Node, Branch, LNode), ki nima geometrije v geografski plasti,
+    - geometrija_brez_atributov: geometrija v plasti, ki nima atributne vrstice.
+
+Poročilo ima eno vrstico na problematičen ključ. Preverjanje se izvede ob koncu pozeni_uvoz (preveri_celovitost=True) in zapiše v
+tabelo g2x_celovitost ali samostojno nad GPKG datoteko:
+
+    print(preveri_celovitost_gpkg('izvoz.gpkg'))
+    python -m gredos2x.gredos_preverjanje izvoz.gpkg
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+
+from gredos2x.gredos_shema import GEOGRAFSKE_PLASTI, najdi_stolpec, kljuc_kot_niz
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+pd = leni_modul('pandas')
+sa = leni_modul('sqlalchemy')
+ds = leni_modul('pyarrow.dataset')
+
+IME_TABELE = 'g2x_celovitost'
+
+# tuji ključi: (tabela, vloga stolpca, ciljna tabela, vloga ključa v ciljni tabeli), glej gredos_shema.STOLPCI
+TUJI_KLJUCI = [
+    ('Node', 'lnode', 'LNode', 'id'),
+    ('Branch', 'vozlisce1', 'Node', 'id'),
+    ('Branch', 'vozlisce2', 'Node', 'id'),
+    ('Branch', 'izvod', 'Branch', 'id'),
+    ('Section', 'veja', 'Branch', 'id'),
+    ('Section', 'material', 'MATERIAL', 'id'),
+    ('Transformer', 'veja', 'Branch', 'id'),
+    ('Switching_device', 'veja', 'Branch', 'id'),
+]
+
+# tabele, v katerih mora biti ključ (vloga 'id') enoličen
+ENOLICNI_KLJUCI = ['LNode', 'Node', 'Branch', 'MATERIAL'] + GEOGRAFSKE_PLASTI
+
+# atributna tabela -> geografska plast z geometrijami njenih vrstic
+GEOMETRIJE = {'Node': 'POINT_geo', 'Branch': 'LINE_geo', 'LNode': 'LNODE_geo'}
+
+# možna imena stolpca z geometrijo v izhodih (GPKG, GeoParquet, PostGIS, MS SQL)
+STOLPCI_GEOMETRIJE = ['geom', 'geometry', 'Shape', 'geom_wkb']
+
+# stolpec, ki ga bralniki ključev dodajo geografskim plastem: True, če ima vrstica geometrijo
+IMA_GEOMETRIJO = '_ima_geometrijo'
+
+STOLPCI_POROCILA = ['preverjanje', 'tabela', 'stolpec', 'kljuc', 'ciljna_tabela', 'vrstice']
+
+
+def potrebne_vloge():
+    """Vrne vloge stolpcev, ki jih preverjanje potrebuje, po tabelah (npr. {'Node': ['id', 'lnode'], ...})."""
+    vloge = {tabela: ['id'] for tabela in ENOLICNI_KLJUCI}
+    for tabela, vloga, ciljna, ciljna_vloga in TUJI_KLJUCI:
+        for ime, v in [(tabela, vloga), (ciljna, ciljna_vloga)]:
+            if v not in vloge.setdefault(ime, []):
+                vloge[ime].append(v)
+    return vloge
+
+
+def _izberi_stolpce(imena, tabela, vloge, stolpci=None):
+    """Imena stolpcev tabele (iz seznama imen), ki ustrezajo vlogam. Manjkajoče vloge se preskočijo."""
+    prazna = pd.DataFrame(columns=imena)
+    izbrani = [najdi_stolpec(prazna, tabela, vloga, stolpci, obvezen=False) for vloga in vloge]
+    return list(dict.fromkeys(s for s in izbrani if s is not None))
+
+
+def _stolpec_geometrije(imena):
+    """Ime stolpca z geometrijo izmed imen stolpcev ali None."""
+    mala = {str(s).lower(): s for s in imena}
+    for kandidat in STOLPCI_GEOMETRIJE:
+        if kandidat.lower() in mala:
+            return mala[kandidat.lower()]
+    return None
+
+
+def _kljuci(df, tabela, vloga, stolpci=None):
+    """Vrne (ime stolpca, ključi kot tekst brez praznih vrednosti) ali (None, None), če stolpca ni."""
+    ime = najdi_stolpec(df, tabela, vloga, stolpci, obvezen=False)
+    if ime is None:
+        return None, None
+    kljuci = kljuc_kot_niz(df[ime])
+    return ime, kljuci[kljuci.notna() & (kljuci != '')]
+
+
+def _porocilo(preverjanje, tabela, stolpec, kljuci, ciljna_tabela=None):
+    """Vrstice poročila za problematične ključe (en zapis na ključ s številom vrstic)."""
+    if kljuci is None or kljuci.empty:
+        return None
+    prestete = kljuci.value_counts(sort=False)
+    return pd.DataFrame({'preverjanje': preverjanje, 'tabela': tabela, 'stolpec': stolpec, 'kljuc': prestete.index.astype(str),
+                         'ciljna_tabela': ciljna_tabela, 'vrstice': prestete.to_numpy()})
+
+
+def preveri_celovitost(tabele, stolpci=None):
+    """Preveri tuje ključe, enoličnost ključev in ujemanje atributnih vrstic z geometrijami.
+
+    Args:
+        tabele (dict): ime tabele -> pandas.DataFrame (ali GeoDataFrame); zadoščajo stolpci s ključi (glej preberi_kljuce_gpkg).
+            Manjkajoče tabele in stolpci se preskočijo.
+        stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+    Returns:
+        pandas.DataFrame: poročilo s stolpci preverjanje, tabela, stolpec, kljuc, ciljna_tabela in vrstice (prazno, če je model celovit).
+    """
+    deli = []
+    normalizirani = {}
+    mnozice = {}
+
+    def kljuci(tabela, vloga):
+        # vsak stolpec se v tekst pretvori le enkrat, tudi če nastopa v več relacijah
+        if (tabela, vloga) not in normalizirani:
+            normalizirani[tabela, vloga] = _kljuci(tabele[tabela], tabela, vloga, stolpci)
+        return normalizirani[tabela, vloga]
+
+    def mnozica(tabela):
+        # zgoščena množica ključev tabele, izračunana enkrat za vse relacije
+        if tabela not in mnozice:
+            _, vrednosti = kljuci(tabela, 'id')
+            mnozice[tabela] = None if vrednosti is None else pd.Index(vrednosti.unique())
+        return mnozice[tabela]
+
+    for tabela in ENOLICNI_KLJUCI:
+        if tabela in tabele:
+            ime, vrednosti = kljuci(tabela, 'id')
+            if vrednosti is not None:
+                deli.append(_porocilo('podvojen_kljuc', tabela, ime, vrednosti[vrednosti.duplicated(keep=False)]))
+
+    for tabela, vloga, ciljna, _ in TUJI_KLJUCI:
+        if tabela not in tabele or ciljna not in tabele or mnozica(ciljna) is None:
+            continue
+        ime, vrednosti = kljuci(tabela, vloga)
+        if vrednosti is not None:
+            deli.append(_porocilo('tuji_kljuc', tabela, ime, vrednosti[~vrednosti.isin(mnozica(ciljna))], ciljna))
+
+    for tabela, plast in GEOMETRIJE.items():
+        if tabela not in tabele or plast not in tabele or mnozica(tabela) is None:
+            continue
+        geo = tabele[plast]
+        ime_plasti, kljuci_plasti = kljuci(plast, 'id')
+        if kljuci_plasti is None:
+            continue
+        if IMA_GEOMETRIJO in geo.columns:
+            ima_geometrijo = geo[IMA_GEOMETRIJO].astype(bool)
+        elif hasattr(geo, 'geometry'):
+            ima_geometrijo = geo.geometry.notna() & ~geo.geometry.is_empty
+        else:
+            ima_geometrijo = pd.Series(True, index=geo.index)
+        z_geometrijo = pd.Index(kljuci_plasti[ima_geometrijo.reindex(kljuci_plasti.index)].unique())
+        ime, vrednosti = kljuci(tabela, 'id')
+        deli.append(_porocilo('brez_geometrije', tabela, ime, vrednosti[~vrednosti.isin(z_geometrijo)], plast))
+        deli.append(_porocilo('geometrija_brez_atributov', plast, ime_plasti, kljuci_plasti[~kljuci_plasti.isin(mnozica(tabela))], tabela))
+
+    deli = [d for d in deli if d is not None]
+    if not deli:
+        return pd.DataFrame(columns=STOLPCI_POROCILA).astype({'vrstice': 'int64'})
+    return pd.concat(deli, ignore_index=True)
+
+
+def povzetek_celovitosti(porocilo):
+    """Povzetek poročila: število problematičnih ključev in vrstic po preverjanju, tabeli in stolpcu.
+
+    Args:
+        porocilo (pandas.DataFrame): poročilo preveri_celovitost
+
+    Returns:
+        pandas.DataFrame: preverjanje, tabela, stolpec, ciljna_tabela, kljuci, vrstice.
+    """
+    return (porocilo.groupby(['preverjanje', 'tabela', 'stolpec', 'ciljna_tabela'], dropna=False, sort=True)
+            .agg(kljuci=('kljuc', 'size'), vrstice=('vrstice', 'sum')).reset_index())
+
+
+def preberi_kljuce_gpkg(pot_gpkg, stolpci=None):
+    """Iz GPKG datoteke prebere le stolpce s ključi, ki jih potrebuje preveri_celovitost, geografskim plastem pa namesto geometrij
+    doda stolpec _ima_geometrijo.
+
+    Args:
+        pot_gpkg (str): pot do GPKG datoteke
+        stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+    Returns:
+        dict: ime tabele -> pandas.DataFrame s stolpci ključev (le tabele, ki obstajajo).
+    """
+    if not os.path.exists(pot_gpkg):
+        raise FileNotFoundError(f"Datoteka {pot_gpkg} ne obstaja.")
+    tabele = {}
+    with sqlite3.connect(pot_gpkg) as povezava:
+        try:
+            geometrije = dict(povezava.execute('SELECT table_name, column_name FROM gpkg_geometry_columns').fetchall())
+        except sqlite3.OperationalError:
+            geometrije = {}
+        for tabela, vloge in potrebne_vloge().items():
+            imena = [vrstica[1] for vrstica in povezava.execute(f'PRAGMA table_info("{tabela}")')]
+            izbrani = _izberi_stolpce(imena, tabela, vloge, stolpci)
+            if not izbrani:
+                continue
+            izrazi = [f'"{s}"' for s in izbrani]
+            if tabela in geometrije:
+                izrazi.append(f'"{geometrije[tabela]}" IS NOT NULL AS {IMA_GEOMETRIJO}')
+            tabele[tabela] = pd.read_sql_query(f'SELECT {", ".join(izrazi)} FROM "{tabela}"', povezava)
+    return tabele
+
+
+def _preberi_kljuce_parquet(imenik, filtri=None, stolpci=None):
+    """Kot preberi_kljuce_gpkg, le za parquet imenik izvoza Gredos2Parquet (vsaka tabela v svojem imeniku s hive particijami)."""
+    tabele = {}
+    for tabela, vloge in potrebne_vloge().items():
+        pot = os.path.join(imenik, tabela)
+        if not os.path.isdir(pot):
+            continue
+        podatki = ds.dataset(pot, format='parquet', partitioning='hive')
+        izbrani = _izberi_stolpce(podatki.schema.names, tabela, vloge, stolpci)
+        if not izbrani:
+            continue
+        geometrija = _stolpec_geometrije(podatki.schema.names) if tabela in GEOGRAFSKE_PLASTI else None
+        filter_ = None
+        for stolpec, _, vrednost in filtri or []:
+            pogoj = ds.field(stolpec) == vrednost
+            filter_ = pogoj if filter_ is None else filter_ & pogoj
+        df = podatki.to_table(columns=izbrani + ([geometrija] if geometrija else []), filter=filter_).to_pandas()
+        if geometrija:
+            df[IMA_GEOMETRIJO] = df.pop(geometrija).notna()
+        tabele[tabela] = df
+    return tabele
+
+
+def _preberi_kljuce_sql(engine, shema=None, predpona='', stolpci=None):
+    """Kot preberi_kljuce_gpkg, le za tabele izvoza v PostGIS ali MS SQL bazo (sqlalchemy)."""
+    pregled = sa.inspect(engine)
+    obstojece = set(pregled.get_table_names(schema=shema))
+    tabele = {}
+    for tabela, vloge in potrebne_vloge().items():
+        ime = f'{predpona}{tabela}'
+        if ime not in obstojece:
+            continue
+        imena = [s['name'] for s in pregled.get_columns(ime, schema=shema)]
+        izbrani = _izberi_stolpce(imena, tabela, vloge, stolpci)
+        if not izbrani:
+            continue
+        izrazi = [sa.column(s) for s in izbrani]
+        geometrija = _stolpec_geometrije(imena) if tabela in GEOGRAFSKE_PLASTI else None
+        if geometrija:
+            izrazi.append(sa.case((sa.column(geometrija).isnot(None), 1), else_=0).label(IMA_GEOMETRIJO))
+        tabele[tabela] = pd.read_sql_query(sa.select(*izrazi).select_from(sa.table(ime, schema=shema)), engine)
+    return tabele
+
+
+def preberi_kljuce(izvoz, stolpci=None):
+    """Prebere stolpce s ključi iz izhoda izvoza (GPKG, parquet imenik ali shema baze).
+
+    Args:
+        izvoz: razred izvoza (Gredos2GPKG, Gredos2PGSQL, Gredos2MSSQL ali Gredos2Parquet)
+        stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+    Returns:
+        dict: ime tabele -> pandas.DataFrame s stolpci ključev.
+    """
+    if hasattr(izvoz, 'imenik_parquet'):
+        from gredos2x.gredos2parquet import STOLPCI_PARTICIJ
+        filtri = [(STOLPCI_PARTICIJ['datum'], '=', izvoz.datum_modela)] if 'datum' in izvoz.particije else None
+        return _preberi_kljuce_parquet(izvoz.imenik_parquet, filtri, stolpci)
+    if hasattr(izvoz, 'gpkg_path'):
+        return preberi_kljuce_gpkg(izvoz.gpkg_path, stolpci)
+    if hasattr(izvoz, 'mssql_engine'):
+        return _preberi_kljuce_sql(izvoz.mssql_engine, izvoz.ime_sheme, izvoz.table_prefix, stolpci)
+    return _preberi_kljuce_sql(izvoz.pgsql_engine, izvoz.ime_sheme, stolpci=stolpci)
+
+
+def preveri_celovitost_gpkg(pot_gpkg, stolpci=None):
+    """Preveri referenčno celovitost modela v GPKG datoteki (glej preveri_celovitost).
+
+    Args:
+        pot_gpkg (str): pot do GPKG datoteke
+        stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+    Returns:
+        pandas.DataFrame: poročilo o problematičnih ključih.
+    """
+    return preveri_celovitost(preberi_kljuce_gpkg(pot_gpkg, stolpci), stolpci)
+
+
+def preveri_celovitost_izvoza(izvoz, stolpci=None):
+    """Preveri referenčno celovitost modela v izhodu izvoza (glej preberi_kljuce in preveri_celovitost).
+
+    Args:
+        izvoz: razred izvoza
+        stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+    Returns:
+        pandas.DataFrame: poročilo o problematičnih ključih.
+    """
+    return preveri_celovitost(preberi_kljuce(izvoz, stolpci), stolpci)
+
+
+def izpisi_povzetek(porocilo):
+    """Izpiše povzetek poročila v terminal."""
+    if porocilo.empty:
+        print("Celovitost modela: ni pokvarjenih referenc, podvojenih ključev ali vrstic brez geometrije.")
+        return
+    print(f"Celovitost modela: {len(porocilo)} problematičnih ključev v {int(porocilo['vrstice'].sum())} vrsticah.")
+    print(povzetek_celovitosti(porocilo).to_string(index=False))
+
+
+def main(argv=None):
+    """Ukaz za preverjanje celovitosti GPKG datoteke. Izhodna koda je 1, če poročilo ni prazno."""
+    parser = argparse.ArgumentParser(description='Preverjanje referenčne celovitosti modela Gredos v GPKG datoteki.')
+    parser.add_argument('gpkg', help='GPKG datoteka izvoza')
+    parser.add_argument('--porocilo', default=None, help='CSV datoteka s poročilom (en zapis na problematičen ključ)')
+    args = parser.parse_args(argv)
+
+    porocilo = preveri_celovitost_gpkg(args.gpkg)
+    izpisi_povzetek(porocilo)
+    if args.porocilo:
+        porocilo.to_csv(args.porocilo, index=False)
+    return 1 if len(porocilo) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,409 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Razlike med dvema izvozoma modela Gredos (npr. GPKG za dva datuma modela ali dve shemi v bazi).
+
+Tabeli se bereta po delih, urejeni po naravnem ključu (glej gredos_shema.NARAVNI_KLJUCI), in se primerjata z zlivanjem: obdela se le
+okno ključev, ki sta ga prebrala oba vira, ostanek pa počaka na naslednji del. Poraba pomnilnika je tako omejena z velikostjo dela
+(velikost_dela vrstic na vir), ne z velikostjo modela. Vrstice z istim ključem se najprej primerjajo po zgoščeni vrednosti
+(glej gredos_zgodovina.zgosti_vrstice), po stolpcih pa le vrstice z različno zgoščeno vrednostjo. Geometrija je spremenjena, če je
+Hausdorffova razdalja med staro in novo geometrijo večja od tolerance (premik v enotah koordinatnega sistema).
+
+Indeks na stolpcu s ključem (npr. CREATE INDEX ... ON Node(NodeId)) ni obvezen, pospeši pa branje, saj baza vrstic ne ureja sama.
+
+Primer:
+    razlike = primerjaj_modela('izvoz/26_1_2026.gpkg', 'izvoz/26_2_2026.gpkg', toleranca=0.05)
+    print(povzetek_razlik(razlike))
+    python -m gredos2x.gredos_razlike 26_1_2026.gpkg 26_2_2026.gpkg --porocilo razlike.csv
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+from contextlib import closing
+
+from gredos2x.gredos_shema import NARAVNI_KLJUCI, najdi_stolpec, kljuc_kot_niz
+from gredos2x.gredos_gpkg2dataframes import gpkg_blob_v_wkb
+from gredos2x.gredos_zgodovina import zgosti_vrstice, _SISTEMSKE_PREDPONE
+from gredos2x.gredos_preverjanje import _stolpec_geometrije
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+np = leni_modul('numpy')
+pd = leni_modul('pandas')
+sa = leni_modul('sqlalchemy')
+shapely = leni_modul('shapely')
+
+# privzeta toleranca premika geometrije (v enotah koordinatnega sistema, za D96/TM metri)
+TOLERANCA = 0.01
+
+# število vrstic, ki se naenkrat prebere iz vsakega vira
+VELIKOST_DELA = 100000
+
+# ime stolpca geometrije v poročilu
+GEOMETRIJA = 'geometrija'
+
+STOLPCI_RAZLIK = ['tabela', 'kljuc', 'sprememba', 'stolpci', 'premik']
+
+# pomožna stolpca delov tabel
+_KLJUC, _GEOMETRIJA = 'g2x_kljuc', 'g2x_geometrija'
+
+
+def _ime(ime):
+    return '"' + str(ime).replace('"', '""') + '"'
+
+
+def _stolpec_kljuca(imena, tabela, stolpci=None):
+    """Ime stolpca z naravnim ključem tabele ali None."""
+    if tabela not in NARAVNI_KLJUCI:
+        return None
+    return najdi_stolpec(pd.DataFrame(columns=imena), tabela, NARAVNI_KLJUCI[tabela], stolpci, obvezen=False)
+
+
+class _VirGPKG:
+    """Branje tabel modela iz GPKG datoteke (sqlite3). Geometrije ostanejo GPKG bloki, v WKB se pretvorijo le različne (glej wkb)."""
+    def __init__(self, pot_gpkg):
+        if not os.path.exists(pot_gpkg):
+            raise FileNotFoundError(f"Datoteka {pot_gpkg} ne obstaja.")
+        self.pot_gpkg = pot_gpkg
+
+    def tabele(self):
+        """Ime tabele -> (imena stolpcev, tipi stolpcev, stolpec geometrije)."""
+        with closing(sqlite3.connect(self.pot_gpkg)) as povezava:
+            try:
+                geometrije = dict(povezava.execute('SELECT table_name, column_name FROM gpkg_geometry_columns').fetchall())
+            except sqlite3.OperationalError:
+                geometrije = {}
+            tabele = {}
+            for (ime,) in povezava.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+                if ime.lower().startswith(_SISTEMSKE_PREDPONE):
+                    continue
+                info = [(v[1], (v[2] or '').upper()) for v in povezava.execute(f'PRAGMA table_info({_ime(ime)})')]
+                # fid je zaporedna številka vrstice v GPKG in ni del modela
+                info = [(s, t) for s, t in info if not (ime in geometrije and s == 'fid')]
+                tabele[ime] = ([s for s, _ in info], dict(info), geometrije.get(ime))
+        return tabele
+
+    def beri(self, tabela, opis, kljuc, velikost_dela):
+        """Deli tabele (pandas.DataFrame), urejeni po ključu kot tekstu. Brez ključa se prebere cela tabela v enem delu."""
+        imena, tipi, geometrija = opis
+        red = ''
+        if kljuc is not None:
+            tip = tipi.get(kljuc, '')
+            izraz = _ime(kljuc)
+            if any(t in tip for t in ('REAL', 'FLOA', 'DOUB')):
+                izraz = f'CAST(CAST({izraz} AS INTEGER) AS TEXT)'
+            elif 'INT' in tip:
+                izraz = f'CAST({izraz} AS TEXT)'
+            red = f' ORDER BY {izraz}'
+        with closing(sqlite3.connect(self.pot_gpkg)) as povezava:
+            kazalec = povezava.execute(f'SELECT {", ".join(_ime(s) for s in imena)} FROM {_ime(tabela)}{red}')
+            while True:
+                vrstice = kazalec.fetchmany(velikost_dela) if kljuc is not None else kazalec.fetchall()
+                if not vrstice:
+                    return
+                yield pd.DataFrame.from_records(vrstice, columns=imena)
+                if kljuc is None:
+                    return
+
+    @staticmethod
+    def wkb(geometrije):
+        return [gpkg_blob_v_wkb(blob) for blob in geometrije]
+
+
+class _VirSQL:
+    """Branje tabel izvoza iz PostGIS ali MS SQL baze (sqlalchemy), geometrije se preberejo kot WKB."""
+    def __init__(self, engine, shema=None, predpona=''):
+        self.engine = engine
+        self.shema = shema
+        self.predpona = predpona
+
+    def tabele(self):
+        pregled = sa.inspect(self.engine)
+        tabele = {}
+        for ime in pregled.get_table_names(schema=self.shema):
+            if not ime.startswith(self.predpona) or ime[len(self.predpona):].lower().startswith(_SISTEMSKE_PREDPONE):
+                continue
+            stolpci = pregled.get_columns(ime, schema=self.shema)
+            imena = [s['name'] for s in stolpci]
+            tabele[ime[len(self.predpona):]] = (imena, {s['name']: s['type'] for s in stolpci}, _stolpec_geometrije(imena))
+        return tabele
+
+    def beri(self, tabela, opis, kljuc, velikost_dela):
+        imena, tipi, geometrija = opis
+        narecje = self.engine.dialect.name
+        izrazi = []
+        for ime in imena:
+            if ime == geometrija and narecje == 'postgresql':
+                izrazi.append(sa.func.ST_AsBinary(sa.column(ime)).label(ime))
+            elif ime == geometrija and narecje == 'mssql':
+                izrazi.append(sa.literal_column(f'[{ime}].STAsBinary()').label(ime))
+            else:
+                izrazi.append(sa.column(ime))
+        poizvedba = sa.select(*izrazi).select_from(sa.table(f'{self.predpona}{tabela}', schema=self.shema))
+        if kljuc is not None:
+            izraz = sa.column(kljuc)
+            if isinstance(tipi[kljuc], sa.Float):
+                izraz = sa.cast(sa.cast(izraz, sa.BigInteger), sa.String(50))
+            elif not isinstance(tipi[kljuc], sa.String):
+                izraz = sa.cast(izraz, sa.String(50))
+            # urejanje po kodnih točkah, kot primerja Python
+            zbirka = {'postgresql': 'C', 'mssql': 'Latin1_General_BIN2'}.get(narecje)
+            izraz = izraz.collate(zbirka) if zbirka else izraz
+            # prazni ključi so na začetku, kot v SQLite in MS SQL
+            poizvedba = poizvedba.order_by(izraz.nulls_first() if narecje == 'postgresql' else izraz)
+        with self.engine.connect() as povezava:
+            povezava = povezava.execution_options(stream_results=True)
+            deli = pd.read_sql_query(poizvedba, povezava, chunksize=velikost_dela) if kljuc is not None else [pd.read_sql_query(poizvedba, povezava)]
+            yield from deli
+
+    @staticmethod
+    def wkb(geometrije):
+        return [bytes(v) if v is not None else None for v in geometrije]
+
+
+def _vir(izvoz):
+    """Vir tabel za pot do GPKG datoteke ali razred izvoza (Gredos2GPKG, Gredos2PGSQL, Gredos2MSSQL)."""
+    if isinstance(izvoz, (str, os.PathLike)):
+        return _VirGPKG(os.fspath(izvoz))
+    if hasattr(izvoz, 'gpkg_path'):
+        return _VirGPKG(izvoz.gpkg_path)
+    if hasattr(izvoz, 'mssql_engine'):
+        return _VirSQL(izvoz.mssql_engine, izvoz.ime_sheme, izvoz.table_prefix)
+    if hasattr(izvoz, 'pgsql_engine'):
+        return _VirSQL(izvoz.pgsql_engine, izvoz.ime_sheme)
+    raise TypeError(f"Primerjava izvoza {type(izvoz).__name__} ni podprta (GPKG datoteka ali izvoz v PostGIS/MS SQL).")
+
+
+def _pripravi(df, tabela, kljuc, geometrija, prejsnji):
+    """Doda deli normaliziran ključ, preimenuje stolpec geometrije v skupno ime in preveri urejenost ključev."""
+    if geometrija is not None:
+        df = df.rename(columns={geometrija: _GEOMETRIJA})
+    if kljuc is None:
+        # tabela brez znanega ključa: vrstica je določena z vsebino
+        zgoscene = zgosti_vrstice(df.drop(columns=_GEOMETRIJA, errors='ignore'))
+        df[_KLJUC] = pd.Series(zgoscene.view(np.uint64), index=df.index).map('{:016x}'.format)
+        return df.sort_values(_KLJUC, kind='stable', ignore_index=True)
+    df[_KLJUC] = kljuc_kot_niz(df[kljuc]).fillna('').astype(object).to_numpy()
+    kljuci = pd.Index(([prejsnji] if prejsnji is not None else []) + df[_KLJUC].tolist())
+    if not kljuci.is_monotonic_increasing:
+        raise ValueError(f"Ključi tabele {tabela} (stolpec {kljuc}) niso urejeni kot tekst; vrednosti ključev naj bodo zapisane enotno.")
+    return df
+
+
+def _zdruzi(prej, df):
+    """Stakne ostanek prejšnjih delov in nov del istega vira (isti stolpci) brez preverjanja tipov, ki ga izvede pandas.concat."""
+    if not len(prej):
+        return df
+    return pd.DataFrame({s: np.concatenate([prej[s].to_numpy(), df[s].to_numpy()]) for s in df.columns})
+
+
+def _sestavi(tabela, kljuci, sprememba, stolpci='', premik=None):
+    return pd.DataFrame({'tabela': tabela, 'kljuc': kljuci, 'sprememba': sprememba, 'stolpci': stolpci,
+                         'premik': np.nan if premik is None else premik})
+
+
+def _primerjaj_okno(tabela, a, b, viri, toleranca, vrednosti):
+    """Primerja vrstice starega (a) in novega (b) dela z istimi ključi in vrne vrstice poročila."""
+    stolpci_a = [s for s in a.columns if s not in (_KLJUC, _GEOMETRIJA)]
+    stolpci_b = [s for s in b.columns if s not in (_KLJUC, _GEOMETRIJA)]
+    za, zb = zgosti_vrstice(a[stolpci_a]), zgosti_vrstice(b[stolpci_b])
+
+    # enake vrstice (ključ in zgoščena vrednost) se združijo v pare, ponovljeni ključi (npr. odseki veje) v vrstnem redu
+    kljuci_a, kljuci_b = a[_KLJUC].to_numpy(), b[_KLJUC].to_numpy()
+    kode = pd.factorize(np.concatenate([kljuci_a, kljuci_b]))[0]
+    ka, kb = kode[:len(a)], kode[len(a):]
+
+    def indeks(*stolpci):
+        okvir = pd.DataFrame({f's{i}': s for i, s in enumerate(stolpci)})
+        ponovitev = okvir.groupby(list(okvir.columns), sort=False).cumcount().to_numpy()
+        return pd.MultiIndex.from_arrays([*stolpci, ponovitev])
+
+    polozaj = indeks(ka, za).get_indexer(indeks(kb, zb))
+    enaki_b = polozaj >= 0
+    enaki_a = np.zeros(len(a), dtype=bool)
+    enaki_a[polozaj[enaki_b]] = True
+    # ostale vrstice z istim ključem so spremenjene, preostale dodane ali odstranjene
+    ostale_a, ostale_b = np.flatnonzero(~enaki_a), np.flatnonzero(~enaki_b)
+    par = indeks(ka[ostale_a]).get_indexer(indeks(kb[ostale_b]))
+    spremenjeni_b = ostale_b[par >= 0]
+    spremenjeni_a = ostale_a[par[par >= 0]]
+    odstranjeni = np.setdiff1d(ostale_a, spremenjeni_a)
+    dodani = ostale_b[par < 0]
+
+    deli = [_sestavi(tabela, kljuci_b[dodani], 'dodan'), _sestavi(tabela, kljuci_a[odstranjeni], 'odstranjen')]
+
+    # pari vrstic: enaki po atributih (le geometrija) in spremenjeni
+    pari_a = np.concatenate([polozaj[enaki_b], spremenjeni_a])
+    pari_b = np.concatenate([np.flatnonzero(enaki_b), spremenjeni_b])
+    ga = a[_GEOMETRIJA].to_numpy()[pari_a] if _GEOMETRIJA in a.columns else np.full(len(pari_a), None, dtype=object)
+    gb = b[_GEOMETRIJA].to_numpy()[pari_b] if _GEOMETRIJA in b.columns else np.full(len(pari_b), None, dtype=object)
+    premik = np.full(len(pari_a), np.nan)
+    drugacne = np.array([x != y for x, y in zip(ga, gb)], dtype=bool)
+    if drugacne.any():
+        stare, nove = shapely.from_wkb(viri[0].wkb(ga[drugacne])), shapely.from_wkb(viri[1].wkb(gb[drugacne]))
+        razdalje = shapely.hausdorff_distance(stare, nove)
+        # dodana ali odstranjena geometrija je neskončen premik
+        premik[drugacne] = np.where(shapely.is_missing(stare) | shapely.is_missing(nove), np.inf, razdalje)
+    premaknjeni = premik > toleranca
+
+    imena = list(dict.fromkeys(stolpci_a + stolpci_b))
+    st_enakih = int(enaki_b.sum())
+    if len(spremenjeni_a):
+        va = a.iloc[spremenjeni_a].reindex(columns=imena)
+        vb = b.iloc[spremenjeni_b].reindex(columns=imena)
+        x, y = va.to_numpy(dtype=object), vb.to_numpy(dtype=object)
+        razlicni = ~((x == y) | (pd.isna(va).to_numpy() & pd.isna(vb).to_numpy()))
+        spremembe = np.vstack([np.zeros((st_enakih, len(imena)), dtype=bool), razlicni])
+    else:
+        spremembe = np.zeros((len(pari_a), len(imena)), dtype=bool)
+
+    izbrani = spremembe.any(axis=1) | premaknjeni
+    if izbrani.any():
+        imena_g = np.array(imena + [GEOMETRIJA], dtype=object)
+        maska = np.column_stack([spremembe, premaknjeni])[izbrani]
+        spremenjeni = _sestavi(tabela, kljuci_b[pari_b[izbrani]], 'spremenjen',
+                               [','.join(imena_g[v]) for v in maska], np.where(premaknjeni[izbrani], premik[izbrani], np.nan))
+        if vrednosti:
+            vrstice_a = a.reindex(columns=imena).iloc[pari_a[izbrani]].to_numpy(dtype=object)
+            vrstice_b = b.reindex(columns=imena).iloc[pari_b[izbrani]].to_numpy(dtype=object)
+            spremenjeni['prej'] = [{s: x for s, x, m in zip(imena, vrstica, v) if m} for vrstica, v in zip(vrstice_a, maska[:, :-1])]
+            spremenjeni['potem'] = [{s: x for s, x, m in zip(imena, vrstica, v) if m} for vrstica, v in zip(vrstice_b, maska[:, :-1])]
+        deli.append(spremenjeni)
+    return [d for d in deli if len(d)]
+
+
+def primerjaj_tabelo(stari, novi, tabela, toleranca=TOLERANCA, vrednosti=False, velikost_dela=VELIKOST_DELA, stolpci=None):
+    """Primerja tabelo v dveh izvozih (glej primerjaj_modela). Tabela, ki je v enem izmed izvozov ni, ima vse vrstice dodane ali
+    odstranjene.
+
+    Args:
+        stari: GPKG datoteka ali razred izvoza s starejšim modelom
+        novi: GPKG datoteka ali razred izvoza z novejšim modelom
+        tabela (str): ime tabele ali geografske plasti
+        toleranca (float, optional): največji premik geometrije, ki še ni sprememba. Defaults to TOLERANCA.
+        vrednosti (bool, optional): dodaj stolpca prej in potem s starimi in novimi vrednostmi spremenjenih stolpcev. Defaults to False.
+        velikost_dela (int, optional): število vrstic, ki se naenkrat prebere iz vsakega izvoza. Defaults to VELIKOST_DELA.
+        stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+
+    Returns:
+        pandas.DataFrame: tabela, kljuc, sprememba ('dodan', 'odstranjen', 'spremenjen'), stolpci (spremenjeni stolpci, ločeni z
+            vejico; premaknjena geometrija je stolpec 'geometrija') in premik (Hausdorffova razdalja premaknjene geometrije).
+    """
+    viri = [_vir(stari), _vir(novi)]
+    return _primerjaj_tabelo(viri, [v.tabele().get(tabela) for v in viri], tabela, toleranca, vrednosti, velikost_dela, stolpci)
+
+
+def _primerjaj_tabelo(viri, opisi, tabela, toleranca, vrednosti, velikost_dela, stolpci):
+    bralci, kljuci, geometrije = [], [], []
+    for vir, opis in zip(viri, opisi):
+        kljuc = _stolpec_kljuca(opis[0], tabela, stolpci) if opis is not None else None
+        kljuci.append(kljuc)
+        geometrije.append(opis[2] if opis is not None else None)
+        bralci.append(vir.beri(tabela, opis, kljuc, velikost_dela) if opis is not None else iter(()))
+    if (kljuci[0] is None) != (kljuci[1] is None) and None not in opisi:
+        raise ValueError(f"Tabela {tabela} ima stolpec s ključem le v enem izmed izvozov.")
+
+    prazen = pd.DataFrame({_KLJUC: pd.Series(dtype=object)})
+    medpomnilnik, konec, zadnji = [prazen, prazen], [False, False], [None, None]
+    deli = []
+    while not all(konec):
+        # preberi del iz vira, katerega prebrani ključi so manjši
+        konci = [m[_KLJUC].iloc[-1] if len(m) else '' for m in medpomnilnik]
+        i = 0 if not konec[0] and (konec[1] or konci[0] <= konci[1]) else 1
+        df = next(bralci[i], None)
+        if df is None:
+            konec[i] = True
+        else:
+            df = _pripravi(df, tabela, kljuci[i], geometrije[i], zadnji[i])
+            zadnji[i] = df[_KLJUC].iloc[-1] if len(df) else zadnji[i]
+            medpomnilnik[i] = _zdruzi(medpomnilnik[i], df)
+        # obdelajo se ključi pod mejo, do katere sta prebrana oba vira (ključ na meji ima lahko vrstice še v naslednjem delu)
+        if all(konec):
+            okna, medpomnilnik = medpomnilnik, [prazen, prazen]
+        else:
+            meja = min(m[_KLJUC].iloc[-1] if len(m) else '' for m, k in zip(medpomnilnik, konec) if not k)
+            razrezi = [int(np.searchsorted(m[_KLJUC].to_numpy(), meja, side='left')) for m in medpomnilnik]
+            okna = [m.iloc[:r].reset_index(drop=True) for m, r in zip(medpomnilnik, razrezi)]
+            medpomnilnik = [m.iloc[r:].reset_index(drop=True) for m, r in zip(medpomnilnik, razrezi)]
+        if len(okna[0]) or len(okna[1]):
+            deli.extend(_primerjaj_okno(tabela, okna[0], okna[1], viri, toleranca, vrednosti))
+    if not deli:
+        return pd.DataFrame({s: pd.Series(dtype=float if s == 'premik' else object) for s in STOLPCI_RAZLIK})
+    return pd.concat(deli, ignore_index=True)
+
+
+def primerjaj_modela(stari, novi, tabele=None, toleranca=TOLERANCA, vrednosti=False, velikost_dela=VELIKOST_DELA, stolpci=None,
+                     show_progress=False):
+    """Razlike med dvema izvozoma modela. Vsaka tabela se prebere po delih, urejenih po naravnem ključu, zato je poraba pomnilnika
+    omejena z velikostjo dela (glej primerjaj_tabelo).
+
+    Args:
+        stari: pot do GPKG datoteke ali razred izvoza (Gredos2GPKG, Gredos2PGSQL, Gredos2MSSQL) s starejšim modelom
+        novi: pot do GPKG datoteke ali razred izvoza z novejšim modelom
+        tabele (list, optional): imena tabel. Defaults to None (vse tabele obeh izvozov).
+        toleranca (float, optional): največji premik geometrije, ki še ni sprememba. Defaults to TOLERANCA.
+        vrednosti (bool, optional): dodaj stolpca prej in potem z vrednostmi spremenjenih stolpcev. Defaults to False.
+        velikost_dela (int, optional): število vrstic, ki se naenkrat prebere iz vsakega izvoza. Defaults to VELIKOST_DELA.
+        stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+        show_progress (bool, optional): izpiši število razlik po tabelah. Defaults to False.
+
+    Returns:
+        pandas.DataFrame: tabela, kljuc, sprememba ('dodan', 'odstranjen', 'spremenjen'), stolpci in premik.
+    """
+    viri = [_vir(stari), _vir(novi)]
+    opisi = [v.tabele() for v in viri]
+    imena = tabele or sorted(set(opisi[0]) | set(opisi[1]))
+    deli = []
+    for tabela in imena:
+        razlike = _primerjaj_tabelo(viri, [o.get(tabela) for o in opisi], tabela, toleranca, vrednosti, velikost_dela, stolpci)
+        if show_progress:
+            print(f"{tabela}: {len(razlike)} razlik.")
+        deli.append(razlike)
+    if not deli:
+        return pd.DataFrame(columns=STOLPCI_RAZLIK)
+    return pd.concat(deli, ignore_index=True)
+
+
+def povzetek_razlik(razlike):
+    """Število dodanih, odstranjenih in spremenjenih vrstic po tabelah."""
+    return razlike.groupby(['tabela', 'sprememba']).size().unstack(fill_value=0).reset_index()
+
+
+def main(argv=None):
+    """Ukaz za primerjavo dveh GPKG izvozov. Izhodna koda je 1, če se izvoza razlikujeta."""
+    parser = argparse.ArgumentParser(description='Razlike med dvema izvozoma modela Gredos v GPKG datotekah.')
+    parser.add_argument('stari', help='GPKG datoteka s starejšim modelom')
+    parser.add_argument('novi', help='GPKG datoteka z novejšim modelom')
+    parser.add_argument('--tabele', nargs='+', default=None, help='primerjaj le te tabele')
+    parser.add_argument('--toleranca', type=float, default=TOLERANCA, help='največji premik geometrije, ki še ni sprememba')
+    parser.add_argument('--porocilo', default=None, help='CSV datoteka z razlikami (en zapis na dodano, odstranjeno ali spremenjeno vrstico)')
+    args = parser.parse_args(argv)
+
+    razlike = primerjaj_modela(args.stari, args.novi, tabele=args.tabele, toleranca=args.toleranca)
+    if razlike.empty:
+        print("Izvoza se ne razlikujeta.")
+    else:
+        print(f"Razlike: {len(razlike)} vrstic.")
+        print(povzetek_razlik(razlike).to_string(index=False))
+    if args.porocilo:
+        razlike.to_csv(args.porocilo, index=False)
+    return 1 if len(razlike) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Skupni opis podatkovnega modela Gredos, ki ga uporabljajo vsi izvozi in orodja nad izvoženim modelom.
+
+Za vsako vlogo stolpca (npr. ključ vozlišča ali dolžina odseka) je navedeno ime stolpca v Gredos modelu; velikost črk ni
+pomembna (npr. imena polj v shp datotekah). Če se stolpec v modelu imenuje drugače, uporabnik ime poda s slovarjem oblike
+{'Tabela': {'vloga': 'ImeStolpca'}} (parameter stolpci), sicer najdi_stolpec sproži KeyError.
+"""
+
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+pd = leni_modul('pandas')
+
+SPISEK_TABEL = ['LNode', 'Node', 'Section', 'Transformer', 'Switching_device', 'Branch']
+GEOGRAFSKE_PLASTI = ['POINT_geo', 'LINE_geo', 'LNODE_geo']
+
+# imena stolpcev po tabelah in vlogah
+STOLPCI = {
+    'LNode': {'id': 'LNodeId', 'tip': 'Type'},
+    'Node': {'id': 'NodeId', 'lnode': 'LNodeId', 'un': 'Un', 'p': 'P', 'q': 'Q', 'generacija': 'Generation'},
+    'Branch': {'id': 'BranchId', 'vozlisce1': 'Node1', 'vozlisce2': 'Node2', 'izvod': 'FeederBrId', 'tip': 'Type'},
+    'Section': {'veja': 'BranchId', 'material': 'MaterialId', 'dolzina': 'Length', 'vzporedno': 'Parallel'},
+    'Transformer': {'veja': 'BranchId', 'sn': 'Sn', 'uk': 'Uk', 'pcu': 'Pcu', 'u1': 'U1', 'u2': 'U2'},
+    'Switching_device': {'veja': 'BranchId', 'stanje': 'State'},
+    'MATERIAL': {'id': 'MaterialId', 'r': 'R1', 'x': 'X1', 'b': 'B1', 'imax': 'Imax'},
+    'POINT_geo': {'id': 'NodeId'},
+    'LINE_geo': {'id': 'BranchId'},
+    'LNODE_geo': {'id': 'LNodeId'},
+}
+
+
+# vloga stolpca z naravnim ključem vrstic po tabelah; odseki (Section) in elementi vej nimajo lastne šifre, zato je ključ šifra veje
+NARAVNI_KLJUCI = {'LNode': 'id', 'Node': 'id', 'Branch': 'id', 'MATERIAL': 'id', 'Section': 'veja', 'Transformer': 'veja',
+                  'Switching_device': 'veja', 'POINT_geo': 'id', 'LINE_geo': 'id', 'LNODE_geo': 'id'}
+
+
+def najdi_stolpec(df, tabela, vloga, stolpci=None, obvezen=True):
+    """Poišče ime stolpca v tabeli glede na vlogo stolpca (npr. 'id', 'dolzina').
+
+    Args:
+        df (pandas.DataFrame): tabela v kateri iščemo stolpec
+        tabela (str): ime Gredos tabele (ključ v STOLPCI), npr. 'Section'
+        vloga (str): vloga stolpca, npr. 'material'
+        stolpci (dict, optional): uporabniška imena stolpcev oblike {'Section': {'material': 'MatId'}}. Defaults to None.
+        obvezen (bool, optional): Če je True in stolpca ni (ali vloga ni znana), sproži KeyError. Defaults to True.
+
+    Returns:
+        str or None: ime stolpca ali None, če stolpca ni in ni obvezen.
+    """
+    if stolpci and vloga in stolpci.get(tabela, {}):
+        ime = stolpci[tabela][vloga]
+    else:
+        ime = STOLPCI.get(tabela, {}).get(vloga)
+    if ime is None:
+        if obvezen:
+            raise KeyError(f"Tabela {tabela} nima vloge stolpca '{vloga}' (glej gredos_shema.STOLPCI).")
+        return None
+
+    if ime in df.columns:
+        return ime
+    stolpci_df = {str(s).lower(): s for s in df.columns}
+    if ime.lower() in stolpci_df:
+        return stolpci_df[ime.lower()]
+
+    if obvezen:
+        raise KeyError(f"V tabeli {tabela} ni stolpca {ime} za vlogo '{vloga}'. Drugo ime stolpca podamo s parametrom stolpci, "
+                       f"npr. stolpci={{'{tabela}': {{'{vloga}': 'ImeStolpca'}}}}.")
+    return None
+
+
+def kljuc_kot_niz(stolpec):
+    """Pretvori stolpec s ključi v enoten tekstovni zapis. Gredos šifre so številke zapisane kot tekst, v shp datotekah
+    in pri uvozu na Windows pa so lahko zapisane kot int ali float (npr. '1234.0').
+
+    Args:
+        stolpec (pandas.Series): stolpec s ključi
+
+    Returns:
+        pandas.Series: ključi kot tekst (pandas 'string' tip)
+    """
+    if pd.api.types.is_float_dtype(stolpec):
+        try:
+            stolpec = stolpec.astype('Int64')
+        except (TypeError, ValueError):
+            pass
+    return stolpec.astype('string').str.strip()
+
+
+def naravni_kljuc(df, tabela, stolpci=None):
+    """Naravni ključ vrstic tabele (glej NARAVNI_KLJUCI) kot tekst. Ponovljen ključ (npr. več odsekov iste veje) dobi zaporedno
+    številko ponovitve v vrstnem redu vrstic: '900001', '900001#1', ...
+
+    Args:
+        df (pandas.DataFrame): tabela
+        tabela (str): ime Gredos tabele, npr. 'Section'
+        stolpci (dict, optional): uporabniška imena stolpcev. Defaults to None.
+
+    Returns:
+        pandas.Series or None: ključi vrstic (object) ali None, če tabela nima znanega stolpca s ključem.
+    """
+    ime = najdi_stolpec(df, tabela, NARAVNI_KLJUCI[tabela], stolpci, obvezen=False) if tabela in NARAVNI_KLJUCI else None
+    if ime is None:
+        return None
+    kljuci = kljuc_kot_niz(df[ime]).fillna('').astype(object)
+    ponovitve = kljuci.groupby(kljuci, sort=False).cumcount()
+    return kljuci.where(ponovitve == 0, kljuci + '#' + ponovitve.astype(str))
@@ -0,0 +1,557 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Branje izvornih podatkov Gredos (mdb tabele in shp datoteke), skupno vsem izvozom.
+
+Na Windows se mdb tabele berejo z {Microsoft Access Driver (*.mdb, *.accdb)}, na linux pa z mdb-export iz paketa mdb-tools
+(sudo apt install mdb-tools).
+
+Namesto mdb datoteke je vir lahko tudi paket že izvoženih tabel: imenik ali zip datoteka z eno CSV (UTF-8, z glavo) ali parquet
+datoteko na tabelo (Node.csv, Branch.parquet, ..., MATERIAL.csv) in shp datotekami POINT, LINE in LNODE. Paket se bere brez mdb-tools,
+ODBC gonilnika in podprocesov, zato je lahko izvoz iz mdb ločen od pretvorbe:
+
+    Gredos2GPKG('model_paket.zip', 'material_paket.zip', 'izvoz.gpkg').pozeni_uvoz()
+"""
+
+import io
+import os
+import queue
+import subprocess
+import sys
+import threading
+import urllib.parse
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from shutil import which
+
+
+from gredos2x.gredos_meritve import BREZ_MERITEV
+from gredos2x import gredos_geometrije
+from gredos2x.gredos_leni_uvoz import leni_modul, uvozi_odvisnosti
+
+fiona = leni_modul('fiona')
+gpd = leni_modul('geopandas')
+pd = leni_modul('pandas')
+pq = leni_modul('pyarrow.parquet')
+shapely = leni_modul('shapely')
+sa = leni_modul('sqlalchemy')
+
+MDB_DRIVER = "Microsoft Access Driver (*.mdb, *.accdb)"
+
+# šifre so v Gredos zapisane kot tekst s številkami, zato jih pri branju z mdb-export ohranimo kot tekst
+TIPI_STOLPCEV = {
+    'Node': {'NodeId': str, 'LNodeId': str, 'XDbId': str, 'OrgId': str},
+    'Branch': {'BranchId': str, 'FeederBrId': str, 'XDbId': str, 'Node1': str, 'Node2': str},
+    'LNode': {'LNodeId': str, 'OrgId': str},
+    'Section': {'BranchId': str},
+}
+
+# pri omejitvi pomnilnika se prvi del prebere s to velikostjo, iz njega pa se oceni poraba pomnilnika na vrstico
+ZACETNA_VELIKOST_DELA = 1000
+# delež omejitve pomnilnika za en del tabele; preostanek je rezerva za kopije pri pisanju v ponor (to_sql, to_file)
+DELEZ_POMNILNIKA_DELA = 0.1
+
+# del imena shp datoteke -> ime geografske plasti
+GEOGRAFSKE_DATOTEKE = {'POINT': 'POINT_geo', 'LINE': 'LINE_geo', 'LNODE': 'LNODE_geo'}
+
+# končnice tabel v paketu izvoženih tabel (po prednosti)
+KONCNICE_PAKETA = ['.parquet', '.csv']
+
+
+def je_paket(pot):
+    """True, če je vir paket izvoženih tabel (imenik ali zip datoteka) namesto mdb datoteke."""
+    return os.path.isdir(pot) or (os.path.splitext(pot)[1].lower() == '.zip' and zipfile.is_zipfile(pot))
+
+
+def imenik_modela(pot_mdb):
+    """Vrne mesto shp datotek modela: imenik mdb datoteke ali paket (glej je_paket)."""
+    return pot_mdb if je_paket(pot_mdb) else os.path.dirname(pot_mdb)
+
+
+def seznam_datotek(pot_paketa):
+    """Seznam datotek v imeniku (samo na prvem nivoju) ali zip datoteki (relativne poti, tudi v podimenikih)."""
+    if os.path.isdir(pot_paketa):
+        return [d for d in sorted(os.listdir(pot_paketa)) if os.path.isfile(os.path.join(pot_paketa, d))]
+    with zipfile.ZipFile(pot_paketa) as paket:
+        return sorted(ime for ime in paket.namelist() if not ime.endswith('/'))
+
+
+def poisci_tabelo_paketa(pot_paketa, ime_tabele):
+    """Poišče datoteko tabele v paketu (<ime_tabele>.parquet ali <ime_tabele>.csv, ne glede na velike in male črke).
+
+    Args:
+        pot_paketa (str): pot do imenika ali zip datoteke
+        ime_tabele (str): ime tabele, npr. 'Node'
+
+    Returns:
+        str: relativna pot datoteke v paketu.
+    """
+    datoteke = {}
+    for datoteka in seznam_datotek(pot_paketa):
+        ime, koncnica = os.path.splitext(os.path.basename(datoteka))
+        datoteke.setdefault((ime.lower(), koncnica.lower()), datoteka)
+    for koncnica in KONCNICE_PAKETA:
+        if (ime_tabele.lower(), koncnica) in datoteke:
+            return datoteke[(ime_tabele.lower(), koncnica)]
+    raise FileNotFoundError(f"Tabele {ime_tabele} ni v paketu {pot_paketa} (pričakovana {ime_tabele}.csv ali {ime_tabele}.parquet).")
+
+
+@contextmanager
+def _odpri_v_paketu(pot_paketa, datoteka):
+    """Odpre datoteko paketa za branje (binarno)."""
+    if os.path.isdir(pot_paketa):
+        with open(os.path.join(pot_paketa, datoteka), 'rb') as f:
+            yield f
+        return
+    with zipfile.ZipFile(pot_paketa) as paket, paket.open(datoteka) as f:
+        yield f
+
+
+def povezava_mdb(pot_mdb, mdb_driver=MDB_DRIVER):
+    """Odpre povezavo do mdb datoteke na Windows platformi.
+
+    Args:
+        pot_mdb (str): pot do mdb datoteke
+        mdb_driver (str, optional): ime ODBC gonilnika. Defaults to MDB_DRIVER.
+
+    Returns:
+        sqlalchemy.engine.Connection: povezava do mdb datoteke.
+    """
+    connection_string = (
+        f"DRIVER={{{mdb_driver}}};"
+        f"DBQ={pot_mdb};"
+        "Str_Ansi=no;"
+    )
+    connection_uri = f"access+pyodbc:///?odbc_connect={urllib.parse.quote_plus(connection_string)}"
+    return sa.create_engine(connection_uri).connect()
+
+
+def naslednja_velikost_dela(df, velikost_dela=None, omejitev_pomnilnika_mb=None):
+    """Določi število vrstic naslednjega dela glede na porabo pomnilnika že prebranega dela.
+
+    Args:
+        df (pandas.DataFrame): zadnji prebrani del
+        velikost_dela (int, optional): največje število vrstic v delu. Defaults to None (brez omejitve).
+        omejitev_pomnilnika_mb (float, optional): omejitev pomnilnika v MB. Defaults to None.
+
+    Returns:
+        int or None: število vrstic naslednjega dela (None pomeni vse preostale vrstice).
+    """
+    if omejitev_pomnilnika_mb is None or len(df) == 0:
+        return velikost_dela
+    bajti = df.memory_usage(deep=True, index=False).sum()
+    if isinstance(df, gpd.GeoDataFrame):
+        # geometrije so v GEOS pomnilniku, ki ga memory_usage ne zajame
+        bajti += int(shapely.get_num_coordinates(df.geometry.values).sum()) * 24
+    vrstice = int(omejitev_pomnilnika_mb * 2**20 * DELEZ_POMNILNIKA_DELA / max(bajti / len(df), 1))
+    if velikost_dela:
+        vrstice = min(vrstice, velikost_dela)
+    return max(vrstice, 1)
+
+
+def _prva_velikost_dela(velikost_dela, omejitev_pomnilnika_mb):
+    if omejitev_pomnilnika_mb is None:
+        return velikost_dela
+    return min(velikost_dela or ZACETNA_VELIKOST_DELA, ZACETNA_VELIKOST_DELA)
+
+
+def preberi_tabelo_mdb_po_delih(pot_mdb, ime_tabele, velikost_dela=None, omejitev_pomnilnika_mb=None, povezava=None, merilnik=None):
+    """Bere tabelo iz mdb datoteke po delih (Windows: ODBC fetchmany, linux: sproten izhod mdb-export, paket: CSV ali parquet datoteka
+    tabele, glej je_paket). V pomnilniku je hkrati le en del.
+    Brez velikosti dela in omejitve pomnilnika se tabela vrne v enem delu. Vedno se vrne vsaj en (lahko prazen) del, da ponor ustvari tabelo.
+
+    Args:
+        pot_mdb (str): pot do mdb datoteke ali paketa izvoženih tabel
+        ime_tabele (str): ime tabele, npr. 'Node'
+        velikost_dela (int, optional): največje število vrstic v delu. Defaults to None.
+        omejitev_pomnilnika_mb (float, optional): omejitev pomnilnika v MB, iz katere se sproti določa velikost dela. Defaults to None.
+        povezava (sqlalchemy.engine.Connection, optional): odprta povezava na Windows platformi. Defaults to None (odpre se nova).
+        merilnik (gredos_meritve.Merilnik, optional): branje vsakega dela se objavi kot faza 'branje'. Defaults to None.
+
+    Returns:
+        iterator: zaporedni deli tabele (pandas.DataFrame).
+    """
+    merilnik = merilnik if merilnik is not None else BREZ_MERITEV
+    if je_paket(pot_mdb):
+        deli = _deli_tabele_paketa(pot_mdb, ime_tabele, velikost_dela, omejitev_pomnilnika_mb)
+    else:
+        deli = _deli_tabele_mdb(pot_mdb, ime_tabele, velikost_dela, omejitev_pomnilnika_mb, povezava)
+    return merilnik.merjeni_deli(deli, 'branje', tabela=ime_tabele)
+
+
+def _deli_tabele_mdb(pot_mdb, ime_tabele, velikost_dela, omejitev_pomnilnika_mb, povezava):
+    """Generator delov tabele brez meritev (glej preberi_tabelo_mdb_po_delih)."""
+    n = _prva_velikost_dela(velikost_dela, omejitev_pomnilnika_mb)
+    if sys.platform.startswith('win'):
+        povezava = povezava if povezava is not None else povezava_mdb(pot_mdb)
+        rezultat = povezava.execute(sa.text(f"select * from {ime_tabele}"))
+        imena = list(rezultat.keys())
+        prvi = True
+        while True:
+            vrstice = rezultat.fetchall() if n is None else rezultat.fetchmany(n)
+            if not vrstice and not prvi:
+                break
+            df = pd.DataFrame.from_records([tuple(v) for v in vrstice], columns=imena, coerce_float=True)
+            yield df
+            if n is None or not vrstice:
+                break
+            prvi = False
+            n = naslednja_velikost_dela(df, velikost_dela, omejitev_pomnilnika_mb)
+        return
+
+    proces = subprocess.Popen(["mdb-export", pot_mdb, ime_tabele], stdout=subprocess.PIPE)
+    try:
+        with pd.read_csv(io.TextIOWrapper(proces.stdout, encoding='utf-8'), sep=',', header=0, converters=TIPI_STOLPCEV.get(ime_tabele),
+                         index_col=False, engine='python', iterator=True) as bralnik:
+            prvi = True
+            while True:
+                try:
+                    df = bralnik.get_chunk(n)
+                except StopIteration:
+                    if prvi:
+                        yield pd.DataFrame()
+                    break
+                yield df
+                prvi = False
+                if n is None:
+                    break
+                n = naslednja_velikost_dela(df, velikost_dela, omejitev_pomnilnika_mb)
+    except pd.errors.EmptyDataError:
+        yield pd.DataFrame()
+    finally:
+        proces.stdout.close()
+        proces.wait()
+
+
+def _kljuci_kot_tekst(df, ime_tabele):
+    """Stolpce s šiframi (TIPI_STOLPCEV) pretvori v tekst kot pri branju z mdb-export (prazna šifra je prazen niz)."""
+    for stolpec in TIPI_STOLPCEV.get(ime_tabele, {}):
+        if stolpec not in df.columns:
+            continue
+        vrednosti = df[stolpec]
+        if pd.api.types.is_float_dtype(vrednosti) and vrednosti.dropna().mod(1).eq(0).all():
+            # cele šifre, ki jih je parquet zaradi manjkajočih vrednosti shranil kot float
+            vrednosti = vrednosti.astype('Int64')
+        if not pd.api.types.is_object_dtype(vrednosti):
+            vrednosti = vrednosti.astype('string')
+        df[stolpec] = vrednosti.astype(object).fillna('')
+    return df
+
+
+def _deli_tabele_paketa(pot_paketa, ime_tabele, velikost_dela, omejitev_pomnilnika_mb):
+    """Generator delov tabele iz paketa izvoženih tabel (glej preberi_tabelo_mdb_po_delih)."""
+    datoteka = poisci_tabelo_paketa(pot_paketa, ime_tabele)
+    n = _prva_velikost_dela(velikost_dela, omejitev_pomnilnika_mb)
+    with _odpri_v_paketu(pot_paketa, datoteka) as f:
+        if datoteka.lower().endswith('.parquet'):
+            vir = pq.ParquetFile(f)
+            if n is None or vir.metadata.num_rows == 0:
+                yield _kljuci_kot_tekst(vir.read().to_pandas(), ime_tabele)
+                return
+            if omejitev_pomnilnika_mb is not None:
+                # velikost dela iz nestisnjene velikosti skupin vrstic, ki jo hrani parquet
+                bajti = sum(vir.metadata.row_group(i).total_byte_size for i in range(vir.metadata.num_row_groups))
+                vrstica = max(bajti / vir.metadata.num_rows, 1)
+                n = max(1, min(velikost_dela or vir.metadata.num_rows, int(omejitev_pomnilnika_mb * 2**20 * DELEZ_POMNILNIKA_DELA / vrstica)))
+            for skupina in vir.iter_batches(batch_size=n):
+                yield _kljuci_kot_tekst(skupina.to_pandas(), ime_tabele)
+            return
+
+        kljuci = {stolpec: str for stolpec in TIPI_STOLPCEV.get(ime_tabele, {})}
+        try:
+            # float_precision='round_trip' da enake vrednosti kot branje izhoda mdb-export (engine='python')
+            with pd.read_csv(f, sep=',', header=0, dtype=kljuci, encoding='utf-8', index_col=False, float_precision='round_trip',
+                             iterator=True) as bralnik:
+                prvi = True
+                while True:
+                    try:
+                        df = bralnik.get_chunk(n)
+                    except StopIteration:
+                        if prvi:
+                            yield pd.DataFrame()
+                        break
+                    yield _kljuci_kot_tekst(df, ime_tabele)
+                    prvi = False
+                    if n is None:
+                        break
+                    n = naslednja_velikost_dela(df, velikost_dela, omejitev_pomnilnika_mb)
+        except pd.errors.EmptyDataError:
+            yield pd.DataFrame()
+
+
+def preberi_tabelo_mdb(pot_mdb, ime_tabele, povezava=None, merilnik=None):
+    """Prebere tabelo iz mdb datoteke v pandas DataFrame (Windows: ODBC, linux: mdb-export).
+
+    Args:
+        pot_mdb (str): pot do mdb datoteke
+        ime_tabele (str): ime tabele, npr. 'Node'
+        povezava (sqlalchemy.engine.Connection, optional): odprta povezava na Windows platformi. Defaults to None (odpre se nova).
+        merilnik (gredos_meritve.Merilnik, optional): branje se objavi kot faza 'branje'. Defaults to None.
+
+    Returns:
+        pandas.DataFrame: vsebina tabele.
+    """
+    return pd.concat(list(preberi_tabelo_mdb_po_delih(pot_mdb, ime_tabele, povezava=povezava, merilnik=merilnik)), ignore_index=True)
+
+
+def prestej_vrstice_mdb(pot_mdb, ime_tabele, povezava=None):
+    """Prešteje vrstice tabele v mdb datoteki brez branja vsebine (Windows: count(*), linux: mdb-count, paket: metapodatki parquet).
+
+    Args:
+        pot_mdb (str): pot do mdb datoteke
+        ime_tabele (str): ime tabele, npr. 'Node'
+        povezava (sqlalchemy.engine.Connection, optional): odprta povezava na Windows platformi. Defaults to None (odpre se nova).
+
+    Returns:
+        int or None: število vrstic ali None, če ga ni mogoče ugotoviti (npr. starejši mdb-tools brez mdb-count ali CSV v paketu).
+    """
+    try:
+        if je_paket(pot_mdb):
+            datoteka = poisci_tabelo_paketa(pot_mdb, ime_tabele)
+            if not datoteka.lower().endswith('.parquet'):
+                return None
+            with _odpri_v_paketu(pot_mdb, datoteka) as f:
+                return pq.ParquetFile(f).metadata.num_rows
+        if sys.platform.startswith('win'):
+            povezava = povezava if povezava is not None else povezava_mdb(pot_mdb)
+            return int(povezava.execute(sa.text(f'select count(*) from [{ime_tabele}]')).scalar())
+        if which('mdb-count') is None:
+            return None
+        izhod = subprocess.run(['mdb-count', pot_mdb, ime_tabele], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
+        return int(izhod.split()[0])
+    except Exception:
+        return None
+
+
+def prestej_vrstice_geografske_datoteke(pot_shp):
+    """Prešteje zapise v shp datoteki brez branja geometrij.
+
+    Args:
+        pot_shp (str): pot do shp datoteke
+
+    Returns:
+        int: število zapisov.
+    """
+    with fiona.open(pot_shp) as vir:
+        return len(vir)
+
+
+def najdi_geografske_datoteke(imenik):
+    """Poišče Gredos shp datoteke (POINT, LINE, LNODE) v imeniku modela ali v paketu izvoženih tabel.
+
+    Args:
+        imenik (str): imenik, v katerem se nahaja mdb datoteka modela, ali paket (glej imenik_modela)
+
+    Returns:
+        dict: ime geografske plasti (npr. 'POINT_geo') -> pot do shp datoteke (v zip datoteki pot /vsizip/, ki jo bereta fiona in GDAL).
+    """
+    if os.path.isdir(imenik):
+        kandidati = [(d, os.path.join(imenik, d)) for d in sorted(os.listdir(imenik)) if os.path.isfile(os.path.join(imenik, d))]
+    else:
+        kandidati = [(os.path.basename(d), f'/vsizip/{os.path.abspath(imenik)}/{d}') for d in seznam_datotek(imenik)]
+    datoteke = {}
+    for datoteka, pot in kandidati:
+        ime, _, koncnica = datoteka.partition('.')
+        if koncnica.lower() != 'shp':
+            continue
+        for del_imena in GEOGRAFSKE_DATOTEKE:
+            if del_imena in ime:
+                datoteke.setdefault(GEOGRAFSKE_DATOTEKE[del_imena], pot)
+                break
+    return datoteke
+
+
+def vhodne_datoteke_modela(pot_mdb, pot_materiali):
+    """Vrne vhodne datoteke izvoza modela: mdb, materiale ter shp datoteke z atributi in projekcijo (.shp, .dbf, .shx, .prj, .cpg).
+    Paket v imeniku se namesto z imenikom navede z vsemi svojimi datotekami, zip paket pa kot ena datoteka.
+
+    Args:
+        pot_mdb (str): pot do mdb datoteke modela ali paketa
+        pot_materiali (str): pot do mdb datoteke ali paketa materialov
+
+    Returns:
+        list: poti do datotek (mdb in materiali tudi, če ne obstajata).
+    """
+    datoteke = []
+    for pot in [pot_mdb, pot_materiali]:
+        if os.path.isdir(pot):
+            datoteke += [os.path.join(pot, d) for d in seznam_datotek(pot) if os.path.join(pot, d) not in datoteke]
+        else:
+            datoteke.append(pot)
+    imenik = os.path.dirname(pot_mdb)
+    if not je_paket(pot_mdb) and os.path.isdir(imenik):
+        for pot_shp in najdi_geografske_datoteke(imenik).values():
+            osnova = os.path.splitext(pot_shp)[0]
+            datoteke += [osnova + koncnica for koncnica in ('.shp', '.dbf', '.shx', '.prj', '.cpg') if os.path.exists(osnova + koncnica)]
+    return datoteke
+
+
+def preberi_geografsko_datoteko(pot_shp, pretvori_crs=False, set_crs='EPSG:3794', input_encoding='cp1250', izvorni_crs='EPSG:3912',
+                                vrstice=None, merilnik=None, oznake=None, popravi_geometrije=False, natancnost_koordinat=None, porocilo=None):
+    """Prebere Gredos shp datoteko v GeoDataFrame.
+
+    Args:
+        pot_shp (str): pot do shp datoteke
+        pretvori_crs (bool, optional): Pretvori v drug koordinatni sistem. Defaults to False.
+        set_crs (str, optional): Izhodni koordinatni sistem. Defaults to 'EPSG:3794'.
+        input_encoding (str, optional): Encoding shp datoteke. Defaults to 'cp1250'.
+        izvorni_crs (str, optional): Koordinatni sistem Gredos datotek. Defaults to 'EPSG:3912'.
+        vrstice (slice, optional): branje samo dela datoteke. Defaults to None (vse vrstice).
+        merilnik (gredos_meritve.Merilnik, optional): branje in pretvorba se objavita kot fazi 'branje' in 'pretvorba_crs'. Defaults to None.
+        oznake (dict, optional): oznake dogodkov merilnika (npr. {'tabela': 'POINT_geo'}). Defaults to None.
+        popravi_geometrije (bool, optional): po pretvorbi popravi neveljavne in odstrani prazne geometrije (faza 'geometrije', glej
+            gredos_geometrije.popravi_geometrije). Defaults to False.
+        natancnost_koordinat (float, optional): pri popravilu koordinate zaokroži na mrežo s tem razmikom. Defaults to None.
+        porocilo (gredos_geometrije.PorociloGeometrij, optional): sem se prištejejo števci popravila pod oznako 'tabela'. Defaults to None.
+
+    Returns:
+        geopandas.GeoDataFrame: geografska plast.
+    """
+    merilnik = merilnik if merilnik is not None else BREZ_MERITEV
+    oznake = oznake or {}
+    with merilnik.faza('branje', **oznake) as meritev:
+        shp = gpd.GeoDataFrame.from_file(pot_shp, encoding=input_encoding, rows=vrstice)
+        shp.set_crs(izvorni_crs, inplace=True, allow_override=True)
+        meritev.dodaj(shp)
+    if pretvori_crs:
+        with merilnik.faza('pretvorba_crs', **oznake) as meritev:
+            shp.to_crs(crs=set_crs, inplace=True)
+            meritev.dodaj(vrstice=len(shp))
+    if popravi_geometrije:
+        with merilnik.faza('geometrije', **oznake) as meritev:
+            shp, stevci = gredos_geometrije.popravi_geometrije(shp, natancnost=natancnost_koordinat)
+            meritev.dodaj(vrstice=len(shp))
+        if porocilo is not None:
+            porocilo.dodaj(oznake.get('tabela', os.path.basename(pot_shp)), stevci)
+    return shp
+
+
+def preberi_geografsko_datoteko_po_delih(pot_shp, velikost_dela=None, omejitev_pomnilnika_mb=None, pretvori_crs=False, set_crs='EPSG:3794',
+                                         input_encoding='cp1250', izvorni_crs='EPSG:3912', merilnik=None, oznake=None, popravi_geometrije=False,
+                                         natancnost_koordinat=None, porocilo=None):
+    """Bere shp datoteko po delih (rows=slice), tako da je v pomnilniku hkrati le en del geometrij.
+
+    Args:
+        pot_shp (str): pot do shp datoteke
+        velikost_dela (int, optional): največje število vrstic v delu. Defaults to None (cela datoteka v enem delu).
+        omejitev_pomnilnika_mb (float, optional): omejitev pomnilnika v MB, iz katere se sproti določa velikost dela. Defaults to None.
+        pretvori_crs (bool, optional): Pretvori v drug koordinatni sistem. Defaults to False.
+        set_crs (str, optional): Izhodni koordinatni sistem. Defaults to 'EPSG:3794'.
+        input_encoding (str, optional): Encoding shp datoteke. Defaults to 'cp1250'.
+        izvorni_crs (str, optional): Koordinatni sistem Gredos datotek. Defaults to 'EPSG:3912'.
+        merilnik (gredos_meritve.Merilnik, optional): branje in pretvorba vsakega dela se objavita kot fazi. Defaults to None.
+        oznake (dict, optional): oznake dogodkov merilnika (npr. {'tabela': 'POINT_geo'}). Defaults to None.
+        popravi_geometrije (bool, optional): popravi neveljavne in odstrani prazne geometrije vsakega dela. Defaults to False.
+        natancnost_koordinat (float, optional): pri popravilu koordinate zaokroži na mrežo s tem razmikom. Defaults to None.
+        porocilo (gredos_geometrije.PorociloGeometrij, optional): zbira števce popravljenih in odstranjenih geometrij. Defaults to None.
+
+    Yields:
+        geopandas.GeoDataFrame: zaporedni deli geografske plasti.
+    """
+    with fiona.open(pot_shp) as vir:
+        st_vrstic = len(vir)
+    n = _prva_velikost_dela(velikost_dela, omejitev_pomnilnika_mb)
+    zacetek = 0
+    st_dela = 0
+    while True:
+        vrstice = None if n is None else slice(zacetek, zacetek + n)
+        shp = preberi_geografsko_datoteko(pot_shp, pretvori_crs=pretvori_crs, set_crs=set_crs, input_encoding=input_encoding,
+                                          izvorni_crs=izvorni_crs, vrstice=vrstice, merilnik=merilnik, oznake={**(oznake or {}), 'del': st_dela},
+                                          popravi_geometrije=popravi_geometrije, natancnost_koordinat=natancnost_koordinat, porocilo=porocilo)
+        st_dela += 1
+        yield shp
+        # odstranjene geometrije ne smejo zamakniti naslednjega dela
+        prebrane = len(shp) if vrstice is None else min(n, st_vrstic - zacetek)
+        zacetek += prebrane
+        if n is None or prebrane == 0 or zacetek >= st_vrstic:
+            break
+        # del, iz katerega je popravilo odstranilo vse geometrije, ne pove ničesar o velikosti vrstic: ostane prejšnja velikost dela
+        if len(shp):
+            n = naslednja_velikost_dela(shp, velikost_dela, omejitev_pomnilnika_mb)
+
+
+def _postavi_v_vrsto(vrsta, ustavi, element):
+    """Doda element v omejeno vrsto; vrne False, če je bralec ustavljen, preden je v vrsti prostor."""
+    while not ustavi.is_set():
+        try:
+            vrsta.put(element, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def preberi_geografske_datoteke_vzporedno(datoteke, niti=None, velikost_dela=None, omejitev_pomnilnika_mb=None, priprava=None, merilnik=None,
+                                          **nastavitve):
+    """Sočasno bere geografske plasti (branje, pretvorba koordinat in priprava za zapis tečejo v nitih, GDAL in PROJ pri tem sproščata GIL),
+    dele pa vrača v klicočo nit, ki jih zapiše v ponor. Zapis v eno GPKG datoteko oziroma povezavo do baze tako ostane zaporeden.
+
+    Deli ene plasti se vrnejo po vrsti, deli različnih plasti pa v vrstnem redu, v katerem so prebrani. Ko je plast prebrana, se vrne
+    še (plast, None, None). V vrsti čaka največ 2 * niti delov, tako da omejitev pomnilnika ostane smiselna tudi pri sočasnem branju.
+    Klicoča koda naj generator zapre (contextlib.closing), da se bralci ustavijo tudi, ko zapis prekine napaka ali preklic.
+
+    Args:
+        datoteke (dict): ime plasti -> pot do shp datoteke (glej najdi_geografske_datoteke)
+        niti (int, optional): število sočasno branih plasti. Defaults to None (vse plasti, največ število jeder).
+        velikost_dela (int, optional): največje število vrstic v delu. Defaults to None (cela plast v enem delu).
+        omejitev_pomnilnika_mb (float, optional): velikost dela se določa sproti glede na omejitev pomnilnika. Defaults to None.
+        priprava (callable, optional): funkcija (plast, del) -> del, ki se izvede v niti bralca (npr. kodiranje geometrij v WKB). Defaults to None.
+        merilnik (gredos_meritve.Merilnik, optional): branje in pretvorba delov se objavita kot fazi. Defaults to None.
+        **nastavitve: parametri preberi_geografsko_datoteko_po_delih (pretvori_crs, set_crs, input_encoding, izvorni_crs,
+            popravi_geometrije, natancnost_koordinat, porocilo)
+
+    Yields:
+        tuple: (ime plasti, zaporedna številka dela, del) za vsak del in (ime plasti, None, None) ob koncu plasti.
+    """
+    if not datoteke:
+        return
+    niti = max(1, min(niti or os.cpu_count() or 1, len(datoteke)))
+    # odvisnosti se uvozijo pred zagonom niti, da se bralci ne srečajo pri prvem (lenem) uvozu
+    uvozi_odvisnosti(['numpy', 'pandas', 'shapely', 'pyproj', 'fiona', 'geopandas'])
+    vrsta = queue.Queue(maxsize=2 * niti)
+    ustavi = threading.Event()
+
+    def beri(plast, pot):
+        try:
+            deli = preberi_geografsko_datoteko_po_delih(pot, velikost_dela, omejitev_pomnilnika_mb, merilnik=merilnik, oznake={'tabela': plast},
+                                                        **nastavitve)
+            for i, shp in enumerate(deli):
+                if priprava is not None:
+                    shp = priprava(plast, shp)
+                if not _postavi_v_vrsto(vrsta, ustavi, (plast, i, shp)):
+                    return
+        except BaseException as e:
+            _postavi_v_vrsto(vrsta, ustavi, (plast, None, e))
+            return
+        _postavi_v_vrsto(vrsta, ustavi, (plast, None, None))
+
+    with ThreadPoolExecutor(max_workers=niti, thread_name_prefix='gredos2x-geo') as izvajalec:
+        for plast, pot in datoteke.items():
+            izvajalec.submit(beri, plast, pot)
+        try:
+            preostale = len(datoteke)
+            while preostale:
+                plast, st_dela, shp = vrsta.get()
+                if st_dela is None:
+                    preostale -= 1
+                    if shp is not None:
+                        raise shp
+                yield plast, st_dela, shp
+        finally:
+            # ob napaki ali prekinjenem branju se bralci ustavijo pred naslednjim delom
+            ustavi.set()
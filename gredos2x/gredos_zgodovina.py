@@ -0,0 +1,375 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Zgodovina modela: zaporedni izvozi istega modela (npr. GPKG za vsak datum modela) v eni SQLite datoteki, v kateri se hranijo samo
+spremenjene vrstice.
+
+Vsaka vrstica tabele ali geografske plasti je v zgodovini shranjena enkrat za vsako različico, z obdobjem veljavnosti
+[g2x_od, g2x_do) v zaporednih številkah posnetkov (g2x_do je NULL za vrstice, ki veljajo v zadnjem posnetku). Vrstice se primerjajo
+po naravnem ključu (glej gredos_shema.naravni_kljuc) in zgoščeni vrednosti vrstice (glej zgosti_vrstice),
+zato dodajanje posnetka zapiše le dodane in spremenjene vrstice. Stanje modela na datum in razlike med dvema datumoma se preberejo
+z indeksiranimi poizvedbami po g2x_od in g2x_do; cena razlik je sorazmerna številu sprememb, ne velikosti modela.
+
+Primer:
+    zgodovina = ZgodovinaModela('zgodovina_ep.sqlite')
+    zgodovina.dodaj_posnetek('izvoz/26_1_2026.gpkg')                 # datum iz imena datoteke ali datum='2026-01-26'
+    zgodovina.dodaj_posnetek('izvoz/26_2_2026.gpkg')
+    branch = zgodovina.stanje('2026-01-26', 'Branch')
+    print(zgodovina.razlike('2026-01-26', '2026-02-26'))            # tabela, kljuc, sprememba, stolpci
+    zgodovina.izvozi_gpkg('2026-01-26', 'obnovljen.gpkg')
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime
+
+from gredos2x.gredos_shema import naravni_kljuc
+from gredos2x.gredos_gpkg2dataframes import gpkg_blob_v_wkb
+from gredos2x.gredos_leni_uvoz import leni_modul
+
+np = leni_modul('numpy')
+pd = leni_modul('pandas')
+gpd = leni_modul('geopandas')
+shapely = leni_modul('shapely')
+
+IME_POSNETKOV = 'g2x_posnetki'
+IME_VSEBINE = 'g2x_vsebina_posnetkov'
+IME_TABEL = 'g2x_tabele'
+
+# pomožni stolpci vrstic v zgodovini
+KLJUC, ZGOSCENA, OD, DO = 'g2x_kljuc', 'g2x_zgoscena', 'g2x_od', 'g2x_do'
+POMOZNI_STOLPCI = [KLJUC, ZGOSCENA, OD, DO]
+
+# tabele GPKG, ki niso del modela (metapodatki GPKG in izvoza)
+_SISTEMSKE_PREDPONE = ('gpkg_', 'rtree_', 'sqlite_', 'g2x_')
+
+STOLPCI_RAZLIK = ['tabela', 'kljuc', 'sprememba', 'stolpci']
+
+
+def datum_posnetka(datum=None, pot=None):
+    """Datum posnetka v obliki ISO (YYYY-MM-DD).
+
+    Args:
+        datum (str or datetime.date, optional): datum (ISO ali Gredos oblika '26_1_2026'). Defaults to None.
+        pot (str, optional): datoteka posnetka; brez datuma se ta prebere iz imena ('26_1_2026.gpkg') ali časa spremembe datoteke.
+
+    Returns:
+        str: datum posnetka.
+    """
+    if isinstance(datum, (date, datetime)):
+        return datum.strftime('%Y-%m-%d')
+    if datum is None and pot is not None:
+        najden = re.search(r'(\d{1,2})_(\d{1,2})_(\d{4})', os.path.basename(pot))
+        if najden is None:
+            return datetime.fromtimestamp(os.path.getmtime(pot)).strftime('%Y-%m-%d')
+        datum = najden.group(0)
+    najden = re.fullmatch(r'(\d{1,2})_(\d{1,2})_(\d{4})', str(datum))
+    if najden is not None:
+        dan, mesec, leto = (int(d) for d in najden.groups())
+        return date(leto, mesec, dan).isoformat()
+    return date.fromisoformat(str(datum)).isoformat()
+
+
+def zgosti_vrstice(df):
+    """Zgoščena vrednost (int64) vsake vrstice, v katero prispevajo le neprazne vrednosti. Nov stolpec brez vrednosti (npr. ob
+    novi različici Gredos) tako ne spremeni zgoščenih vrednosti obstoječih vrstic.
+
+    Args:
+        df (pandas.DataFrame): tabela (geometrije kot GPKG bloki)
+
+    Returns:
+        numpy.ndarray: zgoščene vrednosti vrstic (int64).
+    """
+    zgoscene = np.zeros(len(df), dtype=np.uint64)
+    for ime in df.columns:
+        stolpec = df[ime]
+        sol = np.uint64(int.from_bytes(hashlib.sha256(str(ime).encode('utf-8')).digest()[:8], 'little'))
+        prispevek = pd.util.hash_pandas_object(stolpec, index=False).to_numpy(np.uint64)
+        prispevek ^= sol
+        prispevek *= np.uint64(1099511628211)
+        zgoscene += np.where(stolpec.notna().to_numpy(), prispevek, np.uint64(0))
+    return zgoscene.view(np.int64)
+
+
+def _ime(ime):
+    return '"' + str(ime).replace('"', '""') + '"'
+
+
+def preberi_tabele_gpkg(pot_gpkg):
+    """Prebere vse tabele in geografske plasti modela iz GPKG datoteke brez pretvorbe geometrij (ostanejo GPKG bloki).
+
+    Args:
+        pot_gpkg (str): pot do GPKG datoteke
+
+    Returns:
+        tuple: (ime tabele -> pandas.DataFrame, ime plasti -> (stolpec geometrije, tip geometrije, srs_id, crs)).
+    """
+    with closing(sqlite3.connect(pot_gpkg)) as povezava:
+        imena = [v[0] for v in povezava.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+                 if not v[0].lower().startswith(_SISTEMSKE_PREDPONE)]
+        geometrije = {}
+        try:
+            for tabela, stolpec, tip, srs_id, organizacija, koda in povezava.execute(
+                    "SELECT g.table_name, g.column_name, g.geometry_type_name, g.srs_id, s.organization, s.organization_coordsys_id "
+                    "FROM gpkg_geometry_columns g LEFT JOIN gpkg_spatial_ref_sys s ON s.srs_id = g.srs_id"):
+                crs = f'{organizacija}:{koda}' if organizacija and organizacija.upper() != 'NONE' else None
+                geometrije[tabela] = (stolpec, tip, srs_id, crs)
+        except sqlite3.OperationalError:
+            pass
+        tabele = {}
+        for ime in imena:
+            df = pd.read_sql_query(f'SELECT * FROM {_ime(ime)}', povezava)
+            if ime in geometrije and 'fid' in df.columns:
+                # fid je zaporedna številka vrstice v GPKG, ob obnovi se dodeli na novo
+                df = df.drop(columns='fid')
+            tabele[ime] = df
+    return tabele, geometrije
+
+
+class ZgodovinaModela:
+    """
+        Zgodovina posnetkov modela v SQLite datoteki (ustvari se ob prvem posnetku). Posnetki se dodajajo po datumih naraščajoče.
+
+        Args:
+            pot_zgodovine (str): pot do datoteke zgodovine
+            stolpci (dict, optional): uporabniška imena stolpcev (glej gredos_shema.STOLPCI). Defaults to None.
+    """
+    def __init__(self, pot_zgodovine, stolpci=None):
+        self.pot_zgodovine = os.path.abspath(pot_zgodovine)
+        self.stolpci = stolpci
+
+    def _povezi(self):
+        povezava = sqlite3.connect(self.pot_zgodovine)
+        povezava.execute(f'CREATE TABLE IF NOT EXISTS {IME_POSNETKOV} (posnetek INTEGER PRIMARY KEY, datum TEXT UNIQUE NOT NULL, '
+                         'vir TEXT, uvozeno TEXT)')
+        povezava.execute(f'CREATE TABLE IF NOT EXISTS {IME_VSEBINE} (posnetek INTEGER NOT NULL, tabela TEXT NOT NULL, stolpci TEXT, '
+                         'vrstice INTEGER, dodane INTEGER, odstranjene INTEGER, spremenjene INTEGER, PRIMARY KEY (posnetek, tabela))')
+        povezava.execute(f'CREATE TABLE IF NOT EXISTS {IME_TABEL} (tabela TEXT PRIMARY KEY, geometrija TEXT, tip_geometrije TEXT, '
+                         'srs_id INTEGER, crs TEXT)')
+        return povezava
+
+    def posnetki(self):
+        """Seznam posnetkov (posnetek, datum, vir, uvozeno)."""
+        with closing(self._povezi()) as povezava:
+            return pd.read_sql_query(f'SELECT * FROM {IME_POSNETKOV} ORDER BY posnetek', povezava)
+
+    def vsebina(self, datum=None):
+        """Število vrstic ter dodanih, odstranjenih in spremenjenih vrstic po tabelah za vse posnetke ali za posnetek na datum."""
+        with closing(self._povezi()) as povezava:
+            poizvedba = (f'SELECT p.datum, v.tabela, v.vrstice, v.dodane, v.odstranjene, v.spremenjene FROM {IME_VSEBINE} v '
+                         f'JOIN {IME_POSNETKOV} p USING (posnetek)')
+            if datum is None:
+                return pd.read_sql_query(poizvedba + ' ORDER BY v.posnetek, v.tabela', povezava)
+            posnetek = self._posnetek(povezava, datum)
+            return pd.read_sql_query(poizvedba + ' WHERE v.posnetek = ? ORDER BY v.tabela', povezava, params=(posnetek,))
+
+    def _posnetek(self, povezava, datum):
+        """Zadnji posnetek na datum ali pred njim."""
+        datum = datum_posnetka(datum)
+        vrstica = povezava.execute(f'SELECT max(posnetek) FROM {IME_POSNETKOV} WHERE datum <= ?', (datum,)).fetchone()
+        if vrstica[0] is None:
+            raise ValueError(f"V zgodovini {self.pot_zgodovine} ni posnetka na datum {datum} ali pred njim.")
+        return vrstica[0]
+
+    def _stolpci_tabele(self, povezava, tabela):
+        return [v[1] for v in povezava.execute(f'PRAGMA table_info({_ime(tabela)})')]
+
+    def _dodaj_tabelo(self, povezava, posnetek, tabela, df, show_progress=False):
+        """Zapiše spremembe ene tabele in vrne (dodane, odstranjene, spremenjene)."""
+        kljuci = naravni_kljuc(df, tabela, self.stolpci) if df is not None else None
+        zgoscene = zgosti_vrstice(df) if df is not None else np.array([], dtype=np.int64)
+        if df is not None and kljuci is None:
+            # tabela brez znanega ključa: vrstica je določena z vsebino
+            kljuci = pd.Series(zgoscene.view(np.uint64), index=df.index).map('{:016x}'.format)
+            ponovitve = kljuci.groupby(kljuci, sort=False).cumcount()
+            kljuci = kljuci.where(ponovitve == 0, kljuci + '#' + ponovitve.astype(str))
+
+        obstojeci = self._stolpci_tabele(povezava, tabela)
+        if obstojeci:
+            veljavne = pd.read_sql_query(f'SELECT rowid AS vrstica, {KLJUC}, {ZGOSCENA} FROM {_ime(tabela)} WHERE {DO} IS NULL', povezava)
+        else:
+            veljavne = pd.DataFrame({'vrstica': pd.Series(dtype=np.int64), KLJUC: pd.Series(dtype=object), ZGOSCENA: pd.Series(dtype=np.int64)})
+        if df is None:
+            zaprte = veljavne['vrstica']
+            povezava.executemany(f'UPDATE {_ime(tabela)} SET {DO} = ? WHERE rowid = ?', ((posnetek, int(v)) for v in zaprte))
+            return 0, len(zaprte), 0
+
+        # položaj vsakega ključa med veljavnimi vrsticami (ključi so v obeh enolični)
+        polozaj = pd.Index(veljavne[KLJUC]).get_indexer(kljuci.to_numpy())
+        dodane = polozaj < 0
+        spremenjene = np.zeros(len(kljuci), dtype=bool)
+        spremenjene[~dodane] = veljavne[ZGOSCENA].to_numpy()[polozaj[~dodane]] != zgoscene[~dodane]
+        odstranjene = np.ones(len(veljavne), dtype=bool)
+        odstranjene[polozaj[~dodane]] = False
+
+        vrstice = veljavne['vrstica'].to_numpy()
+        zaprte = np.concatenate([vrstice[odstranjene], vrstice[polozaj[spremenjene]]])
+        if len(zaprte):
+            povezava.executemany(f'UPDATE {_ime(tabela)} SET {DO} = ? WHERE rowid = ?', ((posnetek, int(v)) for v in zaprte))
+
+        zapisi = dodane | spremenjene
+        novo = df.loc[zapisi].copy()
+        novo[KLJUC] = kljuci.to_numpy()[zapisi]
+        novo[ZGOSCENA] = zgoscene[zapisi]
+        novo[OD] = posnetek
+        novo[DO] = None
+        if obstojeci:
+            for stolpec in novo.columns:
+                if stolpec not in obstojeci:
+                    povezava.execute(f'ALTER TABLE {_ime(tabela)} ADD COLUMN {_ime(stolpec)}')
+        if not obstojeci:
+            # g2x_do je ob zapisu prazen, tip stolpca pa mora biti INTEGER (primerjave s številkami posnetkov)
+            povezava.execute(pd.io.sql.get_schema(novo.assign(**{DO: 0}), tabela))
+        if len(novo):
+            # executemany namesto to_sql, ki sproti potrjuje transakcijo; posnetek se tako doda v celoti ali nič
+            vrednosti = novo.astype(object).where(novo.notna(), None)
+            povezava.executemany(f'INSERT INTO {_ime(tabela)} ({", ".join(_ime(s) for s in novo.columns)}) '
+                                 f'VALUES ({", ".join("?" * len(novo.columns))})', vrednosti.itertuples(index=False, name=None))
+        if not obstojeci:
+            for stolpec in [KLJUC, OD, DO]:
+                povezava.execute(f'CREATE INDEX IF NOT EXISTS {_ime(f"{tabela}_{stolpec}")} ON {_ime(tabela)} ({stolpec})')
+        if show_progress:
+            print(f"{tabela}: {int(dodane.sum())} dodanih, {int(odstranjene.sum())} odstranjenih, {int(spremenjene.sum())} spremenjenih vrstic.")
+        return int(dodane.sum()), int(odstranjene.sum()), int(spremenjene.sum())
+
+    def dodaj_posnetek(self, pot_gpkg, datum=None, show_progress=False):
+        """Doda izvoz modela (GPKG) kot nov posnetek. Zapišejo se samo dodane in spremenjene vrstice, odstranjenim in spremenjenim
+        vrsticam prejšnjega posnetka pa se zaključi obdobje veljavnosti. Posnetek se doda v eni transakciji.
+
+        Args:
+            pot_gpkg (str): pot do GPKG izvoza modela
+            datum (str or datetime.date, optional): datum modela. Defaults to None (iz imena ali časa spremembe datoteke).
+            show_progress (bool, optional): izpiši spremembe po tabelah. Defaults to False.
+
+        Returns:
+            pandas.DataFrame: tabela, vrstice, dodane, odstranjene, spremenjene.
+        """
+        datum = datum_posnetka(datum, pot_gpkg)
+        tabele, geometrije = preberi_tabele_gpkg(pot_gpkg)
+        with closing(self._povezi()) as povezava, povezava:
+            zadnji = povezava.execute(f'SELECT posnetek, datum FROM {IME_POSNETKOV} ORDER BY posnetek DESC LIMIT 1').fetchone()
+            if zadnji is not None and datum <= zadnji[1]:
+                raise ValueError(f"Posnetek na datum {datum} ni novejši od zadnjega posnetka v zgodovini ({zadnji[1]}).")
+            posnetek = povezava.execute(f'INSERT INTO {IME_POSNETKOV} (datum, vir, uvozeno) VALUES (?, ?, ?)',
+                                        (datum, os.path.abspath(pot_gpkg), datetime.now().isoformat(timespec='seconds'))).lastrowid
+            prej = [v[0] for v in povezava.execute(f'SELECT tabela FROM {IME_TABEL}')]
+            vsebina = []
+            for tabela in list(tabele) + [t for t in prej if t not in tabele]:
+                df = tabele.get(tabela)
+                if tabela in geometrije:
+                    povezava.execute(f'INSERT OR REPLACE INTO {IME_TABEL} VALUES (?, ?, ?, ?, ?)', (tabela, *geometrije[tabela]))
+                elif tabela not in prej:
+                    povezava.execute(f'INSERT INTO {IME_TABEL} (tabela) VALUES (?)', (tabela,))
+                dodane, odstranjene, spremenjene = self._dodaj_tabelo(povezava, posnetek, tabela, df, show_progress)
+                if df is not None:
+                    vsebina.append((posnetek, tabela, json.dumps([str(s) for s in df.columns]), len(df), dodane, odstranjene, spremenjene))
+            povezava.executemany(f'INSERT INTO {IME_VSEBINE} VALUES (?, ?, ?, ?, ?, ?, ?)', vsebina)
+        return pd.DataFrame([v[1:2] + v[3:] for v in vsebina], columns=['tabela', 'vrstice', 'dodane', 'odstranjene', 'spremenjene'])
+
+    def _v_geografsko(self, povezava, tabela, df):
+        """Pretvori GPKG bloke geometrij v GeoDataFrame, če je tabela geografska plast."""
+        vrstica = povezava.execute(f'SELECT geometrija, crs FROM {IME_TABEL} WHERE tabela = ?', (tabela,)).fetchone()
+        if vrstica is None or vrstica[0] is None or vrstica[0] not in df.columns:
+            return df
+        stolpec, crs = vrstica
+        geometrije = shapely.from_wkb([gpkg_blob_v_wkb(blob) for blob in df[stolpec]])
+        return gpd.GeoDataFrame(df.drop(columns=stolpec), geometry=gpd.GeoSeries(geometrije, index=df.index, crs=crs))
+
+    def stanje(self, datum, tabela, geografsko=True):
+        """Stanje tabele na datum (zadnji posnetek na ta datum ali pred njim).
+
+        Args:
+            datum (str or datetime.date): datum
+            tabela (str): ime tabele ali geografske plasti
+            geografsko (bool, optional): geografske plasti vrni kot GeoDataFrame; sicer ostanejo GPKG bloki. Defaults to True.
+
+        Returns:
+            pandas.DataFrame or geopandas.GeoDataFrame: vrstice in stolpci tabele, kot so bili v posnetku.
+        """
+        with closing(self._povezi()) as povezava:
+            posnetek = self._posnetek(povezava, datum)
+            vrstica = povezava.execute(f'SELECT stolpci FROM {IME_VSEBINE} WHERE tabela = ? AND posnetek = ?', (tabela, posnetek)).fetchone()
+            if vrstica is None:
+                raise KeyError(f"Tabele {tabela} ni v zgodovini na datum {datum_posnetka(datum)}.")
+            stolpci = json.loads(vrstica[0])
+            df = pd.read_sql_query(f'SELECT {", ".join(_ime(s) for s in stolpci)} FROM {_ime(tabela)} '
+                                   f'WHERE {OD} <= ? AND ({DO} IS NULL OR {DO} > ?) ORDER BY rowid', povezava, params=(posnetek, posnetek))
+            return self._v_geografsko(povezava, tabela, df) if geografsko else df
+
+    def tabele(self, datum):
+        """Imena tabel v posnetku na datum."""
+        with closing(self._povezi()) as povezava:
+            posnetek = self._posnetek(povezava, datum)
+            return [v[0] for v in povezava.execute(f'SELECT tabela FROM {IME_VSEBINE} WHERE posnetek = ? ORDER BY tabela', (posnetek,))]
+
+    def model(self, datum, tabele=None):
+        """Stanje vseh (ali izbranih) tabel na datum kot slovar ime tabele -> DataFrame (glej stanje)."""
+        return {tabela: self.stanje(datum, tabela) for tabela in (tabele or self.tabele(datum))}
+
+    def izvozi_gpkg(self, datum, pot_gpkg):
+        """Obnovi izvoz modela na datum v GPKG datoteko (tabele z to_sql, geografske plasti z to_file)."""
+        if os.path.exists(pot_gpkg):
+            os.remove(pot_gpkg)
+        model = self.model(datum)
+        for tabela, df in model.items():
+            if isinstance(df, gpd.GeoDataFrame):
+                df.to_file(pot_gpkg, driver='GPKG', layer=tabela, encoding='utf-8')
+        with closing(sqlite3.connect(pot_gpkg)) as povezava, povezava:
+            for tabela, df in model.items():
+                if not isinstance(df, gpd.GeoDataFrame):
+                    df.to_sql(tabela, povezava, index=False, if_exists='replace')
+
+    def razlike(self, datum1, datum2, tabele=None):
+        """Razlike med posnetkoma na dva datuma. Prebere se le vrstice, ki so se med posnetkoma začele ali prenehale veljati.
+
+        Args:
+            datum1 (str or datetime.date): prejšnji datum
+            datum2 (str or datetime.date): novejši datum
+            tabele (list, optional): imena tabel. Defaults to None (vse tabele).
+
+        Returns:
+            pandas.DataFrame: tabela, kljuc, sprememba ('dodan', 'odstranjen', 'spremenjen') in stolpci (spremenjeni stolpci, ločeni z vejico).
+        """
+        deli = []
+        with closing(self._povezi()) as povezava:
+            s1, s2 = self._posnetek(povezava, datum1), self._posnetek(povezava, datum2)
+            if s1 > s2:
+                raise ValueError(f"Datum {datum_posnetka(datum1)} je novejši od datuma {datum_posnetka(datum2)}.")
+            imena = tabele or [v[0] for v in povezava.execute(f'SELECT tabela FROM {IME_TABEL} ORDER BY tabela')]
+            for tabela in imena:
+                if not self._stolpci_tabele(povezava, tabela):
+                    continue
+                # vrstice, ki so začele veljati v (s1, s2] ali prenehale veljati v (s1, s2]
+                df = pd.read_sql_query(f'SELECT * FROM {_ime(tabela)} WHERE ({OD} > ? AND {OD} <= ?) OR ({DO} > ? AND {DO} <= ?)',
+                                       povezava, params=(s1, s2, s1, s2))
+                prej = df[(df[OD] <= s1) & (df[DO].isna() | (df[DO] > s1))].set_index(KLJUC)
+                potem = df[(df[OD] <= s2) & (df[DO].isna() | (df[DO] > s2))].set_index(KLJUC)
+                oba = prej.index.intersection(potem.index)
+                stolpci = [s for s in df.columns if s not in POMOZNI_STOLPCI]
+                a, b = prej.loc[oba, stolpci], potem.loc[oba, stolpci]
+                razlicni = (a != b) & ~(a.isna() & b.isna())
+                deli.append(pd.DataFrame({'tabela': tabela, 'kljuc': potem.index.difference(prej.index), 'sprememba': 'dodan', 'stolpci': ''}))
+                deli.append(pd.DataFrame({'tabela': tabela, 'kljuc': prej.index.difference(potem.index), 'sprememba': 'odstranjen', 'stolpci': ''}))
+                deli.append(pd.DataFrame({'tabela': tabela, 'kljuc': oba, 'sprememba': 'spremenjen',
+                                          'stolpci': [','.join(razlicni.columns[v]) for v in razlicni.to_numpy()]}))
+        if not deli:
+            return pd.DataFrame(columns=STOLPCI_RAZLIK)
+        return pd.concat(deli, ignore_index=True)[STOLPCI_RAZLIK]
@@ -1,11 +1,11 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
+from tkinter import filedialog, messagebox, scrolledtext, ttk
 import os
-import sys
-import threading
+import queue
 
 # Assuming gredos2x is installed or its path is in sys.path
 from gredos2x.gredos2gpkg import Gredos2GPKG
+from gredos2x.gredos_meritve import IzvozPreklican
 
 class GredosExportApp:
     def __init__(self, master):
@@ -45,30 +45,29 @@ class GredosExportApp:
         # For simplicity, set_crs is hardcoded to 'EPSG:3912' as in the original example.
         # A more advanced GUI might offer a dropdown or entry for set_crs.
 
-        # --- Export Button ---
-        self.export_button = tk.Button(master, text="Začni izvoz", command=self.start_export_thread)
-        self.export_button.grid(row=4, column=0, columnspan=3, pady=10)
+        # --- Export / Cancel Buttons and Progress ---
+        self.export_button = tk.Button(master, text="Začni izvoz", command=self.start_export)
+        self.export_button.grid(row=4, column=0, pady=10)
+        self.cancel_button = tk.Button(master, text="Prekliči", command=self.cancel_export, state='disabled')
+        self.cancel_button.grid(row=4, column=2, pady=10)
+        self.progress = ttk.Progressbar(master, length=400, maximum=1.0)
+        self.progress.grid(row=4, column=1, padx=5, pady=10)
+        self.export_task = None
+        # progress reported by the export thread, drained on the GUI thread in check_export
+        self.progress_queue = queue.Queue()
+        self.last_table = None
 
         # --- Status / Log Area ---
         tk.Label(master, text="Status / Log:").grid(row=5, column=0, sticky="w", padx=5, pady=2)
         self.log_text = scrolledtext.ScrolledText(master, width=90, height=15, state='disabled')
         self.log_text.grid(row=6, column=0, columnspan=3, padx=5, pady=5)
 
-        # Redirect print statements to the log_text widget
-        self.original_stdout = sys.stdout
-        sys.stdout = self
-
     def write(self, text):
-        """Writes text to the scrolled text widget and the original stdout."""
+        """Writes text to the scrolled text widget. Must only be called from the GUI thread."""
         self.log_text.config(state='normal')
         self.log_text.insert(tk.END, text)
         self.log_text.see(tk.END) # Auto-scroll to the end
         self.log_text.config(state='disabled')
-        self.original_stdout.write(text) # Also print to console for debugging/logging
-
-    def flush(self):
-        """Required for file-like object behavior."""
-        self.original_stdout.flush()
 
     def browse_mdb(self):
         filename = filedialog.askopenfilename(
@@ -98,19 +97,12 @@ class GredosExportApp:
             self.gpkg_path_entry.delete(0, tk.END)
             self.gpkg_path_entry.insert(0, filename)
 
-    def start_export_thread(self):
-        """Starts the export process in a separate thread to keep the GUI responsive."""
-        self.export_button.config(state='disabled') # Disable button during export
+    def start_export(self):
+        """Starts the export in the background (pozeni_uvoz_v_ozadju) and polls its progress, so the GUI stays responsive."""
         self.log_text.config(state='normal')
         self.log_text.delete(1.0, tk.END) # Clear previous log
         self.log_text.config(state='disabled')
-        self.write("Export process started...\n")
-
-        export_thread = threading.Thread(target=self.run_export)
-        export_thread.start()
 
-    def run_export(self):
-        """Executes the Gredos2GPKG export logic."""
         mdb_path = self.mdb_path_entry.get()
         materials_path = self.materials_path_entry.get()
         gpkg_output_path = self.gpkg_path_entry.get()
@@ -120,47 +112,83 @@ class GredosExportApp:
         if not mdb_path or not materials_path or not gpkg_output_path:
             messagebox.showerror("Error", "All paths must be provided.")
             self.write("Error: All paths must be provided.\n")
-            self.export_button.config(state='normal')
             return
 
         if not os.path.exists(mdb_path):
             messagebox.showerror("Error", f"Gredos MDB file not found: {mdb_path}")
             self.write(f"Error: Gredos MDB file not found: {mdb_path}\n")
-            self.export_button.config(state='normal')
             return
 
         if not os.path.exists(materials_path):
             messagebox.showerror("Error", f"Materials MDB file not found: {materials_path}")
             self.write(f"Error: Materials MDB file not found: {materials_path}\n")
-            self.export_button.config(state='normal')
             return
 
+        self.write("Export process started...\n")
+        self.write(f"Initializing Gredos2GPKG with:\n")
+        self.write(f"  MDB: {mdb_path}\n")
+        self.write(f"  Materials: {materials_path}\n")
+        self.write(f"  Output GPKG: {gpkg_output_path}\n")
+        self.write(f"  Convert CRS: {pretvori_crs}\n")
+        self.write(f"  Set CRS: {set_crs}\n")
+
+        self.export_button.config(state='disabled') # Disable button during export
+        self.cancel_button.config(state='normal')
+        self.progress['value'] = 0.0
+        self.last_table = None
+        gredos2gpkg_instance = Gredos2GPKG(
+            povezava_mdb=mdb_path,
+            pot_materiali=materials_path,
+            povezava_gpkg=gpkg_output_path
+        )
+        # the output file is replaced only when the export succeeds; cancelling leaves the previous export untouched
+        self.export_task = gredos2gpkg_instance.pozeni_uvoz_v_ozadju(
+            self.on_progress,
+            pretvori_crs=pretvori_crs,
+            set_crs=set_crs
+        )
+        self.master.after(200, self.check_export)
+
+    def on_progress(self, delez, tabela):
+        """Called from the export thread; only queues the progress, the widgets are updated in check_export on the GUI thread."""
+        self.progress_queue.put((delez, tabela))
+
+    def drain_progress(self):
+        """Updates the progress bar and logs each newly written table from the queued progress."""
+        while True:
+            try:
+                delez, tabela = self.progress_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.progress['value'] = delez
+            if tabela is not None and tabela != self.last_table:
+                self.last_table = tabela
+                self.write(f"{delez:.0%} Writing {tabela}\n")
+
+    def cancel_export(self):
+        if self.export_task is not None and self.export_task.preklici():
+            self.write("Cancelling export...\n")
+            self.cancel_button.config(state='disabled')
+
+    def check_export(self):
+        """Polls the background export from the GUI thread."""
+        self.drain_progress()
+        if not self.export_task.koncano():
+            self.master.after(200, self.check_export)
+            return
         try:
-            self.write(f"Initializing Gredos2GPKG with:\n")
-            self.write(f"  MDB: {mdb_path}\n")
-            self.write(f"  Materials: {materials_path}\n")
-            self.write(f"  Output GPKG: {gpkg_output_path}\n")
-            self.write(f"  Convert CRS: {pretvori_crs}\n")
-            self.write(f"  Set CRS: {set_crs}\n")
-
-            gredos2gpkg_instance = Gredos2GPKG(
-                povezava_mdb=mdb_path,
-                pot_materiali=materials_path,
-                povezava_gpkg=gpkg_output_path
-            )
-            self.write("Gredos2GPKG instance created. Starting export...\n")
-            gredos2gpkg_instance.pozeni_uvoz(
-                show_progress=True,
-                pretvori_crs=pretvori_crs,
-                set_crs=set_crs
-            )
+            self.export_task.rezultat()
             messagebox.showinfo("Success", "Export completed successfully!")
             self.write("Export completed successfully!\n")
+        except IzvozPreklican:
+            self.write("Export cancelled, output file was not changed.\n")
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred during export: {e}")
             self.write(f"Error during export: {e}\n")
         finally:
+            self.export_task = None
             self.export_button.config(state='normal') # Re-enable button
+            self.cancel_button.config(state='disabled')
 
 if __name__ == "__main__":
     root = tk.Tk()
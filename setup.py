@@ -15,6 +15,10 @@ setup(
     url='https://github.com/GSkrt/gredos2x',
     py_modules=['gredos2x'],
     install_requires = ['geopandas', 'fiona', 'sqlalchemy','pyodbc','sqlalchemy-access', 'psycopg2-binary', 'geoalchemy2'],
+    extras_require = {'pandapower': ['pandapower'], 'parquet': ['pyarrow']},
+    entry_points = {'console_scripts': ['gredos2x-pretvorba=gredos2x.gredos_paketna_pretvorba:main',
+                                          'gredos2x-celovitost=gredos2x.gredos_preverjanje:main',
+                                          'gredos2x-razlike=gredos2x.gredos_razlike:main']},
     classifiers=[
         'Development Status :: 1 - Planning',
         'Intended Audience :: Science/Research',
@@ -0,0 +1,114 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+"""
+Skupne nastavitve testov. Testi uporabljajo sintetični model (glej benchmarks/sinteticni_model.py), ki namesto mdb-tools uporablja
+skripte v imeniku bin/ modela, zato tečejo samo na linux.
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+KOREN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, KOREN)
+sys.path.insert(0, os.path.join(KOREN, 'benchmarks'))
+
+# predpomnilniki gredos2x (materiali, rezultati) v začasnem imeniku; IMENIK_GREDOS2X se določi ob uvozu gredos2x
+_PREDPOMNILNIK = tempfile.mkdtemp(prefix='gredos2x_testi_')
+os.environ['XDG_CACHE_HOME'] = _PREDPOMNILNIK
+atexit.register(shutil.rmtree, _PREDPOMNILNIK, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def sinteticni_model(tmp_path_factory):
+    """Sintetični model z 10 izvodi po 200 vozlišč (dict s potmi 'mdb', 'materiali', 'bin' in številom vrstic 'vrstice')."""
+    if not sys.platform.startswith('linux'):
+        pytest.skip('sintetični model potrebuje skripte namesto mdb-tools (samo linux)')
+    from sinteticni_model import zgradi_sinteticni_model, okolje_mdb_tools
+
+    imenik = str(tmp_path_factory.mktemp('sinteticni_model'))
+    model = zgradi_sinteticni_model(imenik, 2000, vozlisc_na_izvod=200)
+    okolje_mdb_tools(imenik)
+    return model
+
+
+@pytest.fixture
+def kopija_modela(sinteticni_model, tmp_path):
+    """Kopija sintetičnega modela, ki jo test lahko spreminja. Skripti mdb-tools berejo tabele iz imenika podane mdb datoteke."""
+    imenik = str(tmp_path / 'model')
+    shutil.copytree(os.path.dirname(sinteticni_model['mdb']), imenik)
+    return {**sinteticni_model, 'mdb': os.path.join(imenik, 'model.mdb'), 'materiali': os.path.join(imenik, 'material.mdb'),
+            'bin': os.path.join(imenik, 'bin'), 'imenik': imenik}
+
+
+@pytest.fixture
+def posnetka_modela(kopija_modela, tmp_path):
+    """Izvoza dveh posnetkov modela (26_1_2026.gpkg in 26_2_2026.gpkg). V drugem posnetku je spremenjen odjem enega vozlišča,
+    premaknjena lega drugega in odstranjeno eno logično vozlišče; dict s potmi 'posnetki' in ključi 'spremenjeno', 'premaknjeno'
+    in 'odstranjeno'."""
+    import geopandas as gpd
+    import pandas as pd
+    import shapely
+    from gredos2x.gredos2gpkg import Gredos2GPKG
+
+    imenik = kopija_modela['imenik']
+    posnetki = [str(tmp_path / f'{datum}.gpkg') for datum in ['26_1_2026', '26_2_2026']]
+    Gredos2GPKG(kopija_modela['mdb'], kopija_modela['materiali'], posnetki[0]).pozeni_uvoz(velikost_dela=500)
+
+    pot_node = os.path.join(imenik, 'Node.csv')
+    node = pd.read_csv(pot_node, dtype=str)
+    spremenjeno = node.at[100, 'NodeId']
+    node.at[100, 'P'] = '999.5'
+    node.to_csv(pot_node, index=False)
+    pot_point = os.path.join(imenik, 'POINT.shp')
+    point = gpd.read_file(pot_point)
+    premaknjeno = point.at[200, 'NodeId']
+    point.loc[200, 'geometry'] = shapely.affinity.translate(point.geometry[200], 5, 0)
+    point.to_file(pot_point, encoding='cp1250')
+    pot_lnode = os.path.join(imenik, 'LNode.csv')
+    lnode = pd.read_csv(pot_lnode, dtype=str)
+    odstranjeno = lnode.at[300, 'LNodeId']
+    lnode.drop(index=300).to_csv(pot_lnode, index=False)
+    Gredos2GPKG(kopija_modela['mdb'], kopija_modela['materiali'], posnetki[1]).pozeni_uvoz(velikost_dela=500)
+
+    return {'posnetki': posnetki, 'spremenjeno': spremenjeno, 'premaknjeno': premaknjeno, 'odstranjeno': odstranjeno}
+
+
+@pytest.fixture
+def mssql_na_sqlite(sinteticni_model, tmp_path, monkeypatch):
+    """Gredos2MSSQL za sintetični model, ki namesto SQL Server baze piše v SQLite (brez shem). Stavki, specifični za SQL Server
+    (komentarji tabel, geometrija in prostorski indeks), se v SQLite ne izvedejo."""
+    import sqlalchemy
+    from gredos2x import gredos2mssql
+
+    baza = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'mssql.sqlite'}")
+    monkeypatch.setattr(gredos2mssql.sa, 'create_engine', lambda *args, **kwargs: baza)
+    return gredos2mssql.Gredos2MSSQL(sinteticni_model['mdb'], sinteticni_model['materiali'], ime_sheme=None)
+
+
+@pytest.fixture(scope='session')
+def izvoz_modela(sinteticni_model, tmp_path_factory):
+    """GPKG izvoz sintetičnega modela s parametri vej. Testi ga le berejo; testi, ki v GPKG pišejo, naj uporabijo kopijo."""
+    from gredos2x.gredos2gpkg import Gredos2GPKG
+
+    izhod = str(tmp_path_factory.mktemp('izvoz_modela') / 'model.gpkg')
+    Gredos2GPKG(sinteticni_model['mdb'], sinteticni_model['materiali'], izhod).pozeni_uvoz(parametri_vej=True, velikost_dela=1000)
+    return izhod
@@ -0,0 +1,61 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+KOREN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKI = os.path.join(KOREN, 'benchmarks')
+
+
+def pozeni(skripta, *argumenti):
+    okolje = dict(os.environ, PYTHONPATH=KOREN + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    return subprocess.run([sys.executable, os.path.join(BENCHMARKI, skripta), *argumenti], capture_output=True, text=True,
+                          env=okolje, timeout=600)
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='sintetični model potrebuje skripte namesto mdb-tools (samo linux)')
+def test_meritve_zmogljivosti(tmp_path):
+    izhod = str(tmp_path / 'rezultati.json')
+    proces = pozeni('meritve_zmogljivosti.py', '--velikosti', '2000', '--izhod', izhod, '--imenik', str(tmp_path))
+    assert proces.returncode == 0, proces.stderr
+
+    with open(izhod, encoding='utf-8') as f:
+        rezultati = json.load(f)['rezultati']
+    faze = {r['faza']: r for r in rezultati}
+    assert {'uvozi_podatke_mdb', 'nalozi_negeografsko_tabelo:Node', 'izracunaj_pretok_moci'} <= set(faze)
+    assert all(r['st_vozlisc'] == 2000 and r['cas_s'] >= 0 for r in rezultati)
+    assert faze['nalozi_negeografsko_tabelo:Node']['vrstice'] == 2000
+
+    # primerjava z lastnimi rezultati ne najde poslabšanj pri velikem pragu
+    proces = pozeni('meritve_zmogljivosti.py', '--velikosti', '2000', '--izhod', str(tmp_path / 'ponovno.json'),
+                    '--imenik', str(tmp_path / 'ponovno'), '--primerjaj', izhod, '--prag', '1000')
+    assert proces.returncode == 0, proces.stdout + proces.stderr
+
+
+def test_cas_uvoza(tmp_path):
+    # časovni proračun je ohlapen, test preverja, da uvoz modulov ne naloži težkih odvisnosti
+    izhod = str(tmp_path / 'uvoz.json')
+    proces = pozeni('cas_uvoza.py', '--ponovitve', '1', '--proracun', '30', '--proracun-ukaza', '60', '--izhod', izhod)
+    assert proces.returncode == 0, proces.stdout + proces.stderr
+
+    with open(izhod, encoding='utf-8') as f:
+        rezultati = json.load(f)['rezultati']
+    assert any(r['modul'].startswith('gredos2x-pretvorba') for r in rezultati)
+    assert all(r['uspeh'] and not r['tezki_moduli'] for r in rezultati)
@@ -0,0 +1,64 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import shutil
+import zipfile
+import xml.etree.ElementTree as ET
+
+from gredos2x.gredos2cim import Gredos2CIM, mrid, CIM
+
+RDF = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+
+
+def izvozi(izvoz_modela, imenik):
+    imenik.mkdir()
+    gpkg = str(imenik / 'model.gpkg')
+    shutil.copy(izvoz_modela, gpkg)
+    pot = Gredos2CIM(gpkg, str(imenik / 'model.zip'), velikost_paketa=300).pozeni_izvoz()
+    with zipfile.ZipFile(pot) as arhiv:
+        return {ime: ET.fromstring(arhiv.read(ime)) for ime in arhiv.namelist()}
+
+
+def identifikatorji(koren):
+    return {element.get(f'{{{RDF}}}ID') or element.get(f'{{{RDF}}}about') for element in koren}
+
+
+def test_profili_cim(sinteticni_model, izvoz_modela, tmp_path):
+    profili = izvozi(izvoz_modela, tmp_path / 'prvi')
+    assert sorted(profili) == ['model_EQ.xml', 'model_GL.xml', 'model_TP.xml']
+
+    vrstice = sinteticni_model['vrstice']
+    eq, tp, gl = profili['model_EQ.xml'], profili['model_TP.xml'], profili['model_GL.xml']
+    assert len(eq.findall(f'{{{CIM}}}ConnectivityNode')) == vrstice['Node']
+    assert len(eq.findall(f'{{{CIM}}}Substation')) == vrstice['LNode']
+    assert len(tp.findall(f'{{{CIM}}}TopologicalNode')) == vrstice['Node']
+    assert len(gl.findall(f'{{{CIM}}}Location')) == vrstice['POINT_geo'] + vrstice['LINE_geo'] + vrstice['LNODE_geo']
+
+    # TP in GL se sklicujeta na elemente iz EQ
+    eq_id = {'#' + i for i in identifikatorji(eq)}
+    opisi = tp.findall(f'{{{RDF}}}Description')
+    assert len(opisi) == vrstice['Node'] and {o.get(f'{{{RDF}}}about') for o in opisi} <= eq_id
+
+    # ponoven izvoz da iste mRID
+    ponovno = izvozi(izvoz_modela, tmp_path / 'drugi')
+    for ime, koren in profili.items():
+        assert identifikatorji(ponovno[ime]) == identifikatorji(koren)
+
+
+def test_mrid_stabilen():
+    assert mrid('Node', '1000000') == mrid('Node', 1000000) == mrid('Node', 1000000.0) == mrid('Node', ' 1000000 ')
+    assert mrid('Node', '1000000') != mrid('Branch', '1000000')
+    # mRID je odvisen samo od imenskega prostora, tipa in šifre, zato ostane enak med izvozi in različicami
+    assert mrid('Node', '1000000') == '193ee226-ce3c-593c-b1d3-2ccdb40d4cf8'
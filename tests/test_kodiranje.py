@@ -0,0 +1,59 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import shutil
+
+import pandas as pd
+
+from gredos2x.gredos_gpkg2dataframes import GredosGPKG2df
+from gredos2x.gredos_kodiranje import SlovarKljucev, stolpci_kljucev, IME_TABELE
+from gredos2x.gredos_shema import kljuc_kot_niz
+
+
+def test_kodiran_model_se_odkodira_v_izvirne_tabele(izvoz_modela, tmp_path):
+    gpkg = str(tmp_path / 'model.gpkg')
+    shutil.copy(izvoz_modela, gpkg)
+    rd = GredosGPKG2df(gpkg)
+    kodirane, slovar = rd.nalozi_kodiran_model()
+    assert rd.tabela_obstaja(IME_TABELE)
+    assert set(kodirane) == {'LNode', 'Node', 'Branch', 'Section', 'Transformer', 'Switching_device', 'MATERIAL'}
+
+    for ime, kodirana in kodirane.items():
+        izvirna = rd.nalozi_negeografsko_tabelo(ime)
+        kljuci = stolpci_kljucev(izvirna, ime)
+        assert kljuci and all(str(kodirana[stolpec].dtype) == 'Int32' for stolpec in kljuci)
+
+        odkodirana = slovar.odkodiraj_tabelo(kodirana, ime)
+        assert list(odkodirana.columns) == list(izvirna.columns)
+        for stolpec in izvirna.columns:
+            if stolpec in kljuci:
+                pd.testing.assert_series_equal(odkodirana[stolpec], kljuc_kot_niz(izvirna[stolpec]), check_names=False)
+            else:
+                pd.testing.assert_series_equal(odkodirana[stolpec], izvirna[stolpec])
+
+    # ponovno nalaganje prebere shranjen slovar in da iste kode
+    ponovno, shranjen = GredosGPKG2df(gpkg).nalozi_kodiran_model()
+    assert {d: k.tolist() for d, k in shranjen.kljuci.items()} == {d: k.tolist() for d, k in slovar.kljuci.items()}
+    for ime in kodirane:
+        pd.testing.assert_frame_equal(ponovno[ime], kodirane[ime])
+
+
+def test_nov_kljuc_ne_spremeni_obstojecih_kod():
+    slovar = SlovarKljucev()
+    assert slovar.kodiraj('vozlisce', pd.Series(['20', '10', None, '10'])).tolist() == [1, 0, -1, 0]
+    # novi ključi dobijo kode za obstoječimi
+    assert slovar.kodiraj('vozlisce', pd.Series(['05', '10', '20'])).tolist() == [2, 0, 1]
+    assert slovar.odkodiraj('vozlisce', [2, 0, -1]).tolist() == ['05', '10', pd.NA]
+    assert SlovarKljucev.iz_tabele(slovar.v_tabelo()).kljuci['vozlisce'].tolist() == ['10', '20', '05']
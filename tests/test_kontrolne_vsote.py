@@ -0,0 +1,52 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from gredos2x.gredos2gpkg import Gredos2GPKG
+from gredos2x.gredos_kontrolne_vsote import preberi_kontrolne_vsote, zgosti_vrstice
+
+
+def test_zgoscene_neodvisne_od_tipa_stolpca():
+    # del brez manjkajočih vrednosti se prebere kot int64, del z manjkajočo vrednostjo kot float64 ali object
+    cela = pd.DataFrame({'a': [1, 2], 'b': ['x', None]})
+    realna = pd.DataFrame({'a': [1.0, 2.0], 'b': ['x', np.nan]})
+    objekti = pd.DataFrame({'a': pd.Series([1, 2], dtype=object), 'b': ['x', pd.NA]})
+    assert (zgosti_vrstice(cela) == zgosti_vrstice(realna)).all()
+    assert (zgosti_vrstice(cela) == zgosti_vrstice(objekti)).all()
+
+    manjkajoce = [pd.DataFrame({'a': [np.nan]}), pd.DataFrame({'a': pd.Series([None], dtype=object)}),
+                  pd.DataFrame({'a': pd.Series([pd.NA], dtype='Int64')})]
+    assert len({int(zgosti_vrstice(df)[0]) for df in manjkajoce}) == 1
+
+
+def test_manifest_neodvisen_od_velikosti_dela(kopija_modela, tmp_path):
+    # manjkajoča vrednost v drugem delu tabele Node spremeni tip stolpca Generation samo v tem delu
+    pot_node = os.path.join(kopija_modela['imenik'], 'Node.csv')
+    node = pd.read_csv(pot_node, dtype=str)
+    node.loc[1500, 'Generation'] = None
+    node.to_csv(pot_node, index=False)
+
+    manifesti = []
+    for velikost_dela in [None, 1000]:
+        izhod = str(tmp_path / f'izvoz_{velikost_dela}.gpkg')
+        izvoz = Gredos2GPKG(kopija_modela['mdb'], kopija_modela['materiali'], izhod)
+        izvoz.pozeni_uvoz(velikost_dela=velikost_dela)
+        manifesti.append(preberi_kontrolne_vsote(izvoz).set_index('tabela')[['vrstice', 'kontrolna_vsota']].sort_index())
+    pd.testing.assert_frame_equal(*manifesti)
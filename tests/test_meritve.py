@@ -0,0 +1,52 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import pandas as pd
+
+from gredos2x.gredos2gpkg import Gredos2GPKG
+from gredos2x.gredos_meritve import Merilnik, merilnik_izvoza
+
+
+def test_privzeti_merilnik_brez_vzorcenja():
+    merilnik = merilnik_izvoza(None, 'Gredos2GPKG')
+    with merilnik.faza('zapis', tabela='Node') as meritev:
+        meritev.dodaj(pd.DataFrame({'a': range(10)}))
+        # brez niti za vzorčenje pomnilnika
+        assert merilnik._vzorcevalnik is None and not merilnik._aktivne
+
+    dogodek = merilnik.dogodki[-1]
+    assert (dogodek['vrstice'], dogodek['bajti'], dogodek['najvecji_rss_mb']) == (10, 0, None)
+    assert dogodek['izvoz'] == 'Gredos2GPKG'
+
+
+def test_podan_merilnik_meri_podrobno(sinteticni_model, tmp_path):
+    merilnik = Merilnik()
+    izhod = str(tmp_path / 'izvoz.gpkg')
+    Gredos2GPKG(sinteticni_model['mdb'], sinteticni_model['materiali'], izhod, merilnik=merilnik).pozeni_uvoz(velikost_dela=500)
+
+    zapisi = [d for d in merilnik.dogodki if d['faza'] == 'zapis']
+    assert sum(d['vrstice'] for d in zapisi if d['tabela'] == 'Node') == sinteticni_model['vrstice']['Node']
+    assert all(d['bajti'] > 0 for d in zapisi)
+    assert all(d['najvecji_rss_mb'] for d in zapisi)
+
+
+def test_profiliranje_meri_podrobno(tmp_path):
+    merilnik = merilnik_izvoza(None, 'Gredos2GPKG')
+    with merilnik.profiliranje(str(tmp_path / 'profili')):
+        with merilnik.faza('zapis', tabela='Node') as meritev:
+            meritev.dodaj(pd.DataFrame({'a': range(10)}))
+
+    dogodek = merilnik.dogodki[-1]
+    assert dogodek['bajti'] > 0 and dogodek['najvecji_rss_mb'] and dogodek['profil']
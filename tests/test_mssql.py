@@ -0,0 +1,46 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import geopandas as gpd
+import pandas as pd
+import shapely
+import sqlalchemy
+
+from gredos2x.gredos2mssql import Gredos2MSSQL
+
+
+def test_wkb_dela_plasti():
+    tocke = gpd.GeoDataFrame({'NodeId': ['1', '2', '3']}, geometry=[shapely.Point(1, 2), None, shapely.Point(3, 4)], crs='EPSG:3912')
+
+    wkb = Gredos2MSSQL._pripravi_wkb('POINT_geo', tocke.copy())['geom_wkb']
+
+    assert wkb[1] is None
+    assert list(shapely.from_wkb(wkb[[0, 2]].to_numpy())) == [tocke.geometry[0], tocke.geometry[2]]
+
+
+def test_zapis_plasti_po_delih(mssql_na_sqlite):
+    izvoz = mssql_na_sqlite
+    tocke = gpd.GeoDataFrame({'NodeId': [str(i) for i in range(5)]},
+                             geometry=[shapely.Point(i, i) for i in range(4)] + [None], crs='EPSG:3912')
+
+    # prvi del dobi WKB v niti bralca (_pripravi_wkb), drugi šele ob zapisu
+    izvoz._zapisi_del_geodf_mssql(Gredos2MSSQL._pripravi_wkb('POINT_geo', tocke.iloc[:2].copy()), 'POINT_geo')
+    izvoz._zapisi_del_geodf_mssql(tocke.iloc[2:], 'POINT_geo', if_exists='append', zamik=2)
+
+    with izvoz.mssql_engine.connect() as povezava:
+        zapisano = pd.read_sql_query(sqlalchemy.text('SELECT * FROM g2x_POINT_geo ORDER BY id'), povezava)
+    assert zapisano['id'].tolist() == list(range(5))
+    assert zapisano['geom_wkb'][4] is None
+    assert list(shapely.from_wkb(zapisano['geom_wkb'][:4].to_numpy())) == list(tocke.geometry[:4])
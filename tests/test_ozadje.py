@@ -0,0 +1,61 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import os
+
+import pytest
+import sqlalchemy
+
+from gredos2x.gredos2gpkg import Gredos2GPKG
+from gredos2x.gredos_meritve import IzvozPreklican
+from gredos2x.gredos_ozadje import NAJVECJI_DELEZ_ZAPISA, pozeni_v_ozadju
+
+
+def test_preklic_izvoza_v_ozadju_ne_pusti_datotek(sinteticni_model, tmp_path):
+    izhod = str(tmp_path / 'izvoz.gpkg')
+    izvoz = Gredos2GPKG(sinteticni_model['mdb'], sinteticni_model['materiali'], izhod)
+    napredek = []
+
+    def povratni_klic(delez, tabela):
+        # preklic med izvozom, ko je v začasno datoteko že zapisan prvi del
+        napredek.append(delez)
+        if delez > 0:
+            opravilo.preklici()
+
+    opravilo = izvoz.pozeni_uvoz_v_ozadju(povratni_klic, velikost_dela=500)
+    with pytest.raises(IzvozPreklican):
+        opravilo.rezultat(timeout=120)
+
+    assert opravilo.preklican() and any(napredek)
+    assert os.listdir(tmp_path) == []
+    assert izvoz.gpkg_path == izhod
+
+
+def test_napredek_izvoza_s_predpono_tabel(sinteticni_model, mssql_na_sqlite):
+    # Gredos2MSSQL tabele zapiše s predpono g2x_
+    izvoz = mssql_na_sqlite
+    napredek = []
+
+    opravilo = pozeni_v_ozadju(izvoz, lambda delez, tabela: napredek.append((delez, tabela)), metoda='mdb_2_mssql', velikost_dela=500)
+    opravilo.rezultat(timeout=120)
+
+    # napredek se povečuje po delih tabel (ključi so imena tabel brez predpone), ne šele ob koncu
+    vmesni = [delez for delez, tabela in napredek if 0 < delez < 1]
+    assert len(vmesni) >= len(izvoz.spisek_tabel)
+    assert vmesni == sorted(vmesni) and vmesni[-1] <= NAJVECJI_DELEZ_ZAPISA
+    assert {tabela for _, tabela in napredek if tabela} == set(izvoz.spisek_tabel)
+    assert set(opravilo.zapisane_vrstice) <= set(opravilo.skupaj_vrstic)
+    with izvoz.mssql_engine.connect() as povezava:
+        assert povezava.execute(sqlalchemy.text('SELECT count(*) FROM g2x_Node')).scalar() == sinteticni_model['vrstice']['Node']
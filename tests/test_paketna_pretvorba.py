@@ -0,0 +1,86 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+import json
+import os
+import sqlite3
+
+import geopandas as gpd
+import pandas as pd
+import shapely
+
+from gredos2x.gredos_paketna_pretvorba import pozeni_opravilo, main, PRIPONA_ODTISA
+
+
+def pokvari_geometrije(imenik):
+    """V plasti POINT izbriše geometrijo, v plasti LINE pa eno linijo nadomesti z linijo z eno samo točko (obe se odstranita)."""
+    point = gpd.read_file(os.path.join(imenik, 'POINT.shp'))
+    point.loc[5, 'geometry'] = None
+    point.to_file(os.path.join(imenik, 'POINT.shp'), encoding='cp1250')
+    line = gpd.read_file(os.path.join(imenik, 'LINE.shp'))
+    x, y = line.geometry[3].coords[0]
+    line.loc[3, 'geometry'] = shapely.LineString([(x, y), (x, y)])
+    line.to_file(os.path.join(imenik, 'LINE.shp'), encoding='cp1250')
+
+
+def test_paketna_pretvorba_z_odstranjenimi_geometrijami(kopija_modela, tmp_path):
+    pokvari_geometrije(kopija_modela['imenik'])
+    izhod = str(tmp_path / 'izvoz' / 'model.gpkg')
+    opravilo = {'ime': 'model', 'mdb': kopija_modela['mdb'], 'materiali': kopija_modela['materiali'], 'izhod': izhod,
+                'nastavitve': {'velikost_dela': 500}}
+
+    rezultat = pozeni_opravilo(opravilo, str(tmp_path))
+
+    assert rezultat['stanje'] == 'uspeh', rezultat.get('napaka')
+    with sqlite3.connect(izhod) as povezava:
+        manifest = pd.read_sql_query('SELECT * FROM g2x_manifest', povezava).set_index('tabela')
+    vrstice = kopija_modela['vrstice']
+    for plast in ['POINT_geo', 'LINE_geo']:
+        assert manifest.at[plast, 'odstranjene'] == 1
+        assert manifest.at[plast, 'vrstice'] == vrstice[plast] - 1
+    assert manifest.at['LNODE_geo', 'odstranjene'] == 0
+
+
+def test_ukaz_paketne_pretvorbe(sinteticni_model, tmp_path):
+    manifest = str(tmp_path / 'manifest.json')
+    with open(manifest, 'w', encoding='utf-8') as f:
+        json.dump({'privzeto': {'mdb': sinteticni_model['mdb'], 'materiali': sinteticni_model['materiali']},
+                   'opravila': [{'izhod': 'izvoz/prvi.gpkg'},
+                                {'izhod': 'izvoz/drugi.gpkg', 'nastavitve': {'velikost_dela': 700}},
+                                {'ime': 'manjka', 'mdb': 'ni.mdb', 'izhod': 'izvoz/manjka.gpkg'}]}, f)
+    dnevniki = str(tmp_path / 'dnevniki')
+    povzetek = str(tmp_path / 'povzetek.json')
+
+    assert main([manifest, '--procesi', '2', '--imenik-dnevnikov', dnevniki, '--povzetek', povzetek]) == 1
+    with open(povzetek, encoding='utf-8') as f:
+        rezultati = {r['ime']: r for r in json.load(f)['rezultati']}
+    assert {ime: r['stanje'] for ime, r in rezultati.items()} == {'prvi': 'uspeh', 'drugi': 'uspeh', 'manjka': 'napaka'}
+    assert 'FileNotFoundError' in rezultati['manjka']['napaka']
+    for ime in ['prvi', 'drugi']:
+        izhod = str(tmp_path / 'izvoz' / f'{ime}.gpkg')
+        assert os.path.exists(izhod) and os.path.exists(izhod + PRIPONA_ODTISA)
+        assert os.path.exists(os.path.join(dnevniki, f'{ime}.log')) and os.path.exists(os.path.join(dnevniki, f'{ime}.metrike.jsonl'))
+        with sqlite3.connect(izhod) as povezava:
+            assert povezava.execute('SELECT count(*) FROM Node').fetchone()[0] == sinteticni_model['vrstice']['Node']
+    assert not [d for d in os.listdir(tmp_path / 'izvoz') if d.endswith('.tmp.gpkg')]
+
+    # ponoven zagon preskoči opravila z enakim prstnim odtisom, --prisili jih izvede znova
+    assert main([manifest, '--imenik-dnevnikov', dnevniki, '--povzetek', povzetek]) == 1
+    with open(povzetek, encoding='utf-8') as f:
+        assert json.load(f)['stanja'] == {'uspeh': 0, 'preskoceno': 2, 'napaka': 1}
+    assert main([manifest, '--imenik-dnevnikov', dnevniki, '--povzetek', povzetek, '--prisili']) == 1
+    with open(povzetek, encoding='utf-8') as f:
+        assert json.load(f)['stanja'] == {'uspeh': 2, 'preskoceno': 0, 'napaka': 1}
@@ -0,0 +1,53 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from gredos2x.gredos2pandapower import Gredos2Pandapower
+from gredos2x.gredos_shema import kljuc_kot_niz
+
+pp = pytest.importorskip('pandapower')
+
+
+def test_stevilo_elementov_in_pretok_moci(izvoz_modela):
+    net = Gredos2Pandapower(izvoz_modela).zgradi_mrezo()
+
+    with sqlite3.connect(izvoz_modela) as povezava:
+        node = pd.read_sql_query('SELECT NodeId, P, Q, Generation FROM Node', povezava)
+        branch = kljuc_kot_niz(pd.read_sql_query('SELECT BranchId FROM Branch', povezava)['BranchId'])
+        z_odseki = kljuc_kot_niz(pd.read_sql_query('SELECT DISTINCT BranchId FROM Section', povezava)['BranchId'])
+        transformatorji = kljuc_kot_niz(pd.read_sql_query('SELECT BranchId FROM Transformer', povezava)['BranchId'])
+        stikala = kljuc_kot_niz(pd.read_sql_query('SELECT BranchId FROM Switching_device', povezava)['BranchId'])
+    vodi = branch.isin(z_odseki) & ~branch.isin(transformatorji)
+    brez_impedance = ~branch.isin(z_odseki) & ~branch.isin(transformatorji)
+
+    assert len(net.bus) == len(node)
+    assert len(net.line) == vodi.sum()
+    assert len(net.trafo) == len(transformatorji)
+    assert len(net.switch) == branch[vodi].isin(stikala).sum() + brez_impedance.sum()
+    assert len(net.load) == ((node['P'] != 0) | (node['Q'] != 0)).sum()
+    assert len(net.ext_grid) == (node['Generation'] != 0).sum()
+    assert net.load['p_mw'].sum() == pytest.approx(node['P'].sum() / 1000)
+
+    pp.runpp(net)
+    assert net.converged
+    # napajane zbiralke imajo napetost med 0.9 in 1 p.u., moč napajanja pokrije odjeme in izgube
+    napetosti = net.res_bus['vm_pu'].dropna()
+    assert len(napetosti) > 0 and napetosti.between(0.9, 1.0 + 1e-9).all()
+    izgube = net.res_line['pl_mw'].sum() + net.res_trafo['pl_mw'].sum()
+    assert net.res_ext_grid['p_mw'].sum() == pytest.approx(net.res_load['p_mw'].sum() + izgube, rel=1e-6)
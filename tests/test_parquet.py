@@ -0,0 +1,54 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+
+import os
+
+import geopandas as gpd
+import pandas as pd
+
+from gredos2x.gredos2parquet import Gredos2Parquet
+from gredos2x.gredos_kontrolne_vsote import preberi_kontrolne_vsote
+from gredos2x.gredos_meritve import Merilnik
+
+
+def test_parquet_po_delih(kopija_modela, tmp_path):
+    # stolpec, ki je v prvih delih prazen (float64), v zadnjem pa vsebuje nize: shema se med zapisom poenoti
+    pot_node = os.path.join(kopija_modela['imenik'], 'Node.csv')
+    node = pd.read_csv(pot_node, dtype=str)
+    node['Opis'] = None
+    node.loc[1800:, 'Opis'] = 'TP'
+    node.to_csv(pot_node, index=False)
+
+    izvozi = {}
+    for velikost_dela in [None, 500]:
+        izvoz = Gredos2Parquet(kopija_modela['mdb'], kopija_modela['materiali'], str(tmp_path / f'izvoz_{velikost_dela}'),
+                               particije=['izvod', 'datum'], merilnik=Merilnik())
+        izvoz.pozeni_uvoz(velikost_dela=velikost_dela)
+        izvozi[velikost_dela] = izvoz
+
+    manifesti = [preberi_kontrolne_vsote(izvoz).set_index('tabela')[['vrstice', 'kontrolna_vsota']].sort_index()
+                 for izvoz in izvozi.values()]
+    pd.testing.assert_frame_equal(*manifesti)
+
+    po_delih = izvozi[500].imenik_parquet
+    deli_node = [d for d in izvozi[500].merilnik.dogodki if d['faza'] == 'zapis' and d.get('tabela') == 'Node']
+    assert len(deli_node) == 4
+    node = pd.read_parquet(os.path.join(po_delih, 'Node'))
+    assert len(node) == 2000
+    assert node['Opis'].value_counts().to_dict() == {'TP': 200}
+    line = gpd.read_parquet(os.path.join(po_delih, 'LINE_geo'))
+    assert len(line) == kopija_modela['vrstice']['LINE_geo']
+    assert line.crs == gpd.read_parquet(os.path.join(izvozi[None].imenik_parquet, 'LINE_geo')).crs
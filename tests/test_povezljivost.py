@@ -0,0 +1,60 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import os
+import sqlite3
+
+import geopandas as gpd
+import pandas as pd
+import shapely
+
+from gredos2x.gredos2gpkg import Gredos2GPKG
+from gredos2x.gredos_povezljivost import povzetek_povezljivosti, preveri_povezljivost_gpkg
+
+
+def test_povezan_model(sinteticni_model, tmp_path):
+    izhod = str(tmp_path / 'izvoz.gpkg')
+    Gredos2GPKG(sinteticni_model['mdb'], sinteticni_model['materiali'], izhod).pozeni_uvoz(velikost_dela=500)
+
+    assert preveri_povezljivost_gpkg(izhod, zapisi=False).empty
+
+
+def test_neskladja_povezljivosti(kopija_modela, tmp_path):
+    imenik = kopija_modela['imenik']
+    pot_branch = os.path.join(imenik, 'Branch.csv')
+    branch = pd.read_csv(pot_branch, dtype=str)
+    # Node2 prve veje kaže na drugo vozlišče, njena linija pa še vedno konča v prejšnjem vozlišču
+    pokvarjena_veja, staro_vozlisce, novo_vozlisce = branch.at[0, 'BranchId'], branch.at[0, 'Node2'], branch.at[50, 'Node2']
+    branch.at[0, 'Node2'] = novo_vozlisce
+    branch.to_csv(pot_branch, index=False)
+    # konec linije druge veje se premakne stran od vozlišč
+    pot_line = os.path.join(imenik, 'LINE.shp')
+    line = gpd.read_file(pot_line)
+    premaknjena_veja = line.at[10, 'BranchId']
+    (x1, y1), (x2, y2) = line.geometry[10].coords
+    line.loc[10, 'geometry'] = shapely.LineString([(x1, y1), (x2 + 100, y2 + 100)])
+    line.to_file(pot_line, encoding='cp1250')
+
+    izhod = str(tmp_path / 'izvoz.gpkg')
+    Gredos2GPKG(kopija_modela['mdb'], kopija_modela['materiali'], izhod).pozeni_uvoz(velikost_dela=500, preveri_povezljivost=True)
+
+    with sqlite3.connect(izhod) as povezava:
+        neskladja = pd.read_sql_query('SELECT veja, konec, vozlisce, pricakovano_vozlisce, neskladje FROM g2x_povezljivost',
+                                      povezava).set_index('veja')
+    assert set(neskladja.index) == {pokvarjena_veja, premaknjena_veja}
+    assert neskladja.loc[pokvarjena_veja, ['neskladje', 'vozlisce', 'pricakovano_vozlisce']].tolist() == [
+        'napacno_vozlisce', staro_vozlisce, novo_vozlisce]
+    assert neskladja.at[premaknjena_veja, 'neskladje'] == 'konec_brez_vozlisca'
+    assert povzetek_povezljivosti(preveri_povezljivost_gpkg(izhod, zapisi=False))['veje'].tolist() == [1, 1]
@@ -0,0 +1,78 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import os
+import sqlite3
+
+import pandas as pd
+
+from gredos2x.gredos2gpkg import Gredos2GPKG
+from gredos2x.gredos_meritve import Merilnik
+from gredos2x.gredos_predpomnilnik import PredpomnilnikRezultatov, PredpomnilnikMaterialov
+
+
+def preberi_manifest(pot_gpkg):
+    with sqlite3.connect(pot_gpkg) as povezava:
+        return pd.read_sql_query('SELECT tabela, vrstice, kontrolna_vsota FROM g2x_manifest ORDER BY tabela', povezava)
+
+
+def test_ponovni_izvoz_iz_predpomnilnika(sinteticni_model, tmp_path):
+    predpomnilnik = PredpomnilnikRezultatov(str(tmp_path / 'predpomnilnik'))
+    manifesti, zapisi = [], []
+    for i in range(2):
+        izhod = str(tmp_path / f'izvoz_{i}.gpkg')
+        merilnik = Merilnik()
+        izvoz = Gredos2GPKG(sinteticni_model['mdb'], sinteticni_model['materiali'], izhod, merilnik=merilnik)
+        izvoz.pozeni_uvoz_s_predpomnilnikom(predpomnilnik, velikost_dela=1000)
+        manifesti.append(preberi_manifest(izhod))
+        zapisi.append(sum(d['faza'] == 'zapis' for d in merilnik.dogodki))
+
+    # drugi izvoz se postreže iz predpomnilnika, brez branja in zapisa tabel
+    assert (predpomnilnik.zgresitve, predpomnilnik.zadetki) == (1, 1)
+    assert zapisi[0] > 0 and zapisi[1] == 0
+    pd.testing.assert_frame_equal(*manifesti)
+
+
+def test_predpomnilnik_materialov(kopija_modela, tmp_path, monkeypatch):
+    # prazen predpomnilnik procesa, ki ga sicer delijo vsi testi
+    monkeypatch.setattr(PredpomnilnikMaterialov, '_tabele', {})
+    materiali = kopija_modela['materiali']
+    imenik = str(tmp_path / 'materiali')
+
+    prvi = PredpomnilnikMaterialov(imenik)
+    tabela = prvi.preberi(materiali)
+    assert (prvi.zgresitve, prvi.zadetki) == (1, 0)
+    assert len(tabela) == kopija_modela['vrstice']['MATERIAL'] and len(os.listdir(imenik)) == 1
+
+    # drugi predpomnilnik v istem procesu dobi tabelo iz pomnilnika, vrnjena kopija ne spremeni shranjene tabele
+    tabela.drop(tabela.index, inplace=True)
+    drugi = PredpomnilnikMaterialov(imenik)
+    merilnik = Merilnik()
+    iz_pomnilnika = drugi.preberi(materiali, merilnik=merilnik)
+    assert (drugi.zgresitve, drugi.zadetki) == (0, 1) and merilnik.dogodki[-1]['predpomnilnik'] == 'pomnilnik'
+    assert len(iz_pomnilnika) == kopija_modela['vrstice']['MATERIAL']
+
+    # nov proces (prazen pomnilnik) prebere tabelo z diska
+    monkeypatch.setattr(PredpomnilnikMaterialov, '_tabele', {})
+    tretji = PredpomnilnikMaterialov(imenik)
+    pd.testing.assert_frame_equal(tretji.preberi(materiali, merilnik=merilnik), iz_pomnilnika)
+    assert (tretji.zgresitve, tretji.zadetki) == (0, 1) and merilnik.dogodki[-1]['predpomnilnik'] == 'disk'
+
+    # spremenjena datoteka materialov dobi nov ključ
+    with open(materiali, 'ab') as f:
+        f.write(b'\n')
+    cetrti = PredpomnilnikMaterialov(imenik)
+    cetrti.preberi(materiali)
+    assert (cetrti.zgresitve, cetrti.zadetki) == (1, 0) and len(os.listdir(imenik)) == 2
@@ -0,0 +1,65 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import shutil
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gredos2x.gredos2gpkg import Gredos2GPKG
+from gredos2x.gredos_pretok_moci import RadialniPretokMoci
+
+
+@pytest.fixture
+def kopija_izvoza(izvoz_modela, tmp_path):
+    pot = str(tmp_path / 'model.gpkg')
+    shutil.copy(izvoz_modela, pot)
+    return pot
+
+
+def test_pretok_moci_konvergira(sinteticni_model, kopija_izvoza):
+    izvodi = Gredos2GPKG(sinteticni_model['mdb'], sinteticni_model['materiali'], kopija_izvoza).izracunaj_pretok_moci()
+
+    assert len(izvodi) == 10 and izvodi['Konvergiran'].all()
+    with sqlite3.connect(kopija_izvoza) as povezava:
+        vozlisca = pd.read_sql_query('SELECT * FROM LF_vozlisca', povezava)
+        veje = pd.read_sql_query('SELECT * FROM LF_veje', povezava)
+        branch = pd.read_sql_query('SELECT BranchId, Node1 FROM Branch', povezava)
+    assert len(vozlisca) == sinteticni_model['vrstice']['Node'] and len(veje) == sinteticni_model['vrstice']['Branch']
+
+    # napajalna vozlišča so na 1 p.u., napetosti drugod padajo; vozlišča za odprtimi stikali niso napajana
+    napajana = vozlisca[vozlisca['Izvod'].notna()]
+    assert (napajana.loc[napajana['Nivo'] == 0, 'U_pu'] == 1.0).all()
+    assert napajana['U_pu'].between(0.9, 1.0).all()
+    assert vozlisca.loc[vozlisca['Izvod'].isna(), 'U_pu'].isna().all()
+
+    # moč na začetku izvoda je enaka vsoti odjemov in izgub izvoda
+    for izvod, skupina in napajana.groupby('Izvod'):
+        glava = veje['BranchId'].isin(branch.loc[branch['Node1'] == izvod, 'BranchId'])
+        izgube = veje.loc[veje['Izvod'] == izvod, 'Izgube_kW'].sum() / 1000
+        assert veje.loc[glava, 'P_MW'].sum() == pytest.approx(skupina['P_MW'].sum() + izgube, rel=1e-6)
+
+
+def test_vzporeden_izracun_enak_zaporednemu(izvoz_modela):
+    zaporedno = RadialniPretokMoci(izvoz_modela).izracunaj()
+    vzporedno = RadialniPretokMoci(izvoz_modela).izracunaj(vzporedno=True, st_procesov=2)
+
+    # skupine izvodov iterirajo do skupne konvergence, zato se rezultati razlikujejo največ za toleranco
+    for tabela, stolpec in [('vozlisca', 'U_pu'), ('veje', 'I_A')]:
+        assert np.allclose(zaporedno[tabela][stolpec], vzporedno[tabela][stolpec], rtol=1e-5, equal_nan=True)
+    assert vzporedno['izvodi']['Konvergiran'].all()
+    assert (zaporedno['izvodi']['Vozlisca'] == vzporedno['izvodi']['Vozlisca']).all()
@@ -0,0 +1,53 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import os
+import sqlite3
+
+import pandas as pd
+
+from gredos2x.gredos2gpkg import Gredos2GPKG
+from gredos2x.gredos_preverjanje import preveri_celovitost_gpkg, povzetek_celovitosti
+
+
+def test_celovit_model(sinteticni_model, tmp_path):
+    izhod = str(tmp_path / 'izvoz.gpkg')
+    Gredos2GPKG(sinteticni_model['mdb'], sinteticni_model['materiali'], izhod).pozeni_uvoz(velikost_dela=500)
+
+    assert preveri_celovitost_gpkg(izhod).empty
+
+
+def test_pokvarjene_reference(kopija_modela, tmp_path):
+    imenik = kopija_modela['imenik']
+    # Node2 prve veje ne kaže na nobeno vozlišče, vozlišče pa se v tabeli Node ponovi
+    pot_branch = os.path.join(imenik, 'Branch.csv')
+    branch = pd.read_csv(pot_branch, dtype=str)
+    branch.at[0, 'Node2'] = '999'
+    branch.to_csv(pot_branch, index=False)
+    pot_node = os.path.join(imenik, 'Node.csv')
+    node = pd.read_csv(pot_node, dtype=str)
+    podvojeno_vozlisce = node.at[10, 'NodeId']
+    pd.concat([node, node.iloc[[10]]]).to_csv(pot_node, index=False)
+
+    izhod = str(tmp_path / 'izvoz.gpkg')
+    Gredos2GPKG(kopija_modela['mdb'], kopija_modela['materiali'], izhod).pozeni_uvoz(velikost_dela=500, preveri_celovitost=True)
+
+    with sqlite3.connect(izhod) as povezava:
+        celovitost = pd.read_sql_query('SELECT * FROM g2x_celovitost ORDER BY preverjanje', povezava)
+    assert celovitost[['preverjanje', 'tabela', 'stolpec', 'kljuc', 'ciljna_tabela', 'vrstice']].values.tolist() == [
+        ['podvojen_kljuc', 'Node', 'NodeId', podvojeno_vozlisce, None, 2],
+        ['tuji_kljuc', 'Branch', 'Node2', '999', 'Node', 1]]
+    pd.testing.assert_frame_equal(povzetek_celovitosti(preveri_celovitost_gpkg(izhod)),
+                                  povzetek_celovitosti(celovitost), check_dtype=False)
@@ -0,0 +1,46 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import os
+import pstats
+import shutil
+import tracemalloc
+
+from gredos2x.gredos2cim import Gredos2CIM
+from gredos2x.gredos_meritve import Merilnik
+
+
+def test_profili_faz_izvoza(izvoz_modela, tmp_path):
+    gpkg = str(tmp_path / 'model.gpkg')
+    shutil.copy(izvoz_modela, gpkg)
+    imenik = str(tmp_path / 'profili')
+    merilnik = Merilnik()
+    Gredos2CIM(gpkg, str(tmp_path / 'model.zip'), merilnik=merilnik).pozeni_izvoz(imenik_profilov=imenik)
+
+    # za vsako fazo profil cProfile in izpis najdražjih funkcij ter mest alokacij
+    datoteke = sorted(os.listdir(imenik))
+    profili = [d for d in datoteke if d.endswith('.prof')]
+    assert {d[:-5] for d in profili} == {d[:-4] for d in datoteke if d.endswith('.txt')}
+    assert [d[5:] for d in profili if '_zapis_' in d] == ['zapis_EQ.prof', 'zapis_TP.prof', 'zapis_GL.prof']
+    assert {os.path.basename(d['profil']) for d in merilnik.dogodki} == set(profili)
+
+    stats = pstats.Stats(os.path.join(imenik, profili[0]))
+    assert stats.total_calls > 0
+    with open(os.path.join(imenik, profili[0][:-5] + '.txt'), encoding='utf-8') as f:
+        izpis = f.read()
+    assert 'Najdražje funkcije' in izpis and 'Mesta alokacij' in izpis
+
+    # po izvozu je profiliranje izklopljeno
+    assert merilnik._profiliranje is None and not tracemalloc.is_tracing()
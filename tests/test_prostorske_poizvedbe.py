@@ -0,0 +1,93 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from gredos2x.gredos_gpkg2dataframes import GredosGPKG2df
+
+
+def nakljucne_tocke(gdf, n, seme=0):
+    xmin, ymin, xmax, ymax = gdf.total_bounds
+    rng = np.random.default_rng(seme)
+    return np.column_stack([rng.uniform(xmin - 50, xmax + 50, n), rng.uniform(ymin - 50, ymax + 50, n)])
+
+
+def pari(rezultat, kljuc):
+    return set(zip(rezultat['poizvedba'].tolist(), rezultat[kljuc].astype(str).tolist()))
+
+
+def test_najblizji_enak_polnemu_iskanju(izvoz_modela):
+    rd = GredosGPKG2df(izvoz_modela)
+    for plast, kljuc in [('POINT_geo', 'NodeId'), ('LINE_geo', 'BranchId')]:
+        gdf = rd.preberi_geografsko_tabelo_iz_gpkg(plast)
+        tocke = nakljucne_tocke(gdf, 50)
+        rezultat = rd.najblizji(plast, tocke)
+
+        # polno iskanje: razdalje od vsake točke do vseh elementov
+        razdalje = shapely.distance(shapely.points(tocke)[:, None], gdf.geometry.to_numpy()[None, :])
+        najmanjse = razdalje.min(axis=1)
+        pricakovano = {(i, str(gdf[kljuc].iat[j])) for i, j in zip(*np.nonzero(np.isclose(razdalje, najmanjse[:, None])))}
+        assert pari(rezultat, kljuc) == pricakovano
+        assert np.allclose(rezultat['razdalja'], najmanjse[rezultat['poizvedba']])
+
+    # max_razdalja izloči poizvedbe brez elementa v dosegu
+    rezultat = rd.najblizji('LINE_geo', tocke, max_razdalja=20)
+    assert 0 < len(rezultat) < len(tocke)
+    assert set(rezultat['poizvedba']) == set(np.flatnonzero(najmanjse <= 20))
+
+
+def test_v_obmocju_in_v_radiju_enaka_polnemu_iskanju(izvoz_modela):
+    rd = GredosGPKG2df(izvoz_modela)
+    vodi = rd.preberi_geografsko_tabelo_iz_gpkg('LINE_geo')
+    sredisca = nakljucne_tocke(vodi, 5, seme=1)
+    obmocja = shapely.buffer(shapely.points(sredisca), 300)
+    rezultat = rd.v_obmocju('LINE_geo', obmocja)
+    seka = shapely.intersects(obmocja[:, None], vodi.geometry.to_numpy()[None, :])
+    assert pari(rezultat, 'BranchId') == {(i, str(vodi['BranchId'].iat[j])) for i, j in zip(*np.nonzero(seka))}
+    assert len(rezultat) > 0
+
+    odjemi = rd.preberi_geografsko_tabelo_iz_gpkg('LNODE_geo')
+    tocke = nakljucne_tocke(odjemi, 20, seme=2)
+    rezultat = rd.v_radiju('LNODE_geo', tocke, 500)
+    razdalje = shapely.distance(shapely.points(tocke)[:, None], odjemi.geometry.to_numpy()[None, :])
+    assert pari(rezultat, 'LNodeId') == {(i, str(odjemi['LNodeId'].iat[j])) for i, j in zip(*np.nonzero(razdalje <= 500))}
+    assert (rezultat['razdalja'] <= 500).all() and len(rezultat) > 0
+
+
+def test_atributi_poizvedbe(izvoz_modela):
+    rd = GredosGPKG2df(izvoz_modela)
+    rezultat = rd.najblizji('POINT_geo', nakljucne_tocke(rd.preberi_geografsko_tabelo_iz_gpkg('POINT_geo'), 20))
+    node = rd.nalozi_negeografsko_tabelo('Node').set_index('NodeId')
+    pricakovano = node.loc[rezultat['NodeId'], 'Un'].to_numpy()
+    assert np.array_equal(rezultat['Un'].to_numpy(dtype=float), pd.to_numeric(pricakovano).astype(float))
+    assert 'Un' not in rd.najblizji('POINT_geo', (400000, 30000), atributi=False).columns
+
+
+def test_prostorski_indeks_se_osvezi_ob_spremembi(izvoz_modela, tmp_path):
+    gpkg = str(tmp_path / 'model.gpkg')
+    shutil.copy(izvoz_modela, gpkg)
+    rd = GredosGPKG2df(gpkg)
+    gdf, drevo = rd.prostorski_indeks('POINT_geo')
+    assert len(drevo) == len(gdf)
+    assert rd.prostorski_indeks('POINT_geo')[1] is drevo
+
+    stanje = os.stat(gpkg)
+    os.utime(gpkg, ns=(stanje.st_atime_ns, stanje.st_mtime_ns + 10 ** 9))
+    assert rd.prostorski_indeks('POINT_geo')[1] is not drevo
@@ -0,0 +1,56 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import pandas as pd
+import pytest
+
+from gredos2x.gredos_razlike import primerjaj_modela, primerjaj_tabelo, povzetek_razlik
+from gredos2x.gredos_zgodovina import ZgodovinaModela
+
+
+def test_razlike_neodvisne_od_velikosti_dela(posnetka_modela):
+    stari, novi = posnetka_modela['posnetki']
+    # deli, manjši od tabel, se primerjajo v več oknih ključev
+    razlike = [primerjaj_modela(stari, novi, toleranca=0.05, velikost_dela=velikost_dela).sort_values(['tabela', 'kljuc'])
+               .reset_index(drop=True) for velikost_dela in [100000, 300, 70]]
+    for r in razlike[1:]:
+        pd.testing.assert_frame_equal(razlike[0], r)
+
+    r = razlike[0].set_index('tabela')
+    assert r[['kljuc', 'sprememba']].values.tolist() == [
+        [posnetka_modela['odstranjeno'], 'odstranjen'], [posnetka_modela['spremenjeno'], 'spremenjen'],
+        [posnetka_modela['premaknjeno'], 'spremenjen']]
+    assert r.at['Node', 'stolpci'] == 'P'
+    assert r.at['POINT_geo', 'premik'] == pytest.approx(5.0)
+    assert povzetek_razlik(razlike[0]).set_index('tabela').loc['LNode', 'odstranjen'] == 1
+
+
+def test_toleranca_in_vrednosti(posnetka_modela):
+    stari, novi = posnetka_modela['posnetki']
+    assert primerjaj_tabelo(stari, novi, 'POINT_geo', toleranca=10).empty
+
+    razlike = primerjaj_tabelo(stari, novi, 'Node', vrednosti=True)
+    assert float(razlike['potem'][0]['P']) == 999.5 and float(razlike['prej'][0]['P']) != 999.5
+
+
+def test_enake_razlike_kot_zgodovina(posnetka_modela, tmp_path):
+    zgodovina = ZgodovinaModela(str(tmp_path / 'zgodovina.sqlite'))
+    for pot in posnetka_modela['posnetki']:
+        zgodovina.dodaj_posnetek(pot)
+
+    stolpci = ['tabela', 'kljuc', 'sprememba']
+    iz_zgodovine = zgodovina.razlike('2026-01-26', '2026-02-26')[stolpci].sort_values(stolpci).reset_index(drop=True)
+    razlike = primerjaj_modela(*posnetka_modela['posnetki'], toleranca=0, velikost_dela=300)[stolpci].sort_values(stolpci)
+    pd.testing.assert_frame_equal(iz_zgodovine, razlike.reset_index(drop=True))
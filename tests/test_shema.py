@@ -0,0 +1,37 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import pandas as pd
+import pytest
+
+from gredos2x.gredos_shema import najdi_stolpec
+
+
+def test_najdi_stolpec():
+    section = pd.DataFrame(columns=['BRANCHID', 'Length', 'Dolzina'])
+    assert najdi_stolpec(section, 'Section', 'veja') == 'BRANCHID'
+    assert najdi_stolpec(section, 'Section', 'dolzina') == 'Length'
+    assert najdi_stolpec(section, 'Section', 'dolzina', stolpci={'Section': {'dolzina': 'Dolzina'}}) == 'Dolzina'
+
+
+def test_drugacno_ime_stolpca_sprozi_napako():
+    # stolpec z drugim imenom se ne izbere sam, ime se poda s parametrom stolpci
+    node = pd.DataFrame(columns=['NodeId', 'Unom'])
+    with pytest.raises(KeyError, match='stolpci='):
+        najdi_stolpec(node, 'Node', 'un')
+    assert najdi_stolpec(node, 'Node', 'un', obvezen=False) is None
+    assert najdi_stolpec(node, 'Node', 'un', stolpci={'Node': {'un': 'Unom'}}) == 'Unom'
+    with pytest.raises(KeyError):
+        najdi_stolpec(node, 'Node', 'neznana_vloga')
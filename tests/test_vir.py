@@ -0,0 +1,67 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import os
+import shutil
+import sqlite3
+import zipfile
+
+import pandas as pd
+import pytest
+
+from gredos2x import gredos_vir
+from gredos2x.gredos2gpkg import Gredos2GPKG
+
+
+def preberi_manifest(pot_gpkg):
+    with sqlite3.connect(pot_gpkg) as povezava:
+        manifest = pd.read_sql_query('SELECT tabela, vrstice, kontrolna_vsota, stolpci FROM g2x_manifest', povezava)
+    return manifest.set_index('tabela').sort_index()
+
+
+@pytest.fixture
+def paketa_modela(sinteticni_model, tmp_path):
+    """Paket tabel in shp datotek modela (imenik, v katerem je tabela Branch zapisana kot parquet) in paket materialov."""
+    imenik = os.path.dirname(sinteticni_model['mdb'])
+    paket, materiali = tmp_path / 'model', tmp_path / 'materiali'
+    paket.mkdir()
+    materiali.mkdir()
+    for datoteka in os.listdir(imenik):
+        if datoteka == 'MATERIAL.csv':
+            shutil.copy(os.path.join(imenik, datoteka), materiali)
+        elif datoteka == 'Branch.csv':
+            branch = pd.read_csv(os.path.join(imenik, datoteka), dtype=gredos_vir.TIPI_STOLPCEV['Branch'])
+            branch.to_parquet(paket / 'Branch.parquet', index=False)
+        elif os.path.splitext(datoteka)[1] in ('.csv', '.shp', '.shx', '.dbf', '.prj', '.cpg'):
+            shutil.copy(os.path.join(imenik, datoteka), paket)
+    return str(paket), str(materiali)
+
+
+def test_izvoz_iz_paketa_enak_izvozu_iz_mdb(izvoz_modela, paketa_modela, tmp_path):
+    paket, materiali = paketa_modela
+    zip_paketa = str(tmp_path / 'model.zip')
+    with zipfile.ZipFile(zip_paketa, 'w') as arhiv:
+        for datoteka in os.listdir(paket):
+            arhiv.write(os.path.join(paket, datoteka), f'izvoz/{datoteka}')
+    assert gredos_vir.je_paket(paket) and gredos_vir.je_paket(zip_paketa) and not gredos_vir.je_paket(izvoz_modela)
+    assert gredos_vir.poisci_tabelo_paketa(zip_paketa, 'branch') == 'izvoz/Branch.parquet'
+
+    iz_mdb = preberi_manifest(izvoz_modela)
+    for i, vir in enumerate([paket, zip_paketa]):
+        izhod = str(tmp_path / f'izvoz_{i}.gpkg')
+        Gredos2GPKG(vir, materiali, izhod).pozeni_uvoz()
+        iz_paketa = preberi_manifest(izhod)
+        pd.testing.assert_frame_equal(iz_paketa, iz_mdb.loc[iz_paketa.index])
+        assert set(iz_paketa.index) >= {'Node', 'Branch', 'MATERIAL', 'POINT_geo', 'LINE_geo', 'LNODE_geo'}
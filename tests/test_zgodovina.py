@@ -0,0 +1,54 @@
+ #
+ # Copyright (c) 2022 Gregor Skrt.
+ #
+ # This program is free software: you can redistribute it and/or modify
+ # it under the terms of the GNU General Public License as published by
+ # the Free Software Foundation, version 3.
+ #
+ # This program is distributed in the hope that it will be useful, but
+ # WITHOUT ANY WARRANTY; without even the implied warranty of
+ # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+ # General Public License for more details.
+ #
+ # You should have received a copy of the GNU General Public License
+ # along with this program. If not, see <http://www.gnu.org/licenses/>.
+ #
+import sqlite3
+
+import pandas as pd
+
+from gredos2x.gredos_zgodovina import ZgodovinaModela
+
+
+def test_razlike_in_stanje_posnetkov(posnetka_modela, tmp_path):
+    zgodovina = ZgodovinaModela(str(tmp_path / 'zgodovina.sqlite'))
+    for pot in posnetka_modela['posnetki']:
+        zgodovina.dodaj_posnetek(pot)
+
+    razlike = zgodovina.razlike('2026-01-26', '2026-02-26').sort_values(['tabela', 'kljuc'])
+    assert razlike[['tabela', 'kljuc', 'sprememba']].values.tolist() == [
+        ['LNode', posnetka_modela['odstranjeno'], 'odstranjen'],
+        ['Node', posnetka_modela['spremenjeno'], 'spremenjen'],
+        ['POINT_geo', posnetka_modela['premaknjeno'], 'spremenjen']]
+    assert razlike.set_index('tabela').at['Node', 'stolpci'] == 'P'
+
+    # stanje na prvi datum ima še prejšnji odjem in odstranjeno logično vozlišče
+    for datum, odjem in [('2026-01-26', False), ('2026-02-26', True)]:
+        node = zgodovina.stanje(datum, 'Node', geografsko=False).set_index('NodeId')
+        assert (float(node.at[posnetka_modela['spremenjeno'], 'P']) == 999.5) == odjem
+    assert posnetka_modela['odstranjeno'] in set(zgodovina.stanje('2026-01-26', 'LNode')['LNodeId'])
+    assert posnetka_modela['odstranjeno'] not in set(zgodovina.stanje('2026-02-26', 'LNode')['LNodeId'])
+
+
+def test_posnetek_shrani_le_spremenjene_vrstice(posnetka_modela, tmp_path):
+    pot = str(tmp_path / 'zgodovina.sqlite')
+    zgodovina = ZgodovinaModela(pot)
+    zgodovina.dodaj_posnetek(posnetka_modela['posnetki'][0])
+    with sqlite3.connect(pot) as povezava:
+        vrstice_prvega = pd.read_sql_query('SELECT count(*) AS n FROM "Node"', povezava)['n'][0]
+    zgodovina.dodaj_posnetek(posnetka_modela['posnetki'][1])
+    with sqlite3.connect(pot) as povezava:
+        vrstice = pd.read_sql_query('SELECT count(*) AS n FROM "Node"', povezava)['n'][0]
+
+    # spremenjeno vozlišče dobi novo različico, ostale vrstice se ne podvojijo
+    assert vrstice == vrstice_prvega + 1